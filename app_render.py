@@ -154,6 +154,7 @@ EMAIL_ID_INFLIGHT_LOCK_PREFIX = settings.EMAIL_ID_INFLIGHT_LOCK_PREFIX
 EMAIL_ID_INFLIGHT_LOCK_TTL_SECONDS = settings.EMAIL_ID_INFLIGHT_LOCK_TTL_SECONDS
 SUBJECT_GROUPS_MEMORY = set()
 email_config_valid = False
+_bg_email_poller_thread = None
 
 
 def _log_webhook_config_startup(app_instance: Flask):
@@ -340,11 +341,190 @@ def _init_services(app: Flask, redis_client_instance) -> None:
     try:
         from services.rate_limit_service import RateLimitService
         rls = RateLimitService.get_instance()
-        rls.configure(redis_client=redis_client_instance)
-        app.logger.info("SVC: RateLimitService initialized with Redis")
+        rls.configure(redis_client=redis_client_instance, algorithm=settings.WEBHOOK_RATE_LIMIT_ALGORITHM)
+        app.logger.info(f"SVC: RateLimitService initialized with Redis (algorithm={rls.algorithm})")
     except Exception as e:
         app.logger.error(f"SVC: Failed to initialize RateLimitService: {e}")
 
+    try:
+        from services.delivery_mode_service import DeliveryModeMemoryService
+        DeliveryModeMemoryService.get_instance().configure(
+            redis_client_instance,
+            key_prefix=settings.WEBHOOK_DELIVERY_MODE_REDIS_KEY_PREFIX,
+            ttl_sec=settings.WEBHOOK_DELIVERY_MODE_TTL_SECONDS,
+        )
+        app.logger.info("SVC: DeliveryModeMemoryService initialized")
+    except Exception as e:
+        app.logger.error(f"SVC: Failed to initialize DeliveryModeMemoryService: {e}")
+
+    try:
+        from services.circuit_breaker_service import WebhookCircuitBreakerService
+        WebhookCircuitBreakerService.get_instance().configure(
+            redis_client_instance,
+            key_prefix=settings.WEBHOOK_CIRCUIT_BREAKER_REDIS_KEY_PREFIX,
+            failure_threshold=settings.WEBHOOK_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            cooldown_sec=settings.WEBHOOK_CIRCUIT_BREAKER_COOLDOWN_SECONDS,
+            probe_timeout_sec=settings.WEBHOOK_CIRCUIT_BREAKER_PROBE_TIMEOUT_SECONDS,
+            logger=app.logger,
+        )
+        app.logger.info("SVC: WebhookCircuitBreakerService initialized")
+    except Exception as e:
+        app.logger.error(f"SVC: Failed to initialize WebhookCircuitBreakerService: {e}")
+
+    try:
+        from services.webhook_latency_service import WebhookLatencyService
+        WebhookLatencyService.get_instance().configure(
+            window=settings.WEBHOOK_LATENCY_WINDOW,
+            min_samples=settings.WEBHOOK_LATENCY_MIN_SAMPLES,
+            timeout_factor=settings.WEBHOOK_TIMEOUT_P99_FACTOR,
+            min_timeout_sec=settings.WEBHOOK_MIN_TIMEOUT_SECONDS,
+            retry_ratio=settings.WEBHOOK_RETRY_BUDGET_RATIO,
+            retry_min_per_window=settings.WEBHOOK_RETRY_BUDGET_MIN_PER_WINDOW,
+            retry_window_sec=settings.WEBHOOK_RETRY_BUDGET_WINDOW_SECONDS,
+        )
+        app.logger.info("SVC: WebhookLatencyService initialized")
+    except Exception as e:
+        app.logger.error(f"SVC: Failed to initialize WebhookLatencyService: {e}")
+
+    try:
+        from services.r2_transfer_service import R2TransferService
+        R2TransferService.get_instance().configure(
+            redis_client_instance,
+            index_redis_key=settings.R2_LINKS_INDEX_REDIS_KEY,
+        )
+        app.logger.info("SVC: R2TransferService link index initialized")
+    except Exception as e:
+        app.logger.error(f"SVC: Failed to configure R2TransferService link index: {e}")
+
+
+def _configure_poll_cycle_coordinator(app: Flask, redis_client_instance) -> None:
+    try:
+        from background.cycle_coordinator import PollCycleCoordinator
+
+        PollCycleCoordinator.get_instance().configure(
+            redis_client=redis_client_instance,
+            key_prefix=settings.POLL_CYCLE_REDIS_KEY_PREFIX,
+            lock_ttl_sec=settings.POLL_CYCLE_LOCK_TTL_SECONDS,
+            logger=app.logger,
+        )
+    except Exception as e:
+        app.logger.error("CFG POLL_CYCLE: Unable to configure cycle coordinator: %s", e)
+
+
+def _start_background_poller(app: Flask, redis_client_instance) -> None:
+    global _bg_email_poller_thread
+    if not settings.ENABLE_BACKGROUND_TASKS:
+        return
+    try:
+        from background.cycle_coordinator import PollCycleCoordinator
+        from background.poll_scheduler import PollScheduler, build_cadence, build_lease, last_cycle_new_mail_count
+        from email_processing import orchestrator as email_orchestrator
+
+        def _cycle():
+            with app.app_context():
+                return email_orchestrator.check_new_emails_and_trigger_webhook()
+
+        def _run_cycle():
+            if PollCycleCoordinator.get_instance().run_sync(_cycle, source="scheduler") is None:
+                return None
+            return last_cycle_new_mail_count()
+
+        def _gate():
+            with app.app_context():
+                return email_orchestrator.get_polling_gate()
+
+        scheduler = PollScheduler.start_instance(
+            run_cycle=_run_cycle,
+            lease=build_lease(redis_client_instance, settings),
+            interval_sec=settings.EMAIL_POLLING_INTERVAL_SECONDS,
+            cadence=build_cadence(settings),
+            gate=_gate,
+            logger=app.logger,
+        )
+        _bg_email_poller_thread = scheduler.thread
+        if redis_client_instance is None:
+            app.logger.warning("CFG BG: Redis unavailable; poller leader election limited to this host (file lock)")
+    except Exception as e:
+        app.logger.error("CFG BG: Unable to start background poller: %s", e)
+        return
+    _start_imap_idle_watcher(app, _cycle, _gate)
+
+
+def _start_imap_idle_watcher(app: Flask, run_cycle, gate) -> None:
+    if not (settings.IMAP_SESSION_POOL_ENABLED and settings.IMAP_IDLE_ENABLED):
+        return
+    if settings.IMAP_SESSION_POOL_SIZE < 2:
+        # La session en IDLE bloquerait celle des cycles
+        app.logger.warning("CFG BG: IMAP IDLE watcher needs IMAP_SESSION_POOL_SIZE >= 2; not started")
+        return
+    try:
+        from background.cycle_coordinator import PollCycleCoordinator
+        from background.imap_idle_watcher import ImapIdleWatcher
+        from email_processing.imap_client import ImapSessionPool
+
+        ImapIdleWatcher.start_instance(
+            pool=ImapSessionPool.get_instance(app.logger),
+            run_cycle=run_cycle,
+            coordinator=PollCycleCoordinator.get_instance(),
+            timeout_sec=settings.IMAP_IDLE_TIMEOUT_SECONDS,
+            gate=gate,
+            logger=app.logger,
+        )
+    except Exception as e:
+        app.logger.error("CFG BG: Unable to start IMAP IDLE watcher: %s", e)
+
+
+def _start_webhook_dispatcher(app: Flask, redis_client_instance) -> None:
+    # Le pacing du rate limit passe aussi par l'outbox: il lui faut un dispatcher. Les envois
+    # refusés par un circuit ouvert n'y sont différés que si l'outbox tourne déjà (sinon: UNSEEN)
+    if not (settings.WEBHOOK_OUTBOX_ENABLED or settings.WEBHOOK_RATE_LIMIT_PACING_ENABLED):
+        return
+    try:
+        from background.webhook_dispatcher import WebhookDispatcher, build_dispatcher_kwargs
+        from email_processing import orchestrator as email_orchestrator
+        from services.http_session_service import HttpSessionService
+        from services.rate_limit_service import RateLimitService
+        from services.webhook_logger_service import WebhookLoggerService
+        from services.webhook_outbox_service import WebhookOutboxService
+
+        outbox = WebhookOutboxService.get_instance()
+        outbox.configure(
+            redis_client=redis_client_instance,
+            key_prefix=settings.WEBHOOK_OUTBOX_REDIS_KEY_PREFIX,
+            sqlite_path=settings.WEBHOOK_OUTBOX_SQLITE_PATH,
+            logger=app.logger,
+        )
+
+        def _deliver(job, final_attempt):
+            with app.app_context():
+                return email_orchestrator.deliver_outbox_job(
+                    job,
+                    final_attempt,
+                    requests=HttpSessionService.get_instance(),
+                    record_send_event=RateLimitService.get_instance().record_event,
+                    append_webhook_log=WebhookLoggerService.get_instance().append_log,
+                    logger=app.logger,
+                    delivery_mode_memory=email_orchestrator._get_delivery_mode_memory(),
+                    circuit_breaker=email_orchestrator._get_circuit_breaker(),
+                    latency_tracker=email_orchestrator._get_latency_tracker(),
+                    rate_limiter=RateLimitService.get_instance(),
+                )
+
+        def _acknowledge(job):
+            with app.app_context():
+                email_orchestrator.acknowledge_outbox_job(job, logger=app.logger)
+
+        WebhookDispatcher.start_instance(
+            outbox=outbox,
+            deliver=_deliver,
+            acknowledge=_acknowledge,
+            logger=app.logger,
+            **build_dispatcher_kwargs(settings),
+        )
+        app.logger.info("CFG WEBHOOK: Outbox dispatcher started (backend=%s)", outbox.backend)
+    except Exception as e:
+        app.logger.error("CFG WEBHOOK: Unable to start outbox dispatcher: %s", e)
+
 
 def create_app(config_class=None) -> Flask:
     """Application Factory to create and configure the Flask application."""
@@ -407,6 +587,9 @@ def create_app(config_class=None) -> Flask:
         app.logger.warning("CFG WEBHOOK: SSL verification DISABLED for webhook calls (development/legacy). Use valid certificates in production.")
 
     _log_webhook_config_startup(app)
+    _configure_poll_cycle_coordinator(app, redis_client)
+    _start_background_poller(app, redis_client)
+    _start_webhook_dispatcher(app, redis_client)
 
     try:
         app.logger.info(
@@ -0,0 +1,348 @@
+"""
+background.cycle_coordinator
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Coordination "single-flight" des cycles de polling IMAP.
+
+Au plus un cycle en vol par processus (verrou local) et entre processus (bail
+Redis, voir background.poll_scheduler.RedisLease). Les déclenchements reçus
+pendant un cycle sont fusionnés en un seul cycle de suivi, exécuté dès la fin
+du cycle courant. Chaque déclenchement reçoit un identifiant de cycle dont le
+statut et la durée restent consultables (mémoire + Redis).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from background.poll_scheduler import RedisLease, _LeaseHeartbeat
+
+CYCLE_QUEUED = "queued"
+CYCLE_RUNNING = "running"
+CYCLE_SUCCEEDED = "succeeded"
+CYCLE_FAILED = "failed"
+# Déclenchement absorbé par un cycle tournant dans un autre processus
+CYCLE_COALESCED = "coalesced"
+
+_MAX_LOCAL_RECORDS = 200
+_RECORD_TTL_SEC = 24 * 3600
+
+
+class PollCycleCoordinator:
+    """Garantit un seul cycle en vol et fusionne les déclenchements concurrents."""
+
+    _instance: Optional[PollCycleCoordinator] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        redis_client: Any = None,
+        key_prefix: str = "r:ss:poll_cycle:v1",
+        lock_ttl_sec: int = 120,
+        stale_after_sec: int = 1800,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._redis = redis_client
+        self._key_prefix = key_prefix
+        self._lock_ttl_ms = int(lock_ttl_sec) * 1000
+        self._stale_after_sec = stale_after_sec
+        self._logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._persist_lock = threading.Lock()
+        self._records: OrderedDict[str, dict] = OrderedDict()
+        self._running_id: Optional[str] = None
+        self._running_since: Optional[float] = None
+        self._follow_up_id: Optional[str] = None
+
+    @classmethod
+    def get_instance(cls) -> PollCycleCoordinator:
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._instance_lock:
+            cls._instance = None
+
+    def configure(
+        self,
+        *,
+        redis_client: Any = None,
+        key_prefix: Optional[str] = None,
+        lock_ttl_sec: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._redis = redis_client
+        if key_prefix:
+            self._key_prefix = key_prefix
+        if lock_ttl_sec:
+            self._lock_ttl_ms = int(lock_ttl_sec) * 1000
+        if logger is not None:
+            self._logger = logger
+
+    # ------------------------------------------------------------------ API
+
+    def submit(
+        self,
+        run_cycle: Callable[[], Any],
+        *,
+        source: str,
+        spawn: Optional[Callable[[Callable[[], None]], Any]] = None,
+    ) -> dict:
+        """Demande un cycle en arrière-plan.
+
+        Returns:
+            Le cycle qui traitera la demande: un nouveau cycle, ou le cycle de
+            suivi déjà en file si un cycle est en cours (déclenchements fusionnés).
+            La clé "started" indique si la demande a lancé un nouveau cycle.
+        """
+        record, start_runner = self._enqueue(source)
+        if start_runner:
+            target = lambda: self._drive(record["cycle_id"], run_cycle)  # noqa: E731
+            try:
+                (spawn or _spawn_daemon)(target)
+            except Exception:
+                with self._lock:
+                    self._running_id = self._running_since = None
+                self._update(record["cycle_id"], status=CYCLE_FAILED, error="unable to start cycle runner")
+                raise
+        return {**record, "started": start_runner}
+
+    def run_sync(self, run_cycle: Callable[[], Any], *, source: str) -> Optional[dict]:
+        """Exécute un cycle dans le thread appelant (scheduler).
+
+        Returns:
+            Le dernier cycle exécuté, ou None si un cycle était déjà en vol
+            (la demande est alors fusionnée dans son cycle de suivi).
+        """
+        record, start_runner = self._enqueue(source)
+        if not start_runner:
+            return None
+        return self._drive(record["cycle_id"], run_cycle)
+
+    def get_cycle(self, cycle_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._records.get(cycle_id)
+            if record is not None:
+                return dict(record)
+        if self._redis is None:
+            return None
+        try:
+            raw = self._redis.get(self._record_key(cycle_id))
+            return json.loads(raw) if raw else None
+        except Exception:
+            return None
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"running_cycle_id": self._running_id, "follow_up_cycle_id": self._follow_up_id}
+
+    # ------------------------------------------------------------- internals
+
+    def _enqueue(self, source: str) -> tuple[dict, bool]:
+        with self._lock:
+            if self._running_id is not None and not self._running_is_stale():
+                if self._follow_up_id is None:
+                    follow_up = self._new_record_unlocked(source)
+                    follow_up["triggers"] = 0
+                    self._follow_up_id = follow_up["cycle_id"]
+                record = self._records[self._follow_up_id]
+                record["triggers"] += 1
+                snapshot, start_runner = dict(record), False
+            else:
+                if self._running_id is not None:
+                    self._logger.warning("POLL_CYCLE: Cycle %s looks stale; starting a new one", self._running_id)
+                record = self._new_record_unlocked(source)
+                self._running_id = record["cycle_id"]
+                self._running_since = time.monotonic()
+                snapshot, start_runner = dict(record), True
+        # SET Redis bloquant: hors du verrou, pour ne pas retarder les autres déclenchements
+        self._persist_latest(snapshot)
+        return snapshot, start_runner
+
+    def _drive(self, cycle_id: str, run_cycle: Callable[[], Any]) -> dict:
+        """Exécute le cycle puis, tant qu'il y en a, les cycles de suivi."""
+        last = None
+        try:
+            while cycle_id is not None:
+                last = self._run_one(cycle_id, run_cycle)
+                # Un cycle fusionné ailleurs ne doit pas reprendre sa propre demande "pending"
+                cycle_id = self._next_follow_up(take_remote=last.get("status") != CYCLE_COALESCED)
+        except BaseException:
+            with self._lock:
+                self._running_id = self._running_since = None
+            raise
+        return last
+
+    def _run_one(self, cycle_id: str, run_cycle: Callable[[], Any]) -> dict:
+        lease = self._cross_process_lease(cycle_id)
+        try:
+            if lease is not None and not lease.acquire():
+                # Un autre processus tourne: on lui laisse un cycle de suivi à exécuter,
+                # sauf s'il vient de terminer entre-temps.
+                self._redis.set(self._pending_key(), cycle_id, px=self._lock_ttl_ms * 4)
+                if not lease.acquire():
+                    holder = _as_str(self._redis.get(lease.key)) or ""
+                    self._logger.info("POLL_CYCLE: Cycle %s coalesced into a cycle running elsewhere", cycle_id)
+                    return self._update(cycle_id, status=CYCLE_COALESCED, coalesced_into=_cycle_id_of(holder))
+                self._redis.delete(self._pending_key())
+        except Exception as e:
+            # Redis indisponible: le cycle échoue proprement et _drive libère le slot
+            self._logger.error("POLL_CYCLE: Cycle %s not started, lease backend error: %s", cycle_id, e)
+            if lease is not None:
+                try:
+                    lease.release()
+                except Exception:
+                    pass
+            return self._update(cycle_id, status=CYCLE_FAILED, finished_at=_now_iso(), error=str(e))
+
+        started = time.monotonic()
+        self._update(cycle_id, status=CYCLE_RUNNING, started_at=_now_iso())
+        try:
+            with _LeaseHeartbeat(lease, self._logger) if lease is not None else nullcontext():
+                result = run_cycle()
+            return self._update(
+                cycle_id,
+                status=CYCLE_SUCCEEDED,
+                finished_at=_now_iso(),
+                duration_ms=int((time.monotonic() - started) * 1000),
+                result=result if isinstance(result, (int, float, str, bool)) or result is None else str(result),
+            )
+        except Exception as e:
+            self._logger.error("POLL_CYCLE: Cycle %s failed: %s", cycle_id, e)
+            return self._update(
+                cycle_id,
+                status=CYCLE_FAILED,
+                finished_at=_now_iso(),
+                duration_ms=int((time.monotonic() - started) * 1000),
+                error=str(e),
+            )
+        finally:
+            if lease is not None:
+                try:
+                    lease.release()
+                except Exception:
+                    pass
+
+    def _next_follow_up(self, *, take_remote: bool = True) -> Optional[str]:
+        """Cycle de suivi à enchaîner; sinon libère le slot (atomiquement avec _enqueue)."""
+        remote = self._take_remote_pending() if take_remote else None
+        created = None
+        with self._lock:
+            follow_up, self._follow_up_id = self._follow_up_id, None
+            if follow_up is None and remote:
+                record = self._new_record_unlocked("coalesced")
+                record["coalesced_from"] = remote
+                follow_up, created = record["cycle_id"], dict(record)
+            if follow_up is None:
+                self._running_id = self._running_since = None
+                return None
+            self._running_id, self._running_since = follow_up, time.monotonic()
+        if created is not None:
+            self._persist_latest(created)
+        return follow_up
+
+    def _take_remote_pending(self) -> Optional[str]:
+        if self._redis is None:
+            return None
+        try:
+            with self._redis.pipeline() as pipe:
+                pipe.get(self._pending_key())
+                pipe.delete(self._pending_key())
+                return _as_str(pipe.execute()[0])
+        except Exception:
+            return None
+
+    def _cross_process_lease(self, cycle_id: str) -> Optional[RedisLease]:
+        if self._redis is None:
+            return None
+        return RedisLease(
+            self._redis, f"{self._key_prefix}:inflight", ttl_ms=self._lock_ttl_ms, owner_id=f"cycle-{cycle_id}"
+        )
+
+    def _running_is_stale(self) -> bool:
+        return (
+            self._running_since is not None
+            and self._stale_after_sec > 0
+            and time.monotonic() - self._running_since > self._stale_after_sec
+        )
+
+    def _new_record_unlocked(self, source: str) -> dict:
+        record = {
+            "cycle_id": uuid.uuid4().hex,
+            "status": CYCLE_QUEUED,
+            "source": source,
+            "requested_at": _now_iso(),
+            "started_at": None,
+            "finished_at": None,
+            "duration_ms": None,
+            "triggers": 1,
+        }
+        self._records[record["cycle_id"]] = record
+        while len(self._records) > _MAX_LOCAL_RECORDS:
+            self._records.popitem(last=False)
+        return record
+
+    def _update(self, cycle_id: str, **fields) -> dict:
+        with self._lock:
+            record = self._records.setdefault(cycle_id, {"cycle_id": cycle_id})
+            record.update(fields)
+            snapshot = dict(record)
+        self._persist_latest(snapshot)
+        return snapshot
+
+    def _persist_latest(self, snapshot: dict) -> None:
+        """Persiste l'état le plus récent du cycle, hors de self._lock.
+
+        Les écritures Redis sont sérialisées et relisent l'enregistrement: deux
+        mises à jour concurrentes ne peuvent pas être persistées dans le désordre.
+        """
+        with self._persist_lock:
+            with self._lock:
+                latest = self._records.get(snapshot["cycle_id"])
+                record = dict(latest) if latest is not None else snapshot
+            self._persist(record)
+
+    def _persist(self, record: dict) -> None:
+        if self._redis is None:
+            return
+        try:
+            self._redis.set(self._record_key(record["cycle_id"]), json.dumps(record), ex=_RECORD_TTL_SEC)
+        except Exception as e:
+            self._logger.debug("POLL_CYCLE: Unable to persist cycle %s: %s", record.get("cycle_id"), e)
+
+    def _record_key(self, cycle_id: str) -> str:
+        return f"{self._key_prefix}:cycle:{cycle_id}"
+
+    def _pending_key(self) -> str:
+        return f"{self._key_prefix}:pending"
+
+
+def _spawn_daemon(target: Callable[[], None]) -> None:
+    threading.Thread(target=target, name="poll-cycle", daemon=True).start()
+
+
+def _cycle_id_of(lease_value: str) -> Optional[str]:
+    owner = lease_value.rsplit(":", 1)[0]
+    return owner[len("cycle-"):] if owner.startswith("cycle-") else None
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _as_str(value: Any) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
@@ -0,0 +1,129 @@
+"""
+background.imap_idle_watcher
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Déclenchement des cycles de polling par IMAP IDLE (RFC 2177).
+
+Un thread garde une session du pool (email_processing.imap_client.ImapSessionPool)
+en IDLE sur INBOX. Chaque notification EXISTS/RECENT soumet un cycle au
+PollCycleCoordinator: le mail est traité sans attendre le prochain tick du
+scheduler, et les notifications reçues pendant un cycle sont fusionnées dans
+son cycle de suivi. La boucle IDLE passe aussi le keepalive (NOOP) sur les
+autres sessions du pool.
+
+Le scheduler reste le filet de sécurité: si le serveur ne supporte pas IDLE,
+le watcher s'arrête et le polling périodique continue seul.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from background.poll_scheduler import SLOW_GATE_REASONS
+
+
+class ImapIdleWatcher:
+    """Soumet un cycle de polling à chaque nouveau message signalé par IDLE."""
+
+    _instance: Optional[ImapIdleWatcher] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        pool: Any,
+        run_cycle: Callable[[], Any],
+        coordinator: Any,
+        timeout_sec: float,
+        gate: Optional[Callable[[], tuple[bool, str]]] = None,
+        error_backoff_sec: float = 30.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """
+        Args:
+            pool: ImapSessionPool dont une session reste en IDLE.
+            run_cycle: Cycle soumis au coordinateur à chaque notification.
+            coordinator: PollCycleCoordinator (single-flight + fusion).
+            gate: Même gate que le scheduler; envoi coupé -> notification ignorée.
+        """
+        self._pool = pool
+        self._run_cycle = run_cycle
+        self._coordinator = coordinator
+        self._timeout_sec = timeout_sec
+        self._gate = gate
+        self._error_backoff_sec = error_backoff_sec
+        self._logger = logger or logging.getLogger(__name__)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cycles_submitted = 0
+
+    @classmethod
+    def get_instance(cls) -> Optional[ImapIdleWatcher]:
+        return cls._instance
+
+    @classmethod
+    def start_instance(cls, **kwargs) -> ImapIdleWatcher:
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(**kwargs)
+                cls._instance.start()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._lock:
+            if cls._instance is not None:
+                cls._instance.stop()
+            cls._instance = None
+
+    @property
+    def thread(self) -> Optional[threading.Thread]:
+        return self._thread
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="bg-imap-idle", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def status(self) -> dict:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "cycles_submitted": self._cycles_submitted,
+        }
+
+    def on_new_mail(self) -> Optional[dict]:
+        """Soumet un cycle (ou le fusionne dans le cycle de suivi). None si le gate l'interdit."""
+        if self._gate is not None:
+            try:
+                can_send, reason = self._gate()
+            except Exception as e:
+                self._logger.warning("IMAP_IDLE: Polling gate error, polling anyway: %s", e)
+                can_send, reason = True, ""
+            if not can_send and reason not in SLOW_GATE_REASONS:
+                self._logger.debug("IMAP_IDLE: New mail ignored (%s)", reason)
+                return None
+        cycle = self._coordinator.submit(self._run_cycle, source="idle")
+        self._cycles_submitted += 1
+        self._logger.info(
+            "IMAP_IDLE: New mail; cycle %s %s",
+            cycle["cycle_id"], "started" if cycle["started"] else "queued as follow-up",
+        )
+        return cycle
+
+    def _loop(self) -> None:
+        self._logger.info("IMAP_IDLE: Watcher started (IDLE timeout=%ss)", self._timeout_sec)
+        self._pool.run_idle_loop(
+            self.on_new_mail,
+            self._stop,
+            timeout_sec=self._timeout_sec,
+            error_backoff_sec=self._error_backoff_sec,
+        )
+        self._logger.info("IMAP_IDLE: Watcher stopped")
@@ -0,0 +1,472 @@
+"""
+background.poll_scheduler
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Planificateur des cycles de polling IMAP en tâche de fond.
+
+Plusieurs instances (workers Gunicorn, nœuds Render) peuvent démarrer le
+planificateur: un bail Redis renouvelable (SET NX PX) élit un seul leader.
+Chaque acquisition reçoit un jeton de fencing monotone (INCR); avant chaque
+cycle, le leader fait admettre son jeton, si bien qu'un ancien leader dont le
+bail a expiré (pause GC, partition réseau) ne peut plus lancer de cycle une
+fois qu'un successeur a commencé.
+
+Sans Redis, le verrou fichier BG_POLLER_LOCK_FILE (un seul hôte) est utilisé.
+
+La cadence est adaptative (AdaptiveCadence): intervalle court après l'arrivée
+de mails, backoff exponentiel sur les cycles sans nouveau mail, et aucun polling tant que
+l'envoi de webhooks est coupé (pause d'absence).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # pragma: no cover - redis is a hard dependency in production
+    class WatchError(Exception):  # type: ignore[no-redef]
+        pass
+
+MIN_INTERVAL_SEC = 1.0
+
+INTERVAL_BASE = "base"
+INTERVAL_NEW_MAIL = "new_mail"
+INTERVAL_IDLE_BACKOFF = "idle_backoff"
+INTERVAL_IDLE_MAX = "idle_max"
+INTERVAL_STANDBY = "standby"
+
+# Raisons de gate pour lesquelles on ralentit au lieu de suspendre le polling
+# (hors fenêtre horaire, les DESABO non urgents peuvent encore être envoyés).
+SLOW_GATE_REASONS = frozenset({"outside_time_window"})
+
+
+class RedisLease:
+    """Bail Redis exclusif et renouvelable, avec jeton de fencing.
+
+    La valeur de la clé identifie le détenteur (`owner_id:token`): le
+    renouvellement et la libération ne touchent la clé que si elle appartient
+    encore à ce détenteur (transaction WATCH/MULTI).
+    """
+
+    def __init__(self, redis_client: Any, key: str, ttl_ms: int, owner_id: Optional[str] = None) -> None:
+        self._redis = redis_client
+        self.key = key
+        self.fence_key = f"{key}:fence"
+        self.admitted_key = f"{key}:admitted"
+        self.ttl_ms = int(ttl_ms)
+        self.owner_id = owner_id or _default_owner_id()
+        self.token: Optional[int] = None
+        self._value: Optional[str] = None
+
+    @property
+    def held(self) -> bool:
+        return self._value is not None
+
+    def acquire(self) -> bool:
+        """Tente de prendre le bail (SET NX PX). Returns True si acquis."""
+        token = int(self._redis.incr(self.fence_key))
+        value = f"{self.owner_id}:{token}"
+        if self._redis.set(self.key, value, nx=True, px=self.ttl_ms):
+            self.token, self._value = token, value
+            return True
+        return False
+
+    def renew(self) -> bool:
+        """Prolonge le bail s'il nous appartient toujours; sinon le considère perdu."""
+        if self._value is None:
+            return False
+        renewed = self._compare_and(lambda pipe: pipe.pexpire(self.key, self.ttl_ms))
+        if not renewed:
+            self.token, self._value = None, None
+        return renewed
+
+    def release(self) -> None:
+        if self._value is None:
+            return
+        try:
+            self._compare_and(lambda pipe: pipe.delete(self.key))
+        finally:
+            self.token, self._value = None, None
+
+    def admit(self) -> bool:
+        """Enregistre notre jeton comme le plus récent autorisé à lancer un cycle.
+
+        Returns False si un détenteur plus récent a déjà été admis (jeton périmé).
+        """
+        if self.token is None:
+            return False
+        with self._redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.admitted_key)
+                    current = pipe.get(self.admitted_key)
+                    if current is not None and int(current) > self.token:
+                        pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.set(self.admitted_key, self.token)
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    def _compare_and(self, action: Callable[[Any], Any]) -> bool:
+        with self._redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.key)
+                    if _as_str(pipe.get(self.key)) != self._value:
+                        pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    action(pipe)
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+
+class FileLease:
+    """Repli mono-hôte: verrou fcntl non bloquant sur BG_POLLER_LOCK_FILE."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.token: Optional[int] = None
+        self._fh = None
+
+    @property
+    def held(self) -> bool:
+        return self._fh is not None
+
+    def acquire(self) -> bool:
+        if fcntl is None:
+            self.token = 0
+            self._fh = True
+            return True
+        fh = open(self.path, "a+")
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        self._fh = fh
+        self.token = 0
+        return True
+
+    def renew(self) -> bool:
+        return self.held
+
+    def release(self) -> None:
+        fh, self._fh, self.token = self._fh, None, None
+        if fh is not None and fh is not True:
+            try:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            finally:
+                fh.close()
+
+    def admit(self) -> bool:
+        return self.held
+
+
+class AdaptiveCadence:
+    """Calcule l'intervalle avant le prochain tick et la raison de ce choix.
+
+    - mail reçu -> `burst_sec` (rafale de livraisons);
+    - cycles sans nouveau mail consécutifs -> `base_sec` puis x`backoff_factor` jusqu'à `max_sec`
+      (le courrier ignoré ou en échec, resté UNSEEN, ne compte pas comme nouveau);
+    - envoi impossible (gate fermé) -> `gated_sec`, sans cycle IMAP.
+    """
+
+    def __init__(
+        self,
+        *,
+        base_sec: float,
+        burst_sec: float,
+        max_sec: float,
+        gated_sec: float,
+        backoff_factor: float = 2.0,
+    ) -> None:
+        self.base_sec = max(MIN_INTERVAL_SEC, float(base_sec))
+        self.burst_sec = min(self.base_sec, max(MIN_INTERVAL_SEC, float(burst_sec)))
+        self.max_sec = max(self.base_sec, float(max_sec))
+        self.gated_sec = max(MIN_INTERVAL_SEC, float(gated_sec))
+        self.backoff_factor = max(1.0, float(backoff_factor))
+        self.empty_cycles = 0
+
+    def after_cycle(self, activity: Optional[int]) -> tuple[float, str]:
+        if activity is None:
+            self.empty_cycles = 0
+            return self.base_sec, INTERVAL_BASE
+        if activity > 0:
+            self.empty_cycles = 0
+            return self.burst_sec, INTERVAL_NEW_MAIL
+        self.empty_cycles += 1
+        if self.empty_cycles == 1:
+            return self.base_sec, INTERVAL_BASE
+        interval = self.base_sec * self.backoff_factor ** (self.empty_cycles - 1)
+        if interval >= self.max_sec:
+            return self.max_sec, INTERVAL_IDLE_MAX
+        return interval, INTERVAL_IDLE_BACKOFF
+
+    def standby(self) -> tuple[float, str]:
+        return self.base_sec, INTERVAL_STANDBY
+
+    def gated(self, reason: str) -> tuple[float, str]:
+        return self.gated_sec, reason
+
+
+class PollScheduler:
+    """Lance `run_cycle` toutes les `interval_sec` secondes tant que l'instance détient le bail."""
+
+    _instance: Optional[PollScheduler] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        run_cycle: Callable[[], Optional[int]],
+        lease: RedisLease | FileLease,
+        interval_sec: float,
+        cadence: Optional[AdaptiveCadence] = None,
+        gate: Optional[Callable[[], tuple[bool, str]]] = None,
+        logger: Optional[logging.Logger] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Args:
+            run_cycle: Exécute un cycle; retourne le nombre de nouveaux mails (None = inconnu).
+            cadence: Politique d'intervalle; à défaut, intervalle fixe `interval_sec`.
+            gate: Retourne (envoi_possible, raison) avant chaque tick.
+        """
+        self._run_cycle = run_cycle
+        self._lease = lease
+        self._cadence = cadence or AdaptiveCadence(
+            base_sec=interval_sec, burst_sec=interval_sec, max_sec=interval_sec,
+            gated_sec=interval_sec, backoff_factor=1.0,
+        )
+        self._gate = gate
+        self._next_interval_sec, self._interval_reason = self._cadence.base_sec, INTERVAL_BASE
+        self._logger = logger or logging.getLogger(__name__)
+        self._clock = clock
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cycles_run = 0
+        self._last_cycle_ts: Optional[int] = None
+        self._last_error: Optional[str] = None
+
+    @classmethod
+    def get_instance(cls) -> Optional[PollScheduler]:
+        return cls._instance
+
+    @classmethod
+    def start_instance(cls, **kwargs) -> PollScheduler:
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(**kwargs)
+                cls._instance.start()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._lock:
+            if cls._instance is not None:
+                cls._instance.stop()
+            cls._instance = None
+
+    @property
+    def thread(self) -> Optional[threading.Thread]:
+        return self._thread
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="bg-email-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._lease.release()
+
+    def run_once(self) -> bool:
+        """Un tick: consulte le gate, (re)prend le bail puis lance un cycle si on est leader.
+
+        Returns True si un cycle a été exécuté par cette instance.
+        """
+        can_send, gate_reason = self._check_gate()
+        if not can_send and gate_reason not in SLOW_GATE_REASONS:
+            self._set_next_interval(*self._cadence.gated(gate_reason))
+            return False
+        if not self._ensure_lease():
+            self._set_next_interval(*self._cadence.standby())
+            return False
+        if not self._lease.admit():
+            self._logger.warning(
+                "BG_POLLER: Fencing token %s superseded by a newer leader; stepping down", self._lease.token
+            )
+            self._lease.release()
+            self._set_next_interval(*self._cadence.standby())
+            return False
+        activity: Optional[int] = None
+        with _LeaseHeartbeat(self._lease, self._logger):
+            try:
+                result = self._run_cycle()
+                activity = int(result) if isinstance(result, (int, float)) else None
+                self._last_error = None
+            except Exception as e:
+                self._last_error = str(e)
+                self._logger.error("BG_POLLER: Polling cycle failed: %s", e)
+        self._cycles_run += 1
+        self._last_cycle_ts = int(self._clock())
+        try:
+            from services.runtime_metrics_service import RuntimeMetricsService
+
+            RuntimeMetricsService.get_instance().set_last_poll_cycle_ts(self._last_cycle_ts)
+        except Exception:
+            pass
+        interval, reason = self._cadence.after_cycle(activity)
+        if not can_send:
+            interval, reason = max(interval, self._cadence.max_sec), gate_reason
+        self._set_next_interval(interval, reason)
+        return True
+
+    def status(self) -> dict:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "leader": self._lease.held,
+            "fencing_token": self._lease.token,
+            "interval_sec": self._next_interval_sec,
+            "interval_reason": self._interval_reason,
+            "consecutive_empty_cycles": self._cadence.empty_cycles,
+            "cycles_run": self._cycles_run,
+            "last_cycle_ts": self._last_cycle_ts,
+            "last_error": self._last_error,
+        }
+
+    def _check_gate(self) -> tuple[bool, str]:
+        if self._gate is None:
+            return True, INTERVAL_BASE
+        try:
+            can_send, reason = self._gate()
+            return bool(can_send), str(reason)
+        except Exception as e:
+            self._logger.warning("BG_POLLER: Polling gate error, polling anyway: %s", e)
+            return True, INTERVAL_BASE
+
+    def _set_next_interval(self, interval: float, reason: str) -> None:
+        if reason != self._interval_reason:
+            self._logger.info("BG_POLLER: Next poll in %.0fs (%s)", interval, reason)
+        self._next_interval_sec, self._interval_reason = interval, reason
+
+    def _ensure_lease(self) -> bool:
+        try:
+            if self._lease.held and self._lease.renew():
+                return True
+            if self._lease.acquire():
+                self._logger.info("BG_POLLER: Lease acquired (fencing token %s)", self._lease.token)
+                return True
+        except Exception as e:
+            self._logger.warning("BG_POLLER: Lease backend error: %s", e)
+        return False
+
+    def _loop(self) -> None:
+        self._logger.info("BG_POLLER: Scheduler started (base interval=%ss)", self._cadence.base_sec)
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception as e:  # pragma: no cover - defensive
+                self._logger.error("BG_POLLER: Unexpected scheduler error: %s", e)
+            self._stop.wait(max(0.0, self._next_interval_sec - (time.monotonic() - started)))
+        self._logger.info("BG_POLLER: Scheduler stopped")
+
+
+class _LeaseHeartbeat:
+    """Renouvelle le bail pendant un cycle plus long que son TTL."""
+
+    def __init__(self, lease: RedisLease | FileLease, logger: logging.Logger) -> None:
+        self._lease = lease
+        self._logger = logger
+        self._done = threading.Event()
+        ttl_ms = getattr(lease, "ttl_ms", None)
+        self._period = (ttl_ms / 3000.0) if ttl_ms else None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> _LeaseHeartbeat:
+        if self._period:
+            self._thread = threading.Thread(target=self._beat, name="bg-email-poller-lease", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self._done.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _beat(self) -> None:
+        while not self._done.wait(self._period):
+            try:
+                if not self._lease.renew():
+                    self._logger.warning("BG_POLLER: Lease lost during cycle (fencing token superseded)")
+                    return
+            except Exception as e:
+                self._logger.warning("BG_POLLER: Lease renewal error: %s", e)
+
+
+def build_lease(redis_client: Any, settings_module: Any) -> RedisLease | FileLease:
+    if redis_client is not None:
+        return RedisLease(
+            redis_client,
+            key=getattr(settings_module, "BG_POLLER_LEASE_REDIS_KEY", "r:ss:bg_poller_lease:v1"),
+            ttl_ms=int(getattr(settings_module, "BG_POLLER_LEASE_TTL_SECONDS", 90)) * 1000,
+        )
+    return FileLease(getattr(settings_module, "BG_POLLER_LOCK_FILE", "/tmp/render_signal_server_email_poller.lock"))
+
+
+def build_cadence(settings_module: Any) -> AdaptiveCadence:
+    base = int(getattr(settings_module, "EMAIL_POLLING_INTERVAL_SECONDS", 30))
+    return AdaptiveCadence(
+        base_sec=base,
+        burst_sec=int(getattr(settings_module, "BG_POLLER_BURST_INTERVAL_SECONDS", 5)),
+        max_sec=int(getattr(settings_module, "BG_POLLER_MAX_INTERVAL_SECONDS", 300)),
+        gated_sec=int(getattr(settings_module, "POLLING_INACTIVE_CHECK_INTERVAL_SECONDS", 600)),
+        backoff_factor=float(getattr(settings_module, "BG_POLLER_BACKOFF_FACTOR", 2.0)),
+    )
+
+
+def last_cycle_new_mail_count() -> Optional[int]:
+    """Messages candidats apparus depuis le cycle précédent (dernier cycle publié).
+
+    Le nombre total d'UNSEEN ne convient pas: le courrier écarté (allowlist, filtres)
+    ou dont l'envoi a échoué reste UNSEEN et maintiendrait la cadence en rafale.
+    """
+    try:
+        from services.runtime_metrics_service import RuntimeMetricsService
+
+        stats = RuntimeMetricsService.get_instance().get_last_poll_cycle_stats()
+        return int(stats["pipeline"]["new_mail"])
+    except Exception:
+        return None
+
+
+def _default_owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _as_str(value: Any) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
@@ -0,0 +1,215 @@
+"""
+background.webhook_dispatcher
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Dispatcher des jobs de l'outbox webhook (services.webhook_outbox_service).
+
+Le cycle de polling dépose les envois dans l'outbox et se termine sans
+attendre le récepteur. Ce thread réclame les jobs échus, tente une livraison
+(avec le fallback 415 habituel) puis:
+
+- succès: acquittement (email marqué traité, lecture IMAP différée) et retrait;
+- échec transitoire (réseau, 408/429, 5xx): nouvelle tentative planifiée avec
+  un backoff exponentiel plafonné et du jitter, jusqu'à `max_attempts`;
+- échec définitif (4xx, success=false) ou tentatives épuisées: dead letter;
+- circuit du récepteur ouvert (services.circuit_breaker_service) ou budget de
+  retries épuisé (services.webhook_latency_service): job mis de côté
+  `defer_sec` secondes sans consommer de tentative;
+- quota de rate limit épuisé (job "pacé"): job reporté au prochain créneau
+  annoncé par le rate limiter, sans consommer de tentative.
+
+Plusieurs dispatchers (workers Gunicorn) peuvent tourner en parallèle: la
+réclamation d'un job est atomique côté outbox.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+OUTCOME_DELIVERED = "delivered"
+OUTCOME_RETRY = "retry"
+OUTCOME_FAILED = "failed"
+OUTCOME_DEFERRED = "deferred"
+
+
+class WebhookDispatcher:
+    """Livre les jobs de l'outbox en tâche de fond, retries inclus."""
+
+    _instance: Optional[WebhookDispatcher] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        outbox: Any,
+        deliver: Callable[[dict, bool], tuple],
+        acknowledge: Callable[[dict], None],
+        batch_size: int = 10,
+        visibility_sec: float = 300,
+        max_attempts: int = 10,
+        backoff_base_sec: float = 10,
+        backoff_max_sec: float = 900,
+        poll_interval_sec: float = 2,
+        defer_sec: float = 60,
+        logger: Optional[logging.Logger] = None,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        """
+        Args:
+            deliver: Tente une livraison; reçoit (job, dernière_tentative) et
+                retourne (OUTCOME_*, erreur éventuelle), ou (OUTCOME_DEFERRED,
+                erreur, délai en secondes) pour reporter à une échéance connue.
+            acknowledge: Appelé après une livraison réussie, avant le retrait du job.
+        """
+        self._outbox = outbox
+        self._deliver = deliver
+        self._acknowledge = acknowledge
+        self._batch_size = max(1, int(batch_size))
+        self._visibility_sec = float(visibility_sec)
+        self._max_attempts = max(1, int(max_attempts))
+        self._backoff_base_sec = max(0.0, float(backoff_base_sec))
+        self._backoff_max_sec = max(self._backoff_base_sec, float(backoff_max_sec))
+        self._poll_interval_sec = max(0.1, float(poll_interval_sec))
+        self._defer_sec = max(1.0, float(defer_sec))
+        self._logger = logger or logging.getLogger(__name__)
+        self._rng = rng
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {"delivered": 0, "retried": 0, "deferred": 0, "dead_lettered": 0}
+        self._last_error: Optional[str] = None
+        self._last_run_ts: Optional[int] = None
+
+    @classmethod
+    def get_instance(cls) -> Optional[WebhookDispatcher]:
+        return cls._instance
+
+    @classmethod
+    def start_instance(cls, **kwargs) -> WebhookDispatcher:
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(**kwargs)
+                cls._instance.start()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._lock:
+            if cls._instance is not None:
+                cls._instance.stop()
+            cls._instance = None
+
+    @property
+    def thread(self) -> Optional[threading.Thread]:
+        return self._thread
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="webhook-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def run_once(self) -> int:
+        """Réclame et traite un lot de jobs échus. Retourne le nombre de jobs traités."""
+        jobs = self._outbox.claim_due(limit=self._batch_size, visibility_sec=self._visibility_sec)
+        for job in jobs:
+            self._handle(job)
+        self._last_run_ts = int(time.time())
+        return len(jobs)
+
+    def backoff_delay(self, attempts: int) -> float:
+        """Backoff exponentiel plafonné avec "equal jitter": [cap/2, cap]."""
+        cap = min(self._backoff_max_sec, self._backoff_base_sec * (2 ** max(0, attempts - 1)))
+        return cap / 2 + self._rng() * cap / 2
+
+    def status(self) -> dict:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            **self._counters,
+            "last_run_ts": self._last_run_ts,
+            "last_error": self._last_error,
+        }
+
+    def _handle(self, job: dict) -> None:
+        job_id, email_id = job.get("job_id"), job.get("email_id")
+        attempts = int(job.get("attempts") or 0) + 1
+        final_attempt = attempts >= self._max_attempts
+        defer_sec = self._defer_sec
+        try:
+            result = self._deliver(job, final_attempt)
+            outcome, error = result[0], result[1]
+            if len(result) > 2 and result[2] is not None:
+                defer_sec = max(0.0, float(result[2]))
+        except Exception as e:
+            outcome, error = OUTCOME_RETRY, str(e)
+
+        if outcome == OUTCOME_DEFERRED:
+            # Aucune requête envoyée: la tentative n'est pas comptée
+            self._outbox.reschedule(job, delay_sec=defer_sec)
+            self._counters["deferred"] += 1
+            self._logger.info("WEBHOOK_DISPATCH: Email %s parked for %.0fs (%s)", email_id, defer_sec, error)
+            return
+
+        job = {**job, "attempts": attempts, "last_error": error}
+
+        if outcome == OUTCOME_DELIVERED:
+            try:
+                self._acknowledge(job)
+            except Exception as e:
+                self._logger.error("WEBHOOK_DISPATCH: Ack failed for email %s: %s", email_id, e)
+            self._outbox.complete(job_id)
+            self._counters["delivered"] += 1
+            return
+
+        self._last_error = error
+        if outcome == OUTCOME_RETRY and not final_attempt:
+            delay = self.backoff_delay(attempts)
+            self._outbox.reschedule(job, delay_sec=delay)
+            self._counters["retried"] += 1
+            self._logger.warning(
+                "WEBHOOK_DISPATCH: Delivery of email %s failed (attempt %d/%d: %s); retry in %.1fs",
+                email_id, attempts, self._max_attempts, error, delay,
+            )
+            return
+
+        self._outbox.dead_letter(job)
+        self._counters["dead_lettered"] += 1
+        self._logger.error(
+            "WEBHOOK_DISPATCH: Giving up on email %s after %d attempt(s): %s "
+            "(job %s kept as dead letter; replay with POST /api/webhook_outbox/requeue_dead)",
+            email_id, attempts, error, job_id,
+        )
+
+    def _loop(self) -> None:
+        self._logger.info("WEBHOOK_DISPATCH: Dispatcher started (poll every %.1fs)", self._poll_interval_sec)
+        while not self._stop.is_set():
+            try:
+                handled = self.run_once()
+            except Exception as e:
+                handled = 0
+                self._last_error = str(e)
+                self._logger.error("WEBHOOK_DISPATCH: Unable to process outbox: %s", e)
+            # Lot plein: on enchaîne sans attendre
+            if handled < self._batch_size:
+                self._stop.wait(self._poll_interval_sec)
+        self._logger.info("WEBHOOK_DISPATCH: Dispatcher stopped")
+
+
+def build_dispatcher_kwargs(settings_module: Any) -> dict:
+    return {
+        "batch_size": int(getattr(settings_module, "WEBHOOK_OUTBOX_BATCH_SIZE", 10)),
+        "visibility_sec": float(getattr(settings_module, "WEBHOOK_OUTBOX_VISIBILITY_SECONDS", 300)),
+        "max_attempts": int(getattr(settings_module, "WEBHOOK_OUTBOX_MAX_ATTEMPTS", 10)),
+        "backoff_base_sec": float(getattr(settings_module, "WEBHOOK_OUTBOX_BACKOFF_BASE_SECONDS", 10)),
+        "backoff_max_sec": float(getattr(settings_module, "WEBHOOK_OUTBOX_BACKOFF_MAX_SECONDS", 900)),
+        "poll_interval_sec": float(getattr(settings_module, "WEBHOOK_OUTBOX_POLL_INTERVAL_SECONDS", 2)),
+        "defer_sec": float(getattr(settings_module, "WEBHOOK_CIRCUIT_BREAKER_COOLDOWN_SECONDS", 60)),
+    }
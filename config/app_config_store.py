@@ -13,6 +13,7 @@ from __future__ import annotations
 
 import json
 import os
+import threading
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -24,6 +25,10 @@ except Exception:  # requests may be unavailable in some test contexts
 
 _REDIS_CLIENT = None
 
+# Nombre d'appels get_config_json() depuis le démarrage (mesure des lectures par cycle)
+_READ_COUNT = 0
+_READ_COUNT_LOCK = threading.Lock()
+
 
 def _get_redis_client():
     global _REDIS_CLIENT
@@ -120,6 +125,9 @@ def get_config_json(key: str, *, file_fallback: Optional[Path] = None) -> Dict[s
     """Fetch config dict for a key from External JSON backend, with file fallback.
     Returns empty dict on any error.
     """
+    global _READ_COUNT
+    with _READ_COUNT_LOCK:
+        _READ_COUNT += 1
     mode = _store_mode()
 
     if mode == "redis_first":
@@ -154,6 +162,11 @@ def get_config_json(key: str, *, file_fallback: Optional[Path] = None) -> Dict[s
     return {}
 
 
+def get_read_count() -> int:
+    """Total number of get_config_json() calls served by this process."""
+    return _READ_COUNT
+
+
 def set_config_json(key: str, value: Dict[str, Any], *, file_fallback: Optional[Path] = None) -> bool:
     """Persist config dict for a key into External backend, fallback to file if needed."""
     mode = _store_mode()
@@ -37,6 +37,73 @@ IMAP_SERVER = os.environ.get("IMAP_SERVER", "")
 IMAP_PORT = int(os.environ.get("IMAP_PORT", 993))
 IMAP_USE_SSL = env_bool("IMAP_USE_SSL", True)
 
+# Persistent IMAP sessions (keepalive NOOP + IDLE wakeups) for the legacy poller
+IMAP_SESSION_POOL_ENABLED = env_bool("IMAP_SESSION_POOL_ENABLED", False)
+IMAP_SESSION_POOL_SIZE = int(os.environ.get("IMAP_SESSION_POOL_SIZE", 2))
+IMAP_KEEPALIVE_INTERVAL_SECONDS = int(os.environ.get("IMAP_KEEPALIVE_INTERVAL_SECONDS", 240))
+# RFC 2177: re-issue IDLE at least every 29 minutes to avoid server-side logout
+IMAP_IDLE_TIMEOUT_SECONDS = int(os.environ.get("IMAP_IDLE_TIMEOUT_SECONDS", 1500))
+# IDLE watcher (requires the session pool): new mail triggers a cycle without waiting for the next poll
+IMAP_IDLE_ENABLED = env_bool("IMAP_IDLE_ENABLED", False)
+# Messages per FETCH round trip (1 = legacy one RFC822 fetch per message)
+IMAP_FETCH_BATCH_SIZE = int(os.environ.get("IMAP_FETCH_BATCH_SIZE", 50))
+# Header-only FETCH (From/Subject/Date/Message-ID) to filter before downloading bodies
+IMAP_HEADER_PREFETCH_ENABLED = env_bool("IMAP_HEADER_PREFETCH_ENABLED", True)
+# Total decoded text budget per email (plain + HTML); non-text parts are never decoded
+EMAIL_BODY_MAX_BYTES = int(os.environ.get("EMAIL_BODY_MAX_BYTES", 2 * 1024 * 1024))
+# Concurrent detect/enrich/deliver workers per poll cycle (1 = sequential); IMAP commands stay on the poller thread
+EMAIL_PROCESSING_WORKERS = int(os.environ.get("EMAIL_PROCESSING_WORKERS", 1))
+# Keep-alive webhook sessions: one pool per origin, sized for concurrent senders (gunicorn threads, workers)
+WEBHOOK_HTTP_POOL_MAXSIZE = int(os.environ.get(
+    "WEBHOOK_HTTP_POOL_MAXSIZE",
+    max(int(os.environ.get("GUNICORN_THREADS", 4)), EMAIL_PROCESSING_WORKERS),
+))
+# Idle sessions are closed before the remote side drops keep-alive connections
+WEBHOOK_HTTP_IDLE_TTL_SECONDS = int(os.environ.get("WEBHOOK_HTTP_IDLE_TTL_SECONDS", 50))
+# Concurrent sends when an email targets several webhooks (routing rule + default); 1 = sequential
+WEBHOOK_FANOUT_MAX_WORKERS = int(os.environ.get("WEBHOOK_FANOUT_MAX_WORKERS", 4))
+# Rate limiter algorithm for rate_limit_per_hour: sliding_window | token_bucket | gcra (O(1) memory per key)
+WEBHOOK_RATE_LIMIT_ALGORITHM = os.environ.get("WEBHOOK_RATE_LIMIT_ALGORITHM", "sliding_window").strip().lower()
+# Over-limit sends (global, per-URL or per-rule quota) are queued in the webhook outbox for their next slot
+# instead of being skipped and re-evaluated on a later poll (needs a dedup backend and an outbox store)
+WEBHOOK_RATE_LIMIT_PACING_ENABLED = env_bool("WEBHOOK_RATE_LIMIT_PACING_ENABLED", False)
+# Remember per webhook URL which delivery mode (json/form) was accepted, to skip repeated 415 round trips
+WEBHOOK_DELIVERY_MODE_MEMORY_ENABLED = env_bool("WEBHOOK_DELIVERY_MODE_MEMORY_ENABLED", True)
+WEBHOOK_DELIVERY_MODE_REDIS_KEY_PREFIX = os.environ.get(
+    "WEBHOOK_DELIVERY_MODE_REDIS_KEY_PREFIX", "r:ss:webhook_delivery_mode:v1"
+)
+WEBHOOK_DELIVERY_MODE_TTL_SECONDS = int(os.environ.get("WEBHOOK_DELIVERY_MODE_TTL_SECONDS", 7 * 24 * 3600))
+# Per webhook URL circuit breaker: after N consecutive 5xx/429/network failures, fail fast for the cooldown
+WEBHOOK_CIRCUIT_BREAKER_ENABLED = env_bool("WEBHOOK_CIRCUIT_BREAKER_ENABLED", True)
+WEBHOOK_CIRCUIT_BREAKER_REDIS_KEY_PREFIX = os.environ.get(
+    "WEBHOOK_CIRCUIT_BREAKER_REDIS_KEY_PREFIX", "r:ss:webhook_circuit:v1"
+)
+WEBHOOK_CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.environ.get("WEBHOOK_CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5))
+WEBHOOK_CIRCUIT_BREAKER_COOLDOWN_SECONDS = int(os.environ.get("WEBHOOK_CIRCUIT_BREAKER_COOLDOWN_SECONDS", 60))
+# A half-open probe that never reports back releases its slot after this delay
+WEBHOOK_CIRCUIT_BREAKER_PROBE_TIMEOUT_SECONDS = int(os.environ.get("WEBHOOK_CIRCUIT_BREAKER_PROBE_TIMEOUT_SECONDS", 60))
+# Adaptive delivery (opt-in): timeout = observed p99 latency x factor (capped by webhook_timeout_sec), global retry budget
+WEBHOOK_ADAPTIVE_DELIVERY_ENABLED = env_bool("WEBHOOK_ADAPTIVE_DELIVERY_ENABLED", False)
+WEBHOOK_LATENCY_WINDOW = int(os.environ.get("WEBHOOK_LATENCY_WINDOW", 200))
+WEBHOOK_LATENCY_MIN_SAMPLES = int(os.environ.get("WEBHOOK_LATENCY_MIN_SAMPLES", 20))
+WEBHOOK_TIMEOUT_P99_FACTOR = float(os.environ.get("WEBHOOK_TIMEOUT_P99_FACTOR", 3.0))
+WEBHOOK_MIN_TIMEOUT_SECONDS = float(os.environ.get("WEBHOOK_MIN_TIMEOUT_SECONDS", 2.0))
+# Retries allowed per window: RATIO x sends in the window + MIN_PER_WINDOW
+WEBHOOK_RETRY_BUDGET_RATIO = float(os.environ.get("WEBHOOK_RETRY_BUDGET_RATIO", 0.2))
+WEBHOOK_RETRY_BUDGET_MIN_PER_WINDOW = int(os.environ.get("WEBHOOK_RETRY_BUDGET_MIN_PER_WINDOW", 3))
+WEBHOOK_RETRY_BUDGET_WINDOW_SECONDS = int(os.environ.get("WEBHOOK_RETRY_BUDGET_WINDOW_SECONDS", 60))
+# Payload profile sent to webhooks: full | text | text_capped | headers (see email_processing.payloads)
+WEBHOOK_PAYLOAD_PROFILE = os.environ.get("WEBHOOK_PAYLOAD_PROFILE", "full").strip().lower()
+WEBHOOK_PAYLOAD_MAX_KB = int(os.environ.get("WEBHOOK_PAYLOAD_MAX_KB", 64))
+# Gzip request bodies (Content-Encoding: gzip); only for receivers that decode it
+WEBHOOK_GZIP_ENABLED = env_bool("WEBHOOK_GZIP_ENABLED", False)
+# Per destination overrides, e.g. {"https://hook.eu1.make.com/xxx": {"payload_profile": "text_capped", "gzip": true}}
+WEBHOOK_PAYLOAD_PROFILES_JSON = os.environ.get("WEBHOOK_PAYLOAD_PROFILES_JSON", "")
+# Batch mode ({"batch": true} in WEBHOOK_PAYLOAD_PROFILES_JSON or a routing rule): one POST of a JSON array
+# per destination, sent at MAX_ITEMS payloads, after MAX_WAIT_MS, or at the end of the polling cycle
+WEBHOOK_BATCH_MAX_ITEMS = int(os.environ.get("WEBHOOK_BATCH_MAX_ITEMS", 20))
+WEBHOOK_BATCH_MAX_WAIT_MS = int(os.environ.get("WEBHOOK_BATCH_MAX_WAIT_MS", 2000))
+
 EXPECTED_API_TOKEN = _get_required_env("PROCESS_API_TOKEN")
 
 WEBHOOK_URL = _get_required_env("WEBHOOK_URL")
@@ -95,11 +162,22 @@ POLLING_INACTIVE_CHECK_INTERVAL_SECONDS = int(
     os.environ.get("POLLING_INACTIVE_CHECK_INTERVAL_SECONDS", 600)
 )
 
-# Background tasks (disabled - Gmail Push is the only ingestion method)
+# Background IMAP poller (disabled by default - Gmail Push is the primary ingestion method)
 ENABLE_BACKGROUND_TASKS = env_bool("ENABLE_BACKGROUND_TASKS", False)
+# Single-host fallback lock, used only when Redis is unavailable
 BG_POLLER_LOCK_FILE = os.environ.get(
     "BG_POLLER_LOCK_FILE", "/tmp/render_signal_server_email_poller.lock"
 )
+# Multi-instance leader election: renewable Redis lease + fencing token
+BG_POLLER_LEASE_REDIS_KEY = os.environ.get("BG_POLLER_LEASE_REDIS_KEY", "r:ss:bg_poller_lease:v1")
+BG_POLLER_LEASE_TTL_SECONDS = int(os.environ.get("BG_POLLER_LEASE_TTL_SECONDS", 90))
+# Adaptive cadence: short interval after new mail, exponential backoff on empty cycles
+BG_POLLER_BURST_INTERVAL_SECONDS = int(os.environ.get("BG_POLLER_BURST_INTERVAL_SECONDS", 5))
+BG_POLLER_MAX_INTERVAL_SECONDS = int(os.environ.get("BG_POLLER_MAX_INTERVAL_SECONDS", 300))
+BG_POLLER_BACKOFF_FACTOR = float(os.environ.get("BG_POLLER_BACKOFF_FACTOR", 2.0))
+# Single-flight poll cycles (manual triggers + scheduler), shared across processes via Redis
+POLL_CYCLE_REDIS_KEY_PREFIX = os.environ.get("POLL_CYCLE_REDIS_KEY_PREFIX", "r:ss:poll_cycle:v1")
+POLL_CYCLE_LOCK_TTL_SECONDS = int(os.environ.get("POLL_CYCLE_LOCK_TTL_SECONDS", 120))
 
 ENABLE_SUBJECT_GROUP_DEDUP = env_bool("ENABLE_SUBJECT_GROUP_DEDUP", True)
 DISABLE_EMAIL_ID_DEDUP = env_bool("DISABLE_EMAIL_ID_DEDUP", False)
@@ -118,6 +196,28 @@ TRIGGER_SIGNAL_FILE = SIGNAL_DIR / "local_workflow_trigger_signal.json"
 _MAGIC_LINK_FILE_DEFAULT = DEBUG_DIR / "magic_links.json"
 MAGIC_LINK_TOKENS_FILE = Path(os.environ.get("MAGIC_LINK_TOKENS_FILE", str(_MAGIC_LINK_FILE_DEFAULT)))
 
+# UID-based incremental sync (UIDVALIDITY + high-water checkpoint, Redis -> file)
+IMAP_UID_SYNC_ENABLED = env_bool("IMAP_UID_SYNC_ENABLED", False)
+IMAP_UID_CHECKPOINT_REDIS_KEY = os.environ.get("IMAP_UID_CHECKPOINT_REDIS_KEY", "r:ss:imap_uid_checkpoint:v1")
+IMAP_UID_CHECKPOINT_FILE = Path(
+    os.environ.get("IMAP_UID_CHECKPOINT_FILE", str(DEBUG_DIR / "imap_uid_checkpoint.json"))
+)
+IMAP_UID_PENDING_MAX = int(os.environ.get("IMAP_UID_PENDING_MAX", 500))
+
+# Durable webhook outbox: poll cycles enqueue, a background dispatcher delivers and retries (Redis -> SQLite)
+WEBHOOK_OUTBOX_ENABLED = env_bool("WEBHOOK_OUTBOX_ENABLED", False)
+WEBHOOK_OUTBOX_REDIS_KEY_PREFIX = os.environ.get("WEBHOOK_OUTBOX_REDIS_KEY_PREFIX", "r:ss:webhook_outbox:v1")
+WEBHOOK_OUTBOX_SQLITE_PATH = Path(
+    os.environ.get("WEBHOOK_OUTBOX_SQLITE_PATH", str(DEBUG_DIR / "webhook_outbox.sqlite3"))
+)
+WEBHOOK_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("WEBHOOK_OUTBOX_MAX_ATTEMPTS", 10))
+WEBHOOK_OUTBOX_BACKOFF_BASE_SECONDS = int(os.environ.get("WEBHOOK_OUTBOX_BACKOFF_BASE_SECONDS", 10))
+WEBHOOK_OUTBOX_BACKOFF_MAX_SECONDS = int(os.environ.get("WEBHOOK_OUTBOX_BACKOFF_MAX_SECONDS", 900))
+# A claimed job becomes claimable again after this delay if its dispatcher died mid-delivery
+WEBHOOK_OUTBOX_VISIBILITY_SECONDS = int(os.environ.get("WEBHOOK_OUTBOX_VISIBILITY_SECONDS", 300))
+WEBHOOK_OUTBOX_POLL_INTERVAL_SECONDS = int(os.environ.get("WEBHOOK_OUTBOX_POLL_INTERVAL_SECONDS", 2))
+WEBHOOK_OUTBOX_BATCH_SIZE = int(os.environ.get("WEBHOOK_OUTBOX_BATCH_SIZE", 10))
+
 R2_FETCH_ENABLED = env_bool("R2_FETCH_ENABLED", False)
 R2_FETCH_ENDPOINT = os.environ.get("R2_FETCH_ENDPOINT", "")
 R2_PUBLIC_BASE_URL = os.environ.get("R2_PUBLIC_BASE_URL", "")
@@ -127,6 +227,15 @@ WEBHOOK_LINKS_FILE = os.environ.get(
     str(BASE_DIR / "deployment" / "data" / "webhook_links.json")
 )
 R2_LINKS_MAX_ENTRIES = int(os.environ.get("R2_LINKS_MAX_ENTRIES", 1000))
+# Redis hash indexing webhook_links.json by normalized source URL (in-process dict when Redis is unavailable)
+R2_LINKS_INDEX_REDIS_KEY = os.environ.get("R2_LINKS_INDEX_REDIS_KEY", "r:ss:r2_links:index:v1")
+# Lookup-first (opt-in): reuse the R2 URL of an already-offloaded source link younger than this instead of a new remote fetch (0 = always fetch)
+R2_LINK_REUSE_MAX_AGE_SEC = int(os.environ.get("R2_LINK_REUSE_MAX_AGE_SEC", 0))
+# Dropbox shared folders (/scl/fo/) change content behind the same URL: separate, shorter max age, capped by the one above (0 = never reused)
+R2_LINK_REUSE_FOLDER_MAX_AGE_SEC = int(os.environ.get("R2_LINK_REUSE_FOLDER_MAX_AGE_SEC", 0))
+# HEAD-check the reused R2 URL first; an unreachable object falls back to a remote fetch
+R2_LINK_REUSE_VALIDATE = env_bool("R2_LINK_REUSE_VALIDATE", False)
+R2_LINK_REUSE_VALIDATE_TIMEOUT_SEC = int(os.environ.get("R2_LINK_REUSE_VALIDATE_TIMEOUT_SEC", 5))
 
 # Magic link TTL (seconds)
 MAGIC_LINK_TTL_SECONDS = int(os.environ.get("MAGIC_LINK_TTL_SECONDS", 900))
@@ -182,3 +291,6 @@ def log_configuration(logger):
     
     logger.info(f"CFG BG: ENABLE_BACKGROUND_TASKS={ENABLE_BACKGROUND_TASKS}")
     logger.info(f"CFG BG: BG_POLLER_LOCK_FILE={BG_POLLER_LOCK_FILE}")
+    logger.info(f"CFG BG: BG_POLLER_LEASE_TTL_SECONDS={BG_POLLER_LEASE_TTL_SECONDS}")
+    logger.info(f"CFG WEBHOOK: WEBHOOK_OUTBOX_ENABLED={WEBHOOK_OUTBOX_ENABLED}")
+    logger.info(f"CFG WEBHOOK: WEBHOOK_RATE_LIMIT_PACING_ENABLED={WEBHOOK_RATE_LIMIT_PACING_ENABLED}")
@@ -8,16 +8,27 @@ from __future__ import annotations
 
 import hashlib
 import imaplib
+import logging
+import queue
 import re
+import select
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
 from email.header import decode_header
 from logging import Logger
-from typing import Optional, Union
+from typing import Callable, Iterator, Optional, Union
 
 from config.settings import (
     EMAIL_ADDRESS,
     EMAIL_PASSWORD,
+    IMAP_IDLE_TIMEOUT_SECONDS,
+    IMAP_KEEPALIVE_INTERVAL_SECONDS,
     IMAP_PORT,
     IMAP_SERVER,
+    IMAP_SESSION_POOL_SIZE,
     IMAP_USE_SSL,
 )
 from utils.text_helpers import mask_sensitive_data
@@ -155,3 +166,616 @@ def mark_email_as_read_imap(logger: Optional[Logger], mail: Optional[Union[imapl
         if logger:
             logger.error("IMAP: Error marking email %s as read: %s", email_num, e)
         return False
+
+
+# =============================================================================
+# SESSIONS PERSISTANTES (keepalive + IDLE)
+# =============================================================================
+
+_IDLE_NEW_MAIL_RE = re.compile(rb"^\* \d+ (EXISTS|RECENT)", re.IGNORECASE)
+
+
+@dataclass
+class _PooledSession:
+    mail: Union[imaplib.IMAP4_SSL, imaplib.IMAP4]
+    last_used: float
+
+
+class ImapSessionPool:
+    """Pool de sessions IMAP authentifiées réutilisées d'un cycle de polling à l'autre.
+
+    Évite le handshake TLS + LOGIN à chaque cycle: une session inactive depuis plus de
+    `keepalive_interval_sec` (ou dont le socket signale une fermeture) est validée par
+    un NOOP avant réutilisation, et remplacée par une nouvelle connexion si besoin.
+    Les connexions imaplib n'étant pas thread-safe, une session n'est prêtée qu'à un
+    seul appelant à la fois.
+    """
+
+    _instance: Optional[ImapSessionPool] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        logger: Optional[Logger] = None,
+        *,
+        connection_factory: Optional[Callable[[], Optional[Union[imaplib.IMAP4_SSL, imaplib.IMAP4]]]] = None,
+        max_sessions: int = IMAP_SESSION_POOL_SIZE,
+        keepalive_interval_sec: float = IMAP_KEEPALIVE_INTERVAL_SECONDS,
+        timeout: int = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._logger = logger or logging.getLogger(__name__)
+        self._connection_factory = connection_factory
+        self._max_sessions = max(1, int(max_sessions))
+        self._keepalive_interval = max(0.0, float(keepalive_interval_sec))
+        self._timeout = timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._idle: list[_PooledSession] = []
+        self._in_use = 0
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "keepalives": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "idle_wakeups": 0,
+        }
+
+    @classmethod
+    def get_instance(cls, logger: Optional[Logger] = None) -> ImapSessionPool:
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(logger)
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance.close_all()
+            cls._instance = None
+
+    # ------------------------------------------------------------------ prêt/retour
+    def acquire(self) -> Optional[Union[imaplib.IMAP4_SSL, imaplib.IMAP4]]:
+        """Prête une session authentifiée (réutilisée ou nouvelle). None si connexion impossible."""
+        with self._cond:
+            while not self._idle and self._in_use >= self._max_sessions:
+                if not self._cond.wait(timeout=self._timeout):
+                    self._logger.warning("IMAP_POOL: No session available after %ss", self._timeout)
+                    return None
+            session = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        if session is not None:
+            if self._is_usable(session):
+                self._bump("reused")
+                return session.mail
+            self._bump("reconnects")
+            self._logout_quietly(session.mail)
+
+        mail = self._connect()
+        if mail is None:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+        return mail
+
+    def release(self, mail, *, discard: bool = False) -> None:
+        """Rend une session au pool, ou la ferme si elle est cassée (`discard=True`)."""
+        if mail is None:
+            return
+        with self._cond:
+            self._in_use = max(0, self._in_use - 1)
+            if not discard:
+                self._idle.append(_PooledSession(mail, self._clock()))
+            self._cond.notify()
+        if discard:
+            self._bump("discarded")
+            self._logout_quietly(mail)
+
+    @contextmanager
+    def session(self) -> Iterator[Optional[Union[imaplib.IMAP4_SSL, imaplib.IMAP4]]]:
+        """Context manager: la session est rejetée si la connexion casse pendant l'usage."""
+        mail = self.acquire()
+        try:
+            yield mail
+        except (imaplib.IMAP4.abort, OSError):
+            self.release(mail, discard=True)
+            mail = None
+            raise
+        finally:
+            if mail is not None:
+                self.release(mail)
+
+    def keepalive(self) -> int:
+        """Envoie un NOOP aux sessions inactives depuis trop longtemps; retourne le nombre conservé."""
+        with self._cond:
+            candidates, self._idle = self._idle, []
+            self._in_use += len(candidates)
+        kept = 0
+        for session in candidates:
+            if self._is_usable(session):
+                kept += 1
+                self.release(session.mail)
+            else:
+                self.release(session.mail, discard=True)
+        return kept
+
+    def close_all(self) -> None:
+        with self._cond:
+            sessions, self._idle = self._idle, []
+        for session in sessions:
+            self._logout_quietly(session.mail)
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["idle_sessions"] = len(self._idle)
+            stats["in_use_sessions"] = self._in_use
+            stats["max_sessions"] = self._max_sessions
+        return stats
+
+    # ------------------------------------------------------------------ IDLE
+    def wait_for_new_mail(
+        self,
+        timeout_sec: float = IMAP_IDLE_TIMEOUT_SECONDS,
+        mailbox: str = "INBOX",
+    ) -> Optional[bool]:
+        """Bloque en IMAP IDLE jusqu'à l'arrivée d'un message ou l'expiration du timeout.
+
+        Returns:
+            True si un nouveau message a été signalé, False à l'expiration,
+            None si le serveur ne supporte pas IDLE (l'appelant doit alors poller).
+        """
+        with self.session() as mail:
+            if mail is None:
+                return False
+            if "IDLE" not in (getattr(mail, "capabilities", None) or ()):
+                return None
+            status, _ = mail.select(mailbox, readonly=True)
+            if status != "OK":
+                return False
+            woke = _idle_until_activity(mail, timeout_sec, self._clock)
+        if woke:
+            self._bump("idle_wakeups")
+        return woke
+
+    def run_idle_loop(
+        self,
+        on_new_mail: Callable[[], object],
+        stop_event: threading.Event,
+        *,
+        timeout_sec: float = IMAP_IDLE_TIMEOUT_SECONDS,
+        error_backoff_sec: float = 30.0,
+    ) -> None:
+        """Boucle IDLE: appelle `on_new_mail` à chaque notification jusqu'à `stop_event`.
+
+        IDLE est relancé au moins toutes les `keepalive_interval_sec` secondes pour
+        passer un keepalive (NOOP) sur les autres sessions du pool.
+        """
+        if self._keepalive_interval > 0:
+            timeout_sec = min(timeout_sec, self._keepalive_interval)
+        while not stop_event.is_set():
+            try:
+                self.keepalive()
+                woke = self.wait_for_new_mail(timeout_sec)
+            except Exception as e:
+                self._logger.warning("IMAP_POOL: IDLE interrupted: %s", e)
+                stop_event.wait(error_backoff_sec)
+                continue
+            if woke is None:
+                self._logger.info("IMAP_POOL: Server does not support IDLE; idle loop stopped")
+                return
+            if woke and not stop_event.is_set():
+                try:
+                    on_new_mail()
+                except Exception as e:
+                    self._logger.error("IMAP_POOL: New-mail callback failed: %s", e)
+
+    # ------------------------------------------------------------------ interne
+    def _connect(self):
+        if self._connection_factory is not None:
+            mail = self._connection_factory()
+        else:
+            mail = create_imap_connection(self._logger, timeout=self._timeout)
+        if mail is not None:
+            self._bump("created")
+        return mail
+
+    def _is_usable(self, session: _PooledSession) -> bool:
+        idle_for = self._clock() - session.last_used
+        if idle_for < self._keepalive_interval and not _socket_has_pending_data(session.mail):
+            return True
+        try:
+            status, _ = session.mail.noop()
+            self._bump("keepalives")
+            return status == "OK"
+        except Exception as e:
+            self._logger.debug("IMAP_POOL: Keepalive NOOP failed: %s", e)
+            return False
+
+    def _bump(self, key: str) -> None:
+        with self._cond:
+            self._stats[key] += 1
+
+    def _logout_quietly(self, mail) -> None:
+        try:
+            mail.logout()
+        except Exception:
+            pass
+
+
+def _socket_has_pending_data(mail) -> bool:
+    """Détecte sans round trip un BYE/EOF reçu pendant l'inactivité de la session."""
+    try:
+        sock = mail.socket()
+        if hasattr(sock, "pending") and sock.pending():
+            return True
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable)
+    except Exception:
+        return False
+
+
+def _send_raw_command(mail, command: bytes) -> bytes:
+    """Envoie une commande taguée dont l'appelant lit lui-même les réponses; retourne le tag.
+
+    imaplib n'expose pas IDLE avant Python 3.14: seul endroit qui touche à ses
+    internes. `_new_tag()` garde la séquence de tags cohérente avec les commandes
+    suivantes; le tag est retiré de `tagged_commands` pour qu'imaplib ne range pas
+    sa réponse (lue ici, pas via `_command_complete`).
+    """
+    tag = mail._new_tag()
+    mail.tagged_commands.pop(tag, None)
+    mail.send(tag + b" " + command + b"\r\n")
+    return tag
+
+
+def _idle_until_activity(mail, timeout_sec: float, clock: Callable[[], float]) -> bool:
+    """Exécute IDLE/DONE (RFC 2177) sur une connexion sélectionnée."""
+    tag = _send_raw_command(mail, b"IDLE")
+    first = mail.readline()
+    if not first.startswith(b"+"):
+        raise imaplib.IMAP4.error(f"IDLE refused: {first.strip()!r}")
+
+    new_mail = False
+    deadline = clock() + max(0.0, timeout_sec)
+    while not new_mail:
+        remaining = deadline - clock()
+        if remaining <= 0 or not _wait_readable(mail, remaining):
+            break
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("connection closed during IDLE")
+        new_mail = bool(_IDLE_NEW_MAIL_RE.match(line))
+
+    mail.send(b"DONE\r\n")
+    while True:
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("connection closed while leaving IDLE")
+        if line.startswith(tag):
+            break
+        new_mail = new_mail or bool(_IDLE_NEW_MAIL_RE.match(line))
+    return new_mail
+
+
+def _wait_readable(mail, timeout_sec: float) -> bool:
+    sock = mail.socket()
+    if hasattr(sock, "pending") and sock.pending():
+        return True
+    readable, _, _ = select.select([sock], [], [], timeout_sec)
+    return bool(readable)
+
+
+# =============================================================================
+# FETCH PAR LOTS
+# =============================================================================
+
+_FETCH_START_RE = re.compile(rb"^(\d+) \(")
+_LITERAL_MARK = b"\x00"
+
+
+def compress_message_set(nums) -> str:
+    """Compresse des numéros de message en message set IMAP (ex: [1,2,3,5] -> '1:3,5')."""
+    values = sorted({int(n.decode() if isinstance(n, bytes) else n) for n in nums})
+    ranges: list[str] = []
+    start = prev = None
+    for value in values:
+        if start is None:
+            start = prev = value
+        elif value == prev + 1:
+            prev = value
+        else:
+            ranges.append(str(start) if start == prev else f"{start}:{prev}")
+            start = prev = value
+    if start is not None:
+        ranges.append(str(start) if start == prev else f"{start}:{prev}")
+    return ",".join(ranges)
+
+
+def chunk_message_numbers(nums: list, batch_size: int) -> list[list]:
+    """Découpe la liste UNSEEN en lots de `batch_size` messages (ordre conservé)."""
+    size = max(1, int(batch_size))
+    return [nums[i:i + size] for i in range(0, len(nums), size)]
+
+
+def parse_fetch_response(data) -> dict[str, dict]:
+    """Démultiplexe la réponse imaplib d'un FETCH multi-messages.
+
+    Returns:
+        {numéro: {ATTRIBUT: valeur}} — les littéraux (RFC822, BODY[...]) sont des bytes,
+        UID/RFC822.SIZE des int, les listes parenthésées (FLAGS, BODYSTRUCTURE) du texte brut.
+    """
+    messages: dict[str, dict] = {}
+    current_num: Optional[str] = None
+    text = b""
+    literals: list[bytes] = []
+
+    def _flush() -> None:
+        if current_num is not None:
+            messages.setdefault(current_num, {}).update(_parse_fetch_attributes(text, literals))
+
+    for entry in data or []:
+        if isinstance(entry, tuple) and len(entry) >= 2:
+            head, literal = entry[0], entry[1]
+        elif isinstance(entry, (bytes, bytearray)):
+            head, literal = bytes(entry), None
+        else:
+            continue
+        head = head if isinstance(head, (bytes, bytearray)) else b""
+        match = _FETCH_START_RE.match(head)
+        if match:
+            _flush()
+            current_num = match.group(1).decode()
+            text = head[match.end():]
+            literals = []
+        elif current_num is not None:
+            text += head
+        else:
+            continue
+        if literal is not None:
+            text += _LITERAL_MARK + str(len(literals)).encode() + _LITERAL_MARK
+            literals.append(bytes(literal))
+    _flush()
+    return messages
+
+
+def _parse_fetch_attributes(body: bytes, literals: list[bytes]) -> dict:
+    attrs: dict = {}
+    i, n = 0, len(body)
+    while i < n:
+        while i < n and body[i:i + 1] == b" ":
+            i += 1
+        if i >= n or body[i:i + 1] == b")":
+            break
+        start, depth = i, 0
+        while i < n:
+            ch = body[i:i + 1]
+            if ch == b"[":
+                depth += 1
+            elif ch == b"]":
+                depth -= 1
+            elif ch in (b" ", b")") and depth == 0:
+                break
+            i += 1
+        key = body[start:i].decode("utf-8", errors="replace").upper()
+        # Les littéraux sont annoncés "{n}" juste après la clé: imaplib les a déjà extraits.
+        key = re.sub(r"\s*\{\d+\}$", "", key)
+        while i < n and body[i:i + 1] == b" ":
+            i += 1
+        value, i = _read_fetch_value(body, i, literals)
+        if key:
+            attrs[key] = value
+    return attrs
+
+
+def _read_fetch_value(body: bytes, i: int, literals: list[bytes]):
+    n = len(body)
+    if i >= n:
+        return None, i
+    ch = body[i:i + 1]
+    if ch == b"{":
+        # littéral annoncé dans la tête de tuple: le marqueur suit immédiatement
+        end = body.find(b"}", i)
+        i = end + 1 if end != -1 else n
+        return _read_fetch_value(body, i, literals)
+    if ch == _LITERAL_MARK:
+        end = body.find(_LITERAL_MARK, i + 1)
+        return literals[int(body[i + 1:end])], end + 1
+    if ch == b"(":
+        depth, j, in_quote = 0, i, False
+        while j < n:
+            c = body[j:j + 1]
+            if in_quote:
+                if c == b"\\":
+                    j += 1
+                elif c == b'"':
+                    in_quote = False
+            elif c == b'"':
+                in_quote = True
+            elif c == b"(":
+                depth += 1
+            elif c == b")":
+                depth -= 1
+                if depth == 0:
+                    break
+            j += 1
+        return body[i:j + 1].decode("utf-8", errors="replace"), j + 1
+    if ch == b'"':
+        j = i + 1
+        while j < n and body[j:j + 1] != b'"':
+            j += 2 if body[j:j + 1] == b"\\" else 1
+        return body[i + 1:j].decode("utf-8", errors="replace"), j + 1
+    j = i
+    while j < n and body[j:j + 1] not in (b" ", b")"):
+        j += 1
+    atom = body[i:j].decode("utf-8", errors="replace")
+    if atom.upper() == "NIL":
+        return None, j
+    return (int(atom) if atom.isdigit() else atom), j
+
+
+def fetch_messages(mail, nums: list, items: str) -> dict[str, dict]:
+    """Un seul FETCH pour tout un lot de numéros de message (un round trip)."""
+    if not nums:
+        return {}
+    status, data = mail.fetch(compress_message_set(nums), items)
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"FETCH failed (status={status})")
+    return parse_fetch_response(data)
+
+
+# =============================================================================
+# SYNCHRONISATION PAR UID
+# =============================================================================
+
+def read_select_uid_state(mail) -> tuple[Optional[int], Optional[int]]:
+    """Lit (UIDVALIDITY, UIDNEXT) depuis les réponses non taguées du dernier SELECT."""
+    values: list[Optional[int]] = []
+    for code in ("UIDVALIDITY", "UIDNEXT"):
+        try:
+            _, data = mail.response(code)
+            raw = data[-1] if data and data[-1] is not None else None
+            values.append(int(raw.decode() if isinstance(raw, bytes) else raw) if raw is not None else None)
+        except Exception:
+            values.append(None)
+    return values[0], values[1]
+
+
+class UidMailbox:
+    """Proxy exposant UID FETCH / UID STORE sous les noms fetch/store utilisés par le poller.
+
+    Les numéros manipulés par le pipeline sont alors des UID: les réponses FETCH
+    sont réindexées par UID pour que `parse_fetch_response` reste utilisable tel quel.
+    """
+
+    def __init__(self, mail) -> None:
+        self._mail = mail
+
+    def __getattr__(self, name):
+        return getattr(self._mail, name)
+
+    def fetch(self, message_set, message_parts):
+        status, data = self._mail.uid("FETCH", _as_message_set(message_set), message_parts)
+        if status != "OK":
+            return status, data
+        return status, _rekey_fetch_by_uid(data)
+
+    def store(self, message_set, command, flags):
+        return self._mail.uid("STORE", _as_message_set(message_set), command, flags)
+
+    def search(self, charset, *criteria):
+        return self._mail.uid("SEARCH", charset, *criteria)
+
+
+def _as_message_set(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _rekey_fetch_by_uid(data) -> list:
+    seq_to_uid = {
+        seq: str(attrs["UID"])
+        for seq, attrs in parse_fetch_response(data).items()
+        if isinstance(attrs.get("UID"), int)
+    }
+    rekeyed = []
+    for entry in data or []:
+        head = entry[0] if isinstance(entry, tuple) else entry
+        if isinstance(head, (bytes, bytearray)):
+            match = _FETCH_START_RE.match(head)
+            if match and match.group(1).decode() in seq_to_uid:
+                head = seq_to_uid[match.group(1).decode()].encode() + bytes(head[match.end(1):])
+                entry = (head,) + tuple(entry[1:]) if isinstance(entry, tuple) else head
+        rekeyed.append(entry)
+    return rekeyed
+
+
+# =============================================================================
+# COMMANDES IMAP SÉRIALISÉES (traitement concurrent des emails)
+# =============================================================================
+
+class ImapCommandChannel:
+    """Sérialise sur le thread propriétaire les commandes IMAP émises par des workers.
+
+    imaplib n'est pas thread-safe: les workers reçoivent `proxy()` et chaque appel
+    (store, fetch, uid...) est mis en file puis exécuté par le thread propriétaire
+    dans `pump()`, dans l'ordre d'arrivée. Depuis le thread propriétaire, l'appel
+    est direct.
+    """
+
+    def __init__(self, mail) -> None:
+        self._mail = mail
+        self._owner = threading.get_ident()
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def call(self, name: str, *args, **kwargs):
+        if threading.get_ident() == self._owner:
+            return getattr(self._mail, name)(*args, **kwargs)
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise imaplib.IMAP4.abort("IMAP command channel closed")
+            self._queue.put((name, args, kwargs, future))
+        return future.result()
+
+    def wake(self) -> None:
+        """Réveille un `pump()` bloqué (ex: un worker vient de terminer)."""
+        self._queue.put(None)
+
+    def pump(self, timeout: float) -> int:
+        """Exécute les commandes en attente; bloque au plus `timeout` s si la file est vide.
+
+        Returns:
+            Nombre de commandes exécutées.
+        """
+        executed = 0
+        try:
+            item = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return 0
+        while True:
+            if item is not None:
+                name, args, kwargs, future = item
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(getattr(self._mail, name)(*args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+                executed += 1
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return executed
+
+    def close(self) -> None:
+        """Refuse les nouvelles commandes et fait échouer celles encore en file."""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[3].set_exception(imaplib.IMAP4.abort("IMAP command channel closed"))
+
+    def proxy(self) -> "_ChannelMailbox":
+        return _ChannelMailbox(self)
+
+
+class _ChannelMailbox:
+    """Vue de la connexion IMAP dont chaque méthode passe par un ImapCommandChannel."""
+
+    def __init__(self, channel: ImapCommandChannel) -> None:
+        self._channel = channel
+
+    def __getattr__(self, name):
+        def _call(*args, **kwargs):
+            return self._channel.call(name, *args, **kwargs)
+
+        return _call
@@ -7,14 +7,29 @@ Provides a stable interface for email processing with detector-specific routing.
 """
 from __future__ import annotations
 
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Mapping
+import binascii
+import copy
+import gzip as _gzip
+import imaplib
+import io
 import logging
 import re as _stdlib_re  # kept for fallback when re2 is unavailable
 from typing_extensions import TypedDict
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import os
 import json
+import quopri
+import threading
+import contextvars
+import uuid
+from time import monotonic as _monotonic  # `time` est un paramètre injecté du flux webhook
+from contextvars import ContextVar
+from dataclasses import dataclass
 from pathlib import Path
+from types import MappingProxyType
+
+from requests.exceptions import Timeout as _RequestsTimeout
 
 try:
     import re2 as re
@@ -28,13 +43,19 @@ except ImportError:
 from utils.time_helpers import parse_time_hhmm, is_within_time_window_local, get_polling_timezone
 from utils.text_helpers import mask_sensitive_data, strip_leading_reply_prefixes
 from config import settings
+from services.circuit_breaker_service import STATE_OPEN as _CIRCUIT_OPEN, WebhookCircuitBreakerService
 from services.deduplication_service import DeduplicationService
-from services.rate_limit_service import RateLimitService
+from services.delivery_mode_service import DeliveryModeMemoryService
+from services.http_session_service import HttpSessionService
+from services.rate_limit_service import SCOPE_GLOBAL, RateLimitService, routing_rule_scope, webhook_url_scope
+from services.webhook_latency_service import WebhookLatencyService
 from services.webhook_logger_service import WebhookLoggerService
-from email_processing import imap_client
+from services.webhook_outbox_service import WebhookOutboxService, outbox_job_id
+from email_processing import imap_client, payloads, webhook_batch
 
 
-from email import message_from_bytes
+from email.feedparser import BytesFeedParser
+from email.parser import BytesHeaderParser
 
 # =============================================================================
 # CONSTANTS
@@ -44,6 +65,9 @@ IMAP_MAILBOX_INBOX = "INBOX"
 IMAP_STATUS_OK = "OK"
 IMAP_SEARCH_CRITERIA_UNSEEN = "(UNSEEN)"
 IMAP_FETCH_RFC822 = "(RFC822)"
+# BODY.PEEK[] ne pose pas \Seen: seuls les emails traités sont marqués lus (mark_email_as_read_imap)
+IMAP_FETCH_BODY_PEEK = "(BODY.PEEK[])"
+IMAP_FETCH_HEADER_FIELDS = "(RFC822.SIZE BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE MESSAGE-ID)])"
 
 DETECTOR_RECADRAGE = "recadrage"
 DETECTOR_DESABO = "desabonnement_journee_tarifs"
@@ -62,6 +86,7 @@ WEEKDAY_NAMES = [
 ]
 
 MAX_HTML_BYTES = 1024 * 1024
+MIME_FEED_CHUNK_BYTES = 64 * 1024
 WEBHOOK_DELIVERY_MODE_JSON = "json"
 WEBHOOK_DELIVERY_MODE_FORM = "form"
 WEBHOOK_DELIVERY_MODES = {
@@ -74,6 +99,37 @@ WEBHOOK_DELIVERY_MODES = {
 # TYPE DEFINITIONS
 # =============================================================================
 
+@dataclass(frozen=True)
+class CycleConfig:
+    """Snapshot immuable de la configuration, construit une fois par cycle de polling."""
+    webhook_config: Mapping[str, Any]
+    routing_rules: tuple
+    processing_prefs: Mapping[str, Any]
+    time_window: tuple[str, str]
+    sender_allowlist: frozenset
+    runtime_flags: Mapping[str, Any]
+    webhook_sending_enabled: bool
+    config_reads: int = 0
+
+
+# Config webhook du cycle en cours: les lectures imbriquées (fenêtre horaire,
+# mode de livraison...) réutilisent le snapshot au lieu de recharger le store.
+_CYCLE_WEBHOOK_CONFIG: ContextVar[Optional[Mapping[str, Any]]] = ContextVar(
+    "orchestrator_cycle_webhook_config", default=None
+)
+
+# Lots webhook en attente du cycle en cours (destinations en mode batch)
+_CYCLE_WEBHOOK_BATCHER: ContextVar[Optional[webhook_batch.WebhookBatcher]] = ContextVar(
+    "orchestrator_cycle_webhook_batcher", default=None
+)
+
+
+# Candidats UNSEEN du cycle précédent: seuls les nouveaux comptent comme activité pour
+# la cadence du scheduler (le courrier ignoré ou en échec reste UNSEEN d'un cycle à l'autre)
+_LAST_CYCLE_CANDIDATES: frozenset = frozenset()
+_LAST_CYCLE_CANDIDATES_LOCK = threading.Lock()
+
+
 class ParsedEmail(TypedDict, total=False):
     """Structure d'un email parsé depuis IMAP."""
     num: str
@@ -85,12 +141,71 @@ class ParsedEmail(TypedDict, total=False):
     body_html: str
 
 
+# Étapes du pipeline par email, de la moins chère à la plus chère.
+PIPELINE_STAGES = ("headers", "parse", "cheap_filters", "detectors", "routing", "enrichment", "delivery")
+
+
+class PipelineStats:
+    """Compteurs par étape du pipeline d'un cycle (entrées / courts-circuits).
+
+    Un email court-circuité avant "enrichment" n'a déclenché aucun appel R2, et
+    avant "delivery" aucun POST webhook: `r2_enrichments_avoided` et
+    `deliveries_avoided` mesurent ce travail distant évité.
+    """
+
+    def __init__(self) -> None:
+        self.entered = {stage: 0 for stage in PIPELINE_STAGES}
+        self.short_circuited = {stage: 0 for stage in PIPELINE_STAGES}
+        self.reasons: Dict[str, int] = {}
+        self.r2_enrichments = 0
+        self.r2_enrichments_avoided = 0
+        self.deliveries_avoided = 0
+        self.new_mail = 0
+        self._lock = threading.Lock()
+
+    def enter(self, stage: str, count: int = 1) -> None:
+        with self._lock:
+            self.entered[stage] += count
+
+    def record_r2_enrichment(self) -> None:
+        with self._lock:
+            self.r2_enrichments += 1
+
+    def short_circuit(self, stage: str, reason: str, *, count: int = 1, had_links: bool = False) -> None:
+        with self._lock:
+            self.short_circuited[stage] += count
+            self.reasons[reason] = self.reasons.get(reason, 0) + count
+            self.deliveries_avoided += count
+            if had_links:
+                self.r2_enrichments_avoided += count
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return self._as_dict_unlocked()
+
+    def _as_dict_unlocked(self) -> dict:
+        return {
+            "stages": {
+                stage: {"entered": self.entered[stage], "short_circuited": self.short_circuited[stage]}
+                for stage in PIPELINE_STAGES
+            },
+            "short_circuit_reasons": dict(self.reasons),
+            "r2_enrichments": self.r2_enrichments,
+            "r2_enrichments_avoided": self.r2_enrichments_avoided,
+            "deliveries_avoided": self.deliveries_avoided,
+            "new_mail": self.new_mail,
+        }
+
+
 
 # =============================================================================
 # MODULE-LEVEL HELPERS
 # =============================================================================
 
 def _get_webhook_config_dict() -> dict:
+    cycle_config = _CYCLE_WEBHOOK_CONFIG.get()
+    if cycle_config is not None:
+        return copy.deepcopy(dict(cycle_config))
     try:
         from services import WebhookConfigService
 
@@ -423,23 +538,35 @@ def _build_webhook_mode_sequence(
 
 def _build_webhook_request_kwargs(
     *,
-    serialized_payload: str,
+    serialized_payload: str | bytes,
     delivery_mode: str,
+    content_encoding: str | None = None,
 ) -> dict[str, Any]:
     content_type = (
         "application/json"
         if delivery_mode == WEBHOOK_DELIVERY_MODE_JSON
         else "application/x-www-form-urlencoded"
     )
+    headers = {
+        "Content-Type": content_type,
+        "Accept": "application/json, text/plain, */*",
+    }
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
     return {
         "data": serialized_payload,
-        "headers": {
-            "Content-Type": content_type,
-            "Accept": "application/json, text/plain, */*",
-        },
+        "headers": headers,
     }
 
 
+def _encode_webhook_body(serialized_payload: str, *, gzip_enabled: bool) -> tuple[str | bytes, str | None, int]:
+    """Returns (body, content_encoding, wire_size_bytes); the body is compressed once for all attempts."""
+    if not gzip_enabled:
+        return serialized_payload, None, len(serialized_payload.encode("utf-8"))
+    body = _gzip.compress(serialized_payload.encode("utf-8"), compresslevel=6)
+    return body, "gzip", len(body)
+
+
 def _truncate_webhook_response_snippet(value: Any, *, limit: int = 200) -> str:
     if value is None:
         return ""
@@ -468,7 +595,7 @@ def _normalize_webhook_failure_reason(*, status_code: int | None, response_text:
 def _parse_email(mail, num: bytes, logger) -> Optional[ParsedEmail]:
     """Fetch and parse email from IMAP."""
     try:
-        status, msg_data = mail.fetch(num, '(RFC822)')
+        status, msg_data = mail.fetch(num, IMAP_FETCH_BODY_PEEK)
         if status != 'OK' or not msg_data:
             logger.warning("IMAP: Failed to fetch message %s (status=%s)", num, status)
             return None
@@ -482,70 +609,352 @@ def _parse_email(mail, num: bytes, logger) -> Optional[ParsedEmail]:
             logger.warning("IMAP: No RFC822 bytes for message %s", num)
             return None
 
-        from email import message_from_bytes
-        msg = message_from_bytes(raw_bytes)
-        subj_raw = msg.get('Subject', '')
-        from_raw = msg.get('From', '')
-        date_raw = msg.get('Date', '')
+        return _build_parsed_email(num, raw_bytes, logger)
+    except Exception as e:
+        logger.error("IMAP error fetching/parsing email %s: %s", num, e)
+        return None
 
-        subject = imap_client.decode_email_header_value(subj_raw)
-        sender = imap_client.extract_sender_email(from_raw).lower()
 
-        body_plain, body_html = _extract_email_bodies(msg, logger)
+def _parse_message_bytes(raw_bytes: bytes):
+    """Parses RFC822 bytes chunk by chunk (no full-size str copy of the message)."""
+    parser = BytesFeedParser()
+    view = memoryview(raw_bytes)
+    for start in range(0, len(view), MIME_FEED_CHUNK_BYTES):
+        parser.feed(bytes(view[start:start + MIME_FEED_CHUNK_BYTES]))
+    return parser.close()
 
-        return {
-            'num': num.decode() if isinstance(num, bytes) else str(num),
-            'subject': subject,
-            'sender': sender,
-            'date_raw': date_raw,
-            'msg': msg,
-            'body_plain': body_plain,
-            'body_html': body_html,
-        }
-    except Exception as e:
-        logger.error("IMAP error fetching/parsing email %s: %s", num, e)
+
+def _build_parsed_email(num, raw_bytes: bytes, logger) -> ParsedEmail:
+    msg = _parse_message_bytes(raw_bytes)
+    subj_raw = msg.get('Subject', '')
+    from_raw = msg.get('From', '')
+    date_raw = msg.get('Date', '')
+
+    subject = imap_client.decode_email_header_value(subj_raw)
+    sender = imap_client.extract_sender_email(from_raw).lower()
+
+    body_plain, body_html = _extract_email_bodies(msg, logger)
+
+    return {
+        'num': num.decode() if isinstance(num, bytes) else str(num),
+        'subject': subject,
+        'sender': sender,
+        'date_raw': date_raw,
+        'msg': msg,
+        'body_plain': body_plain,
+        'body_html': body_html,
+    }
+
+
+def _get_fetch_batch_size() -> int:
+    try:
+        return max(1, int(getattr(settings, "IMAP_FETCH_BATCH_SIZE", 1) or 1))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _iter_parsed_emails(mail, email_nums: list, logger):
+    """Yields (num, ParsedEmail | None) in UNSEEN order, one FETCH round trip per batch.
+
+    Bodies are fetched with BODY.PEEK[]: a batch leaves its messages unseen until
+    each one is processed and explicitly marked as read.
+    Messages missing from a batch response are re-fetched individually, so a server
+    (or stub) that cannot answer multi-message sets degrades to the legacy path.
+    """
+    batch_size = _get_fetch_batch_size()
+    if batch_size <= 1:
+        for num in email_nums:
+            yield num, _parse_email(mail, num, logger)
+        return
+
+    for batch in imap_client.chunk_message_numbers(email_nums, batch_size):
+        try:
+            fetched = imap_client.fetch_messages(mail, batch, IMAP_FETCH_BODY_PEEK)
+        except Exception as e_batch:
+            logger.warning("IMAP: Batched fetch failed (%d messages), falling back: %s", len(batch), e_batch)
+            fetched = {}
+        for num in batch:
+            key = num.decode() if isinstance(num, bytes) else str(num)
+            raw_bytes = (fetched.get(key) or {}).get("BODY[]")
+            if not isinstance(raw_bytes, (bytes, bytearray)):
+                yield num, _parse_email(mail, num, logger)
+                continue
+            try:
+                yield num, _build_parsed_email(num, bytes(raw_bytes), logger)
+            except Exception as e:
+                logger.error("IMAP error parsing email %s: %s", num, e)
+                yield num, None
+
+
+def _apply_header_filters(
+    mail,
+    num,
+    *,
+    subject: str,
+    sender: str,
+    message_id: str,
+    date_raw: str,
+    logger,
+    allowed: frozenset | None = None,
+) -> Optional[str]:
+    """Cheap header-only filters (allowlist, dedup, reply/forward).
+
+    Returns:
+        L'email_id si le message doit être traité, None s'il est écarté.
+    """
+    if allowed is None:
+        allowed = _load_sender_allowlist()
+    num_str = num.decode() if isinstance(num, bytes) else str(num)
+    if allowed and sender not in allowed:
+        logger.info("POLLER: Skipping email %s (sender not in allowlist)", num_str)
+        return None
+
+    headers_map = {'Message-ID': message_id or '', 'Subject': subject or '', 'Date': date_raw}
+    email_id = imap_client.generate_email_id(headers_map)
+    if DeduplicationService.get_instance().is_email_processed(email_id):
+        logger.info("DEDUP_EMAIL: Skipping already processed email_id=%s", email_id)
         return None
 
+    core_subject = strip_leading_reply_prefixes(subject or '')
+    if core_subject != subject:
+        logger.info("IGNORED: Skipping reply/forward (email_id=%s)", email_id)
+        DeduplicationService.get_instance().mark_email_processed(email_id)
+        imap_client.mark_email_as_read_imap(logger, mail, num)
+        return None
+    return email_id
 
-def _extract_email_bodies(msg, logger) -> tuple[str, str]:
-    """Extract plain and HTML bodies from message with size limit enforcement."""
-    body_plain = ""
-    body_html = ""
+
+def _count_new_candidates(email_nums: list) -> int:
+    """Number of this cycle's candidates that were not candidates in the previous cycle."""
+    global _LAST_CYCLE_CANDIDATES
+    current = frozenset(num.decode() if isinstance(num, bytes) else str(num) for num in email_nums)
+    with _LAST_CYCLE_CANDIDATES_LOCK:
+        new_count = len(current - _LAST_CYCLE_CANDIDATES)
+        _LAST_CYCLE_CANDIDATES = current
+    return new_count
+
+
+def _get_max_email_size_bytes(processing_prefs: dict) -> int:
+    try:
+        size_mb = (processing_prefs or {}).get("max_email_size_mb")
+        return int(size_mb) * 1024 * 1024 if size_mb else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _skip_oversized_email(mail, num, email_id: str, subject: str, size: int, max_size_bytes: int, logger) -> None:
+    """Skips a message whose RFC822.SIZE exceeds max_email_size_mb, without downloading it.
+
+    Recorded like the other header pre-filter skips: no webhook was attempted, so no status_code.
+    """
+    logger.info(
+        "POLLER: Skipping email %s (oversized_email: RFC822.SIZE=%d bytes > max_email_size_mb=%d)",
+        email_id,
+        size,
+        max_size_bytes // (1024 * 1024),
+    )
     try:
-        if msg.is_multipart():
-            html_bytes_total = 0
-            html_truncated_logged = False
-            for part in msg.walk():
-                ctype = part.get_content_type()
-                disp = (part.get('Content-Disposition') or '').lower()
-                if 'attachment' in disp:
+        DeduplicationService.get_instance().mark_email_processed(email_id)
+        imap_client.mark_email_as_read_imap(logger, mail, num)
+    except Exception:
+        pass
+    try:
+        webhook_url = str(getattr(settings, 'WEBHOOK_URL', '') or '')
+        WebhookLoggerService.get_instance().append_log({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "type": "custom",
+            "email_id": email_id,
+            "status": "skipped",
+            "error_message": (
+                f"Email size {size} bytes exceeds max_email_size_mb="
+                f"{max_size_bytes // (1024 * 1024)}; skipped without download"
+            ),
+            "failure_reason": "oversized_email",
+            "webhook_url": (webhook_url[:50] + "...") if len(webhook_url) > 50 else webhook_url,
+            "subject": (subject[:100] if subject else None),
+        })
+    except Exception:
+        pass
+
+
+def _prefilter_by_headers(
+    mail, email_nums: list, logger, *, cycle_config: CycleConfig | None = None
+) -> tuple[list, set]:
+    """Header-first phase: FETCH RFC822.SIZE + From/Subject/Date/Message-ID and drop filtered messages.
+
+    Runs when IMAP_HEADER_PREFETCH_ENABLED is set or a max_email_size_mb preference is
+    configured; oversized messages are skipped before their body is downloaded.
+
+    Returns:
+        (survivants, numéros déjà validés). Un message dont les en-têtes n'ont pas pu être
+        lus est conservé sans validation: les filtres s'appliqueront après le FETCH complet.
+    """
+    if not email_nums:
+        return list(email_nums), set()
+    prefs = cycle_config.processing_prefs if cycle_config is not None else _load_processing_prefs()
+    allowed = cycle_config.sender_allowlist if cycle_config is not None else _load_sender_allowlist()
+    max_size_bytes = _get_max_email_size_bytes(prefs)
+    if not bool(getattr(settings, "IMAP_HEADER_PREFETCH_ENABLED", False)) and not max_size_bytes:
+        return list(email_nums), set()
+
+    survivors: list = []
+    approved: set = set()
+    parser = BytesHeaderParser()
+    for batch in imap_client.chunk_message_numbers(email_nums, _get_fetch_batch_size()):
+        try:
+            fetched = imap_client.fetch_messages(mail, batch, IMAP_FETCH_HEADER_FIELDS)
+        except Exception as e_batch:
+            logger.warning("IMAP: Header prefetch failed (%d messages), skipping phase: %s", len(batch), e_batch)
+            fetched = {}
+        for num in batch:
+            key = num.decode() if isinstance(num, bytes) else str(num)
+            # Les serveurs renvoient la liste de champs avec leur propre casse/guillemets
+            header_bytes = next(
+                (v for k, v in (fetched.get(key) or {}).items() if k.startswith("BODY[HEADER.FIELDS")),
+                None,
+            )
+            if not isinstance(header_bytes, (bytes, bytearray)):
+                survivors.append(num)
+                continue
+            try:
+                headers = parser.parsebytes(bytes(header_bytes))
+                subject = imap_client.decode_email_header_value(headers.get('Subject', ''))
+                email_id = _apply_header_filters(
+                    mail,
+                    num,
+                    subject=subject,
+                    sender=imap_client.extract_sender_email(headers.get('From', '')).lower(),
+                    message_id=headers.get('Message-ID', ''),
+                    date_raw=headers.get('Date', ''),
+                    logger=logger,
+                    allowed=allowed,
+                )
+                size = fetched[key].get("RFC822.SIZE")
+                if email_id and max_size_bytes and isinstance(size, int) and size > max_size_bytes:
+                    _skip_oversized_email(mail, num, email_id, subject, size, max_size_bytes, logger)
                     continue
-                payload = part.get_payload(decode=True) or b''
-                if ctype == 'text/plain':
-                    body_plain += payload.decode(part.get_content_charset() or 'utf-8', errors='ignore')
-                elif ctype == 'text/html':
-                    if isinstance(payload, (bytes, bytearray)):
-                        remaining = MAX_HTML_BYTES - html_bytes_total
-                        if len(payload) > remaining:
-                            payload = payload[:remaining]
-                            if not html_truncated_logged:
-                                logger.warning("HTML content truncated (exceeded 1MB limit)")
-                                html_truncated_logged = True
-                        html_bytes_total += len(payload)
-                    body_html += payload.decode(part.get_content_charset() or 'utf-8', errors='ignore')
-        else:
-            payload = msg.get_payload(decode=True) or b''
-            ctype = msg.get_content_type() or 'text/plain'
-            if ctype == 'text/html':
-                if len(payload) > MAX_HTML_BYTES:
-                    logger.warning("HTML content truncated (exceeded 1MB limit)")
-                    payload = payload[:MAX_HTML_BYTES]
-                body_html = payload.decode(msg.get_content_charset() or 'utf-8', errors='ignore')
+            except Exception as e:
+                logger.warning("IMAP: Unable to pre-filter message %s from headers: %s", key, e)
+                survivors.append(num)
+                continue
+            if email_id:
+                survivors.append(num)
+                approved.add(num)
+    if len(survivors) != len(email_nums):
+        logger.info(
+            "POLLER: Header prefetch kept %d/%d UNSEEN messages for full download",
+            len(survivors),
+            len(email_nums),
+        )
+    return survivors, approved
+
+
+def _get_body_byte_budget() -> int:
+    try:
+        return max(0, int(getattr(settings, "EMAIL_BODY_MAX_BYTES", 2 * MAX_HTML_BYTES)))
+    except (TypeError, ValueError):
+        return 2 * MAX_HTML_BYTES
+
+
+def _decode_text_part(part, limit: int) -> tuple[bytes, bool]:
+    """Decodes at most `limit` bytes of a text part's transfer encoding.
+
+    Returns:
+        (octets décodés, tronqué ?) — seule la portion utile du payload encodé est lue.
+    """
+    raw = part.get_payload()
+    if not isinstance(raw, str):
+        return b"", False
+    cte = str(part.get('Content-Transfer-Encoding', '') or '').strip().lower()
+
+    if cte == 'base64':
+        out = bytearray()
+        pending = ""
+        for line in io.StringIO(raw):
+            pending += "".join(line.split())
+            usable = len(pending) - len(pending) % 4
+            if usable:
+                out += binascii.a2b_base64(pending[:usable])
+                pending = pending[usable:]
+            if len(out) > limit:
+                return bytes(out[:limit]), True
+        if pending:
+            try:
+                out += binascii.a2b_base64(pending + "=" * (-len(pending) % 4))
+            except binascii.Error:
+                pass
+        return bytes(out[:limit]), len(out) > limit
+
+    if cte == 'quoted-printable':
+        # Au plus 3 caractères encodés par octet décodé ("=XX")
+        window = raw[: limit * 3 + 3]
+        data = quopri.decodestring(window.encode('ascii', 'surrogateescape'))
+        return data[:limit], len(data) > limit or len(raw) > len(window)
+
+    window = raw[: limit + 1]
+    try:
+        data = window.encode('ascii', 'surrogateescape')
+    except UnicodeEncodeError:
+        data = window.encode(part.get_content_charset() or 'utf-8', errors='replace')
+    return data[:limit], len(data) > limit or len(raw) > len(window)
+
+
+def _bytes_to_text(payload: bytes, charset: str | None) -> str:
+    try:
+        return payload.decode(charset or 'utf-8', errors='ignore')
+    except LookupError:
+        return payload.decode('utf-8', errors='ignore')
+
+
+def _extract_email_bodies(msg, logger) -> tuple[str, str]:
+    """Extract plain and HTML bodies within one decoded byte budget.
+
+    Non-text parts (images, PDF...) are skipped without decoding; HTML keeps its
+    own MAX_HTML_BYTES cap inside the overall EMAIL_BODY_MAX_BYTES budget.
+    """
+    plain_buf, html_buf = io.StringIO(), io.StringIO()
+    remaining = _get_body_byte_budget()
+    html_bytes_total = 0
+    html_truncated_logged = False
+    budget_truncated_logged = False
+    try:
+        parts = msg.walk() if msg.is_multipart() else [msg]
+        for part in parts:
+            if part.is_multipart():
+                continue
+            ctype = part.get_content_type()
+            if ctype not in ('text/plain', 'text/html'):
+                continue
+            disp = (part.get('Content-Disposition') or '').lower()
+            if 'attachment' in disp:
+                continue
+
+            is_html = ctype == 'text/html'
+            limit = min(remaining, MAX_HTML_BYTES - html_bytes_total) if is_html else remaining
+            if limit <= 0:
+                payload, truncated = b'', True
             else:
-                body_plain = payload.decode(msg.get_content_charset() or 'utf-8', errors='ignore')
+                payload, truncated = _decode_text_part(part, limit)
+            remaining -= len(payload)
+
+            if truncated:
+                if is_html and html_bytes_total + len(payload) >= MAX_HTML_BYTES:
+                    if not html_truncated_logged:
+                        logger.warning("HTML content truncated (exceeded 1MB limit)")
+                        html_truncated_logged = True
+                elif not budget_truncated_logged:
+                    logger.warning("Email body truncated (exceeded %d bytes budget)", _get_body_byte_budget())
+                    budget_truncated_logged = True
+
+            text = _bytes_to_text(payload, part.get_content_charset())
+            if is_html:
+                html_bytes_total += len(payload)
+                html_buf.write(text)
+            else:
+                plain_buf.write(text)
     except Exception as e:
         logger.debug("Email body extraction error: %s", e)
-    return body_plain, body_html
+    return plain_buf.getvalue(), html_buf.getvalue()
 
 
 def _apply_routing_rules(
@@ -554,13 +963,18 @@ def _apply_routing_rules(
     body: str,
     email_id: str,
     logger,
-) -> tuple[str | None, bool, str | None]:
-    """Applies dynamic routing rules and returns (webhook_url, stop_processing, priority)."""
+    routing_rules: tuple | list | None = None,
+) -> tuple[str | None, bool, str | None, dict]:
+    """Applies dynamic routing rules and returns (webhook_url, stop_processing, priority, payload_options).
+
+    `payload_options` holds the rule's payload overrides (payload_profile, payload_max_kb, gzip, batch), if any,
+    and its rate limit (`rule_rate_limit`) when the rule caps its sends.
+    """
     try:
-        routing_payload = _get_routing_rules_payload()
-        routing_rules = routing_payload.get("rules") if isinstance(routing_payload, dict) else []
+        if routing_rules is None:
+            routing_rules = _load_routing_rules()
         matched_rule = _find_matching_routing_rule(
-            routing_rules,
+            list(routing_rules),
             sender=sender_addr,
             subject=subject,
             body=body,
@@ -576,7 +990,14 @@ def _apply_routing_rules(
                     routing_stop_processing = bool(actions.get("stop_processing", False))
                     priority_value = actions.get("priority")
                     routing_priority = priority_value.strip().lower() if isinstance(priority_value, str) else None
-                    return routing_webhook_url, routing_stop_processing, routing_priority
+                    payload_options = {k: actions[k] for k in _PAYLOAD_OPTION_KEYS if k in actions}
+                    if actions.get("rate_limit_per_hour"):
+                        payload_options["rule_rate_limit"] = {
+                            "rule_id": matched_rule.get("id"),
+                            "rule_name": matched_rule.get("name"),
+                            "limit_per_hour": actions["rate_limit_per_hour"],
+                        }
+                    return routing_webhook_url, routing_stop_processing, routing_priority, payload_options
                 else:
                     logger.warning(
                         "ROUTING_RULES: Rule %s missing webhook_url; skipping",
@@ -584,7 +1005,68 @@ def _apply_routing_rules(
                     )
     except Exception as routing_exc:
         logger.debug("ROUTING_RULES: Evaluation error: %s", routing_exc)
-    return None, False, None
+    return None, False, None, {}
+
+
+_PAYLOAD_OPTION_KEYS = ("payload_profile", "payload_max_kb", "gzip", "batch")
+
+
+def _load_destination_payload_options() -> dict:
+    raw = str(getattr(settings, 'WEBHOOK_PAYLOAD_PROFILES_JSON', '') or '').strip()
+    if not raw:
+        return {}
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _resolve_payload_options(webhook_url: str, rule_options: dict | None = None) -> dict:
+    """Payload options of a destination: routing rule > WEBHOOK_PAYLOAD_PROFILES_JSON[url] > global defaults.
+
+    `batch` (opt-in per destination only) groups the destination's payloads of a cycle, see webhook_batch.
+    A `rate_limit_per_hour` in the URL's entry, or a rate-limited rule, adds
+    `url_rate_limit_per_hour` / `rule_rate_limit` (see _rate_limit_scopes).
+    """
+    options = {
+        "payload_profile": str(getattr(settings, 'WEBHOOK_PAYLOAD_PROFILE', payloads.PAYLOAD_PROFILE_FULL)),
+        "payload_max_kb": int(getattr(settings, 'WEBHOOK_PAYLOAD_MAX_KB', 64)),
+        "gzip": bool(getattr(settings, 'WEBHOOK_GZIP_ENABLED', False)),
+        "batch": False,
+    }
+    per_url = _load_destination_payload_options().get(webhook_url)
+    for overrides in (per_url, rule_options):
+        if isinstance(overrides, dict):
+            options.update({k: overrides[k] for k in _PAYLOAD_OPTION_KEYS if k in overrides})
+    if options["payload_profile"] not in payloads.PAYLOAD_PROFILES:
+        options["payload_profile"] = payloads.PAYLOAD_PROFILE_FULL
+    if isinstance(per_url, dict) and _rate_limit_per_hour(per_url):
+        options["url_rate_limit_per_hour"] = _rate_limit_per_hour(per_url)
+    if isinstance(rule_options, dict) and isinstance(rule_options.get("rule_rate_limit"), dict):
+        options["rule_rate_limit"] = dict(rule_options["rule_rate_limit"])
+    return options
+
+
+def _rate_limit_scopes(webhook_url: str, payload_options: dict | None) -> list[tuple]:
+    """Rate-limit scopes of a destination on top of the global one: its URL and its routing rule, if limited."""
+    payload_options = payload_options or {}
+    scopes = []
+    if payload_options.get("url_rate_limit_per_hour"):
+        scopes.append(webhook_url_scope(webhook_url, payload_options["url_rate_limit_per_hour"]))
+    rule = payload_options.get("rule_rate_limit")
+    if isinstance(rule, dict) and rule.get("limit_per_hour"):
+        scopes.append(routing_rule_scope(rule.get("rule_id"), rule["limit_per_hour"], rule.get("rule_name")))
+    return scopes
+
+
+def _project_payload(payload: dict, payload_options: dict | None, body_plain: str | None) -> dict:
+    if not payload_options:
+        return payload
+    return payloads.apply_payload_profile(
+        payload, profile=payload_options["payload_profile"],
+        body_plain=body_plain, max_kb=payload_options["payload_max_kb"],
+    )
 
 
 def _enforce_time_window(
@@ -633,9 +1115,30 @@ def _send_webhook(
     mail,
     num,
     logger,
+    payload_options: dict | None = None,
 ) -> bool:
     """Dispatches sending to custom webhook flow. Returns success/attempt status."""
-    return send_custom_webhook_flow(
+    return send_custom_webhook_flow(**_webhook_flow_kwargs(
+        email_id, subject, payload_for_webhook, delivery_links, webhook_url, processing_prefs, mail, num, logger,
+        payload_options=payload_options,
+    ))
+
+
+def _webhook_flow_kwargs(
+    email_id: str,
+    subject: str,
+    payload_for_webhook: dict,
+    delivery_links: list,
+    webhook_url: str,
+    processing_prefs: dict,
+    mail,
+    num,
+    logger,
+    payload_options: dict | None = None,
+) -> dict:
+    payload_options = payload_options or {}
+    rate_limit_allow_send, pace_webhook_job = _rate_limit_hooks(webhook_url, processing_prefs, payload_options)
+    return dict(
         email_id=email_id,
         subject=subject,
         payload_for_webhook=payload_for_webhook,
@@ -644,7 +1147,7 @@ def _send_webhook(
         webhook_ssl_verify=True,
         allow_without_links=bool(getattr(settings, 'ALLOW_CUSTOM_WEBHOOK_WITHOUT_LINKS', False)),
         processing_prefs=processing_prefs,
-        rate_limit_allow_send=RateLimitService.get_instance().allow_send,
+        rate_limit_allow_send=rate_limit_allow_send,
         record_send_event=RateLimitService.get_instance().record_event,
         append_webhook_log=WebhookLoggerService.get_instance().append_log,
         mark_email_id_as_processed_redis=DeduplicationService.get_instance().mark_email_processed,
@@ -652,19 +1155,527 @@ def _send_webhook(
         mail=mail,
         email_num=num,
         urlparse=None,
-        requests=__import__('requests'),
+        requests=HttpSessionService.get_instance(),
         time=__import__('time'),
         logger=logger,
+        enqueue_webhook_job=_get_outbox_enqueue(),
+        pace_webhook_job=pace_webhook_job,
+        defer_webhook_job=_get_circuit_deferral(),
+        delivery_mode_memory=_get_delivery_mode_memory(),
+        circuit_breaker=_get_circuit_breaker(),
+        latency_tracker=_get_latency_tracker(),
+        payload_profile=payload_options.get("payload_profile"),
+        webhook_gzip=bool(payload_options.get("gzip", False)),
+    )
+
+
+def _rate_limit_hooks(webhook_url: str, processing_prefs: dict, payload_options: dict | None) -> tuple:
+    """(allow_send, pacer) of a destination: reserve a slot in all its scopes, or pace the send (None when off)."""
+    rate_limiter = RateLimitService.get_instance()
+    limit_per_hour = _rate_limit_per_hour(processing_prefs)
+    scopes = _rate_limit_scopes(webhook_url, payload_options)
+    pacer = _get_rate_limit_pacer(rate_limiter, [(SCOPE_GLOBAL, limit_per_hour, SCOPE_GLOBAL), *scopes])
+    return (lambda: rate_limiter.allow_send(limit_per_hour, scopes)), pacer
+
+
+def _rate_limit_per_hour(processing_prefs: Mapping[str, Any] | None) -> int:
+    """rate_limit_per_hour des préférences de traitement, ou d'une destination (0 = pas de limite)."""
+    try:
+        return max(0, int((processing_prefs or {}).get("rate_limit_per_hour") or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _get_delivery_mode_memory():
+    if not bool(getattr(settings, 'WEBHOOK_DELIVERY_MODE_MEMORY_ENABLED', True)):
+        return None
+    return DeliveryModeMemoryService.get_instance()
+
+
+def _get_circuit_breaker():
+    if not bool(getattr(settings, 'WEBHOOK_CIRCUIT_BREAKER_ENABLED', True)):
+        return None
+    return WebhookCircuitBreakerService.get_instance()
+
+
+def _get_latency_tracker():
+    if not bool(getattr(settings, 'WEBHOOK_ADAPTIVE_DELIVERY_ENABLED', False)):
+        return None
+    return WebhookLatencyService.get_instance()
+
+
+_FANOUT_EXECUTOR = None
+_FANOUT_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_fanout_executor(max_workers: int):
+    global _FANOUT_EXECUTOR
+    with _FANOUT_EXECUTOR_LOCK:
+        if _FANOUT_EXECUTOR is None or _FANOUT_EXECUTOR._max_workers != max_workers:
+            from concurrent.futures import ThreadPoolExecutor
+
+            _FANOUT_EXECUTOR = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="webhook-fanout")
+        return _FANOUT_EXECUTOR
+
+
+def _send_webhook_fanout(
+    email_id: str,
+    subject: str,
+    payload_for_webhook: dict,
+    delivery_links: list,
+    destinations: list,
+    processing_prefs: dict,
+    mail,
+    num,
+    logger,
+    payload_options: dict | None = None,
+    body_plain: str | None = None,
+) -> int:
+    """Sends one email to several webhooks concurrently. Returns the number of triggered sends.
+
+    Le payload est sérialisé une seule fois par profil de payload (`payload_options`
+    par URL, voir _resolve_payload_options); le rate limiter est consulté une fois
+    par destination (avec les scopes URL/règle de celle-ci), dans l'ordre, avant le départ des envois. Le marquage IMAP
+    (\\Seen) est différé et exécuté une seule fois par le thread appelant, qui
+    reste seul à utiliser la connexion IMAP. Chaque entrée de log webhook reçoit
+    un bloc "fanout" (email, index, nombre de destinations).
+    """
+    payload_options = payload_options or {}
+    prepared_by_profile: dict = {}
+
+    def _prepared_for(options: dict | None) -> tuple[dict, str, int]:
+        profile_key = (options or {}).get("payload_profile"), (options or {}).get("payload_max_kb")
+        if profile_key not in prepared_by_profile:
+            prepared_by_profile[profile_key] = _prepare_payload(
+                email_id=email_id, subject=subject,
+                payload_for_webhook=_project_payload(payload_for_webhook, options, body_plain),
+                delivery_links=delivery_links,
+            )
+        return prepared_by_profile[profile_key]
+
+    base_kwargs = _webhook_flow_kwargs(
+        email_id, subject, payload_for_webhook, delivery_links, "", processing_prefs, mail, num, logger,
+    )
+    append_log = base_kwargs["append_webhook_log"]
+    read_requested = threading.Event()
+    total = len(destinations)
+
+    def _rate_limit_decision(allow_send) -> bool:
+        try:
+            return bool(allow_send())
+        except Exception:
+            return True  # même tolérance que _check_rate_limit
+
+    def _defer_mark_read(*_args, **_kwargs) -> bool:
+        read_requested.set()
+        return True
+
+    def _flow_kwargs(index: int, webhook_url: str) -> dict:
+        fanout = {"email_id": email_id, "index": index, "destinations": total}
+        options = payload_options.get(webhook_url)
+        allow_send, pace_webhook_job = _rate_limit_hooks(webhook_url, processing_prefs, options)
+        allowed = _rate_limit_decision(allow_send)
+        return {
+            **base_kwargs,
+            "webhook_url": webhook_url,
+            "prepared_payload": _prepared_for(options),
+            "payload_profile": (options or {}).get("payload_profile"),
+            "webhook_gzip": bool((options or {}).get("gzip", False)),
+            "rate_limit_allow_send": lambda: allowed,
+            "pace_webhook_job": pace_webhook_job,
+            "append_webhook_log": lambda entry: append_log({**entry, "fanout": fanout}),
+            "mark_email_as_read_imap": _defer_mark_read,
+        }
+
+    calls = [_flow_kwargs(i, url) for i, url in enumerate(destinations)]
+    executor = _get_fanout_executor(max(1, int(getattr(settings, 'WEBHOOK_FANOUT_MAX_WORKERS', 4) or 1)))
+    futures = [
+        executor.submit(contextvars.copy_context().run, lambda kw=kw: send_custom_webhook_flow(**kw))
+        for kw in calls
+    ]
+    triggered, errors = 0, []
+    for webhook_url, future in zip(destinations, futures):
+        try:
+            if future.result() is False:
+                triggered += 1
+        except Exception as e:
+            errors.append(e)
+            logger.error("FANOUT: Webhook send to %s failed for email %s: %s", webhook_url, email_id, e)
+    if read_requested.is_set():
+        imap_client.mark_email_as_read_imap(logger, mail, num)
+    logger.info(
+        "FANOUT: Email %s sent to %d destination(s) concurrently (%d triggered, %d failed)",
+        email_id, total, triggered, len(errors),
+    )
+    if errors and len(errors) == total:
+        raise errors[0]
+    return triggered
+
+
+def _new_cycle_batcher(cycle_config: CycleConfig, logger) -> webhook_batch.WebhookBatcher:
+    processing_prefs = dict(cycle_config.processing_prefs)
+
+    def _send_batch(webhook_url: str, items: list, options: dict, mail) -> int:
+        try:
+            return _deliver_webhook_batch(
+                webhook_url, items, options, mail, processing_prefs=processing_prefs, logger=logger,
+            )
+        except Exception as e:
+            logger.error("WEBHOOK_BATCH: Batch of %d email(s) to %s failed: %s", len(items), webhook_url, e)
+            return 0
+
+    return webhook_batch.WebhookBatcher(
+        _send_batch,
+        max_items=int(getattr(settings, 'WEBHOOK_BATCH_MAX_ITEMS', 20) or 1),
+        max_wait_ms=int(getattr(settings, 'WEBHOOK_BATCH_MAX_WAIT_MS', 2000) or 0),
+    )
+
+
+def _queue_batched_webhook(
+    batcher: webhook_batch.WebhookBatcher,
+    email_id: str,
+    subject: str,
+    payload_for_webhook: dict,
+    delivery_links: list,
+    webhook_url: str,
+    mail,
+    num,
+    logger,
+    *,
+    payload_options: dict,
+    body_plain: str | None = None,
+) -> int:
+    """Adds one email to the cycle's batch for `webhook_url`. Returns the number of emails sent by a resulting flush."""
+    if _check_no_links_policy(
+        email_id=email_id, subject=subject, delivery_links=delivery_links,
+        allow_without_links=bool(getattr(settings, 'ALLOW_CUSTOM_WEBHOOK_WITHOUT_LINKS', False)),
+        webhook_url=webhook_url,
+        mark_email_id_as_processed_redis=DeduplicationService.get_instance().mark_email_processed,
+        mark_email_as_read_imap=lambda *a, **k: imap_client.mark_email_as_read_imap(logger, *a, **k),
+        mail=mail, email_num=num, append_webhook_log=WebhookLoggerService.get_instance().append_log, logger=logger,
+    ):
+        return 0
+    _payload_to_send, serialized_payload, payload_size_bytes = _prepare_payload(
+        email_id=email_id, subject=subject,
+        payload_for_webhook=_project_payload(payload_for_webhook, payload_options, body_plain),
+        delivery_links=delivery_links,
+    )
+    item = webhook_batch.BatchItem(email_id, subject, num, serialized_payload, payload_size_bytes)
+    return batcher.add(webhook_url, item, options=payload_options, mail=mail)
+
+
+def _deliver_webhook_batch(webhook_url: str, items: list, options: dict, mail, *, processing_prefs: dict, logger) -> int:
+    """POSTs a batch as one JSON array and maps the answer back to each email.
+
+    Un seul créneau de rate limit, une seule vérification du disjoncteur et une
+    seule séquence de retries par lot (toujours en JSON: un tableau n'a pas
+    d'encodage form). Dédup, flag IMAP \\Seen et logs webhook restent par email;
+    chaque entrée de log reçoit un bloc "batch" (batch_id, index, size).
+    Returns the number of emails whose batch got an HTTP answer, or that an open
+    circuit handed to the outbox (counted like send_custom_webhook_flow does).
+    """
+    flow = _webhook_flow_kwargs(
+        "", None, {}, [], webhook_url, processing_prefs, mail, None, logger, payload_options=options,
+    )
+    size = len(items)
+    batch_id = uuid.uuid4().hex[:12]
+    serialized_batch = "[" + ",".join(item.serialized_payload for item in items) + "]"
+    wire_payload, content_encoding, wire_size_bytes = _encode_webhook_body(
+        serialized_batch, gzip_enabled=flow["webhook_gzip"],
+    )
+    append_log = _with_payload_size_fields(
+        flow["append_webhook_log"], payload_profile=flow["payload_profile"], wire_size_bytes=wire_size_bytes,
+    )
+
+    def _log_kwargs(index: int, item: webhook_batch.BatchItem) -> dict:
+        batch = {"batch_id": batch_id, "index": index, "size": size}
+        return {
+            "email_id": item.email_id, "subject": item.subject, "webhook_url": webhook_url,
+            "append_webhook_log": lambda entry: append_log({**entry, "batch": batch}),
+            "payload_size_bytes": item.payload_size_bytes,
+        }
+
+    def _item_job(item: webhook_batch.BatchItem) -> dict:
+        return _build_outbox_job(
+            email_id=item.email_id, subject=item.subject, webhook_url=webhook_url,
+            webhook_ssl_verify=flow["webhook_ssl_verify"], serialized_payload=item.serialized_payload,
+            payload_size_bytes=item.payload_size_bytes,
+            timeout_sec=int(processing_prefs.get("webhook_timeout_sec") or 30),
+            resolved_delivery_mode=WEBHOOK_DELIVERY_MODE_JSON, resolved_fallback_on_415=False,
+            payload_profile=flow["payload_profile"], webhook_gzip=flow["webhook_gzip"],
+        )
+
+    def _pace_item(item: webhook_batch.BatchItem):
+        # Hors quota, chaque email du lot part seul par l'outbox à son créneau
+        if flow["pace_webhook_job"] is None:
+            return None
+
+        def _pace() -> float | None:
+            try:
+                eta = flow["pace_webhook_job"](_item_job(item))
+            except Exception as e:
+                logger.warning("RATE_LIMIT: Unable to pace webhook for email %s: %s", item.email_id, e)
+                return None
+            if eta is not None:
+                flow["mark_email_as_read_imap"](mail, item.email_num)
+            return eta
+
+        return _pace
+
+    try:
+        allowed = bool(flow["rate_limit_allow_send"]())
+    except Exception:
+        allowed = True  # même tolérance que _check_rate_limit
+    if not allowed:
+        for index, item in enumerate(items):
+            _check_rate_limit(
+                email_id=item.email_id, subject=item.subject, webhook_url=webhook_url, rate_limit_allow_send=lambda: False,
+                append_webhook_log=_log_kwargs(index, item)["append_webhook_log"], logger=logger,
+                pace_send=_pace_item(item),
+            )
+        return 0
+    circuit_breaker = flow["circuit_breaker"]
+    if circuit_breaker is not None and not circuit_breaker.allow_request(webhook_url):
+        logger.warning("WEBHOOK_BATCH: Circuit open for %s, batch of %d email(s) not sent", webhook_url, size)
+        deferred = 0
+        for index, item in enumerate(items):
+            # Comme pour le pacing, chaque email part seul par l'outbox après le cooldown
+            if flow["defer_webhook_job"] is not None and _defer_until_circuit_closes(
+                flow["defer_webhook_job"], _item_job(item),
+                append_webhook_log=_log_kwargs(index, item)["append_webhook_log"], logger=logger,
+            ):
+                flow["mark_email_as_read_imap"](mail, item.email_num)
+                deferred += 1
+                continue
+            _log_webhook_outcome(
+                status="error", status_code=503, error_message="Circuit open: receiver unavailable",
+                failure_reason="circuit_open", **_log_kwargs(index, item),
+            )
+        return deferred
+    _record_payload_size(flow["payload_profile"], len(serialized_batch.encode("utf-8")), wire_size_bytes)
+    timeout_sec = int(processing_prefs.get("webhook_timeout_sec") or 30)
+    latency_tracker = flow["latency_tracker"]
+    if latency_tracker is not None:
+        timeout_sec = latency_tracker.timeout_for(webhook_url, timeout_sec)
+    response, last_exc, last_mode, attempted = _execute_webhook_with_retries(
+        email_id=f"batch:{batch_id}", serialized_payload=wire_payload, webhook_url=webhook_url,
+        webhook_ssl_verify=flow["webhook_ssl_verify"], retries=int(processing_prefs.get("retry_count") or 0),
+        delay=int(processing_prefs.get("retry_delay_sec") or 0), timeout_sec=timeout_sec,
+        resolved_delivery_mode=WEBHOOK_DELIVERY_MODE_JSON, resolved_fallback_on_415=False,
+        requests=flow["requests"], time=flow["time"], logger=logger,
+        circuit_breaker=circuit_breaker, latency_tracker=latency_tracker, content_encoding=content_encoding,
+    )
+    flow["record_send_event"]()
+    if response is None:
+        error_message = str(last_exc or "Webhook request failed")[:200]
+        logger.error("WEBHOOK_BATCH: Batch %s of %d email(s) to %s failed: %s", batch_id, size, webhook_url, error_message)
+        for index, item in enumerate(items):
+            _log_webhook_outcome(
+                status="error", status_code=0, error_message=error_message, failure_reason="request_failed",
+                **_log_kwargs(index, item),
+            )
+        return 0
+    status_code = response.status_code
+    try:
+        response_data = response.json() if status_code == 200 and response.content else {}
+    except Exception:
+        response_data = {}
+    response_text = getattr(response, "text", "") or ""
+    snippet = _truncate_webhook_response_snippet(response_text) or "Unknown error"
+    delivered = 0
+    for index, (item, (success, message)) in enumerate(
+        zip(items, webhook_batch.map_batch_response(status_code, response_data, size))
+    ):
+        log_kwargs = {**_log_kwargs(index, item), "delivery_mode": last_mode, "attempted_delivery_modes": attempted}
+        if success:
+            delivered += 1
+            _log_webhook_outcome(status="success", status_code=200, **log_kwargs)
+            if flow["mark_email_id_as_processed_redis"](item.email_id):
+                flow["mark_email_as_read_imap"](mail, item.email_num)
+        elif status_code == 200:
+            msg = message or "Unknown error"
+            _log_webhook_outcome(
+                status="error", status_code=200, error_message=msg[:200],
+                response_snippet=_truncate_webhook_response_snippet(msg),
+                failure_reason=_normalize_webhook_failure_reason(status_code=200, response_text=msg), **log_kwargs,
+            )
+        else:
+            _log_webhook_outcome(
+                status="error", status_code=status_code, error_message=snippet, response_snippet=snippet,
+                failure_reason=_normalize_webhook_failure_reason(status_code=status_code, response_text=response_text),
+                **log_kwargs,
+            )
+    logger.info(
+        "WEBHOOK_BATCH: Batch %s of %d email(s) sent to %s (status=%s, %d delivered)",
+        batch_id, size, webhook_url, status_code, delivered,
+    )
+    return size
+
+
+def _get_rate_limit_pacer(rate_limiter: RateLimitService, scopes: list[tuple]):
+    """Returns a callable queueing an over-limit job for its next rate-limit slot, or None when pacing is off.
+
+    The callable takes an outbox job and returns the delay (seconds) until that
+    slot. The job carries its `rate_limit_scopes`: the dispatcher reserves the
+    slot (deliver_outbox_job) before sending.
+    """
+    if not bool(getattr(settings, 'WEBHOOK_RATE_LIMIT_PACING_ENABLED', False)):
+        return None
+    if DeduplicationService.get_instance().is_email_dedup_disabled():
+        return None
+    outbox = WebhookOutboxService.get_instance()
+    if not outbox.is_available():
+        return None
+
+    def _pace(job: dict) -> float:
+        retry_after = rate_limiter.retry_after(scopes)
+        outbox.enqueue({**job, "rate_limit_scopes": [list(scope) for scope in scopes]}, delay_sec=retry_after)
+        return retry_after
+
+    return _pace
+
+
+def _get_circuit_deferral():
+    """Returns a callable queueing a job refused by an open circuit until its cooldown ends, or None.
+
+    The callable takes an outbox job and returns the delay (seconds) until the
+    circuit may half-open again (opened_at + cooldown). The dispatcher keeps
+    parking the job without consuming attempts while the circuit stays open.
+    """
+    circuit_breaker = _get_circuit_breaker()
+    if circuit_breaker is None:
+        return None
+    # Sans outbox (ni pacing), pas de dispatcher: l'email reste UNSEEN et le cycle suivant réessaie
+    if not (
+        bool(getattr(settings, 'WEBHOOK_OUTBOX_ENABLED', False))
+        or bool(getattr(settings, 'WEBHOOK_RATE_LIMIT_PACING_ENABLED', False))
+    ):
+        return None
+    if DeduplicationService.get_instance().is_email_dedup_disabled():
+        return None
+    outbox = WebhookOutboxService.get_instance()
+    if not outbox.is_available():
+        return None
+
+    def _defer(job: dict) -> float:
+        retry_after = circuit_breaker.retry_after(job["webhook_url"])
+        outbox.enqueue(job, delay_sec=retry_after)
+        return retry_after
+
+    return _defer
+
+
+def _defer_until_circuit_closes(defer_webhook_job, job: dict, *, append_webhook_log, logger) -> bool:
+    """Queues a send refused by an open circuit (see _get_circuit_deferral). Returns False if it could not."""
+    try:
+        retry_after = float(defer_webhook_job(job))
+    except Exception as e:
+        logger.warning("CIRCUIT_BREAKER: Unable to defer webhook for email %s: %s", job.get("email_id"), e)
+        return False
+    webhook_url = job["webhook_url"]
+    logger.info(
+        "CIRCUIT_BREAKER: Circuit open for %s, webhook for email %s queued for %.0fs",
+        webhook_url, job.get("email_id"), retry_after,
     )
+    subject = job.get("subject")
+    append_webhook_log({
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "type": "custom",
+        "email_id": job.get("email_id"),
+        "status": "deferred",
+        "status_code": 503,
+        "error_message": "Circuit open: send scheduled after the cooldown",
+        "failure_reason": "circuit_open",
+        "retry_after_sec": round(retry_after, 1),
+        "eta": (datetime.now(timezone.utc) + timedelta(seconds=retry_after)).isoformat(),
+        "webhook_url": (webhook_url[:50] + "...") if len(webhook_url) > 50 else webhook_url,
+        "subject": (subject[:100] if subject else None),
+    })
+    return True
+
+
+def _get_outbox_enqueue():
+    """Returns the outbox enqueue callable when WEBHOOK_OUTBOX_ENABLED, else None (inline send)."""
+    if not bool(getattr(settings, 'WEBHOOK_OUTBOX_ENABLED', False)):
+        return None
+    # L'acquittement passe par la dédup email_id: sans elle, un job livré serait renvoyé
+    if DeduplicationService.get_instance().is_email_dedup_disabled():
+        return None
+    outbox = WebhookOutboxService.get_instance()
+    return outbox.enqueue if outbox.is_available() else None
+
+
+def _new_r2_cache_stats() -> dict:
+    return {"hits": 0, "misses": 0, "seconds_saved": 0.0}
+
+
+def _find_reusable_r2_link(r2_service, normalized: str, provider: str, cache_stats: dict) -> dict | None:
+    """Lookup-first: the R2 pair already offloaded for this exact normalized link, when still fresh.
+
+    Counts a hit (its recorded fetch duration as seconds saved) or a miss in `cache_stats`;
+    nothing is counted when reuse is disabled (R2_LINK_REUSE_MAX_AGE_SEC=0). Dropbox shared
+    folders can gain or lose files behind the same URL, so they only use the shorter
+    R2_LINK_REUSE_FOLDER_MAX_AGE_SEC (0 by default: always fetched again).
+    """
+    max_age_sec = int(getattr(settings, 'R2_LINK_REUSE_MAX_AGE_SEC', 0) or 0)
+    if provider == "dropbox" and "/scl/fo/" in normalized.lower():
+        max_age_sec = min(max_age_sec, int(getattr(settings, 'R2_LINK_REUSE_FOLDER_MAX_AGE_SEC', 0) or 0))
+    if max_age_sec <= 0:
+        return None
+    try:
+        entry = r2_service.find_reusable_link(
+            normalized, provider, max_age_sec=max_age_sec,
+            validate=bool(getattr(settings, 'R2_LINK_REUSE_VALIDATE', False)),
+            validate_timeout=int(getattr(settings, 'R2_LINK_REUSE_VALIDATE_TIMEOUT_SEC', 5) or 5),
+        )
+    except Exception:
+        entry = None
+    if not entry or not entry.get('r2_url'):
+        cache_stats["misses"] += 1
+        return None
+    cache_stats["hits"] += 1
+    try:
+        cache_stats["seconds_saved"] += float(entry.get('fetch_duration_sec') or 0)
+    except (TypeError, ValueError):
+        pass
+    return entry
+
+
+def _log_r2_cache_stats(email_id: str, cache_stats: dict, logger) -> None:
+    """Reports lookup-first hits / misses and the remote fetch time saved in the webhook logs."""
+    hits, misses = cache_stats["hits"], cache_stats["misses"]
+    if not hits and not misses:
+        return
+    seconds_saved = round(cache_stats["seconds_saved"], 3)
+    logger.info(
+        "R2_TRANSFER: Lookup-first for %s: %d hit(s), %d miss(es), %.1fs of remote fetch saved",
+        email_id, hits, misses, seconds_saved,
+    )
+    try:
+        WebhookLoggerService.get_instance().append_log({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "type": "r2_cache",
+            "email_id": email_id,
+            "status": "hit" if not misses else ("miss" if not hits else "partial"),
+            "r2_cache_hits": hits,
+            "r2_cache_misses": misses,
+            "r2_seconds_saved": seconds_saved,
+        })
+    except Exception:
+        pass
 
 
 def _handle_r2_enrichment(delivery_links: list, email_id: str, logger) -> None:
-    """Enrich delivery links with Cloudflare R2 offload URLs when enabled."""
+    """Enrich delivery links with Cloudflare R2 offload URLs when enabled.
+
+    Links already offloaded reuse their R2 URL without a remote fetch (see _find_reusable_r2_link).
+    """
     try:
         from services import R2TransferService
         r2_service = R2TransferService.get_instance()
         if not r2_service.is_enabled() or not delivery_links:
             return
+        cache_stats = _new_r2_cache_stats()
         for link_item in delivery_links:
             if not isinstance(link_item, dict):
                 continue
@@ -678,16 +1689,28 @@ def _handle_r2_enrichment(delivery_links: list, email_id: str, logger) -> None:
                     link_item['direct_url'] = fallback_direct_url
                 try:
                     normalized = r2_service.normalize_source_url(source_url, provider)
+                    reused = _find_reusable_r2_link(r2_service, normalized, provider, cache_stats)
+                    if reused:
+                        link_item['r2_url'] = reused['r2_url']
+                        filename = reused.get('original_filename')
+                        if isinstance(filename, str) and filename.strip():
+                            link_item['original_filename'] = filename.strip()
+                        logger.info("R2_TRANSFER: Reused existing R2 object for %s (no remote fetch)", email_id)
+                        continue
                     timeout = 120 if provider == "dropbox" and "/scl/fo/" in normalized.lower() else 15
+                    started = _monotonic()
                     r2_result = r2_service.request_remote_fetch(
                         source_url=normalized, provider=provider, email_id=email_id, timeout=timeout
                     )
+                    fetch_duration_sec = _monotonic() - started
                     r2_url, filename = r2_result if isinstance(r2_result, tuple) and len(r2_result) == 2 else (None, None)
                     if r2_url:
                         link_item['r2_url'] = r2_url
                         if isinstance(filename, str) and filename.strip():
                             link_item['original_filename'] = filename.strip()
-                        r2_service.persist_link_pair(normalized, r2_url, provider, filename)
+                        r2_service.persist_link_pair(
+                            normalized, r2_url, provider, filename, fetch_duration_sec=fetch_duration_sec
+                        )
                         logger.info("R2_TRANSFER: Successfully transferred link to R2 for %s", email_id)
                     else:
                         raise ValueError("R2 fetch returned empty url")
@@ -695,6 +1718,7 @@ def _handle_r2_enrichment(delivery_links: list, email_id: str, logger) -> None:
                     logger.warning("R2 transfer failed, falling back to source url")
                     link_item['raw_url'] = fallback_raw_url
                     link_item['direct_url'] = fallback_direct_url
+        _log_r2_cache_stats(email_id, cache_stats, logger)
     except Exception as ex:
         logger.debug("R2_TRANSFER: Service unavailable: %s", ex)
 
@@ -778,23 +1802,161 @@ def _build_webhook_payload(
     return payload
 
 
-def _load_processing_prefs() -> dict:
-    """Loads current processing preferences with default fallback."""
+def _load_processing_prefs() -> dict:
+    """Loads current processing preferences with default fallback."""
+    try:
+        from routes.api_processing import DEFAULT_PROCESSING_PREFS
+        from config.app_config_store import get_config_json as _config_get
+        from pathlib import Path
+        processing_prefs_file = Path(__file__).resolve().parents[1] / "debug" / "processing_prefs.json"
+        data = _config_get("processing_prefs", file_fallback=processing_prefs_file) or {}
+        if isinstance(data, dict):
+            return {**DEFAULT_PROCESSING_PREFS, **data}
+    except Exception:
+        pass
+    try:
+        from routes.api_processing import DEFAULT_PROCESSING_PREFS
+        return DEFAULT_PROCESSING_PREFS.copy()
+    except Exception:
+        return {}
+
+
+def _load_sender_allowlist() -> frozenset:
+    try:
+        sender_list = getattr(settings, 'SENDER_LIST_FOR_POLLING', [])
+    except Exception:
+        sender_list = []
+    return frozenset(str(s).lower() for s in (sender_list or []))
+
+
+def _load_routing_rules() -> tuple:
+    routing_payload = _get_routing_rules_payload()
+    rules = routing_payload.get("rules") if isinstance(routing_payload, dict) else []
+    return tuple(rules) if isinstance(rules, list) else ()
+
+
+def _load_runtime_flags() -> dict:
+    try:
+        from services import RuntimeFlagsService
+
+        return RuntimeFlagsService.get_instance().get_all_flags()
+    except Exception:
+        return {}
+
+
+def _config_store_read_count() -> int:
+    try:
+        from config import app_config_store
+
+        return app_config_store.get_read_count()
+    except Exception:
+        return 0
+
+
+def _build_cycle_config(logger) -> CycleConfig:
+    """Reads every setting the cycle needs exactly once and freezes it."""
+    reads_before = _config_store_read_count()
+    webhook_config = _get_webhook_config_dict() or {}
+    scope = _CYCLE_WEBHOOK_CONFIG.set(MappingProxyType(webhook_config))
+    try:
+        sending_enabled = bool(_is_webhook_sending_enabled())
+        if sending_enabled:
+            time_window = tuple(_load_webhook_global_time_window())
+            routing_rules = _load_routing_rules()
+            processing_prefs = _load_processing_prefs() or {}
+            runtime_flags = _load_runtime_flags()
+        else:
+            time_window, routing_rules, processing_prefs, runtime_flags = ("", ""), (), {}, {}
+    finally:
+        _CYCLE_WEBHOOK_CONFIG.reset(scope)
+    return CycleConfig(
+        webhook_config=MappingProxyType(webhook_config),
+        routing_rules=routing_rules,
+        processing_prefs=MappingProxyType(dict(processing_prefs)),
+        time_window=time_window,
+        sender_allowlist=_load_sender_allowlist(),
+        runtime_flags=MappingProxyType(dict(runtime_flags)),
+        webhook_sending_enabled=sending_enabled,
+        config_reads=_config_store_read_count() - reads_before,
+    )
+
+
+def _get_redis_client():
+    try:
+        import app_render
+        return getattr(app_render, "redis_client", None)
+    except Exception:
+        return None
+
+
+def _uid_checkpoint_storage() -> dict:
+    return {
+        "redis_client": _get_redis_client(),
+        "redis_key": getattr(settings, "IMAP_UID_CHECKPOINT_REDIS_KEY", None),
+        "file_path": Path(getattr(settings, "IMAP_UID_CHECKPOINT_FILE")),
+        "mailbox": IMAP_MAILBOX_INBOX,
+    }
+
+
+def _start_uid_sync(mail, logger):
+    """Returns the UID sync plan for this cycle, or None to keep the SEARCH UNSEEN path."""
+    if not bool(getattr(settings, "IMAP_UID_SYNC_ENABLED", False)) or not hasattr(mail, "uid"):
+        return None
+    from email_processing import uid_sync
+
+    checkpoint = uid_sync.load_checkpoint(logger=logger, **_uid_checkpoint_storage())
+    plan = uid_sync.plan_uid_sync(
+        mail,
+        checkpoint,
+        account=str(getattr(settings, "EMAIL_ADDRESS", "") or ""),
+        mailbox=IMAP_MAILBOX_INBOX,
+        logger=logger,
+    )
+    if plan is not None:
+        logger.info(
+            "IMAP_UID_SYNC: %d candidate UID(s) (uidvalidity=%s, high_water=%s%s)",
+            len(plan.candidates),
+            plan.uidvalidity,
+            plan.high_water,
+            ", bootstrap" if plan.bootstrap else "",
+        )
+    return plan
+
+
+def _commit_uid_sync(mail, plan, logger) -> None:
+    from email_processing import uid_sync
+
+    try:
+        entry = uid_sync.finalize_uid_sync(
+            mail,
+            plan,
+            account=str(getattr(settings, "EMAIL_ADDRESS", "") or ""),
+            max_pending=int(getattr(settings, "IMAP_UID_PENDING_MAX", 500) or 0),
+            logger=logger,
+        )
+        if not uid_sync.save_checkpoint(entry, logger=logger, **_uid_checkpoint_storage()):
+            logger.error("IMAP_UID_SYNC: Failed to persist checkpoint")
+    except Exception as e:
+        logger.error("IMAP_UID_SYNC: Error while saving checkpoint: %s", e)
+
+
+def _open_imap_session(logger) -> tuple[Any, Any]:
+    """Returns (mail, pool); pool is None when the cycle owns a one-shot connection."""
+    if bool(getattr(settings, "IMAP_SESSION_POOL_ENABLED", False)):
+        pool = imap_client.ImapSessionPool.get_instance(logger)
+        return pool.acquire(), pool
+    return imap_client.create_imap_connection(logger), None
+
+
+def _close_imap_session(logger, mail, pool, *, broken: bool = False) -> None:
+    """Returns a pooled session (kept authenticated) or logs out a one-shot connection."""
     try:
-        from routes.api_processing import DEFAULT_PROCESSING_PREFS
-        from config.app_config_store import get_config_json as _config_get
-        from pathlib import Path
-        processing_prefs_file = Path(__file__).resolve().parents[1] / "debug" / "processing_prefs.json"
-        data = _config_get("processing_prefs", file_fallback=processing_prefs_file) or {}
-        if isinstance(data, dict):
-            return {**DEFAULT_PROCESSING_PREFS, **data}
+        if pool is not None:
+            pool.release(mail, discard=broken)
+        else:
+            imap_client.close_imap_connection(logger, mail)
     except Exception:
         pass
-    try:
-        from routes.api_processing import DEFAULT_PROCESSING_PREFS
-        return DEFAULT_PROCESSING_PREFS.copy()
-    except Exception:
-        return {}
 
 
 # =============================================================================
@@ -819,16 +1981,280 @@ def check_new_emails_and_trigger_webhook() -> int:
         logger.error("ORCHESTRATOR: Wiring error; skipping cycle: %s", _imp_ex)
         return 0
 
-    if not _is_webhook_sending_enabled():
-        logger.info("ABSENCE_PAUSE: Global absence active — skipping webhook sends.")
+    reads_before = _config_store_read_count()
+    cycle_config = _build_cycle_config(logger)
+    pipeline = PipelineStats()
+    scope = _CYCLE_WEBHOOK_CONFIG.set(cycle_config.webhook_config)
+    try:
+        if not cycle_config.webhook_sending_enabled:
+            logger.info("ABSENCE_PAUSE: Global absence active — skipping webhook sends.")
+            return 0
+        return _run_polling_cycle(cycle_config, pipeline, logger, link_extraction, _w_tw)
+    finally:
+        _CYCLE_WEBHOOK_CONFIG.reset(scope)
+        _publish_cycle_stats(cycle_config, _config_store_read_count() - reads_before, pipeline, logger)
+
+
+POLL_GATE_OPEN = "sending_enabled"
+POLL_GATE_SENDING_DISABLED = "webhook_sending_disabled"
+POLL_GATE_OUTSIDE_WINDOW = "outside_time_window"
+
+
+def get_polling_gate() -> tuple[bool, str]:
+    """Tells the background scheduler whether a cycle could send anything right now.
+
+    Returns (can_send, reason):
+    - (False, "webhook_sending_disabled"): envoi coupé ou jour d'absence -> aucun polling utile;
+    - (False, "outside_time_window"): hors fenêtre globale; seuls les DESABO non urgents
+      peuvent encore partir, le scheduler ralentit donc sans s'arrêter;
+    - (True, "sending_enabled").
+    """
+    scope = _CYCLE_WEBHOOK_CONFIG.set(MappingProxyType(_get_webhook_config_dict() or {}))
+    try:
+        if not _is_webhook_sending_enabled():
+            return False, POLL_GATE_SENDING_DISABLED
+        try:
+            s_str, e_str = _load_webhook_global_time_window()
+            s_t = parse_time_hhmm(s_str) if s_str else None
+            e_t = parse_time_hhmm(e_str) if e_str else None
+            if not is_within_time_window_local(datetime.now(get_polling_timezone()), s_t, e_t):
+                return False, POLL_GATE_OUTSIDE_WINDOW
+        except Exception:
+            pass
+        return True, POLL_GATE_OPEN
+    finally:
+        _CYCLE_WEBHOOK_CONFIG.reset(scope)
+
+
+def _publish_cycle_stats(cycle_config: CycleConfig, cycle_reads: int, pipeline: PipelineStats, logger) -> None:
+    try:
+        from services.runtime_metrics_service import RuntimeMetricsService
+
+        stats = {
+            "config_reads": cycle_reads,
+            "snapshot_config_reads": cycle_config.config_reads,
+            "pipeline": pipeline.as_dict(),
+        }
+        RuntimeMetricsService.get_instance().set_last_poll_cycle_stats(stats)
+        logger.debug(
+            "CYCLE_CONFIG: %d config-store read(s) this cycle (%d for the snapshot)",
+            cycle_reads,
+            cycle_config.config_reads,
+        )
+        logger.debug(
+            "PIPELINE: short-circuits=%s, r2 enrichments=%d (avoided %d), deliveries avoided=%d",
+            pipeline.reasons,
+            pipeline.r2_enrichments,
+            pipeline.r2_enrichments_avoided,
+            pipeline.deliveries_avoided,
+        )
+    except Exception:
+        pass
+
+
+def _run_email_pipeline(
+    num,
+    email_data: Optional[ParsedEmail],
+    *,
+    mail,
+    cycle_config: CycleConfig,
+    header_approved: set,
+    pipeline: PipelineStats,
+    link_extraction,
+    _w_tw,
+    logger,
+) -> int:
+    """Runs one email through parse -> cheap filters -> detectors -> routing -> enrichment -> delivery.
+
+    Les étapes sont ordonnées par coût: un email écarté (dédup de groupe, fenêtre
+    horaire...) ne déclenche ni enrichissement R2 ni POST webhook.
+    Returns the number of webhook sends triggered.
+    """
+    # -- parse ---------------------------------------------------------------
+    pipeline.enter("parse")
+    if not email_data:
+        pipeline.short_circuit("parse", "parse_error")
+        return 0
+    subject, sender_addr, msg = email_data['subject'], email_data['sender'], email_data['msg']
+    combined_text = (email_data['body_plain'] or '') + "\n" + (email_data['body_html'] or '')
+    delivery_links = link_extraction.extract_provider_links_from_text(combined_text)
+    has_links = bool(delivery_links)
+
+    # -- cheap filters (allowlist, dédup email/groupe, réponses) ---------------
+    pipeline.enter("cheap_filters")
+    if num in header_approved:
+        headers_map = {'Message-ID': msg.get('Message-ID', ''), 'Subject': subject or '', 'Date': email_data['date_raw']}
+        email_id = imap_client.generate_email_id(headers_map)
+    else:
+        email_id = _apply_header_filters(
+            mail, num, subject=subject, sender=sender_addr,
+            message_id=msg.get('Message-ID', ''), date_raw=email_data['date_raw'], logger=logger,
+            allowed=cycle_config.sender_allowlist,
+        )
+        if not email_id:
+            pipeline.short_circuit("cheap_filters", "header_filters", had_links=has_links)
+            return 0
+
+    dedup = DeduplicationService.get_instance()
+    group_id = dedup.generate_subject_group_id(subject or '')
+    if dedup.is_subject_group_processed(group_id):
+        logger.info("DEDUP_GROUP: Skipping email %s (group processed)", email_id)
+        dedup.mark_email_processed(email_id)
+        imap_client.mark_email_as_read_imap(logger, mail, num)
+        pipeline.short_circuit("cheap_filters", "group_processed", had_links=has_links)
+        return 0
+
+    # -- detectors + fenêtre horaire --------------------------------------------
+    pipeline.enter("detectors")
+    detector_val, delivery_time_val, desabo_is_urgent = _infer_detectors(subject, combined_text, logger)
+    logger.info("CUSTOM_WEBHOOK: detector inferred for email %s: %s", email_id, detector_val or 'none')
+
+    now_local = datetime.now(get_polling_timezone())
+    s_str, e_str = cycle_config.time_window
+    s_t, e_t = parse_time_hhmm(s_str) if s_str else None, parse_time_hhmm(e_str) if e_str else None
+
+    _patched = globals().get('is_within_time_window_local')
+    within = _patched(now_local, s_t, e_t) if callable(_patched) else is_within_time_window_local(now_local, s_t, e_t)
+
+    if not _enforce_time_window(detector_val, desabo_is_urgent, now_local, s_str, e_str, within, email_id, mail, num, logger):
+        pipeline.short_circuit("detectors", "outside_time_window", had_links=has_links)
         return 0
 
-    mail = imap_client.create_imap_connection(logger)
+    # -- routing ----------------------------------------------------------------
+    pipeline.enter("routing")
+    payload = _build_webhook_payload(
+        email_id, subject, email_data['date_raw'], msg.get('From', ''), sender_addr, combined_text,
+        s_str, e_str, within, detector_val, delivery_time_val, desabo_is_urgent, now_local, s_t, _w_tw
+    )
+    processing_prefs = dict(cycle_config.processing_prefs)
+
+    routing_webhook_url, routing_stop_processing, routing_priority, routing_payload_options = _apply_routing_rules(
+        subject, sender_addr, combined_text, email_id, logger, routing_rules=cycle_config.routing_rules
+    )
+    destinations = []
+    if routing_webhook_url:
+        if routing_priority:
+            payload["routing_rule"] = {"id": payload.get("routing_rule", {}).get("id"), "name": payload.get("routing_rule", {}).get("name"), "priority": routing_priority}
+        destinations.append(routing_webhook_url)
+    default_webhook_url = getattr(settings, 'WEBHOOK_URL', '')
+    if not (routing_webhook_url and (routing_stop_processing or routing_webhook_url == default_webhook_url)):
+        destinations.append(default_webhook_url)
+    payload_options = {
+        url: _resolve_payload_options(url, routing_payload_options if url == routing_webhook_url else None)
+        for url in destinations
+    }
+
+    # -- enrichment (R2, jusqu'à 120 s par lien) -------------------------------
+    pipeline.enter("enrichment")
+    if has_links:
+        pipeline.record_r2_enrichment()
+        _handle_r2_enrichment(delivery_links, email_id, logger)
+
+    # -- delivery ---------------------------------------------------------------
+    pipeline.enter("delivery")
+    triggered = 0
+    batcher = _CYCLE_WEBHOOK_BATCHER.get()
+    if batcher is not None and any(payload_options[url].get("batch") for url in destinations) \
+            and _get_outbox_enqueue() is None:
+        for webhook_url in [url for url in destinations if payload_options[url].get("batch")]:
+            triggered += _queue_batched_webhook(
+                batcher, email_id, subject, payload, delivery_links, webhook_url, mail, num, logger,
+                payload_options=payload_options[webhook_url], body_plain=email_data['body_plain'],
+            )
+        destinations = [url for url in destinations if not payload_options[url].get("batch")]
+    if len(destinations) > 1 and int(getattr(settings, 'WEBHOOK_FANOUT_MAX_WORKERS', 4) or 0) > 1:
+        return triggered + _send_webhook_fanout(
+            email_id, subject, payload, delivery_links, destinations, processing_prefs, mail, num, logger,
+            payload_options=payload_options, body_plain=email_data['body_plain'],
+        )
+    for webhook_url in destinations:
+        options = payload_options[webhook_url]
+        destination_payload = _project_payload(payload, options, email_data['body_plain'])
+        if _send_webhook(
+            email_id, subject, destination_payload, delivery_links, webhook_url, processing_prefs, mail, num, logger,
+            payload_options=options,
+        ) is False:
+            triggered += 1
+    return triggered
+
+
+def _get_email_worker_count() -> int:
+    try:
+        return max(1, int(getattr(settings, 'EMAIL_PROCESSING_WORKERS', 1) or 1))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _process_email_safely(num, email_data, *, logger, **pipeline_kwargs) -> tuple[int, bool]:
+    """Runs the pipeline for one email. Returns (triggered_count, imap_session_broken)."""
+    try:
+        triggered = _run_email_pipeline(num, email_data, logger=logger, **pipeline_kwargs)
+        batcher = _CYCLE_WEBHOOK_BATCHER.get()
+        if batcher is not None:
+            triggered += batcher.flush_due(pipeline_kwargs["mail"])
+        return triggered, False
+    except Exception as e_one:
+        if os.environ.get('ORCH_TEST_RERAISE') == '1':
+            raise
+        logger.error("POLLER: Exception while processing message %s: %s", num, e_one)
+        return 0, isinstance(e_one, (imaplib.IMAP4.abort, OSError))
+
+
+def _process_emails_concurrently(mail, email_nums: list, workers: int, *, logger, **pipeline_kwargs) -> tuple[int, bool]:
+    """Runs the per-email pipeline on a bounded worker pool.
+
+    Le thread appelant reste propriétaire de la connexion IMAP: il fait les FETCH
+    et exécute, via ImapCommandChannel, les commandes (STORE...) émises par les
+    workers. Au plus `workers` emails parsés sont en vol à la fois.
+    Returns (triggered_count, imap_session_broken).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    channel = imap_client.ImapCommandChannel(mail)
+    worker_mail = channel.proxy()
+    in_flight: set = set()
+    totals = [0, False]
+
+    def _reap() -> None:
+        for future in [f for f in in_flight if f.done()]:
+            in_flight.discard(future)
+            triggered, broken = future.result()
+            totals[0] += triggered
+            totals[1] = totals[1] or broken
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email-worker")
+    try:
+        for num, email_data in _iter_parsed_emails(mail, email_nums, logger):
+            while len(in_flight) >= workers:
+                channel.pump(timeout=1.0)
+                _reap()
+            # Les workers héritent du contexte du cycle (snapshot de config)
+            future = executor.submit(
+                contextvars.copy_context().run, _process_email_safely, num, email_data,
+                mail=worker_mail, logger=logger, **pipeline_kwargs,
+            )
+            future.add_done_callback(lambda _f: channel.wake())
+            in_flight.add(future)
+            channel.pump(timeout=0)
+            _reap()
+        while in_flight:
+            channel.pump(timeout=1.0)
+            _reap()
+    finally:
+        channel.close()
+        executor.shutdown(wait=True)
+    return totals[0], totals[1]
+
+
+def _run_polling_cycle(cycle_config: CycleConfig, pipeline: PipelineStats, logger, link_extraction, _w_tw) -> int:
+    mail, session_pool = _open_imap_session(logger)
     if not mail:
         logger.error("POLLER: Email polling cycle aborted: IMAP connection failed.")
         return 0
 
+    session_mail = mail
     triggered_count = 0
+    session_broken = False
     try:
         try:
             status, _ = mail.select(IMAP_MAILBOX_INBOX)
@@ -837,110 +2263,64 @@ def check_new_emails_and_trigger_webhook() -> int:
                 return 0
         except Exception as e_sel:
             logger.error("IMAP: Exception selecting INBOX: %s", e_sel)
+            session_broken = True
             return 0
 
+        uid_plan = None
         try:
-            status, data = mail.search(None, 'UNSEEN')
-            if status != IMAP_STATUS_OK:
-                logger.error("IMAP: search UNSEEN failed (status=%s)", status)
-                return 0
-            email_nums = data[0].split() if data and data[0] else []
-        except Exception as e_search:
-            logger.error("IMAP: Exception during search UNSEEN: %s", e_search)
-            return 0
-
-        for num in email_nums:
+            uid_plan = _start_uid_sync(mail, logger)
+        except Exception as e_uid:
+            logger.error("IMAP_UID_SYNC: Unable to plan UID sync, falling back to UNSEEN: %s", e_uid)
+
+        if uid_plan is not None:
+            # Le pipeline manipule alors des UID (UID FETCH / UID STORE)
+            mail = imap_client.UidMailbox(session_mail)
+            email_nums = uid_plan.candidates
+        else:
             try:
-                email_data = _parse_email(mail, num, logger)
-                if not email_data:
-                    continue
-
-                subject, sender_addr, msg = email_data['subject'], email_data['sender'], email_data['msg']
-                try:
-                    sender_list = getattr(settings, 'SENDER_LIST_FOR_POLLING', [])
-                except Exception:
-                    sender_list = []
-                allowed = [str(s).lower() for s in (sender_list or [])]
-                if allowed and sender_addr not in allowed:
-                    logger.info("POLLER: Skipping email %s (sender not in allowlist)", email_data['num'])
-                    continue
-
-                headers_map = {'Message-ID': msg.get('Message-ID', ''), 'Subject': subject or '', 'Date': email_data['date_raw']}
-                email_id = imap_client.generate_email_id(headers_map)
-                if DeduplicationService.get_instance().is_email_processed(email_id):
-                    logger.info("DEDUP_EMAIL: Skipping already processed email_id=%s", email_id)
-                    continue
-
-                core_subject = strip_leading_reply_prefixes(subject or '')
-                if core_subject != subject:
-                    logger.info("IGNORED: Skipping reply/forward (email_id=%s)", email_id)
-                    DeduplicationService.get_instance().mark_email_processed(email_id)
-                    imap_client.mark_email_as_read_imap(logger, mail, num)
-                    continue
-
-                combined_text = (email_data['body_plain'] or '') + "\n" + (email_data['body_html'] or '')
-                delivery_links = link_extraction.extract_provider_links_from_text(combined_text)
-                _handle_r2_enrichment(delivery_links, email_id, logger)
-
-                group_id = DeduplicationService.get_instance().generate_subject_group_id(subject or '')
-                if DeduplicationService.get_instance().is_subject_group_processed(group_id):
-                    logger.info("DEDUP_GROUP: Skipping email %s (group processed)", email_id)
-                    DeduplicationService.get_instance().mark_email_processed(email_id)
-                    imap_client.mark_email_as_read_imap(logger, mail, num)
-                    continue
-
-                detector_val, delivery_time_val, desabo_is_urgent = _infer_detectors(subject, combined_text, logger)
-                logger.info("CUSTOM_WEBHOOK: detector inferred for email %s: %s", email_id, detector_val or 'none')
-
-                now_local = datetime.now(get_polling_timezone())
-                s_str, e_str = _load_webhook_global_time_window()
-                s_t, e_t = parse_time_hhmm(s_str) if s_str else None, parse_time_hhmm(e_str) if e_str else None
-
-                _patched = globals().get('is_within_time_window_local')
-                within = _patched(now_local, s_t, e_t) if callable(_patched) else is_within_time_window_local(now_local, s_t, e_t)
-
-                if not _enforce_time_window(detector_val, desabo_is_urgent, now_local, s_str, e_str, within, email_id, mail, num, logger):
-                    continue
-
-                payload = _build_webhook_payload(
-                    email_id, subject, email_data['date_raw'], msg.get('From', ''), sender_addr, combined_text,
-                    s_str, e_str, within, detector_val, delivery_time_val, desabo_is_urgent, now_local, s_t, _w_tw
-                )
-                processing_prefs = _load_processing_prefs()
-
-                routing_webhook_url, routing_stop_processing, routing_priority = _apply_routing_rules(
-                    subject, sender_addr, combined_text, email_id, logger
-                )
-                if routing_webhook_url:
-                    if routing_priority:
-                        payload["routing_rule"] = {"id": payload.get("routing_rule", {}).get("id"), "name": payload.get("routing_rule", {}).get("name"), "priority": routing_priority}
-                    cont = _send_webhook(email_id, subject, payload, delivery_links, routing_webhook_url, processing_prefs, mail, num, logger)
-                    if cont is False:
-                        triggered_count += 1
-                    if routing_stop_processing:
-                        continue
+                status, data = mail.search(None, 'UNSEEN')
+                if status != IMAP_STATUS_OK:
+                    logger.error("IMAP: search UNSEEN failed (status=%s)", status)
+                    return 0
+                email_nums = data[0].split() if data and data[0] else []
+            except Exception as e_search:
+                logger.error("IMAP: Exception during search UNSEEN: %s", e_search)
+                session_broken = True
+                return 0
 
-                should_send_default = True
-                default_webhook_url = getattr(settings, 'WEBHOOK_URL', '')
-                if routing_webhook_url and routing_webhook_url == default_webhook_url:
-                    should_send_default = False
-                if should_send_default:
-                    cont = _send_webhook(email_id, subject, payload, delivery_links, default_webhook_url, processing_prefs, mail, num, logger)
-                    if cont is False:
-                        triggered_count += 1
-
-            except Exception as e_one:
-                if os.environ.get('ORCH_TEST_RERAISE') == '1':
-                    raise
-                logger.error("POLLER: Exception while processing message %s: %s", num, e_one)
-                continue
+        pipeline.enter("headers", len(email_nums))
+        pipeline.new_mail = _count_new_candidates(email_nums)
+        prefetched_count = len(email_nums)
+        email_nums, header_approved = _prefilter_by_headers(mail, email_nums, logger, cycle_config=cycle_config)
+        if prefetched_count > len(email_nums):
+            pipeline.short_circuit("headers", "header_prefilter", count=prefetched_count - len(email_nums))
 
+        pipeline_kwargs = dict(
+            cycle_config=cycle_config, header_approved=header_approved, pipeline=pipeline,
+            link_extraction=link_extraction, _w_tw=_w_tw, logger=logger,
+        )
+        batcher = _new_cycle_batcher(cycle_config, logger)
+        batcher_scope = _CYCLE_WEBHOOK_BATCHER.set(batcher)
+        try:
+            workers = _get_email_worker_count()
+            if workers > 1 and len(email_nums) > 1:
+                triggered_count, broken = _process_emails_concurrently(mail, email_nums, workers, **pipeline_kwargs)
+                session_broken = session_broken or broken
+            else:
+                for num, email_data in _iter_parsed_emails(mail, email_nums, logger):
+                    triggered, broken = _process_email_safely(num, email_data, mail=mail, **pipeline_kwargs)
+                    triggered_count += triggered
+                    session_broken = session_broken or broken
+            # Les lots incomplets partent avant la fermeture de la session IMAP
+            triggered_count += batcher.flush_all(mail)
+        finally:
+            _CYCLE_WEBHOOK_BATCHER.reset(batcher_scope)
+
+        if uid_plan is not None:
+            _commit_uid_sync(session_mail, uid_plan, logger)
         return triggered_count
     finally:
-        try:
-            imap_client.close_imap_connection(logger, mail)
-        except Exception:
-            pass
+        _close_imap_session(logger, session_mail, session_pool, broken=session_broken)
 
 
 def compute_desabo_time_window(
@@ -1140,9 +2520,36 @@ def _check_rate_limit(
     rate_limit_allow_send,
     append_webhook_log,
     logger,
+    pace_send=None,
 ) -> bool:
+    """Returns True when the send must not happen now (over the rate limit).
+
+    `pace_send`, when given, queues the send for its next slot and returns the
+    delay in seconds (None if it could not): the email is then logged as
+    "paced" instead of skipped.
+    """
     try:
         if not rate_limit_allow_send():
+            short_url = (webhook_url[:50] + "...") if len(webhook_url) > 50 else webhook_url
+            retry_after = pace_send() if pace_send is not None else None
+            if retry_after is not None:
+                eta = datetime.now(timezone.utc) + timedelta(seconds=retry_after)
+                logger.info(
+                    "RATE_LIMIT: Webhook for email %s paced, next slot in %.0fs", email_id, retry_after,
+                )
+                append_webhook_log({
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "type": "custom",
+                    "email_id": email_id,
+                    "status": "paced",
+                    "status_code": 429,
+                    "error_message": "Rate limit exceeded: send scheduled for the next slot",
+                    "retry_after_sec": round(retry_after, 1),
+                    "eta": eta.isoformat(),
+                    "webhook_url": short_url,
+                    "subject": (subject[:100] if subject else None),
+                })
+                return True
             logger.warning("RATE_LIMIT: Skipping webhook send due to rate limit.")
             append_webhook_log({
                 "timestamp": datetime.now(timezone.utc).isoformat(),
@@ -1151,7 +2558,7 @@ def _check_rate_limit(
                 "status": "error",
                 "status_code": 429,
                 "error_message": "Rate limit exceeded",
-                "webhook_url": (webhook_url[:50] + "...") if len(webhook_url) > 50 else webhook_url,
+                "webhook_url": short_url,
                 "subject": (subject[:100] if subject else None),
             })
             return True
@@ -1274,22 +2681,41 @@ def _send_single_attempt(
     attempt: int,
     requests,
     logger,
+    delivery_mode_memory=None,
+    latency_tracker=None,
+    content_encoding: str | None = None,
 ) -> tuple[Any, bool, str, list[str]]:
     webhook_response = None
     should_retry = False
-    last_mode = resolved_delivery_mode
+    learned_mode = _recall_delivery_mode(delivery_mode_memory, webhook_url) if resolved_fallback_on_415 else None
+    primary_mode = learned_mode or resolved_delivery_mode
+    last_mode = primary_mode
     attempted: list[str] = []
     for mode_index, delivery_mode in enumerate(
-        _build_webhook_mode_sequence(resolved_delivery_mode, fallback_on_415=resolved_fallback_on_415)
+        _build_webhook_mode_sequence(primary_mode, fallback_on_415=resolved_fallback_on_415)
     ):
         last_mode = delivery_mode
         attempted.append(delivery_mode)
-        request_kwargs = _build_webhook_request_kwargs(serialized_payload=serialized_payload, delivery_mode=delivery_mode)
+        request_kwargs = _build_webhook_request_kwargs(
+            serialized_payload=serialized_payload, delivery_mode=delivery_mode, content_encoding=content_encoding,
+        )
         try:
             logger.debug("CUSTOM_WEBHOOK_DEBUG: attempt=%d/%d email=%s mode=%s", attempt + 1, retries + 1, email_id, delivery_mode)
         except Exception:
             pass
-        webhook_response = requests.post(webhook_url, timeout=timeout_sec, verify=webhook_ssl_verify, **request_kwargs)
+        started = _monotonic()
+        try:
+            webhook_response = requests.post(webhook_url, timeout=timeout_sec, verify=webhook_ssl_verify, **request_kwargs)
+        except Exception as exc:
+            if latency_tracker is not None:
+                # Échantillon censuré: sans lui, un timeout appris trop court ne remonterait jamais
+                latency_tracker.record_failed_attempt(
+                    webhook_url, _monotonic() - started,
+                    timeout_sec=timeout_sec if isinstance(exc, _RequestsTimeout) else None,
+                )
+            raise
+        if latency_tracker is not None:
+            latency_tracker.record_latency(webhook_url, _monotonic() - started)
         if webhook_response.status_code != 415:
             break
         snippet = _truncate_webhook_response_snippet(getattr(webhook_response, "text", ""))
@@ -1301,9 +2727,62 @@ def _send_single_attempt(
             continue
         should_retry = attempt < retries
         break
+    if delivery_mode_memory is not None and webhook_response is not None and 200 <= webhook_response.status_code < 300:
+        _learn_delivery_mode(
+            delivery_mode_memory, webhook_url, configured_mode=resolved_delivery_mode,
+            learned_mode=learned_mode, attempted=attempted,
+        )
     return webhook_response, should_retry, last_mode, attempted
 
 
+def _recall_delivery_mode(delivery_mode_memory, webhook_url: str) -> str | None:
+    if delivery_mode_memory is None:
+        return None
+    try:
+        mode = delivery_mode_memory.get_mode(webhook_url)
+    except Exception:
+        return None
+    return mode if mode in (WEBHOOK_DELIVERY_MODE_JSON, WEBHOOK_DELIVERY_MODE_FORM) else None
+
+
+def _learn_delivery_mode(
+    delivery_mode_memory,
+    webhook_url: str,
+    *,
+    configured_mode: str,
+    learned_mode: str | None,
+    attempted: list[str],
+) -> None:
+    """Retient le mode accepté; compte le POST 415 évité quand le mode appris a passé du premier coup."""
+    accepted_mode = attempted[-1]
+    try:
+        if len(attempted) == 1 and learned_mode and learned_mode != configured_mode:
+            delivery_mode_memory.record_first_attempt_avoided()
+        if accepted_mode != configured_mode or learned_mode:
+            delivery_mode_memory.remember(webhook_url, accepted_mode, previous=learned_mode)
+    except Exception:
+        pass
+
+
+def _record_circuit_outcome(circuit_breaker, webhook_url: str, *, response=None, exc: Exception | None = None) -> str | None:
+    """Feeds one HTTP attempt to the circuit breaker. Returns the resulting circuit state."""
+    if circuit_breaker is None:
+        return None
+    try:
+        if exc is not None or response is None:
+            return circuit_breaker.record_failure(webhook_url, "request_failed")
+        status_code = response.status_code
+        if 200 <= status_code < 300:
+            circuit_breaker.record_success(webhook_url)
+            return None
+        return circuit_breaker.record_failure(
+            webhook_url,
+            _normalize_webhook_failure_reason(status_code=status_code, response_text=getattr(response, "text", "") or ""),
+        )
+    except Exception:
+        return None
+
+
 def _execute_webhook_with_retries(
     *,
     email_id: str,
@@ -1318,12 +2797,22 @@ def _execute_webhook_with_retries(
     requests,
     time,
     logger,
+    delivery_mode_memory=None,
+    circuit_breaker=None,
+    latency_tracker=None,
+    content_encoding: str | None = None,
 ) -> tuple[Any, Exception | None, str, list[str]]:
     last_exc: Exception | None = None
     webhook_response = None
     last_delivery_mode = resolved_delivery_mode
     attempted_delivery_modes: list[str] = []
     for attempt in range(retries + 1):
+        if latency_tracker is not None:
+            if attempt == 0:
+                latency_tracker.record_request()
+            elif not latency_tracker.try_acquire_retry():
+                logger.warning("RETRY_BUDGET: Retry budget exhausted, giving up on email %s after %d attempt(s)", email_id, attempt)
+                break
         try:
             resp, should_retry, last_mode, modes = _send_single_attempt(
                 email_id=email_id, serialized_payload=serialized_payload,
@@ -1331,15 +2820,24 @@ def _execute_webhook_with_retries(
                 timeout_sec=timeout_sec, resolved_delivery_mode=resolved_delivery_mode,
                 resolved_fallback_on_415=resolved_fallback_on_415,
                 retries=retries, attempt=attempt, requests=requests, logger=logger,
+                delivery_mode_memory=delivery_mode_memory, latency_tracker=latency_tracker,
+                content_encoding=content_encoding,
             )
             webhook_response = resp
             last_delivery_mode = last_mode
             attempted_delivery_modes.extend(modes)
+            circuit_state = _record_circuit_outcome(circuit_breaker, webhook_url, response=webhook_response)
             if webhook_response is not None and not should_retry:
                 break
+            if circuit_state == _CIRCUIT_OPEN:
+                logger.warning("CIRCUIT_BREAKER: Circuit opened, abandoning retries for email %s", email_id)
+                break
         except Exception as e_req:
             last_exc = e_req
             webhook_response = None
+            if _record_circuit_outcome(circuit_breaker, webhook_url, exc=e_req) == _CIRCUIT_OPEN:
+                logger.warning("CIRCUIT_BREAKER: Circuit opened, abandoning retries for email %s", email_id)
+                break
             if attempt < retries and delay > 0:
                 time.sleep(delay)
             continue
@@ -1413,6 +2911,27 @@ def _process_webhook_response(
     return False
 
 
+def _with_payload_size_fields(append_webhook_log, *, payload_profile: str | None, wire_size_bytes: int):
+    """Adds payload_profile / wire_size_bytes next to payload_size_bytes in webhook log entries."""
+    def _append(entry: dict) -> None:
+        if "payload_size_bytes" in entry:
+            entry = {**entry, "payload_profile": payload_profile or payloads.PAYLOAD_PROFILE_FULL,
+                     "wire_size_bytes": wire_size_bytes}
+        append_webhook_log(entry)
+
+    return _append
+
+
+def _record_payload_size(payload_profile: str | None, payload_size_bytes: int, wire_size_bytes: int) -> None:
+    try:
+        from services.runtime_metrics_service import RuntimeMetricsService
+        RuntimeMetricsService.get_instance().record_payload_size(
+            payload_profile or payloads.PAYLOAD_PROFILE_FULL, payload_size_bytes, wire_size_bytes,
+        )
+    except Exception:
+        pass
+
+
 def send_custom_webhook_flow(
     *,
     email_id: str,
@@ -1436,8 +2955,33 @@ def send_custom_webhook_flow(
     logger,
     webhook_delivery_mode: str | None = None,
     webhook_fallback_on_415: bool | None = None,
+    enqueue_webhook_job=None,
+    prepared_payload: tuple[dict, str, int] | None = None,
+    delivery_mode_memory=None,
+    circuit_breaker=None,
+    latency_tracker=None,
+    payload_profile: str | None = None,
+    webhook_gzip: bool = False,
+    pace_webhook_job=None,
+    defer_webhook_job=None,
 ) -> bool:
-    """Execute the custom webhook send flow. Returns True if caller should continue to next email."""
+    """Execute the custom webhook send flow. Returns True if caller should continue to next email.
+
+    With `enqueue_webhook_job`, the prepared send is handed to the webhook outbox
+    instead of being delivered (and retried) inline. `prepared_payload` reuses a
+    `_prepare_payload` result shared by several destinations (fan-out).
+    `delivery_mode_memory` (DeliveryModeMemoryService) tries the mode this URL
+    last accepted first, sparing the 415 round trip. While the `circuit_breaker`
+    (WebhookCircuitBreakerService) of the URL is open, the inline send fails fast.
+    `latency_tracker` (WebhookLatencyService) shortens the timeout from the URL's
+    observed p99 latency and caps retries with a global retry budget.
+    `payload_profile` names the projection already applied to the payload (see
+    payloads.apply_payload_profile); `webhook_gzip` sends the body gzip-encoded.
+    Over the rate limit, `pace_webhook_job` (see _get_rate_limit_pacer) hands the
+    send to the outbox for its next slot instead of skipping the email; while the
+    circuit is open, `defer_webhook_job` (see _get_circuit_deferral) queues it
+    until the end of the cooldown.
+    """
     if _check_no_links_policy(
         email_id=email_id, subject=subject, delivery_links=delivery_links,
         allow_without_links=allow_without_links, webhook_url=webhook_url,
@@ -1446,14 +2990,43 @@ def send_custom_webhook_flow(
         append_webhook_log=append_webhook_log, logger=logger,
     ):
         return True
+
+    def _pace_send() -> float | None:
+        _payload, serialized, size_bytes = prepared_payload or _prepare_payload(
+            email_id=email_id, subject=subject, payload_for_webhook=payload_for_webhook, delivery_links=delivery_links,
+        )
+        delivery_mode, fallback_on_415 = _resolve_webhook_delivery_settings(
+            webhook_delivery_mode=webhook_delivery_mode, webhook_fallback_on_415=webhook_fallback_on_415,
+        )
+        try:
+            eta = pace_webhook_job(_build_outbox_job(
+                email_id=email_id, subject=subject, webhook_url=webhook_url, webhook_ssl_verify=webhook_ssl_verify,
+                serialized_payload=serialized, payload_size_bytes=size_bytes,
+                timeout_sec=int(processing_prefs.get("webhook_timeout_sec") or 30),
+                resolved_delivery_mode=delivery_mode, resolved_fallback_on_415=fallback_on_415,
+                payload_profile=payload_profile, webhook_gzip=webhook_gzip,
+            ))
+        except Exception as e:
+            logger.warning("RATE_LIMIT: Unable to pace webhook for email %s: %s", email_id, e)
+            return None
+        if eta is not None:
+            mark_email_as_read_imap(mail, email_num)  # confié à l'outbox: ne pas le refetcher
+        return eta
+
     if _check_rate_limit(
         email_id=email_id, subject=subject, webhook_url=webhook_url,
         rate_limit_allow_send=rate_limit_allow_send, append_webhook_log=append_webhook_log, logger=logger,
+        pace_send=_pace_send if pace_webhook_job is not None else None,
     ):
         return True
-    _payload_to_send, serialized_payload, payload_size_bytes = _prepare_payload(
+    _payload_to_send, serialized_payload, payload_size_bytes = prepared_payload or _prepare_payload(
         email_id=email_id, subject=subject, payload_for_webhook=payload_for_webhook, delivery_links=delivery_links,
     )
+    wire_payload, content_encoding, wire_size_bytes = _encode_webhook_body(serialized_payload, gzip_enabled=webhook_gzip)
+    append_webhook_log = _with_payload_size_fields(
+        append_webhook_log, payload_profile=payload_profile, wire_size_bytes=wire_size_bytes,
+    )
+    _record_payload_size(payload_profile, payload_size_bytes, wire_size_bytes)
     retries = int(processing_prefs.get("retry_count") or 0)
     delay = int(processing_prefs.get("retry_delay_sec") or 0)
     timeout_sec = int(processing_prefs.get("webhook_timeout_sec") or 30)
@@ -1469,11 +3042,44 @@ def send_custom_webhook_flow(
         )
     except Exception:
         pass
+    if enqueue_webhook_job is not None and _enqueue_outbox_job(
+        enqueue_webhook_job, email_id=email_id, subject=subject, webhook_url=webhook_url,
+        webhook_ssl_verify=webhook_ssl_verify, serialized_payload=serialized_payload,
+        payload_size_bytes=payload_size_bytes, timeout_sec=timeout_sec,
+        resolved_delivery_mode=resolved_delivery_mode, resolved_fallback_on_415=resolved_fallback_on_415,
+        logger=logger, payload_profile=payload_profile, webhook_gzip=webhook_gzip,
+    ):
+        mark_email_as_read_imap(mail, email_num)  # confié à l'outbox: ne pas le refetcher
+        return False
+    if circuit_breaker is not None and not circuit_breaker.allow_request(webhook_url):
+        if defer_webhook_job is not None and _defer_until_circuit_closes(
+            defer_webhook_job,
+            _build_outbox_job(
+                email_id=email_id, subject=subject, webhook_url=webhook_url, webhook_ssl_verify=webhook_ssl_verify,
+                serialized_payload=serialized_payload, payload_size_bytes=payload_size_bytes, timeout_sec=timeout_sec,
+                resolved_delivery_mode=resolved_delivery_mode, resolved_fallback_on_415=resolved_fallback_on_415,
+                payload_profile=payload_profile, webhook_gzip=webhook_gzip,
+            ),
+            append_webhook_log=append_webhook_log, logger=logger,
+        ):
+            mark_email_as_read_imap(mail, email_num)  # confié à l'outbox: ne pas le refetcher
+            return False  # comme un envoi confié à l'outbox (enqueue_webhook_job)
+        logger.warning("CIRCUIT_BREAKER: Circuit open for %s, email %s not sent", webhook_url, email_id)
+        _log_webhook_outcome(
+            email_id=email_id, subject=subject, webhook_url=webhook_url, status="error", status_code=503,
+            append_webhook_log=append_webhook_log, payload_size_bytes=payload_size_bytes,
+            error_message="Circuit open: receiver unavailable", failure_reason="circuit_open",
+        )
+        return True
+    if latency_tracker is not None:
+        timeout_sec = latency_tracker.timeout_for(webhook_url, timeout_sec)
     webhook_response, last_exc, last_delivery_mode, attempted_delivery_modes = _execute_webhook_with_retries(
-        email_id=email_id, serialized_payload=serialized_payload, webhook_url=webhook_url,
+        email_id=email_id, serialized_payload=wire_payload, webhook_url=webhook_url,
         webhook_ssl_verify=webhook_ssl_verify, retries=retries, delay=delay,
         timeout_sec=timeout_sec, resolved_delivery_mode=resolved_delivery_mode,
         resolved_fallback_on_415=resolved_fallback_on_415, requests=requests, time=time, logger=logger,
+        delivery_mode_memory=delivery_mode_memory, circuit_breaker=circuit_breaker,
+        latency_tracker=latency_tracker, content_encoding=content_encoding,
     )
     return _process_webhook_response(
         email_id=email_id, subject=subject, webhook_url=webhook_url,
@@ -1484,3 +3090,185 @@ def send_custom_webhook_flow(
         mark_email_as_read_imap=mark_email_as_read_imap, mail=mail, email_num=email_num,
         record_send_event=record_send_event, append_webhook_log=append_webhook_log, logger=logger,
     )
+
+
+# =============================================================================
+# WEBHOOK OUTBOX (envoi différé, voir background.webhook_dispatcher)
+# =============================================================================
+
+_OUTBOX_RETRYABLE_STATUS = frozenset({408, 425, 429})
+
+
+def _build_outbox_job(
+    *,
+    email_id: str,
+    subject: str | None,
+    webhook_url: str,
+    webhook_ssl_verify: bool,
+    serialized_payload: str,
+    payload_size_bytes: int,
+    timeout_sec: int,
+    resolved_delivery_mode: str,
+    resolved_fallback_on_415: bool,
+    payload_profile: str | None = None,
+    webhook_gzip: bool = False,
+) -> dict:
+    return {
+        "job_id": outbox_job_id(email_id, webhook_url),
+        "email_id": email_id,
+        "subject": subject,
+        "webhook_url": webhook_url,
+        "webhook_ssl_verify": bool(webhook_ssl_verify),
+        "serialized_payload": serialized_payload,
+        "payload_size_bytes": payload_size_bytes,
+        "timeout_sec": timeout_sec,
+        "delivery_mode": resolved_delivery_mode,
+        "fallback_on_415": resolved_fallback_on_415,
+        "payload_profile": payload_profile,
+        "gzip": bool(webhook_gzip),
+    }
+
+
+def _enqueue_outbox_job(
+    enqueue_webhook_job,
+    *,
+    email_id: str,
+    subject: str | None,
+    webhook_url: str,
+    webhook_ssl_verify: bool,
+    serialized_payload: str,
+    payload_size_bytes: int,
+    timeout_sec: int,
+    resolved_delivery_mode: str,
+    resolved_fallback_on_415: bool,
+    logger,
+    payload_profile: str | None = None,
+    webhook_gzip: bool = False,
+) -> bool:
+    """Hands the prepared send to the outbox. Returns False to fall back to the inline send."""
+    job = _build_outbox_job(
+        email_id=email_id, subject=subject, webhook_url=webhook_url, webhook_ssl_verify=webhook_ssl_verify,
+        serialized_payload=serialized_payload, payload_size_bytes=payload_size_bytes, timeout_sec=timeout_sec,
+        resolved_delivery_mode=resolved_delivery_mode, resolved_fallback_on_415=resolved_fallback_on_415,
+        payload_profile=payload_profile, webhook_gzip=webhook_gzip,
+    )
+    try:
+        if enqueue_webhook_job(job):
+            logger.info("WEBHOOK_OUTBOX: Queued webhook for email %s (job %s)", email_id, job["job_id"])
+        else:
+            logger.info("WEBHOOK_OUTBOX: Webhook for email %s already queued", email_id)
+        return True
+    except Exception as e:
+        logger.warning("WEBHOOK_OUTBOX: Enqueue failed for email %s, sending inline: %s", email_id, e)
+        return False
+
+
+def deliver_outbox_job(
+    job: dict,
+    final_attempt: bool,
+    *,
+    requests,
+    record_send_event,
+    append_webhook_log,
+    logger,
+    delivery_mode_memory=None,
+    circuit_breaker=None,
+    latency_tracker=None,
+    rate_limiter=None,
+) -> tuple:
+    """Single delivery attempt of an outbox job (415 fallback included).
+
+    Returns (outcome, error) where outcome is one of the dispatcher OUTCOME_* values.
+    Webhook logs are written on success and on terminal failures only. While the
+    URL's circuit is open, or a retry finds the retry budget exhausted, the job is
+    parked (OUTCOME_DEFERRED) without any request. A paced job (`rate_limit_scopes`,
+    see _get_rate_limit_pacer) first reserves its slot with `rate_limiter`; when
+    none is free yet it returns (OUTCOME_DEFERRED, error, seconds until the next slot).
+    """
+    from background.webhook_dispatcher import OUTCOME_DEFERRED, OUTCOME_DELIVERED, OUTCOME_FAILED, OUTCOME_RETRY
+
+    email_id, subject, webhook_url = job["email_id"], job.get("subject"), job["webhook_url"]
+    wire_payload, content_encoding, wire_size_bytes = _encode_webhook_body(
+        job["serialized_payload"], gzip_enabled=bool(job.get("gzip")),
+    )
+    log_kwargs = {
+        "email_id": email_id, "subject": subject, "webhook_url": webhook_url,
+        "append_webhook_log": _with_payload_size_fields(
+            append_webhook_log, payload_profile=job.get("payload_profile"), wire_size_bytes=wire_size_bytes,
+        ),
+        "payload_size_bytes": int(job.get("payload_size_bytes") or 0),
+    }
+    if circuit_breaker is not None and not circuit_breaker.allow_request(webhook_url):
+        return OUTCOME_DEFERRED, "circuit open"
+    if job.get("rate_limit_scopes") and rate_limiter is not None:
+        allowed, retry_after = rate_limiter.acquire(job["rate_limit_scopes"])
+        if not allowed:
+            return OUTCOME_DEFERRED, "rate limited", max(1.0, retry_after)
+        # Créneau réservé une fois pour toutes: les retries éventuels ne le reprennent pas
+        job.pop("rate_limit_scopes")
+    timeout_sec = int(job.get("timeout_sec") or 30)
+    if latency_tracker is not None:
+        if int(job.get("attempts") or 0) == 0:
+            latency_tracker.record_request()
+        elif not latency_tracker.try_acquire_retry():
+            return OUTCOME_DEFERRED, "retry budget exhausted"
+        timeout_sec = latency_tracker.timeout_for(webhook_url, timeout_sec)
+    try:
+        response, _should_retry, last_mode, attempted = _send_single_attempt(
+            email_id=email_id, serialized_payload=wire_payload,
+            webhook_url=webhook_url, webhook_ssl_verify=bool(job.get("webhook_ssl_verify", True)),
+            timeout_sec=timeout_sec, resolved_delivery_mode=job.get("delivery_mode") or "json",
+            resolved_fallback_on_415=bool(job.get("fallback_on_415")), retries=0, attempt=0,
+            requests=requests, logger=logger, delivery_mode_memory=delivery_mode_memory,
+            latency_tracker=latency_tracker, content_encoding=content_encoding,
+        )
+    except Exception as e:
+        _record_circuit_outcome(circuit_breaker, webhook_url, exc=e)
+        if final_attempt:
+            _log_webhook_outcome(
+                status="error", status_code=0, error_message=str(e)[:200],
+                failure_reason="request_failed", **log_kwargs,
+            )
+        return OUTCOME_RETRY, str(e)
+    _record_circuit_outcome(circuit_breaker, webhook_url, response=response)
+    record_send_event()
+    log_kwargs.update(delivery_mode=last_mode, attempted_delivery_modes=attempted)
+    status_code = response.status_code
+    if status_code == 200:
+        try:
+            response_data = response.json() if response.content else {}
+        except Exception:
+            response_data = {}
+        if response_data.get("success", False):
+            logger.info("WEBHOOK_OUTBOX: Webhook delivered for email %s.", email_id)
+            _log_webhook_outcome(status="success", status_code=200, **log_kwargs)
+            return OUTCOME_DELIVERED, None
+        msg = str(response_data.get("message", "Unknown error"))
+        _log_webhook_outcome(
+            status="error", status_code=200, error_message=msg[:200],
+            response_snippet=_truncate_webhook_response_snippet(msg),
+            failure_reason=_normalize_webhook_failure_reason(status_code=200, response_text=msg), **log_kwargs,
+        )
+        return OUTCOME_FAILED, msg[:200]
+    snippet = _truncate_webhook_response_snippet(getattr(response, "text", "")) or "Unknown error"
+    outcome = OUTCOME_RETRY if status_code >= 500 or status_code in _OUTBOX_RETRYABLE_STATUS else OUTCOME_FAILED
+    if outcome == OUTCOME_FAILED or final_attempt:
+        _log_webhook_outcome(
+            status="error", status_code=status_code, error_message=snippet, response_snippet=snippet,
+            failure_reason=_normalize_webhook_failure_reason(
+                status_code=status_code, response_text=getattr(response, "text", "") or ""
+            ),
+            **log_kwargs,
+        )
+    return outcome, f"HTTP {status_code}: {snippet}"
+
+
+def acknowledge_outbox_job(job: dict, *, logger) -> None:
+    """Delivery acknowledged: mark the email processed.
+
+    The IMAP \\Seen flag needs no deferred STORE: send_custom_webhook_flow set it when the job was queued.
+    A dead-lettered job is therefore never seen again by a poll cycle; it keeps its payload
+    and is replayed with WebhookOutboxService.requeue_dead (POST /api/webhook_outbox/requeue_dead).
+    """
+    DeduplicationService.get_instance().mark_email_processed(job["email_id"])
+    logger.debug("WEBHOOK_OUTBOX: Acknowledged email %s", job["email_id"])
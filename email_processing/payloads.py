@@ -10,6 +10,18 @@ from typing import Any, Dict, List, Optional
 from typing_extensions import TypedDict
 
 
+PAYLOAD_PROFILE_FULL = "full"
+PAYLOAD_PROFILE_TEXT = "text"
+PAYLOAD_PROFILE_TEXT_CAPPED = "text_capped"
+PAYLOAD_PROFILE_HEADERS = "headers"
+PAYLOAD_PROFILES = (
+    PAYLOAD_PROFILE_FULL,
+    PAYLOAD_PROFILE_TEXT,
+    PAYLOAD_PROFILE_TEXT_CAPPED,
+    PAYLOAD_PROFILE_HEADERS,
+)
+
+
 class CustomWebhookPayload(TypedDict, total=False):
     """Structure du payload pour le webhook custom (PHP endpoint)."""
     microsoft_graph_email_id: str
@@ -122,3 +134,39 @@ def build_desabo_make_payload(
         "webhooks_time_start": time_start_payload,
         "webhooks_time_end": time_end_payload,
     }
+
+
+def apply_payload_profile(
+    payload: Dict[str, Any],
+    *,
+    profile: str,
+    body_plain: Optional[str] = None,
+    max_kb: int = 64,
+) -> Dict[str, Any]:
+    """Projects a webhook payload according to a destination's payload profile.
+
+    - ``full``: unchanged (texte brut + HTML combinés dans ``email_content``)
+    - ``text``: ``email_content`` limité au texte brut
+    - ``text_capped``: texte brut tronqué à ``max_kb`` Ko (UTF-8), avec
+      ``email_content_truncated``
+    - ``headers``: ni ``email_content`` ni ``bodyPreview``
+
+    Le payload d'origine n'est pas modifié.
+    """
+    if profile not in PAYLOAD_PROFILES or profile == PAYLOAD_PROFILE_FULL:
+        return payload
+    projected = dict(payload)
+    if profile == PAYLOAD_PROFILE_HEADERS:
+        projected.pop("email_content", None)
+        projected.pop("bodyPreview", None)
+        return projected
+    text = body_plain if body_plain is not None else str(payload.get("email_content") or "")
+    if profile == PAYLOAD_PROFILE_TEXT_CAPPED:
+        limit = max(1, int(max_kb)) * 1024
+        encoded = text.encode("utf-8")
+        truncated = len(encoded) > limit
+        if truncated:
+            text = encoded[:limit].decode("utf-8", errors="ignore")
+        projected["email_content_truncated"] = truncated
+    projected["email_content"] = text
+    return projected
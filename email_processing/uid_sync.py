@@ -0,0 +1,184 @@
+"""
+email_processing.uid_sync
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Synchronisation IMAP incrémentale par UID.
+
+Le checkpoint (UIDVALIDITY + UID le plus haut déjà vu + UID laissés en attente)
+est persisté via utils.storage_backend (Redis -> fichier JSON). Chaque cycle ne
+cherche alors que la plage `UID n:*`, indépendamment du flag \\Seen.
+"""
+from __future__ import annotations
+
+import imaplib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from email_processing import imap_client
+from utils.storage_backend import load_json_with_fallback, save_json_with_fallback
+
+
+@dataclass
+class UidSyncPlan:
+    """Plage de UID à traiter pour un cycle."""
+
+    mailbox: str
+    uidvalidity: int
+    candidates: list[bytes]
+    high_water: int
+    bootstrap: bool = False
+
+
+def load_checkpoint(
+    *,
+    redis_client: Any,
+    redis_key: str | None,
+    file_path: Path,
+    mailbox: str,
+    logger: Any = None,
+) -> dict:
+    doc = load_json_with_fallback(
+        redis_client=redis_client,
+        redis_key=redis_key,
+        file_path=file_path,
+        defaults={},
+        logger=logger,
+    )
+    entry = doc.get(mailbox)
+    return entry if isinstance(entry, dict) else {}
+
+
+def save_checkpoint(
+    entry: dict,
+    *,
+    redis_client: Any,
+    redis_key: str | None,
+    file_path: Path,
+    mailbox: str,
+    logger: Any = None,
+) -> bool:
+    doc = load_json_with_fallback(
+        redis_client=redis_client,
+        redis_key=redis_key,
+        file_path=file_path,
+        defaults={},
+        logger=logger,
+    )
+    doc[mailbox] = entry
+    return save_json_with_fallback(
+        doc,
+        redis_client=redis_client,
+        redis_key=redis_key,
+        file_path=file_path,
+        logger=logger,
+    )
+
+
+def plan_uid_sync(
+    mail,
+    checkpoint: dict,
+    *,
+    account: str,
+    mailbox: str,
+    logger: Any,
+) -> Optional[UidSyncPlan]:
+    """Construit la liste des UID à traiter depuis le checkpoint (mailbox déjà sélectionnée).
+
+    Returns:
+        Le plan du cycle, ou None si le serveur n'annonce pas d'UIDVALIDITY
+        (le poller retombe alors sur SEARCH UNSEEN).
+    """
+    uidvalidity, uidnext = imap_client.read_select_uid_state(mail)
+    if uidvalidity is None:
+        logger.warning("IMAP_UID_SYNC: No UIDVALIDITY in SELECT response; using UNSEEN search")
+        return None
+
+    last_uid = _as_int(checkpoint.get("last_uid"))
+    same_mailbox = (
+        last_uid is not None
+        and _as_int(checkpoint.get("uidvalidity")) == uidvalidity
+        and str(checkpoint.get("account") or "") == account
+    )
+    if not same_mailbox:
+        if checkpoint:
+            logger.warning(
+                "IMAP_UID_SYNC: Checkpoint invalidated for %s (uidvalidity %s -> %s); resyncing from UNSEEN",
+                mailbox,
+                checkpoint.get("uidvalidity"),
+                uidvalidity,
+            )
+        status, data = mail.uid("SEARCH", None, "UNSEEN")
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"UID SEARCH UNSEEN failed (status={status})")
+        candidates = _parse_uids(data)
+        high_water = (uidnext - 1) if uidnext else max(candidates, default=0)
+        return UidSyncPlan(
+            mailbox=mailbox,
+            uidvalidity=uidvalidity,
+            candidates=[str(u).encode() for u in candidates],
+            high_water=max(high_water, max(candidates, default=0)),
+            bootstrap=True,
+        )
+
+    pending = sorted({u for u in (_as_int(p) for p in checkpoint.get("pending_uids") or []) if u})
+    new_uids: list[int] = []
+    if not uidnext or uidnext > last_uid + 1:
+        status, data = mail.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"UID SEARCH failed (status={status})")
+        # "n:*" renvoie toujours le plus grand UID, même s'il est <= n
+        new_uids = [u for u in _parse_uids(data) if u > last_uid]
+    candidates = sorted(set(pending) | set(new_uids))
+    return UidSyncPlan(
+        mailbox=mailbox,
+        uidvalidity=uidvalidity,
+        candidates=[str(u).encode() for u in candidates],
+        high_water=max([last_uid] + new_uids),
+    )
+
+
+def finalize_uid_sync(mail, plan: UidSyncPlan, *, account: str, max_pending: int, logger: Any) -> dict:
+    """Calcule le nouveau checkpoint après le cycle.
+
+    Les candidats toujours non lus (fenêtre horaire, échec d'envoi...) restent en
+    attente et seront re-proposés au cycle suivant, comme avec SEARCH UNSEEN.
+    """
+    pending: list[int] = []
+    if plan.candidates:
+        try:
+            message_set = imap_client.compress_message_set(plan.candidates)
+            status, data = mail.uid("SEARCH", None, "UNSEEN", "UID", message_set)
+            if status != "OK":
+                raise imaplib.IMAP4.error(f"UID SEARCH UNSEEN failed (status={status})")
+            pending = _parse_uids(data)
+        except Exception as e:
+            logger.warning("IMAP_UID_SYNC: Unable to refresh pending UIDs, keeping all candidates: %s", e)
+            pending = [int(u) for u in plan.candidates]
+    if max_pending > 0 and len(pending) > max_pending:
+        logger.warning(
+            "IMAP_UID_SYNC: %d pending UIDs, keeping the %d most recent", len(pending), max_pending
+        )
+        pending = pending[-max_pending:]
+    return {
+        "account": account,
+        "uidvalidity": plan.uidvalidity,
+        "last_uid": plan.high_water,
+        "pending_uids": pending,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _parse_uids(data) -> list[int]:
+    raw = data[0] if data and data[0] else b""
+    if isinstance(raw, str):
+        raw = raw.encode()
+    return sorted(int(u) for u in raw.split() if u.isdigit())
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
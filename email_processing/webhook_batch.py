@@ -0,0 +1,131 @@
+"""
+email_processing.webhook_batch
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Envoi webhook groupé pour les récepteurs qui acceptent un tableau JSON.
+
+Une destination en mode batch (option `batch` de WEBHOOK_PAYLOAD_PROFILES_JSON
+ou d'une règle de routage) ne reçoit plus un POST par email: les payloads du
+cycle sont accumulés par URL et envoyés ensemble, dès que `max_items` payloads
+sont en attente, que le plus ancien attend depuis `max_wait_ms`, ou à la fin du
+cycle (la connexion IMAP ne survit pas au cycle).
+
+La réponse est ramenée à un résultat par email (voir map_batch_response) pour
+la dédup, le flag IMAP \\Seen et les logs webhook.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+
+@dataclass
+class BatchItem:
+    """Un email en attente d'envoi groupé (payload déjà sérialisé)."""
+
+    email_id: str
+    subject: Optional[str]
+    email_num: Any
+    serialized_payload: str
+    payload_size_bytes: int
+
+
+@dataclass
+class _PendingBatch:
+    options: dict
+    started_at: float
+    items: list = field(default_factory=list)
+
+
+class WebhookBatcher:
+    """Accumule les payloads par URL et délègue l'envoi à `send_batch`.
+
+    `send_batch(webhook_url, items, options, mail)` retourne le nombre d'emails
+    envoyés; il est appelé hors verrou, par le thread qui déclenche le flush
+    (avec la connexion IMAP, ou son proxy, de ce thread).
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[str, list, dict, Any], int],
+        *,
+        max_items: int = 20,
+        max_wait_ms: int = 2000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._send_batch = send_batch
+        self._max_items = max(1, int(max_items))
+        self._max_wait_sec = max(0, int(max_wait_ms)) / 1000.0
+        self._clock = clock
+        self._pending: dict[str, _PendingBatch] = {}
+        self._lock = threading.Lock()
+
+    def add(self, webhook_url: str, item: BatchItem, *, options: dict, mail) -> int:
+        """Met l'email en attente; envoie le lot s'il est plein ou trop ancien."""
+        with self._lock:
+            batch = self._pending.get(webhook_url)
+            if batch is None:
+                batch = self._pending[webhook_url] = _PendingBatch(options=dict(options), started_at=self._clock())
+            batch.items.append(item)
+            ready = [webhook_url] if len(batch.items) >= self._max_items else []
+            ready += [url for url in self._due_urls() if url not in ready]
+            batches = [(url, self._pending.pop(url)) for url in ready]
+        return self._send(batches, mail)
+
+    def flush_due(self, mail) -> int:
+        """Envoie les lots dont le plus ancien payload attend depuis max_wait_ms."""
+        with self._lock:
+            batches = [(url, self._pending.pop(url)) for url in self._due_urls()]
+        return self._send(batches, mail)
+
+    def flush_all(self, mail) -> int:
+        """Envoie tout ce qui est en attente (fin de cycle)."""
+        with self._lock:
+            batches = list(self._pending.items())
+            self._pending.clear()
+        return self._send(batches, mail)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(batch.items) for batch in self._pending.values())
+
+    def _due_urls(self) -> list[str]:
+        now = self._clock()
+        return [url for url, batch in self._pending.items() if now - batch.started_at >= self._max_wait_sec]
+
+    def _send(self, batches: list, mail) -> int:
+        return sum(self._send_batch(url, batch.items, batch.options, mail) for url, batch in batches)
+
+
+def map_batch_response(status_code: int, response_data: Any, size: int) -> list[tuple[bool, Optional[str]]]:
+    """Ramène la réponse d'un POST groupé à (succès, message) par email, dans l'ordre du lot.
+
+    Formes acceptées pour une réponse 200:
+    - un tableau de `size` résultats (`{"success": bool, "message": ...}` ou booléen);
+    - `{"results": [...]}` avec le même tableau;
+    - `{"success": bool, "message": ...}`, appliqué à tout le lot.
+    Un tableau de taille différente ne permet pas d'attribuer les résultats:
+    aucun email n'est alors considéré comme livré.
+    """
+    if status_code != 200:
+        return [(False, None)] * size
+    results = response_data.get("results") if isinstance(response_data, dict) else response_data
+    if isinstance(results, list):
+        if len(results) != size:
+            return [(False, f"Batch response has {len(results)} result(s) for {size} email(s)")] * size
+        return [_item_result(result) for result in results]
+    if isinstance(response_data, dict):
+        return [_item_result(response_data)] * size
+    return [(False, "Unknown error")] * size
+
+
+def _item_result(result: Any) -> tuple[bool, Optional[str]]:
+    if isinstance(result, bool):
+        return result, None if result else "Unknown error"
+    if isinstance(result, dict):
+        if result.get("success", False):
+            return True, None
+        return False, str(result.get("message", "Unknown error"))
+    return False, "Unknown error"
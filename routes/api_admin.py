@@ -14,7 +14,9 @@ import requests
 from flask import Blueprint, jsonify, request, current_app, Response
 from flask_login import login_required, current_user
 
+from background.cycle_coordinator import PollCycleCoordinator
 from services import ConfigService
+from services.webhook_outbox_service import WebhookOutboxService
 from email_processing import orchestrator as email_orchestrator
 from app_logging.webhook_logger import append_webhook_log as _append_webhook_log
 from migrate_configs_to_redis import main as migrate_configs_main
@@ -361,18 +363,54 @@ def check_emails_and_download() -> Response | tuple[Response, int]:
         if not _config_service.has_webhook_url():
             return jsonify({"status": "error", "message": "Config serveur email incomplète (webhook URL)."}), 503
 
+        app = current_app._get_current_object()
+
         def run_task():
-            try:
-                with current_app.app_context():
-                    email_orchestrator.check_new_emails_and_trigger_webhook()
-            except Exception as e:
-                try:
-                    current_app.logger.error(f"API_EMAIL_CHECK: Exception background task: {e}")
-                except Exception:
-                    pass
-
-        threading.Thread(target=run_task, daemon=True).start()
-        return jsonify({"status": "success", "message": "Vérification en arrière-plan lancée."}), 202
+            with app.app_context():
+                return email_orchestrator.check_new_emails_and_trigger_webhook()
+
+        cycle = PollCycleCoordinator.get_instance().submit(
+            run_task,
+            source="api",
+            spawn=lambda target: threading.Thread(target=target, daemon=True).start(),
+        )
+        coalesced = not cycle["started"]
+        return jsonify({
+            "status": "success",
+            "message": (
+                "Vérification déjà en cours; demande regroupée dans le cycle suivant."
+                if coalesced
+                else "Vérification en arrière-plan lancée."
+            ),
+            "cycle_id": cycle["cycle_id"],
+            "cycle_status": cycle["status"],
+            "coalesced": coalesced,
+            "status_url": f"/api/poll_cycles/{cycle['cycle_id']}",
+        }), 202
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+
+@bp.route("/poll_cycles/<cycle_id>", methods=["GET"])
+@login_required
+def get_poll_cycle_status(cycle_id: str) -> Response | tuple[Response, int]:
+    cycle = PollCycleCoordinator.get_instance().get_cycle(cycle_id)
+    if cycle is None:
+        return jsonify({"success": False, "message": "Cycle inconnu ou expiré."}), 404
+    return jsonify({"success": True, "cycle": cycle}), 200
+
+
+
+@bp.route("/webhook_outbox/requeue_dead", methods=["POST"])
+@login_required
+def requeue_dead_webhook_jobs() -> Response | tuple[Response, int]:
+    outbox = WebhookOutboxService.get_instance()
+    if not outbox.is_available():
+        return jsonify({"success": False, "message": "Outbox webhook inactif."}), 503
+    job_id = (request.get_json(silent=True) or {}).get("job_id")
+    try:
+        requeued = outbox.requeue_dead(str(job_id) if job_id else None)
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+    current_app.logger.info("ADMIN: %d dead-lettered webhook job(s) requeued by '%s'", requeued, current_user.id)
+    return jsonify({"success": True, "requeued": requeued}), 200
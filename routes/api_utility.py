@@ -24,10 +24,20 @@ def _get_runtime_metrics_payload(now: datetime) -> dict:
     process_start_iso = None
     uptime_sec = None
     last_poll_cycle_ts = None
+    last_poll_cycle_stats = None
     last_webhook_sent_ts = None
     bg_poller_alive = None
     make_watcher_alive = None
     enable_bg = None
+    bg_poller_status = None
+    poll_cycle_status = None
+    http_pool_stats = None
+    webhook_outbox_status = None
+    delivery_mode_stats = None
+    circuit_breaker_stats = None
+    latency_stats = None
+    payload_size_stats = None
+    rate_limit_stats = None
 
     try:
         from services.runtime_metrics_service import RuntimeMetricsService
@@ -40,6 +50,55 @@ def _get_runtime_metrics_payload(now: datetime) -> dict:
             except Exception:
                 uptime_sec = None
         last_poll_cycle_ts = svc.get_last_poll_cycle_ts()
+        last_poll_cycle_stats = svc.get_last_poll_cycle_stats()
+        payload_size_stats = svc.get_payload_size_stats()
+    except Exception:
+        pass
+    try:
+        from background.poll_scheduler import PollScheduler
+        scheduler = PollScheduler.get_instance()
+        bg_poller_status = scheduler.status() if scheduler else None
+    except Exception:
+        pass
+    try:
+        from background.cycle_coordinator import PollCycleCoordinator
+        poll_cycle_status = PollCycleCoordinator.get_instance().status()
+    except Exception:
+        pass
+    try:
+        from services.http_session_service import HttpSessionService
+        http_pool_stats = HttpSessionService.get_instance().get_stats()
+    except Exception:
+        pass
+    try:
+        from services.delivery_mode_service import DeliveryModeMemoryService
+        delivery_mode_stats = DeliveryModeMemoryService.get_instance().get_stats()
+    except Exception:
+        pass
+    try:
+        from services.circuit_breaker_service import WebhookCircuitBreakerService
+        circuit_breaker_stats = WebhookCircuitBreakerService.get_instance().get_stats()
+    except Exception:
+        pass
+    try:
+        from services.webhook_latency_service import WebhookLatencyService
+        latency_stats = WebhookLatencyService.get_instance().get_stats()
+    except Exception:
+        pass
+    try:
+        from services.rate_limit_service import RateLimitService
+        rate_limiter = RateLimitService.get_instance()
+        rate_limit_stats = {**rate_limiter.get_stats(), "quotas": rate_limiter.get_quotas()}
+    except Exception:
+        pass
+    try:
+        from background.webhook_dispatcher import WebhookDispatcher
+        from services.webhook_outbox_service import WebhookOutboxService
+        dispatcher = WebhookDispatcher.get_instance()
+        webhook_outbox_status = {
+            **WebhookOutboxService.get_instance().get_stats(),
+            "dispatcher": dispatcher.status() if dispatcher else None,
+        }
     except Exception:
         pass
 
@@ -68,8 +127,18 @@ def _get_runtime_metrics_payload(now: datetime) -> dict:
         "process_start_time": process_start_iso,
         "uptime_sec": uptime_sec,
         "last_poll_cycle_ts": last_poll_cycle_ts,
+        "last_poll_cycle_stats": last_poll_cycle_stats,
         "last_webhook_sent_ts": last_webhook_sent_ts,
         "bg_poller_thread_alive": bg_poller_alive,
+        "bg_poller": bg_poller_status,
+        "poll_cycle": poll_cycle_status,
+        "webhook_http_pool": http_pool_stats,
+        "webhook_outbox": webhook_outbox_status,
+        "webhook_delivery_modes": delivery_mode_stats,
+        "webhook_circuit_breakers": circuit_breaker_stats,
+        "webhook_latency": latency_stats,
+        "webhook_payload_sizes": payload_size_stats,
+        "webhook_rate_limits": rate_limit_stats,
         "make_watcher_thread_alive": make_watcher_alive,
         "enable_background_tasks": enable_bg,
         "server_time_utc": now.isoformat(),
@@ -206,6 +206,34 @@ def update_webhook_config() -> Response | tuple[Response, int]:
     return jsonify({"success": True, "message": "Configuration mise à jour avec succès."}), 200
 
 
+@bp.route("/circuit_breakers", methods=["GET"])
+@login_required
+def get_webhook_circuit_breakers() -> Response | tuple[Response, int]:
+    """État des disjoncteurs par URL de webhook (URLs masquées)."""
+    from services.circuit_breaker_service import WebhookCircuitBreakerService
+
+    breaker = WebhookCircuitBreakerService.get_instance()
+    return jsonify({
+        "success": True,
+        "breakers": breaker.get_snapshot(),
+        "cooldown_sec": breaker.cooldown_sec,
+    }), 200
+
+
+@bp.route("/rate_limits", methods=["GET"])
+@login_required
+def get_webhook_rate_limits() -> Response | tuple[Response, int]:
+    """Quota restant par scope de rate limit (global, URL masquée, règle de routage)."""
+    from services.rate_limit_service import RateLimitService
+
+    rate_limiter = RateLimitService.get_instance()
+    return jsonify({
+        "success": True,
+        "algorithm": rate_limiter.algorithm,
+        "quotas": rate_limiter.get_quotas(),
+    }), 200
+
+
 # ---- Dedicated time window for global webhook toggle ----
 
 @bp.route("/time-window", methods=["GET"])
@@ -0,0 +1,380 @@
+"""
+services.circuit_breaker_service
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Disjoncteur (circuit breaker) par URL de webhook.
+
+Quand un récepteur est tombé, chaque email de chaque cycle épuisait
+`retry_count + 1` tentatives avec le timeout complet. Le disjoncteur compte les
+échecs consécutifs « récepteur indisponible » (5xx, 429, erreurs réseau /
+timeouts) et, au-delà du seuil, s'ouvre: les envois vers cette URL échouent
+immédiatement (ou restent dans l'outbox) pendant `cooldown_sec`. Ensuite un seul
+envoi de sonde passe (half-open): succès -> fermé, échec -> rouvert.
+
+Les réponses 4xx / 415 / success=false prouvent que le récepteur répond: elles
+ne font pas disjoncter.
+
+Features:
+- États closed / open / half_open partagés entre workers via Redis (HASH par URL
+  hachée + bail de sonde SET NX EX)
+- Fallback mémoire locale si Redis indisponible
+- Instantané pour le dashboard (URL masquée, état, échecs, réouverture prévue)
+- Pattern Singleton
+
+Usage:
+    from services.circuit_breaker_service import WebhookCircuitBreakerService
+
+    breaker = WebhookCircuitBreakerService.get_instance()
+    if breaker.allow_request(webhook_url):
+        ...
+        breaker.record_failure(webhook_url, "upstream_server_error")
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from utils.text_helpers import mask_url
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # pragma: no cover - redis is a hard dependency in production
+    class WatchError(Exception):  # type: ignore[no-redef]
+        pass
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Classes de _normalize_webhook_failure_reason() signalant un récepteur indisponible
+TRIPPING_FAILURE_REASONS = frozenset({"upstream_server_error", "rate_limited", "request_failed"})
+
+_DEFAULT_KEY_PREFIX = "r:ss:webhook_circuit:v1"
+_STATE_TTL_SEC = 7 * 24 * 3600
+_MAX_WATCH_RETRIES = 20
+
+
+class WebhookCircuitBreakerService:
+    _instance: Optional[WebhookCircuitBreakerService] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        redis_client: Any = None,
+        key_prefix: str = _DEFAULT_KEY_PREFIX,
+        failure_threshold: int = 5,
+        cooldown_sec: float = 60,
+        probe_timeout_sec: float = 60,
+        clock: Callable[[], float] = time.time,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._redis = redis_client
+        self._key_prefix = key_prefix
+        self._failure_threshold = max(1, int(failure_threshold))
+        self._cooldown_sec = max(0.0, float(cooldown_sec))
+        self._probe_timeout_sec = max(1.0, float(probe_timeout_sec))
+        self._clock = clock
+        self._logger = logger or logging.getLogger(__name__)
+        self._local: dict[str, dict] = {}
+        self._local_probes: dict[str, float] = {}
+        self._local_lock = threading.Lock()
+        self._stats = {"fast_failed": 0, "tripped": 0, "recovered": 0}
+
+    @classmethod
+    def get_instance(cls) -> WebhookCircuitBreakerService:
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._lock:
+            cls._instance = None
+
+    def configure(
+        self,
+        redis_client: Any = None,
+        *,
+        key_prefix: Optional[str] = None,
+        failure_threshold: Optional[int] = None,
+        cooldown_sec: Optional[float] = None,
+        probe_timeout_sec: Optional[float] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._redis = redis_client
+        if key_prefix:
+            self._key_prefix = key_prefix
+        if failure_threshold:
+            self._failure_threshold = max(1, int(failure_threshold))
+        if cooldown_sec is not None:
+            self._cooldown_sec = max(0.0, float(cooldown_sec))
+        if probe_timeout_sec:
+            self._probe_timeout_sec = max(1.0, float(probe_timeout_sec))
+        if logger is not None:
+            self._logger = logger
+
+    @property
+    def cooldown_sec(self) -> float:
+        return self._cooldown_sec
+
+    def allow_request(self, webhook_url: str) -> bool:
+        """True si l'envoi peut partir (circuit fermé, ou sonde half-open obtenue)."""
+        digest = self._digest(webhook_url)
+        state = self._load(digest)
+        if state["state"] == STATE_CLOSED:
+            return True
+        if state["state"] == STATE_OPEN and self._clock() < state["opened_at"] + self._cooldown_sec:
+            self._bump("fast_failed")
+            return False
+        # Délai écoulé (ou sonde précédente perdue): un seul appelant sonde le récepteur
+        if not self._acquire_probe(digest):
+            self._bump("fast_failed")
+            return False
+        if state["state"] != STATE_HALF_OPEN:
+            # Seul le champ "state": un échec compté entre-temps par un autre worker est conservé
+            self._save_fields(digest, {"state": STATE_HALF_OPEN})
+            self._logger.info("CIRCUIT_BREAKER: %s half-open, probing receiver", mask_url(webhook_url))
+        return True
+
+    def retry_after(self, webhook_url: str) -> float:
+        """Secondes avant la fin du cooldown (0 si le circuit n'est pas ouvert)."""
+        state = self._load(self._digest(webhook_url))
+        if state["state"] != STATE_OPEN:
+            return 0.0
+        return max(0.0, state["opened_at"] + self._cooldown_sec - self._clock())
+
+    def record_success(self, webhook_url: str) -> None:
+        digest = self._digest(webhook_url)
+        state = self._load(digest)
+        if state["state"] == STATE_CLOSED and not state["failures"]:
+            return
+        self._save(digest, {**state, "state": STATE_CLOSED, "failures": 0, "opened_at": 0.0})
+        self._release_probe(digest)
+        if state["state"] != STATE_CLOSED:
+            self._bump("recovered")
+            self._logger.info("CIRCUIT_BREAKER: %s closed, receiver recovered", mask_url(webhook_url))
+
+    def record_failure(self, webhook_url: str, failure_reason: str | None) -> str:
+        """Enregistre un échec classé; retourne l'état résultant du circuit."""
+        if failure_reason not in TRIPPING_FAILURE_REASONS:
+            self.record_success(webhook_url)
+            return STATE_CLOSED
+        digest = self._digest(webhook_url)
+        state, tripped = self._apply_failure(digest, failure_reason)
+        if tripped:
+            self._release_probe(digest)
+            self._bump("tripped")
+            self._logger.warning(
+                "CIRCUIT_BREAKER: %s open after %d failure(s) (%s); failing fast for %.0fs",
+                mask_url(webhook_url), state["failures"], failure_reason, self._cooldown_sec,
+            )
+        return state["state"]
+
+    def get_state(self, webhook_url: str) -> str:
+        return self._load(self._digest(webhook_url))["state"]
+
+    def get_snapshot(self) -> list[dict]:
+        """État des circuits connus, pour le dashboard (URL masquée)."""
+        snapshot = []
+        for digest in self._known_digests():
+            state = self._load(digest)
+            if not state.get("url"):
+                continue
+            retry_at = None
+            if state["state"] == STATE_OPEN:
+                retry_at = int(state["opened_at"] + self._cooldown_sec)
+            snapshot.append({
+                "url": state["url"],
+                "state": state["state"],
+                "failures": state["failures"],
+                "last_failure_reason": state.get("last_failure_reason") or None,
+                "opened_at": int(state["opened_at"]) if state["opened_at"] else None,
+                "retry_at": retry_at,
+            })
+        return sorted(snapshot, key=lambda s: (s["state"] == STATE_CLOSED, s["url"]))
+
+    def get_stats(self) -> dict:
+        snapshot = self.get_snapshot()
+        with self._local_lock:
+            counters = dict(self._stats)
+        return {
+            **counters,
+            "open": sum(1 for s in snapshot if s["state"] != STATE_CLOSED),
+            "failure_threshold": self._failure_threshold,
+            "cooldown_sec": self._cooldown_sec,
+            "backend": "redis" if self._redis is not None else "memory",
+        }
+
+    # ------------------------------------------------------------------
+    # Stockage (Redis si configuré, sinon mémoire locale)
+    # ------------------------------------------------------------------
+
+    def _digest(self, webhook_url: str) -> str:
+        digest = hashlib.sha1(str(webhook_url or "").strip().encode("utf-8")).hexdigest()
+        with self._local_lock:
+            entry = self._local.setdefault(digest, self._empty_state())
+            entry["url"] = entry.get("url") or mask_url(webhook_url)
+        return digest
+
+    @staticmethod
+    def _empty_state() -> dict:
+        return {"state": STATE_CLOSED, "failures": 0, "opened_at": 0.0, "last_failure_reason": "", "url": ""}
+
+    def _key(self, digest: str) -> str:
+        return f"{self._key_prefix}:{digest}"
+
+    def _load(self, digest: str) -> dict:
+        if self._redis is not None:
+            try:
+                return self._parse(digest, self._redis.hgetall(self._key(digest)))
+            except Exception:
+                pass
+        with self._local_lock:
+            return dict(self._local.get(digest) or self._empty_state())
+
+    def _parse(self, digest: str, raw: Optional[dict]) -> dict:
+        raw = {_as_str(k): _as_str(v) for k, v in (raw or {}).items()}
+        state = self._empty_state()
+        state.update({
+            "state": raw.get("state") or STATE_CLOSED,
+            "failures": int(raw.get("failures") or 0),
+            "opened_at": float(raw.get("opened_at") or 0.0),
+            "last_failure_reason": raw.get("last_failure_reason") or "",
+            "url": raw.get("url") or self._local.get(digest, {}).get("url", ""),
+        })
+        return state
+
+    def _next_failure_state(self, state: dict, failure_reason: str) -> tuple[dict, bool]:
+        """Transition d'un échec: (nouvel état, True si cet échec ouvre le circuit)."""
+        failures = int(state["failures"]) + 1
+        state = {**state, "failures": failures, "last_failure_reason": failure_reason}
+        if state["state"] != STATE_OPEN and (
+            state["state"] == STATE_HALF_OPEN or failures >= self._failure_threshold
+        ):
+            return {**state, "state": STATE_OPEN, "opened_at": self._clock()}, True
+        return state, False
+
+    def _apply_failure(self, digest: str, failure_reason: str) -> tuple[dict, bool]:
+        """Compte l'échec et décide de l'ouverture en une seule étape atomique.
+
+        Avec Redis, lecture et écriture passent par WATCH/MULTI: deux workers en
+        échec simultané comptent bien deux échecs, et un seul ouvre le circuit.
+        """
+        if self._redis is not None:
+            try:
+                return self._apply_failure_redis(digest, failure_reason)
+            except Exception:
+                pass
+        with self._local_lock:
+            state, tripped = self._next_failure_state(
+                dict(self._local.get(digest) or self._empty_state()), failure_reason,
+            )
+            self._local[digest] = dict(state)
+        return state, tripped
+
+    def _apply_failure_redis(self, digest: str, failure_reason: str) -> tuple[dict, bool]:
+        key = self._key(digest)
+        with self._redis.pipeline() as pipe:
+            for _ in range(_MAX_WATCH_RETRIES):
+                try:
+                    pipe.watch(key)
+                    state, tripped = self._next_failure_state(self._parse(digest, pipe.hgetall(key)), failure_reason)
+                    pipe.multi()
+                    self._queue_save(pipe, digest, state)
+                    pipe.execute()
+                except WatchError:
+                    continue
+                with self._local_lock:
+                    self._local[digest] = dict(state)
+                return state, tripped
+        raise RuntimeError("circuit state contention")
+
+    def _save(self, digest: str, state: dict) -> None:
+        with self._local_lock:
+            self._local[digest] = dict(state)
+        if self._redis is None:
+            return
+        try:
+            with self._redis.pipeline() as pipe:
+                self._queue_save(pipe, digest, state)
+                pipe.execute()
+        except Exception:
+            pass
+
+    def _save_fields(self, digest: str, fields: dict) -> None:
+        with self._local_lock:
+            self._local.setdefault(digest, self._empty_state()).update(fields)
+        if self._redis is None:
+            return
+        try:
+            key = self._key(digest)
+            with self._redis.pipeline() as pipe:
+                pipe.hset(key, mapping=fields)
+                pipe.expire(key, _STATE_TTL_SEC)
+                pipe.execute()
+        except Exception:
+            pass
+
+    def _queue_save(self, pipe: Any, digest: str, state: dict) -> None:
+        key = self._key(digest)
+        pipe.hset(key, mapping={
+            "state": state["state"],
+            "failures": int(state["failures"]),
+            "opened_at": float(state["opened_at"]),
+            "last_failure_reason": state.get("last_failure_reason") or "",
+            "url": state.get("url") or "",
+        })
+        pipe.expire(key, _STATE_TTL_SEC)
+        pipe.sadd(f"{self._key_prefix}:index", digest)
+
+    def _acquire_probe(self, digest: str) -> bool:
+        if self._redis is not None:
+            try:
+                return bool(self._redis.set(
+                    f"{self._key(digest)}:probe", "1", nx=True, ex=int(self._probe_timeout_sec)
+                ))
+            except Exception:
+                pass
+        now = self._clock()
+        with self._local_lock:
+            if self._local_probes.get(digest, 0.0) > now:
+                return False
+            self._local_probes[digest] = now + self._probe_timeout_sec
+            return True
+
+    def _release_probe(self, digest: str) -> None:
+        with self._local_lock:
+            self._local_probes.pop(digest, None)
+        if self._redis is not None:
+            try:
+                self._redis.delete(f"{self._key(digest)}:probe")
+            except Exception:
+                pass
+
+    def _known_digests(self) -> list[str]:
+        digests = set()
+        if self._redis is not None:
+            try:
+                digests.update(_as_str(d) for d in self._redis.smembers(f"{self._key_prefix}:index") or ())
+            except Exception:
+                pass
+        with self._local_lock:
+            digests.update(d for d, s in self._local.items() if s.get("state") != STATE_CLOSED or s.get("failures"))
+        return sorted(digests)
+
+    def _bump(self, name: str) -> None:
+        with self._local_lock:
+            self._stats[name] += 1
+
+
+def _as_str(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
@@ -0,0 +1,143 @@
+"""
+services.delivery_mode_service
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Mémoire du mode de livraison (json / form) accepté par chaque webhook.
+
+Sans mémoire, un récepteur qui n'accepte que le form-urlencoded répond 415 au
+premier POST JSON de chaque email: deux requêtes HTTP par envoi, pour toujours.
+Le mode ayant réussi est retenu par URL (TTL) et tenté en premier la fois
+suivante; le fallback 415 reste actif si le récepteur change d'avis.
+
+Features:
+- Redis (clé par URL hachée, TTL), partagé entre workers Gunicorn
+- Fallback mémoire locale (dict + expiration) si Redis indisponible
+- Compteurs: premières tentatives inutiles évitées, modes appris/réappris
+- Pattern Singleton
+
+Usage:
+    from services.delivery_mode_service import DeliveryModeMemoryService
+
+    memory = DeliveryModeMemoryService.get_instance()
+    mode = memory.get_mode(webhook_url)      # None si rien d'appris
+    memory.remember(webhook_url, "form")
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Optional
+
+_DEFAULT_KEY_PREFIX = "r:ss:webhook_delivery_mode:v1"
+_DEFAULT_TTL_SEC = 7 * 24 * 3600
+
+
+class DeliveryModeMemoryService:
+    _instance: Optional[DeliveryModeMemoryService] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        redis_client: Any = None,
+        key_prefix: str = _DEFAULT_KEY_PREFIX,
+        ttl_sec: int = _DEFAULT_TTL_SEC,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._redis = redis_client
+        self._key_prefix = key_prefix
+        self._ttl_sec = int(ttl_sec)
+        self._clock = clock
+        self._local: dict[str, tuple[str, float]] = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "lookups": 0,
+            "hits": 0,
+            "learned": 0,
+            "relearned": 0,
+            "first_attempts_avoided": 0,
+        }
+
+    @classmethod
+    def get_instance(cls) -> DeliveryModeMemoryService:
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._lock:
+            cls._instance = None
+
+    def configure(
+        self,
+        redis_client: Any = None,
+        *,
+        key_prefix: Optional[str] = None,
+        ttl_sec: Optional[int] = None,
+    ) -> None:
+        """Injecte un client Redis (mémoire partagée entre workers)."""
+        self._redis = redis_client
+        if key_prefix:
+            self._key_prefix = key_prefix
+        if ttl_sec:
+            self._ttl_sec = int(ttl_sec)
+
+    def get_mode(self, webhook_url: str) -> Optional[str]:
+        """Mode appris pour cette URL, ou None."""
+        key = self._key(webhook_url)
+        mode = None
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(key)
+                mode = raw.decode() if isinstance(raw, bytes) else raw
+            except Exception:
+                mode = self._get_local(key)
+        else:
+            mode = self._get_local(key)
+        self._bump("lookups")
+        if mode:
+            self._bump("hits")
+        return mode or None
+
+    def remember(self, webhook_url: str, mode: str, *, previous: Optional[str] = None) -> None:
+        """Retient le mode accepté (rafraîchit le TTL); `previous` = mode appris qui a échoué."""
+        key = self._key(webhook_url)
+        if previous is None or previous != mode:
+            self._bump("relearned" if previous else "learned")
+        self._local[key] = (mode, self._clock() + self._ttl_sec)
+        if self._redis is not None:
+            try:
+                self._redis.set(key, mode, ex=self._ttl_sec)
+            except Exception:
+                pass
+
+    def record_first_attempt_avoided(self) -> None:
+        self._bump("first_attempts_avoided")
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return {**self._stats, "ttl_sec": self._ttl_sec, "backend": "redis" if self._redis is not None else "memory"}
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        mode, expires_at = entry
+        if expires_at <= self._clock():
+            self._local.pop(key, None)
+            return None
+        return mode
+
+    def _key(self, webhook_url: str) -> str:
+        # URL hachée: les webhooks Make.com portent leur jeton dans le chemin
+        digest = hashlib.sha1(str(webhook_url or "").strip().encode("utf-8")).hexdigest()
+        return f"{self._key_prefix}:{digest}"
+
+    def _bump(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
@@ -0,0 +1,206 @@
+"""
+services.http_session_service
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Registre de sessions HTTP (keep-alive) partagées pour l'envoi des webhooks.
+
+Une ``requests.Session`` par origine (scheme://host:port) : les envois, retries
+et fallbacks 415 vers le même hôte réutilisent les connexions TCP/TLS ouvertes
+au lieu de refaire un handshake à chaque POST.
+
+Features:
+- Pool urllib3 dimensionné sur le nombre de threads concurrents (gunicorn, workers)
+- Éviction des sessions inactives (avant que le serveur ne coupe le keep-alive)
+- Statistiques hit/miss (registre) et connexions ouvertes vs réutilisées
+- Pattern Singleton, thread-safe
+
+Usage:
+    from services.http_session_service import HttpSessionService
+
+    http = HttpSessionService.get_instance()
+    resp = http.post(webhook_url, json=payload, timeout=30)
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class _PooledSession:
+    __slots__ = ("session", "last_used", "requests")
+
+    def __init__(self, session: requests.Session, now: float) -> None:
+        self.session = session
+        self.last_used = now
+        self.requests = 0
+
+
+class HttpSessionService:
+    _instance: Optional[HttpSessionService] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        pool_maxsize: int = 4,
+        idle_ttl_sec: float = 50.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._pool_maxsize = max(1, int(pool_maxsize))
+        self._idle_ttl_sec = float(idle_ttl_sec)
+        self._clock = clock
+        self._sessions_lock = threading.Lock()
+        self._sessions: dict[str, _PooledSession] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # Compteurs des sessions déjà fermées (les pools disparaissent avec elles)
+        self._closed_connections = 0
+        self._closed_requests = 0
+
+    @classmethod
+    def get_instance(cls) -> HttpSessionService:
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls._from_settings()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._lock:
+            if cls._instance is not None:
+                cls._instance.close_all()
+            cls._instance = None
+
+    @classmethod
+    def _from_settings(cls) -> HttpSessionService:
+        try:
+            from config import settings
+
+            return cls(
+                pool_maxsize=int(getattr(settings, "WEBHOOK_HTTP_POOL_MAXSIZE", 4)),
+                idle_ttl_sec=float(getattr(settings, "WEBHOOK_HTTP_IDLE_TTL_SECONDS", 50)),
+            )
+        except Exception:
+            return cls()
+
+    # ------------------------------------------------------------------ API
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """POST via la session poolée de l'origine de ``url`` (même signature que requests.post)."""
+        return self.get_session(url).post(url, **kwargs)
+
+    def get_session(self, url: str) -> requests.Session:
+        origin = _origin_of(url)
+        now = self._clock()
+        with self._sessions_lock:
+            self._evict_idle_unlocked(now)
+            pooled = self._sessions.get(origin)
+            if pooled is None:
+                self._misses += 1
+                pooled = _PooledSession(self._new_session(), now)
+                self._sessions[origin] = pooled
+            else:
+                self._hits += 1
+            pooled.last_used = now
+            pooled.requests += 1
+            return pooled.session
+
+    def evict_idle(self) -> int:
+        """Ferme les sessions inactives depuis plus de idle_ttl_sec. Retourne le nombre évincé."""
+        with self._sessions_lock:
+            return self._evict_idle_unlocked(self._clock())
+
+    def close_all(self) -> None:
+        with self._sessions_lock:
+            for origin in list(self._sessions):
+                self._close_unlocked(origin)
+
+    def get_stats(self) -> dict:
+        with self._sessions_lock:
+            connections = self._closed_connections
+            pooled_requests = self._closed_requests
+            origins = {}
+            for origin, pooled in self._sessions.items():
+                opened, sent = _pool_counters(pooled.session)
+                connections += opened
+                pooled_requests += sent
+                origins[origin] = {
+                    "requests": pooled.requests,
+                    "connections_opened": opened,
+                    "idle_sec": round(max(0.0, self._clock() - pooled.last_used), 1),
+                }
+            return {
+                "pool_maxsize": self._pool_maxsize,
+                "idle_ttl_sec": self._idle_ttl_sec,
+                "sessions": len(self._sessions),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "connections_opened": connections,
+                "connections_reused": max(0, pooled_requests - connections),
+                "origins": origins,
+            }
+
+    # ------------------------------------------------------------- internals
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        # Les retries sont gérés par le flux webhook (retry_count / fallback 415)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_maxsize, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _evict_idle_unlocked(self, now: float) -> int:
+        if self._idle_ttl_sec <= 0:
+            return 0
+        stale = [o for o, p in self._sessions.items() if now - p.last_used > self._idle_ttl_sec]
+        for origin in stale:
+            self._close_unlocked(origin)
+            self._evictions += 1
+        return len(stale)
+
+    def _close_unlocked(self, origin: str) -> None:
+        pooled = self._sessions.pop(origin)
+        opened, sent = _pool_counters(pooled.session)
+        self._closed_connections += opened
+        self._closed_requests += sent
+        try:
+            pooled.session.close()
+        except Exception:
+            pass
+
+
+def _origin_of(url: str) -> str:
+    parts = urlsplit(str(url or ""))
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port or _DEFAULT_PORTS.get(scheme)
+    return f"{scheme}://{host}:{port}"
+
+
+def _pool_counters(session: requests.Session) -> tuple[int, int]:
+    """(connexions ouvertes, requêtes envoyées) cumulées sur les pools urllib3 de la session."""
+    opened = sent = 0
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        manager = getattr(adapter, "poolmanager", None)
+        if manager is None:
+            continue
+        try:
+            pools = [manager.pools[key] for key in list(manager.pools.keys())]
+        except Exception:
+            continue
+        for pool in pools:
+            opened += int(getattr(pool, "num_connections", 0) or 0)
+            sent += int(getattr(pool, "num_requests", 0) or 0)
+    return opened, sent
@@ -16,6 +16,7 @@ import hashlib
 import logging
 import sys
 import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from email.utils import parseaddr
@@ -111,10 +112,14 @@ class IngressService:
         except Exception:
             return
 
+        cache_stats = email_orchestrator._new_r2_cache_stats()
         for item in delivery_links:
-            self._process_single_delivery_link(item, r2_service, email_id)
+            self._process_single_delivery_link(item, r2_service, email_id, cache_stats=cache_stats)
+        email_orchestrator._log_r2_cache_stats(email_id, cache_stats, self._logger)
 
-    def _process_single_delivery_link(self, item: dict, r2_service: Any, email_id: str) -> None:
+    def _process_single_delivery_link(
+        self, item: dict, r2_service: Any, email_id: str, *, cache_stats: Optional[dict] = None
+    ) -> None:
         if not isinstance(item, dict):
             return
 
@@ -133,6 +138,17 @@ class IngressService:
         except Exception:
             normalized_source_url = raw_url
 
+        if cache_stats is None:
+            cache_stats = email_orchestrator._new_r2_cache_stats()
+        reused = email_orchestrator._find_reusable_r2_link(r2_service, normalized_source_url, provider, cache_stats)
+        if reused:
+            item["r2_url"] = reused["r2_url"]
+            reused_filename = reused.get("original_filename")
+            if isinstance(reused_filename, str) and reused_filename.strip():
+                item["original_filename"] = reused_filename.strip()
+            self._logger.info("R2_TRANSFER: Reused existing R2 object for email %s (no remote fetch)", email_id)
+            return
+
         remote_fetch_timeout = 15
         try:
             if provider == "dropbox" and "/scl/fo/" in normalized_source_url.lower():
@@ -141,12 +157,14 @@ class IngressService:
             pass
 
         try:
+            started = time.monotonic()
             r2_url, original_filename = r2_service.request_remote_fetch(
                 source_url=normalized_source_url,
                 provider=provider,
                 email_id=email_id,
                 timeout=remote_fetch_timeout,
             )
+            fetch_duration_sec = time.monotonic() - started
         except Exception:
             return
 
@@ -172,6 +190,7 @@ class IngressService:
                 r2_url=r2_url,
                 provider=provider,
                 original_filename=(original_filename if isinstance(original_filename, str) else None),
+                fetch_duration_sec=fetch_duration_sec,
             )
         except Exception as ex:
             try:
@@ -349,7 +368,7 @@ class IngressService:
     ) -> Tuple[Dict[str, Any], int]:
         from services.rate_limit_service import RateLimitService
         from services.webhook_logger_service import WebhookLoggerService
-        import requests
+        from services.http_session_service import HttpSessionService
         import time as _time
 
         webhook_cfg = email_orchestrator._get_webhook_config_dict() or {}
@@ -376,18 +395,30 @@ class IngressService:
         except Exception:
             pass
         processing_prefs = self._get_processing_prefs()
+        payload_options = email_orchestrator._resolve_payload_options(webhook_url)
+        payload_for_webhook = email_orchestrator._project_payload(payload_for_webhook, payload_options, None)
+        # Mêmes scopes (global, URL, règle) et même pacing par l'outbox que le chemin email
+        rate_limit_allow_send, pace_webhook_job = email_orchestrator._rate_limit_hooks(
+            webhook_url, processing_prefs, payload_options,
+        )
         try:
             flow_result = email_orchestrator.send_custom_webhook_flow(
                 email_id=email_id, subject=subject, payload_for_webhook=payload_for_webhook,
                 delivery_links=delivery_links, webhook_url=webhook_url, webhook_ssl_verify=webhook_ssl_verify,
                 allow_without_links=allow_without_links, processing_prefs=processing_prefs,
-                rate_limit_allow_send=RateLimitService.get_instance().allow_send,
+                rate_limit_allow_send=rate_limit_allow_send,
                 record_send_event=RateLimitService.get_instance().record_event,
                 append_webhook_log=WebhookLoggerService.get_instance().append_log,
                 mark_email_id_as_processed_redis=dedup_service.mark_email_processed,
                 mark_email_as_read_imap=lambda *_a, **_kw: True, mail=None, email_num=None, urlparse=None,
-                requests=requests, time=_time, logger=self._logger,
+                requests=HttpSessionService.get_instance(), time=_time, logger=self._logger,
                 webhook_delivery_mode=webhook_delivery_mode, webhook_fallback_on_415=webhook_fallback_on_415,
+                pace_webhook_job=pace_webhook_job,
+                defer_webhook_job=email_orchestrator._get_circuit_deferral(),
+                delivery_mode_memory=email_orchestrator._get_delivery_mode_memory(),
+                circuit_breaker=email_orchestrator._get_circuit_breaker(),
+                latency_tracker=email_orchestrator._get_latency_tracker(),
+                payload_profile=payload_options["payload_profile"], webhook_gzip=payload_options["gzip"],
             )
             return {"success": True, "status": "processed", "email_id": email_id, "flow_result": flow_result, "timestamp_utc": datetime.now(timezone.utc).isoformat()}, 200
         except Exception as e:
@@ -0,0 +1,221 @@
+"""
+services.r2_link_index
+~~~~~~~~~~~~~~~~~~~~~~
+
+Index des paires source_url -> r2_url de webhook_links.json, par URL source normalisée.
+
+Sans index, chaque recherche relisait tout le fichier et normalisait chaque
+entrée: O(N) parsing JSON + N normalisations d'URL. L'index associe l'URL
+normalisée (normalize_source_url avec le provider de l'entrée) à la paire la
+plus récente:
+
+- hash Redis partagé entre workers (un champ par URL + la position lue);
+- sinon dict en mémoire du processus.
+
+La position lue (inode, offset) dit où en est l'index dans le journal JSONL
+(R2LinksStore): si le fichier a grandi, seules les lignes ajoutées depuis
+l'offset sont lues; si son inode a changé (compaction, migration, remplacement
+externe), l'index est reconstruit en une passe sur les `max_entries` dernières
+paires.
+
+Usage:
+    index = R2LinkIndex(r2_service.normalize_source_url)
+    entry = index.lookup(source_url, links_store, max_entries=1000)
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Callable, Optional
+
+DEFAULT_REDIS_KEY = "r:ss:r2_links:index:v1"
+_STAMP_FIELD = "__stamp__"
+_REBUILD_CHUNK = 1000
+# normalize_source_url ne distingue que dropbox (URL canonique) des autres providers
+# (strip + unescape) et du provider vide (URL brute)
+_LOOKUP_PROVIDERS = ("", "dropbox", "other")
+
+
+class R2LinkIndex:
+    """Index O(1) des paires R2, Redis si configuré, mémoire locale sinon.
+
+    `store` fournit identity() -> (inode, taille), read_from(offset) et
+    tail(n) -> (entrées, (inode, position)) (voir services.r2_links_store).
+    """
+
+    def __init__(
+        self,
+        normalize: Callable[[str, str], str],
+        *,
+        redis_client: Any = None,
+        redis_key: str = DEFAULT_REDIS_KEY,
+    ) -> None:
+        self._normalize = normalize
+        self._redis_client = redis_client
+        self._redis_key = redis_key
+        self._local: dict[str, dict] = {}
+        self._local_position: Optional[tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._rebuilds = 0
+        self._catch_ups = 0
+
+    def configure(self, redis_client: Any = None, *, redis_key: Optional[str] = None) -> None:
+        self._redis_client = redis_client
+        if redis_key:
+            self._redis_key = redis_key
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self._redis_client is not None else "memory"
+
+    @property
+    def rebuilds(self) -> int:
+        return self._rebuilds
+
+    @property
+    def catch_ups(self) -> int:
+        return self._catch_ups
+
+    def entry_key(self, entry: Any) -> Optional[str]:
+        if not isinstance(entry, dict) or not entry.get("source_url"):
+            return None
+        return self._normalize(entry["source_url"], entry.get("provider") or "")
+
+    def lookup(self, source_url: str, store: Any, *, max_entries: int) -> Optional[dict]:
+        """Paire la plus récente pour `source_url` (quel que soit son provider), ou None."""
+        identity = store.identity()
+        if not source_url or identity is None:
+            return None
+        keys = list(dict.fromkeys(self._normalize(source_url, p) for p in _LOOKUP_PROVIDERS))
+        if self._redis_client is not None:
+            try:
+                return self._pick(source_url, self._lookup_redis(keys, store, identity, max_entries))
+            except Exception:
+                pass
+        return self._pick(source_url, self._lookup_local(keys, store, identity, max_entries))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            local_size = len(self._local)
+        return {
+            "backend": self.backend,
+            "local_entries": local_size,
+            "rebuilds": self._rebuilds,
+            "catch_ups": self._catch_ups,
+        }
+
+    # ------------------------------------------------------------------
+
+    def _pick(self, source_url: str, matches: list[tuple[str, Optional[dict]]]) -> Optional[dict]:
+        valid = [
+            entry for key, entry in matches
+            if isinstance(entry, dict) and self._normalize(source_url, entry.get("provider") or "") == key
+        ]
+        if not valid:
+            return None
+        return max(valid, key=lambda entry: str(entry.get("created_at") or ""))
+
+    def _build(self, entries: list) -> dict[str, dict]:
+        index: dict[str, dict] = {}
+        for entry in entries:
+            key = self.entry_key(entry)
+            if key:
+                # Ordre du fichier: la dernière entrée d'une URL gagne
+                index[key] = entry
+        return index
+
+    def _read_new_lines(self, store: Any, position: Optional[tuple[int, int]], identity: tuple[int, int]):
+        """Lignes ajoutées depuis `position` si le fichier est le même et a grandi, sinon None."""
+        if position is None or position[0] != identity[0] or position[1] > identity[1]:
+            return None
+        if position[1] == identity[1]:
+            return [], position
+        entries, new_position = store.read_from(position[1])
+        if new_position is None or new_position[0] != position[0]:
+            return None
+        self._catch_ups += 1
+        return entries, new_position
+
+    def _lookup_local(self, keys: list[str], store: Any, identity, max_entries: int) -> list[tuple[str, Optional[dict]]]:
+        with self._lock:
+            fresh = self._read_new_lines(store, self._local_position, identity)
+            if fresh is None:
+                entries, self._local_position = store.tail(max_entries)
+                self._local = self._build(entries)
+                self._rebuilds += 1
+            else:
+                self._local.update(self._build(fresh[0]))
+                self._local_position = fresh[1]
+            return [(key, self._local.get(key)) for key in keys]
+
+    def _lookup_redis(self, keys: list[str], store: Any, identity, max_entries: int) -> list[tuple[str, Optional[dict]]]:
+        values = self._redis_client.hmget(self._redis_key, [_STAMP_FIELD, *keys])
+        stamp = _parse_position(values[0])
+        fresh = self._read_new_lines(store, stamp, identity)
+        if fresh is not None:
+            added = self._build(fresh[0])
+            if fresh[1] != stamp:
+                self._advance_redis(stamp, fresh[1], added)
+            return [(key, added.get(key) or _decode(value)) for key, value in zip(keys, values[1:])]
+        entries, position = store.tail(max_entries)
+        index = self._build(entries)
+        self._rebuild_redis(index, position)
+        return [(key, index.get(key)) for key in keys]
+
+    def _advance_redis(self, stamp, position, added: dict[str, dict]) -> None:
+        """Ajoute les lignes lues au hash si personne ne l'a avancé entre-temps."""
+        from redis.exceptions import WatchError
+
+        with self._redis_client.pipeline() as pipe:
+            try:
+                pipe.watch(self._redis_key)
+                if _parse_position(pipe.hget(self._redis_key, _STAMP_FIELD)) != stamp:
+                    return
+                pipe.multi()
+                if added:
+                    pipe.hset(self._redis_key, mapping={
+                        key: json.dumps(entry, ensure_ascii=False) for key, entry in added.items()
+                    })
+                pipe.hset(self._redis_key, _STAMP_FIELD, _format_position(position))
+                pipe.execute()
+            except WatchError:
+                pass
+
+    def _rebuild_redis(self, index: dict[str, dict], position: Optional[tuple[int, int]]) -> None:
+        items = [(key, json.dumps(entry, ensure_ascii=False)) for key, entry in index.items()]
+        with self._redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._redis_key)
+            for start in range(0, len(items), _REBUILD_CHUNK):
+                pipe.hset(self._redis_key, mapping=dict(items[start:start + _REBUILD_CHUNK]))
+            pipe.hset(self._redis_key, _STAMP_FIELD, _format_position(position))
+            pipe.execute()
+        self._rebuilds += 1
+
+
+def _format_position(position: Optional[tuple[int, int]]) -> str:
+    return f"{position[0]}:{position[1]}" if position else ""
+
+
+def _parse_position(value: Any) -> Optional[tuple[int, int]]:
+    try:
+        inode, offset = _as_str(value).split(":")
+        return int(inode), int(offset)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _as_str(value: Any) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
+
+
+def _decode(value: Any) -> Optional[dict]:
+    if value is None:
+        return None
+    try:
+        entry = json.loads(_as_str(value))
+    except ValueError:
+        return None
+    return entry if isinstance(entry, dict) else None
@@ -0,0 +1,254 @@
+"""
+services.r2_links_store
+~~~~~~~~~~~~~~~~~~~~~~~
+
+Stockage append-only (JSONL) des paires source_url/r2_url (webhook_links.json).
+
+Chaque paire est une ligne JSON ajoutée avec O_APPEND: plus de réécriture du
+fichier entier à chaque lien transféré. Les écrivains partagent un verrou
+(LOCK_SH sur le fichier `.lock` voisin) que seule la compaction prend en
+exclusif: elle dédoublonne, ne garde que les `max_entries` dernières paires et
+remplace le fichier atomiquement (os.replace, nouvel inode). Elle tourne dans
+un thread de fond après `compact_every` ajouts du processus.
+
+Lecture sans verrou: une ligne incomplète en fin de fichier (ajout en cours)
+est ignorée jusqu'à son '\\n'. `read_from(offset)` reprend après une position
+connue (rattrapage incrémental de l'index), `tail(n)` lit les n dernières
+paires en remontant depuis la fin.
+
+L'ancien format (tableau JSON) est converti en JSONL à l'ouverture, au même
+emplacement.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+_TAIL_BLOCK_SIZE = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class R2LinksStore:
+    """Journal JSONL des paires R2 avec compaction en tâche de fond."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_entries: Callable[[], int],
+        compact_every: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            path: Fichier des paires (webhook_links.json)
+            max_entries: Nombre de paires conservées par la compaction (lu à chaque compaction)
+            compact_every: Ajouts du processus entre deux compactions (défaut: max_entries / 10)
+        """
+        self._path = Path(path)
+        self._lock_path = self._path.with_name(self._path.name + ".lock")
+        self._max_entries = max_entries
+        self._compact_every = compact_every
+        self._appends_since_compaction = 0
+        self._state_lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def identity(self) -> Optional[tuple[int, int]]:
+        """(inode, taille) du fichier, None s'il n'existe pas."""
+        try:
+            st = os.stat(self._path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size
+
+    def append(self, entry: dict) -> None:
+        """Ajoute une paire (une ligne, un seul write O_APPEND) et planifie la compaction si besoin."""
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        self._ensure_jsonl()
+        with self._writer_lock(fcntl.LOCK_SH):
+            fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        with self._state_lock:
+            self._appends_since_compaction += 1
+            due = self._appends_since_compaction >= self._compaction_interval()
+        if due:
+            self.schedule_compaction()
+
+    def read_all(self) -> tuple[list[dict], Optional[tuple[int, int]]]:
+        """Toutes les paires et (inode, position de fin lue)."""
+        return self.read_from(0)
+
+    def read_from(self, offset: int) -> tuple[list[dict], Optional[tuple[int, int]]]:
+        """Paires écrites à partir de `offset` et (inode, nouvelle position).
+
+        Retourne identité None si `offset` ne tombe pas sur un début de ligne
+        de ce fichier (fichier remplacé entre-temps): l'appelant relit tout.
+        """
+        self._ensure_jsonl()
+        return self._read_from(offset)
+
+    def tail(self, count: int) -> tuple[list[dict], Optional[tuple[int, int]]]:
+        """Les `count` dernières paires (en remontant par blocs depuis la fin) et (inode, position de fin)."""
+        self._ensure_jsonl()
+        try:
+            with open(self._path, "rb") as f:
+                st = os.fstat(f.fileno())
+                end = st.st_size
+                position, chunks, newlines = end, [], 0
+                while position > 0 and newlines <= count:
+                    step = min(_TAIL_BLOCK_SIZE, position)
+                    position -= step
+                    f.seek(position)
+                    chunk = f.read(step)
+                    chunks.insert(0, chunk)
+                    newlines += chunk.count(b"\n")
+        except FileNotFoundError:
+            return [], None
+        data = b"".join(chunks)
+        complete_end = data.rfind(b"\n") + 1
+        # Début de bloc au milieu d'une ligne: on ne garde que les lignes complètes
+        start = data.find(b"\n") + 1 if position > 0 else 0
+        entries = _parse_lines(data[start:complete_end])
+        return entries[-count:] if count > 0 else [], (st.st_ino, position + complete_end)
+
+    def compact(self) -> dict:
+        """Dédoublonne (dernière occurrence gardée) et tronque aux `max_entries` dernières paires."""
+        self._ensure_jsonl()
+        with self._writer_lock(fcntl.LOCK_EX):
+            entries, _identity = self._read_from(0)
+            last_index = {_pair_key(entry): i for i, entry in enumerate(entries)}
+            kept = [entry for i, entry in enumerate(entries) if last_index[_pair_key(entry)] == i]
+            max_entries = max(1, int(self._max_entries()))
+            kept = kept[-max_entries:]
+            if len(kept) != len(entries):
+                self._replace_with(kept)
+        with self._state_lock:
+            self._appends_since_compaction = 0
+        return {"before": len(entries), "after": len(kept)}
+
+    def schedule_compaction(self) -> bool:
+        """Lance la compaction dans un thread de fond (une seule à la fois par processus)."""
+        with self._state_lock:
+            if self._compaction_thread is not None and self._compaction_thread.is_alive():
+                return False
+            self._compaction_thread = threading.Thread(
+                target=self._compact_quietly, name="r2-links-compaction", daemon=True,
+            )
+            self._compaction_thread.start()
+        return True
+
+    def join_compaction(self, timeout: Optional[float] = None) -> None:
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    # ------------------------------------------------------------------
+
+    def _read_from(self, offset: int) -> tuple[list[dict], Optional[tuple[int, int]]]:
+        try:
+            with open(self._path, "rb") as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if offset > 0:
+                    f.seek(offset - 1)
+                    if f.read(1) != b"\n":
+                        return [], None
+                data = f.read()
+        except FileNotFoundError:
+            return [], None
+        complete = data[: data.rfind(b"\n") + 1]
+        return _parse_lines(complete), (inode, offset + len(complete))
+
+    def _compaction_interval(self) -> int:
+        if self._compact_every:
+            return max(1, int(self._compact_every))
+        return max(1, int(self._max_entries()) // 10)
+
+    def _compact_quietly(self) -> None:
+        try:
+            result = self.compact()
+            logger.debug("R2_LINKS: Compaction %s -> %s entries", result["before"], result["after"])
+        except Exception as e:
+            logger.warning("R2_LINKS: Compaction failed: %s", e)
+
+    @contextmanager
+    def _writer_lock(self, mode: int) -> Iterator[None]:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _replace_with(self, entries: list[dict]) -> None:
+        fd, tmp_path = tempfile.mkstemp(prefix=self._path.name + ".", suffix=".tmp", dir=str(self._path.parent))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _ensure_jsonl(self) -> None:
+        """Convertit l'ancien tableau JSON en JSONL (vérifié à chaque ouverture: un fichier
+        réécrit en place par un outil externe est aussi migré)."""
+        if not self._is_legacy_array():
+            return
+        with self._writer_lock(fcntl.LOCK_EX):
+            if not self._is_legacy_array():
+                return
+            try:
+                legacy = json.loads(self._path.read_text(encoding="utf-8"))
+            except ValueError:
+                legacy = []
+            entries = [entry for entry in legacy if isinstance(entry, dict)] if isinstance(legacy, list) else []
+            self._replace_with(entries)
+            logger.info("R2_LINKS: Migrated %d link pair(s) from JSON array to JSONL", len(entries))
+
+    def _is_legacy_array(self) -> bool:
+        try:
+            with open(self._path, "rb") as f:
+                head = f.read(64).lstrip()
+        except FileNotFoundError:
+            return False
+        return head.startswith(b"[")
+
+
+def _pair_key(entry: dict) -> tuple:
+    return entry.get("source_url"), entry.get("r2_url"), entry.get("provider")
+
+
+def _parse_lines(data: bytes) -> list[dict]:
+    entries = []
+    for raw in data.splitlines():
+        if not raw.strip():
+            continue
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            continue
+        if isinstance(entry, dict):
+            entries.append(entry)
+    return entries
@@ -4,7 +4,9 @@ Service for transferring files to Cloudflare R2 with fetch mode.
 Features:
 - Singleton pattern
 - Remote fetch (R2 downloads directly from source) to save Render bandwidth
-- Persistence of source_url/r2_url pairs in webhook_links.json
+- Persistence of source_url/r2_url pairs in webhook_links.json (append-only JSONL, background compaction)
+- O(1) lookup of existing pairs through an index (Redis hash or in-process dict)
+- Reuse of already-offloaded links (max age, optional HEAD check) instead of a new fetch
 - Fallback support when R2 is unavailable
 - Secure logging (no secrets)
 """
@@ -13,16 +15,17 @@ from __future__ import annotations
 
 import logging
 import os
-import json
 import hashlib
 import html
 import time
-import fcntl
 import urllib.parse
 from pathlib import Path
 from typing import Dict, Optional, Any, List, Tuple
 from datetime import datetime, timezone
 
+from services.r2_link_index import R2LinkIndex
+from services.r2_links_store import R2LinksStore
+
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +53,8 @@ class R2TransferService:
         _enabled: Flag d'activation global
         _bucket_name: Nom du bucket R2
         _links_file: Chemin du fichier webhook_links.json
+        _links_store: Journal JSONL des paires (ajouts O_APPEND, compaction)
+        _link_index: Index des paires par URL source normalisée
     """
     
     _instance: Optional[R2TransferService] = None
@@ -82,6 +87,8 @@ class R2TransferService:
         
         enabled_str = os.environ.get("R2_FETCH_ENABLED", "false").strip().lower()
         self._enabled = enabled_str in ("1", "true", "yes", "on")
+        self._links_store = R2LinksStore(self._links_file, max_entries=self._max_links_entries)
+        self._link_index = R2LinkIndex(self.normalize_source_url)
         
         if self._enabled and not self._fetch_endpoint:
             pass
@@ -114,6 +121,15 @@ class R2TransferService:
         """Réinitialise l'instance (pour tests)."""
         cls._instance = None
     
+    def configure(self, redis_client=None, *, index_redis_key: Optional[str] = None) -> None:
+        """Injecte un client Redis pour partager l'index des liens entre workers.
+        
+        Args:
+            redis_client: Client Redis (None = index en mémoire du processus)
+            index_redis_key: Clé du hash Redis de l'index
+        """
+        self._link_index.configure(redis_client, redis_key=index_redis_key)
+    
     def is_enabled(self) -> bool:
         """Vérifie si le service est activé et configuré.
         
@@ -248,17 +264,21 @@ class R2TransferService:
         r2_url: str,
         provider: str,
         original_filename: Optional[str] = None,
+        fetch_duration_sec: Optional[float] = None,
     ) -> bool:
         """Persiste la paire source_url/r2_url dans webhook_links.json.
         
-        Utilise un verrouillage fichier (fcntl) pour garantir l'intégrité
-        en environnement multi-processus (Gunicorn).
+        Ajoute une ligne JSON (O_APPEND, verrou partagé entre workers) au lieu
+        de réécrire le fichier. Une paire identique à la plus récente connue
+        pour cette URL n'est pas réécrite; le dédoublonnage complet et la
+        rotation (R2_LINKS_MAX_ENTRIES) sont faits par la compaction de fond.
         
         Args:
             source_url: URL source du fichier
             r2_url: URL R2 publique du fichier
             provider: Nom du provider
             original_filename: Nom de fichier original (best-effort, optionnel)
+            fetch_duration_sec: Durée du fetch distant (temps économisé à chaque réutilisation)
             
         Returns:
             True si succès, False si échec
@@ -269,60 +289,32 @@ class R2TransferService:
         normalized_source_url = self.normalize_source_url(source_url, provider)
         
         try:
-            self._links_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            if not self._links_file.exists():
-                with open(self._links_file, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
-            
-            with open(self._links_file, 'r+', encoding='utf-8') as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                
-                try:
-                    f.seek(0)
-                    try:
-                        links = json.load(f)
-                        if not isinstance(links, list):
-                            links = []
-                    except json.JSONDecodeError:
-                        links = []
-                    
-                    entry = {
-                        "source_url": normalized_source_url,
-                        "r2_url": r2_url,
-                        "provider": provider,
-                        "created_at": datetime.now(timezone.utc).isoformat(),
-                    }
-
-                    if isinstance(original_filename, str):
-                        cleaned_original_filename = original_filename.strip()
-                        if cleaned_original_filename:
-                            entry["original_filename"] = cleaned_original_filename
-
-                    for existing in reversed(links):
-                        if not isinstance(existing, dict):
-                            continue
-                        if (
-                            existing.get("source_url") == entry["source_url"]
-                            and existing.get("r2_url") == entry["r2_url"]
-                            and existing.get("provider") == entry["provider"]
-                        ):
-                            return True
-                    
-                    links.append(entry)
-                    
-                    max_entries = int(os.environ.get("R2_LINKS_MAX_ENTRIES", "1000"))
-                    if len(links) > max_entries:
-                        links = links[-max_entries:]
-                    
-                    f.seek(0)
-                    f.truncate()
-                    json.dump(links, f, indent=2, ensure_ascii=False)
-                    
-                    return True
-                    
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            existing = self.find_link_pair(normalized_source_url)
+            if (
+                existing
+                and existing.get("source_url") == normalized_source_url
+                and existing.get("r2_url") == r2_url
+                and existing.get("provider") == provider
+            ):
+                return True
+
+            entry = {
+                "source_url": normalized_source_url,
+                "r2_url": r2_url,
+                "provider": provider,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+
+            if isinstance(original_filename, str):
+                cleaned_original_filename = original_filename.strip()
+                if cleaned_original_filename:
+                    entry["original_filename"] = cleaned_original_filename
+
+            if isinstance(fetch_duration_sec, (int, float)) and fetch_duration_sec >= 0:
+                entry["fetch_duration_sec"] = round(float(fetch_duration_sec), 3)
+
+            self._links_store.append(entry)
+            return True
                     
         except Exception:
             return False
@@ -336,55 +328,80 @@ class R2TransferService:
         Returns:
             URL R2 si trouvée, None sinon
         """
-        try:
-            if not self._links_file.exists():
-                return None
-
-            normalized_input_by_provider: Dict[str, str] = {}
+        entry = self.find_link_pair(source_url)
+        return entry.get("r2_url") if entry else None
+    
+    def find_link_pair(self, source_url: str) -> Optional[Dict[str, Any]]:
+        """Recherche la paire la plus récente pour une URL source (via l'index).
+        
+        L'URL est comparée sous sa forme normalisée pour le provider de chaque
+        paire; seules les lignes ajoutées depuis la dernière recherche sont lues.
+        
+        Args:
+            source_url: URL source à rechercher
             
-            with open(self._links_file, 'r', encoding='utf-8') as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-                
-                try:
-                    links = json.load(f)
-                    if not isinstance(links, list):
-                        return None
-                    
-                    for entry in reversed(links):
-                        if not isinstance(entry, dict):
-                            continue
-
-                        entry_source_url = entry.get("source_url")
-                        if not entry_source_url:
-                            continue
-
-                        if entry_source_url == source_url:
-                            return entry.get("r2_url")
-
-                        entry_provider = entry.get("provider") or ""
-                        if entry_provider not in normalized_input_by_provider:
-                            normalized_input_by_provider[entry_provider] = self.normalize_source_url(
-                                source_url, entry_provider
-                            )
-                        normalized_input = normalized_input_by_provider[entry_provider]
-
-                        if entry_source_url == normalized_input:
-                            return entry.get("r2_url")
-
-                        entry_source_url_normalized = self.normalize_source_url(
-                            entry_source_url, entry_provider
-                        )
-                        if entry_source_url_normalized == normalized_input:
-                            return entry.get("r2_url")
-                    
-                    return None
-                    
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                    
+        Returns:
+            Entrée (source_url, r2_url, provider, created_at...) si trouvée, None sinon
+        """
+        try:
+            return self._link_index.lookup(
+                source_url, self._links_store, max_entries=self._max_links_entries()
+            )
         except Exception:
             return None
     
+    def find_reusable_link(
+        self,
+        source_url: str,
+        provider: str,
+        *,
+        max_age_sec: int,
+        validate: bool = False,
+        validate_timeout: int = 5,
+    ) -> Optional[Dict[str, Any]]:
+        """Paire déjà transférée pour ce lien exact, réutilisable sans nouveau fetch distant.
+        
+        Args:
+            source_url: URL source (normalisée pour `provider`)
+            provider: Nom du provider
+            max_age_sec: Âge maximal de la paire (created_at)
+            validate: Vérifie d'abord que l'objet R2 répond à un HEAD
+            validate_timeout: Timeout du HEAD en secondes
+            
+        Returns:
+            Entrée de la paire si réutilisable, None sinon (fetch distant nécessaire)
+        """
+        if max_age_sec <= 0:
+            return None
+        normalized = self.normalize_source_url(source_url, provider)
+        entry = self.find_link_pair(normalized)
+        if not entry or entry.get("source_url") != normalized or not entry.get("r2_url"):
+            return None
+        try:
+            created_at = datetime.fromisoformat(str(entry.get("created_at")))
+        except ValueError:
+            return None
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        if (datetime.now(timezone.utc) - created_at).total_seconds() > max_age_sec:
+            return None
+        if validate and not self._is_r2_url_reachable(entry["r2_url"], validate_timeout):
+            return None
+        return entry
+    
+    def _is_r2_url_reachable(self, r2_url: str, timeout: int) -> bool:
+        if requests is None:
+            return False
+        try:
+            response = requests.head(r2_url, timeout=timeout, allow_redirects=True)
+            return response.status_code < 400
+        except requests.exceptions.RequestException:
+            return False
+    
+    @staticmethod
+    def _max_links_entries() -> int:
+        return int(os.environ.get("R2_LINKS_MAX_ENTRIES", "1000"))
+    
     def _generate_object_key(self, source_url: str, provider: str) -> str:
         """Génère un nom d'objet unique pour R2.
         
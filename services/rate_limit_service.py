@@ -5,32 +5,254 @@ services.rate_limit_service
 Service centralisé gérant le rate limiting avec Redis (partagé entre workers)
 et fallback mémoire local.
 
+`allow_send()` vérifie la limite ET réserve le créneau en une seule opération
+atomique: un script Lua (un aller-retour Redis), ou, si le serveur n'accepte
+pas les scripts, une transaction optimiste WATCH/MULTI rejouée en cas de
+conflit. Deux workers ne peuvent donc plus passer tous les deux à `limit - 1`.
+
+Scopes: la limite globale (`rate_limit_per_hour`) peut être complétée par une
+limite par URL de webhook et par règle de routage. Un envoi réserve un créneau
+dans tous ses scopes à la fois, ou dans aucun; en cas de refus, le délai avant
+le prochain créneau commun est retourné (ETA du pacing).
+
+Algorithmes (WEBHOOK_RATE_LIMIT_ALGORITHM):
+- sliding_window: fenêtre glissante d'une heure (ZSET, un membre par envoi)
+- token_bucket: seau de `limit` jetons rechargé en continu sur une heure (HASH)
+- gcra: Generic Cell Rate Algorithm, un seul timestamp (TAT) par clé, mémoire O(1)
+
 Features:
-- Redis ZSET-based sliding window (partagé entre workers Gunicorn)
-- Fallback mémoire local (deque) si Redis indisponible
+- Check-and-reserve atomique partagé entre workers Gunicorn, multi-scopes
+- Quota restant par scope (dashboard)
+- Fallback mémoire local (verrou + mêmes algorithmes) si Redis indisponible
 - Pattern Singleton
 
 Usage:
-    from services.rate_limit_service import RateLimitService
+    from services.rate_limit_service import RateLimitService, webhook_url_scope
 
     rls = RateLimitService.get_instance()
-    rls.configure(redis_client=redis_client)
+    rls.configure(redis_client=redis_client, algorithm="gcra")
 
-    if rls.allow_send(limit_per_hour=5):
+    if rls.allow_send(limit_per_hour=5, scopes=[webhook_url_scope(url, 30)]):
+        # créneau réservé: send webhook...
         rls.record_event()
-        # send webhook...
 """
 
 from __future__ import annotations
 
+import hashlib
+import math
+import re
+import threading
 import time
 import uuid
 from collections import deque
-from typing import Optional
+from typing import Any, Callable, Iterable, Optional, Sequence
 
-from utils.rate_limit import prune_and_allow_send, record_send_event
+from utils.rate_limit import record_send_event
+from utils.text_helpers import mask_url
 
 _REDIS_KEY = "r:ss:rate_limit:webhooks"
+_WINDOW_SEC = 3600
+_KEY_TTL_MARGIN_SEC = 300
+_MAX_WATCH_RETRIES = 50
+
+ALGORITHM_SLIDING_WINDOW = "sliding_window"
+ALGORITHM_TOKEN_BUCKET = "token_bucket"
+ALGORITHM_GCRA = "gcra"
+ALGORITHMS = (ALGORITHM_SLIDING_WINDOW, ALGORITHM_TOKEN_BUCKET, ALGORITHM_GCRA)
+
+SCOPE_GLOBAL = "global"
+
+# Chaque script traite KEYS[i] avec la limite ARGV[4 + i] et retourne
+# {autorisé (0/1), délai avant le prochain créneau commun en ms}.
+# Rien n'est réservé tant qu'un seul scope refuse.
+_SLIDING_WINDOW_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local wait_ms = 0
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= tonumber(ARGV[4 + i]) then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        wait_ms = math.max(wait_ms, 1, math.ceil((tonumber(oldest[2]) + window - now) * 1000))
+    end
+end
+if wait_ms > 0 then
+    return {0, wait_ms}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[3])
+    redis.call('EXPIRE', key, math.ceil(window) + tonumber(ARGV[4]))
+end
+return {1, 0}
+"""
+
+_TOKEN_BUCKET_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local wait_ms = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[4 + i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1])
+    local ts = tonumber(state[2])
+    if tokens == nil or ts == nil then
+        tokens = limit
+        ts = now
+    end
+    tokens = math.min(limit, tokens + math.max(0, now - ts) * limit / window)
+    if tokens < 1 then
+        wait_ms = math.max(wait_ms, math.ceil((1 - tokens) * window / limit * 1000))
+    end
+    levels[i] = tokens
+end
+if wait_ms > 0 then
+    return {0, wait_ms}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - 1), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(window) + tonumber(ARGV[4]))
+end
+return {1, 0}
+"""
+
+_GCRA_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local wait_ms = 0
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local interval = window / tonumber(ARGV[4 + i])
+    local tat = tonumber(redis.call('GET', key)) or now
+    if tat < now then
+        tat = now
+    end
+    local wait = tat - now - (window - interval)
+    if wait > 0 then
+        wait_ms = math.max(wait_ms, math.ceil(wait * 1000))
+    end
+    tats[i] = tat + interval
+end
+if wait_ms > 0 then
+    return {0, wait_ms}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tostring(tats[i]), 'PX', math.ceil((tats[i] - now) * 1000))
+end
+return {1, 0}
+"""
+
+
+def webhook_url_scope(webhook_url: str, limit_per_hour: int) -> tuple[str, int, str]:
+    """Scope (nom, limite, libellé) d'une URL de destination: clé hachée, libellé masqué."""
+    digest = hashlib.sha1(str(webhook_url or "").strip().encode("utf-8")).hexdigest()[:16]
+    return f"url:{digest}", int(limit_per_hour or 0), mask_url(webhook_url)
+
+
+def routing_rule_scope(rule_id: str, limit_per_hour: int, rule_name: Optional[str] = None) -> tuple[str, int, str]:
+    """Scope (nom, limite, libellé) d'une règle de routage."""
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(rule_id or "unknown"))[:64]
+    return f"rule:{safe_id}", int(limit_per_hour or 0), str(rule_name or rule_id or "unknown")
+
+
+class _SlidingWindow:
+    """État: (nombre d'envois dans la fenêtre, timestamp du plus ancien)."""
+
+    lua = _SLIDING_WINDOW_LUA
+
+    def read_redis(self, reader, key: str, now: float):
+        horizon = f"({now - _WINDOW_SEC}"
+        count = int(reader.zcount(key, horizon, "+inf"))
+        oldest = reader.zrangebyscore(key, horizon, "+inf", start=0, num=1, withscores=True) if count else []
+        return count, (float(oldest[0][1]) if oldest else None)
+
+    def read_local(self, store: dict, key: str, now: float):
+        send_times = store.setdefault(key, deque())
+        # Même borne que la fenêtre Redis: un envoi vieux d'exactement une heure est expiré
+        while send_times and now - send_times[0] >= _WINDOW_SEC:
+            send_times.popleft()
+        return len(send_times), (send_times[0] if send_times else None)
+
+    def step(self, state, now: float, limit: int) -> tuple[bool, Any, float, int]:
+        """Retourne (autorisé, nouvel état, délai avant le prochain créneau, quota restant)."""
+        count, oldest = state
+        remaining = max(0, limit - count)
+        if remaining:
+            return True, None, 0.0, remaining
+        return False, None, max(0.001, (oldest if oldest is not None else now) + _WINDOW_SEC - now), 0
+
+    def write_redis(self, pipe, key: str, _new_state, now: float) -> None:
+        pipe.zremrangebyscore(key, "-inf", now - _WINDOW_SEC)
+        pipe.zadd(key, {uuid.uuid4().hex: now})
+        pipe.expire(key, _WINDOW_SEC + _KEY_TTL_MARGIN_SEC)
+
+    def write_local(self, store: dict, key: str, _new_state, now: float) -> None:
+        record_send_event(store.setdefault(key, deque()), ts=now)
+
+
+class _TokenBucket:
+    """État: (jetons, timestamp de la dernière mise à jour)."""
+
+    lua = _TOKEN_BUCKET_LUA
+
+    def read_redis(self, reader, key: str, now: float):
+        tokens, ts = reader.hmget(key, "tokens", "ts")
+        return (float(tokens) if tokens is not None else None), (float(ts) if ts is not None else None)
+
+    def read_local(self, store: dict, key: str, now: float):
+        return store.get(key, (None, None))
+
+    def step(self, state, now: float, limit: int) -> tuple[bool, Any, float, int]:
+        tokens, ts = state
+        if tokens is None or ts is None:
+            tokens, ts = float(limit), now
+        tokens = min(float(limit), tokens + max(0.0, now - ts) * limit / _WINDOW_SEC)
+        if tokens >= 1:
+            return True, tokens - 1, 0.0, int(tokens)
+        return False, tokens, (1 - tokens) * _WINDOW_SEC / limit, 0
+
+    def write_redis(self, pipe, key: str, new_state, now: float) -> None:
+        pipe.hset(key, mapping={"tokens": repr(new_state), "ts": repr(now)})
+        pipe.expire(key, _WINDOW_SEC + _KEY_TTL_MARGIN_SEC)
+
+    def write_local(self, store: dict, key: str, new_state, now: float) -> None:
+        store[key] = (new_state, now)
+
+
+class _Gcra:
+    """État: TAT (theoretical arrival time), un seul nombre par clé."""
+
+    lua = _GCRA_LUA
+
+    def read_redis(self, reader, key: str, now: float):
+        raw = reader.get(key)
+        return float(raw) if raw is not None else None
+
+    def read_local(self, store: dict, key: str, now: float):
+        return store.get(key)
+
+    def step(self, state, now: float, limit: int) -> tuple[bool, Any, float, int]:
+        interval = _WINDOW_SEC / limit
+        tat = max(state if state is not None else now, now)
+        remaining = min(limit, int((now + _WINDOW_SEC - tat) / interval + 1e-9))
+        wait = tat - now - (_WINDOW_SEC - interval)
+        if wait > 0:
+            return False, tat, wait, 0
+        return True, tat + interval, 0.0, remaining
+
+    def write_redis(self, pipe, key: str, new_state, now: float) -> None:
+        pipe.set(key, repr(new_state), px=max(1, math.ceil((new_state - now) * 1000)))
+
+    def write_local(self, store: dict, key: str, new_state, now: float) -> None:
+        store[key] = new_state
+
+
+_STRATEGIES = {
+    ALGORITHM_SLIDING_WINDOW: _SlidingWindow(),
+    ALGORITHM_TOKEN_BUCKET: _TokenBucket(),
+    ALGORITHM_GCRA: _Gcra(),
+}
 
 
 class RateLimitService:
@@ -41,6 +263,14 @@ class RateLimitService:
             raise RuntimeError("RateLimitService is a singleton. Use get_instance().")
         self._webhook_send_times: deque[float] = deque()
         self._redis_client = None
+        self._algorithm = ALGORITHM_SLIDING_WINDOW
+        self._clock: Callable[[], float] = time.time
+        self._scripts: dict = {}
+        self._scripting_supported = True
+        self._local_state: dict = {_REDIS_KEY: self._webhook_send_times}
+        self._local_lock = threading.Lock()
+        self._known_scopes: dict[str, dict] = {}
+        self._sent_events = 0
 
     @classmethod
     def get_instance(cls) -> RateLimitService:
@@ -52,46 +282,180 @@ class RateLimitService:
     def reset_instance(cls) -> None:
         cls._instance = None
 
-    def configure(self, redis_client=None) -> None:
-        """Injecte un client Redis pour le rate limiting distribué."""
+    def configure(self, redis_client=None, *, algorithm: Optional[str] = None) -> None:
+        """Injecte un client Redis pour le rate limiting distribué (et l'algorithme)."""
         self._redis_client = redis_client
+        self._scripts = {}
+        self._scripting_supported = True
+        if algorithm:
+            algorithm = str(algorithm).strip().lower()
+            self._algorithm = algorithm if algorithm in ALGORITHMS else ALGORITHM_SLIDING_WINDOW
+
+    @property
+    def algorithm(self) -> str:
+        return self._algorithm
+
+    def allow_send(self, limit_per_hour: int, scopes: Iterable[tuple] = ()) -> bool:
+        """Vérifie la limite par heure (et celles des `scopes`) et réserve le créneau si l'envoi est autorisé.
 
-    def allow_send(self, limit_per_hour: int) -> bool:
-        """Vérifie si on peut envoyer en fonction de la limite par heure.
+        0 (ou moins) désactive une limite. Utilise Redis si disponible, fallback mémoire.
+        """
+        allowed, _retry_after = self.acquire([(SCOPE_GLOBAL, limit_per_hour, SCOPE_GLOBAL), *scopes])
+        return allowed
+
+    def acquire(self, scopes: Iterable[tuple]) -> tuple[bool, float]:
+        """Réserve un créneau dans tous les scopes (nom, limite[, libellé]), ou dans aucun.
 
-        Utilise Redis (ZSET) si disponible, fallback sur deque mémoire.
+        Returns (autorisé, délai en secondes avant le prochain créneau commun).
         """
+        keys_limits = [(self._storage_key(name), limit) for name, limit in self._active_scopes(scopes)]
+        if not keys_limits:
+            return True, 0.0
         if self._redis_client:
             try:
-                return self._allow_send_redis(limit_per_hour)
+                return self._acquire_redis(keys_limits)
             except Exception:
                 pass
-        return prune_and_allow_send(self._webhook_send_times, limit_per_hour)
+        return self._acquire_local(keys_limits)
+
+    def retry_after(self, scopes: Iterable[tuple]) -> float:
+        """Délai (secondes) avant qu'un envoi soumis à ces scopes puisse passer, sans rien réserver."""
+        return max((quota["next_slot_in_sec"] for quota in self._peek(self._active_scopes(scopes))), default=0.0)
+
+    def get_quotas(self) -> list[dict]:
+        """Quota restant des scopes vus par ce worker (état lu dans Redis si disponible)."""
+        with self._local_lock:
+            known = [(name, entry["limit_per_hour"]) for name, entry in self._known_scopes.items()]
+        return sorted(self._peek(known), key=lambda q: (q["scope"] != SCOPE_GLOBAL, q["scope"]))
 
     def record_event(self) -> None:
-        """Enregistre un envoi réussi."""
-        if self._redis_client:
+        """Compte un envoi effectif (statistiques).
+
+        Le créneau a déjà été réservé par allow_send(): ne rien réécrire dans la
+        fenêtre, sinon chaque envoi serait compté deux fois.
+        """
+        with self._local_lock:
+            self._sent_events += 1
+
+    def get_stats(self) -> dict:
+        with self._local_lock:
+            sent = self._sent_events
+        return {
+            "algorithm": self._algorithm,
+            "backend": "redis" if self._redis_client else "memory",
+            "atomic_mode": ("lua" if self._scripting_supported else "watch_multi") if self._redis_client else "local_lock",
+            "sent_events": sent,
+        }
+
+    # ------------------------------------------------------------------
+    # Check-and-reserve
+    # ------------------------------------------------------------------
+
+    def _active_scopes(self, scopes: Iterable[tuple]) -> list[tuple[str, int]]:
+        """Retient les scopes limités (> 0) et les enregistre pour get_quotas()."""
+        active = []
+        with self._local_lock:
+            for scope in scopes:
+                name, limit = str(scope[0]), int(scope[1] or 0)
+                if limit <= 0:
+                    continue
+                self._known_scopes[name] = {"label": scope[2] if len(scope) > 2 else name, "limit_per_hour": limit}
+                active.append((name, limit))
+        return active
+
+    def _storage_key(self, scope_name: str) -> str:
+        # Le ZSET historique garde sa clé; les autres algorithmes ont leur propre type Redis
+        key = _REDIS_KEY if scope_name == SCOPE_GLOBAL else f"{_REDIS_KEY}:{scope_name}"
+        if self._algorithm == ALGORITHM_SLIDING_WINDOW:
+            return key
+        return f"{key}:{self._algorithm}"
+
+    def _acquire_redis(self, keys_limits: list[tuple[str, int]]) -> tuple[bool, float]:
+        if self._scripting_supported:
             try:
-                self._record_event_redis()
-                return
-            except Exception:
-                pass
-        record_send_event(self._webhook_send_times)
-
-    def _allow_send_redis(self, limit_per_hour: int) -> bool:
-        now = time.time()
-        one_hour_ago = now - 3600
-        self._redis_client.zremrangebyscore(_REDIS_KEY, 0, one_hour_ago)
-        count = self._redis_client.zcard(_REDIS_KEY)
-        if count >= limit_per_hour:
-            return False
-        entry_id = str(uuid.uuid4())
-        self._redis_client.zadd(_REDIS_KEY, {entry_id: now})
-        self._redis_client.expire(_REDIS_KEY, 3900)
-        return True
-
-    def _record_event_redis(self) -> None:
-        now = time.time()
-        entry_id = str(uuid.uuid4())
-        self._redis_client.zadd(_REDIS_KEY, {entry_id: now})
-        self._redis_client.expire(_REDIS_KEY, 3900)
+                return self._acquire_lua(keys_limits)
+            except Exception as e:
+                if "unknown command" not in str(e).lower():
+                    raise
+                # Serveur sans EVAL (proxy managé, fakeredis...): transaction optimiste
+                self._scripting_supported = False
+        return self._acquire_watch(keys_limits)
+
+    def _acquire_lua(self, keys_limits: list[tuple[str, int]]) -> tuple[bool, float]:
+        script = self._scripts.get(self._algorithm)
+        if script is None:
+            script = self._scripts[self._algorithm] = self._redis_client.register_script(
+                _STRATEGIES[self._algorithm].lua
+            )
+        allowed, wait_ms = script(
+            keys=[key for key, _limit in keys_limits],
+            args=[
+                repr(self._clock()), _WINDOW_SEC, uuid.uuid4().hex, _KEY_TTL_MARGIN_SEC,
+                *[limit for _key, limit in keys_limits],
+            ],
+        )
+        return bool(int(allowed)), int(wait_ms) / 1000.0
+
+    def _acquire_watch(self, keys_limits: list[tuple[str, int]]) -> tuple[bool, float]:
+        from redis.exceptions import WatchError
+
+        strategy = _STRATEGIES[self._algorithm]
+        for _ in range(_MAX_WATCH_RETRIES):
+            with self._redis_client.pipeline() as pipe:
+                try:
+                    pipe.watch(*[key for key, _limit in keys_limits])
+                    now = self._clock()
+                    steps = [strategy.step(strategy.read_redis(pipe, key, now), now, limit) for key, limit in keys_limits]
+                    # Pas d'écriture avant MULTI: une clé modifiée après WATCH invaliderait la transaction
+                    pipe.multi()
+                    allowed = all(step[0] for step in steps)
+                    if allowed:
+                        for (key, _limit), step in zip(keys_limits, steps):
+                            strategy.write_redis(pipe, key, step[1], now)
+                    pipe.execute()
+                    return allowed, max(step[2] for step in steps)
+                except WatchError:
+                    continue
+        # Contention persistante: refuser plutôt que risquer de dépasser la limite
+        return False, 1.0
+
+    def _acquire_local(self, keys_limits: list[tuple[str, int]]) -> tuple[bool, float]:
+        strategy = _STRATEGIES[self._algorithm]
+        now = self._clock()
+        with self._local_lock:
+            steps = [
+                strategy.step(strategy.read_local(self._local_state, key, now), now, limit)
+                for key, limit in keys_limits
+            ]
+            allowed = all(step[0] for step in steps)
+            if allowed:
+                for (key, _limit), step in zip(keys_limits, steps):
+                    strategy.write_local(self._local_state, key, step[1], now)
+        return allowed, max(step[2] for step in steps)
+
+    def _peek(self, scopes: Sequence[tuple[str, int]]) -> list[dict]:
+        strategy = _STRATEGIES[self._algorithm]
+        now = self._clock()
+        quotas = []
+        for name, limit in scopes:
+            key = self._storage_key(name)
+            state, read_from_redis = None, False
+            if self._redis_client:
+                try:
+                    # Clé absente (None) = quota plein; le repli local ne sert qu'en cas d'erreur Redis
+                    state, read_from_redis = strategy.read_redis(self._redis_client, key, now), True
+                except Exception:
+                    pass
+            with self._local_lock:
+                if not read_from_redis:
+                    state = strategy.read_local(self._local_state, key, now)
+                label = self._known_scopes.get(name, {}).get("label", name)
+            _allowed, _new_state, wait, remaining = strategy.step(state, now, limit)
+            quotas.append({
+                "scope": name,
+                "label": label,
+                "limit_per_hour": limit,
+                "remaining": remaining,
+                "next_slot_in_sec": round(wait, 3),
+            })
+        return quotas
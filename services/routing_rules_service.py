@@ -21,6 +21,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from typing_extensions import TypedDict
 
+from email_processing.payloads import PAYLOAD_PROFILES
 from utils.validators import normalize_make_webhook_url
 
 try:
@@ -46,12 +47,22 @@ class RoutingRuleCondition(TypedDict):
     case_sensitive: bool
 
 
-class RoutingRuleAction(TypedDict):
-    """Action à exécuter lorsqu'une règle match."""
+class RoutingRuleAction(TypedDict, total=False):
+    """Action à exécuter lorsqu'une règle match.
+
+    payload_profile / payload_max_kb / gzip / batch sont optionnels (profil de
+    payload et envoi groupé propres à la destination de la règle).
+    rate_limit_per_hour (optionnel) plafonne les envois déclenchés par la règle.
+    """
 
     webhook_url: str
     priority: str
     stop_processing: bool
+    payload_profile: str
+    payload_max_kb: int
+    gzip: bool
+    batch: bool
+    rate_limit_per_hour: int
 
 
 class RoutingRule(TypedDict):
@@ -352,8 +363,36 @@ class RoutingRulesService:
 
         stop_processing = bool(actions_raw.get("stop_processing", False))
 
-        return True, "ok", {
+        actions: RoutingRuleAction = {
             "webhook_url": normalized_url,
             "priority": priority,
             "stop_processing": stop_processing,
         }
+        if actions_raw.get("payload_profile") not in (None, ""):
+            payload_profile = str(actions_raw.get("payload_profile")).strip().lower()
+            if payload_profile not in PAYLOAD_PROFILES:
+                return False, f"payload_profile invalide ({'|'.join(PAYLOAD_PROFILES)}).", None
+            actions["payload_profile"] = payload_profile
+        if actions_raw.get("payload_max_kb") not in (None, ""):
+            try:
+                payload_max_kb = int(actions_raw.get("payload_max_kb"))
+            except (TypeError, ValueError):
+                payload_max_kb = 0
+            if not 1 <= payload_max_kb <= 1024:
+                return False, "payload_max_kb hors limites (1..1024).", None
+            actions["payload_max_kb"] = payload_max_kb
+        if "gzip" in actions_raw:
+            actions["gzip"] = bool(actions_raw.get("gzip"))
+        if "batch" in actions_raw:
+            actions["batch"] = bool(actions_raw.get("batch"))
+        if actions_raw.get("rate_limit_per_hour") not in (None, ""):
+            try:
+                rate_limit_per_hour = int(actions_raw.get("rate_limit_per_hour"))
+            except (TypeError, ValueError):
+                rate_limit_per_hour = -1
+            if not 0 <= rate_limit_per_hour <= 100000:
+                return False, "rate_limit_per_hour hors limites (0..100000).", None
+            if rate_limit_per_hour:
+                actions["rate_limit_per_hour"] = rate_limit_per_hour
+
+        return True, "ok", actions
@@ -2,13 +2,17 @@
 services.runtime_metrics_service
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-Singleton service tracking runtime metrics: process start time and last poll cycle.
+Singleton service tracking runtime metrics: process start time, last poll cycle and its stats,
+webhook payload size histograms (per payload profile).
 """
 from __future__ import annotations
 
 import threading
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Optional
+
+# Bornes (octets) de l'histogramme des tailles de payload webhook
+PAYLOAD_SIZE_BUCKETS = (1024, 4 * 1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024)
 
 
 class RuntimeMetricsService:
@@ -20,6 +24,9 @@ class RuntimeMetricsService:
             raise RuntimeError("RuntimeMetricsService is a singleton. Use get_instance().")
         self._process_start_time: Optional[datetime] = datetime.now(timezone.utc)
         self._last_poll_cycle_ts: Optional[int] = None
+        self._last_poll_cycle_stats: dict[str, Any] = {}
+        self._payload_sizes: dict[str, dict[str, Any]] = {}
+        self._payload_sizes_lock = threading.Lock()
 
     @classmethod
     def get_instance(cls) -> RuntimeMetricsService:
@@ -44,3 +51,43 @@ class RuntimeMetricsService:
 
     def set_last_poll_cycle_ts(self, ts: int) -> None:
         self._last_poll_cycle_ts = ts
+
+    def get_last_poll_cycle_stats(self) -> dict[str, Any]:
+        return dict(self._last_poll_cycle_stats)
+
+    def set_last_poll_cycle_stats(self, stats: dict[str, Any]) -> None:
+        self._last_poll_cycle_stats = dict(stats)
+
+    def record_payload_size(self, profile: str, payload_size_bytes: int, wire_size_bytes: int) -> None:
+        """Adds one webhook send to the payload size histogram of its profile.
+
+        `wire_size_bytes` is the size on the wire (after gzip when enabled).
+        """
+        with self._payload_sizes_lock:
+            entry = self._payload_sizes.setdefault(profile, {
+                "count": 0,
+                "payload_bytes_total": 0,
+                "wire_bytes_total": 0,
+                "buckets": [0] * (len(PAYLOAD_SIZE_BUCKETS) + 1),
+            })
+            entry["count"] += 1
+            entry["payload_bytes_total"] += int(payload_size_bytes)
+            entry["wire_bytes_total"] += int(wire_size_bytes)
+            index = next(
+                (i for i, bound in enumerate(PAYLOAD_SIZE_BUCKETS) if payload_size_bytes <= bound),
+                len(PAYLOAD_SIZE_BUCKETS),
+            )
+            entry["buckets"][index] += 1
+
+    def get_payload_size_stats(self) -> dict[str, Any]:
+        labels = [f"<={bound // 1024}KB" for bound in PAYLOAD_SIZE_BUCKETS] + [f">{PAYLOAD_SIZE_BUCKETS[-1] // 1024}KB"]
+        with self._payload_sizes_lock:
+            return {
+                profile: {
+                    "count": entry["count"],
+                    "payload_bytes_total": entry["payload_bytes_total"],
+                    "wire_bytes_total": entry["wire_bytes_total"],
+                    "histogram": dict(zip(labels, entry["buckets"])),
+                }
+                for profile, entry in self._payload_sizes.items()
+            }
@@ -0,0 +1,218 @@
+"""
+services.webhook_latency_service
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Timeouts adaptatifs et budget de retries pour les envois webhook.
+
+`webhook_timeout_sec` / `retry_count` (préférences de traitement) sont des
+valeurs fixes: trop généreuses, un récepteur lent bloque le cycle; trop
+serrées, on compte de faux échecs. Ce service tient, par URL de destination,
+un histogramme glissant des latences observées (buckets logarithmiques sur les
+N derniers envois) et en dérive le timeout: p99 × facteur, borné par
+[`min_timeout_sec`, timeout configuré]. Tant que l'historique est trop court,
+le timeout configuré s'applique tel quel.
+
+Un envoi en échec (timeout, connexion refusée) compte aussi: sa durée est un
+échantillon censuré (la latence réelle est au moins celle-là, au moins le
+timeout appliqué en cas de timeout). Sans cela, un récepteur devenu plus lent
+que le timeout appris échouerait indéfiniment sans jamais le faire remonter.
+
+Le budget de retries est global: sur une fenêtre glissante, les retries ne
+peuvent dépasser `retry_ratio` × nombre d'envois (plus un minimum fixe), si
+bien qu'une panne du récepteur ne multiplie pas la charge par `retry_count + 1`.
+
+Features:
+- Histogramme glissant par URL (mémoire bornée, percentiles p50/p90/p99)
+- Budget de retries global (fenêtre glissante)
+- Mémoire locale au processus: chaque worker apprend de ses propres envois
+- Pattern Singleton
+
+Usage:
+    from services.webhook_latency_service import WebhookLatencyService
+
+    latency = WebhookLatencyService.get_instance()
+    timeout = latency.timeout_for(webhook_url, configured_timeout_sec)
+    latency.record_latency(webhook_url, elapsed_sec)
+    latency.record_failed_attempt(webhook_url, elapsed_sec, timeout_sec=timeout)  # timeout / erreur réseau
+    if latency.try_acquire_retry():
+        ...
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from utils.text_helpers import mask_url
+
+# Bornes supérieures des buckets (secondes): 10 ms × 1.25^k jusqu'à ~5 min
+_BUCKET_BOUNDS = tuple(0.01 * 1.25 ** k for k in range(int(math.log(300 / 0.01, 1.25)) + 2))
+
+
+class _RollingHistogram:
+    """Histogramme des `window` dernières latences (un index de bucket par échantillon)."""
+
+    def __init__(self, window: int) -> None:
+        self._samples: deque[int] = deque()
+        self._counts = [0] * len(_BUCKET_BOUNDS)
+        self._window = window
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, latency_sec: float) -> None:
+        index = min(bisect.bisect_left(_BUCKET_BOUNDS, latency_sec), len(_BUCKET_BOUNDS) - 1)
+        self._samples.append(index)
+        self._counts[index] += 1
+        if len(self._samples) > self._window:
+            self._counts[self._samples.popleft()] -= 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Borne supérieure du bucket contenant le quantile q (0..1)."""
+        total = len(self._samples)
+        if not total:
+            return None
+        rank = max(1, math.ceil(q * total))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return _BUCKET_BOUNDS[index]
+        return _BUCKET_BOUNDS[-1]
+
+
+class WebhookLatencyService:
+    _instance: Optional[WebhookLatencyService] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        window: int = 200,
+        min_samples: int = 20,
+        timeout_factor: float = 3.0,
+        min_timeout_sec: float = 2.0,
+        retry_ratio: float = 0.2,
+        retry_min_per_window: int = 3,
+        retry_window_sec: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._window = max(1, int(window))
+        self._min_samples = max(1, int(min_samples))
+        self._timeout_factor = max(1.0, float(timeout_factor))
+        self._min_timeout_sec = max(0.01, float(min_timeout_sec))
+        self._retry_ratio = max(0.0, float(retry_ratio))
+        self._retry_min_per_window = max(0, int(retry_min_per_window))
+        self._retry_window_sec = max(1.0, float(retry_window_sec))
+        self._clock = clock
+        self._histograms: dict[str, _RollingHistogram] = {}
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self._retries_denied = 0
+        self._state_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> WebhookLatencyService:
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._lock:
+            cls._instance = None
+
+    def configure(self, **kwargs) -> None:
+        """Met à jour les paramètres (mêmes noms que le constructeur), historique conservé."""
+        with self._state_lock:
+            for name in (
+                "window", "min_samples", "timeout_factor", "min_timeout_sec",
+                "retry_ratio", "retry_min_per_window", "retry_window_sec",
+            ):
+                if kwargs.get(name) is not None:
+                    setattr(self, f"_{name}", type(getattr(self, f"_{name}"))(kwargs[name]))
+
+    # ------------------------------------------------------------------
+    # Latences / timeouts
+    # ------------------------------------------------------------------
+
+    def record_latency(self, webhook_url: str, latency_sec: float) -> None:
+        with self._state_lock:
+            histogram = self._histograms.get(webhook_url)
+            if histogram is None:
+                histogram = self._histograms[webhook_url] = _RollingHistogram(self._window)
+            histogram.add(max(0.0, float(latency_sec)))
+
+    def record_failed_attempt(
+        self, webhook_url: str, elapsed_sec: float, *, timeout_sec: Optional[float] = None
+    ) -> None:
+        """Échantillon censuré d'un envoi sans réponse: au moins `timeout_sec` s'il a expiré."""
+        self.record_latency(webhook_url, max(float(elapsed_sec), float(timeout_sec or 0.0)))
+
+    def timeout_for(self, webhook_url: str, configured_timeout_sec: float) -> float:
+        """p99 × facteur, borné par [min_timeout_sec, timeout configuré]."""
+        configured = float(configured_timeout_sec)
+        with self._state_lock:
+            histogram = self._histograms.get(webhook_url)
+            if histogram is None or len(histogram) < self._min_samples:
+                return configured
+            p99 = histogram.percentile(0.99)
+        return round(min(configured, max(self._min_timeout_sec, p99 * self._timeout_factor)), 3)
+
+    # ------------------------------------------------------------------
+    # Budget de retries
+    # ------------------------------------------------------------------
+
+    def record_request(self) -> None:
+        """Un envoi initial (hors retry) alimente le budget."""
+        with self._state_lock:
+            now = self._clock()
+            self._requests.append(now)
+            self._trim(now)
+
+    def try_acquire_retry(self) -> bool:
+        """True si un retry est autorisé (et le consomme)."""
+        with self._state_lock:
+            now = self._clock()
+            self._trim(now)
+            budget = self._retry_min_per_window + self._retry_ratio * len(self._requests)
+            if len(self._retries) + 1 > budget:
+                self._retries_denied += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def get_stats(self) -> dict:
+        with self._state_lock:
+            self._trim(self._clock())
+            destinations = [
+                {
+                    "url": mask_url(url),
+                    "samples": len(histogram),
+                    "p50_sec": histogram.percentile(0.5),
+                    "p90_sec": histogram.percentile(0.9),
+                    "p99_sec": histogram.percentile(0.99),
+                }
+                for url, histogram in self._histograms.items()
+            ]
+            return {
+                "destinations": destinations,
+                "retry_budget": {
+                    "window_sec": self._retry_window_sec,
+                    "requests": len(self._requests),
+                    "retries": len(self._retries),
+                    "denied": self._retries_denied,
+                },
+            }
+
+    def _trim(self, now: float) -> None:
+        horizon = now - self._retry_window_sec
+        for events in (self._requests, self._retries):
+            while events and events[0] <= horizon:
+                events.popleft()
@@ -0,0 +1,349 @@
+"""
+services.webhook_outbox_service
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Outbox durable des envois webhook.
+
+Le cycle de polling n'envoie plus lui-même: il dépose un job (payload déjà
+sérialisé + paramètres d'envoi) et passe au mail suivant. Le dispatcher
+(background.webhook_dispatcher) réclame les jobs échus, les livre et gère les
+retries (backoff exponentiel + jitter). Un job n'est retiré qu'après
+acquittement: un crash pendant la livraison le rend à nouveau réclamable après
+`visibility_sec` (livraison au moins une fois).
+
+Features:
+- Redis (HASH des jobs + ZSET des échéances), partagé entre workers Gunicorn
+- Fallback SQLite (fichier local) pour les déploiements sans Redis
+- Enqueue idempotent par (email_id, webhook_url): un mail non encore acquitté
+  revu au cycle suivant ne crée pas de doublon
+- Pattern Singleton
+
+Usage:
+    from services.webhook_outbox_service import WebhookOutboxService
+
+    outbox = WebhookOutboxService.get_instance()
+    outbox.configure(redis_client=redis_client, sqlite_path=settings.WEBHOOK_OUTBOX_SQLITE_PATH)
+    outbox.enqueue(job)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # pragma: no cover - redis is a hard dependency in production
+    class WatchError(Exception):  # type: ignore[no-redef]
+        pass
+
+JOB_PENDING = "pending"
+JOB_DEAD = "dead"
+
+_DEFAULT_KEY_PREFIX = "r:ss:webhook_outbox:v1"
+
+
+def outbox_job_id(email_id: str, webhook_url: str) -> str:
+    """Identifiant stable d'un envoi: un même mail vers une même URL = un seul job."""
+    return hashlib.sha1(f"{email_id}|{webhook_url}".encode("utf-8")).hexdigest()
+
+
+class _RedisOutboxStore:
+    backend = "redis"
+
+    def __init__(self, redis_client: Any, key_prefix: str) -> None:
+        self._redis = redis_client
+        self._jobs_key = f"{key_prefix}:jobs"
+        self._due_key = f"{key_prefix}:due"
+        self._dead_key = f"{key_prefix}:dead"
+
+    def enqueue(self, job: dict, due_at: float) -> bool:
+        job_id = job["job_id"]
+        if self._redis.hexists(self._dead_key, job_id):
+            return False
+        with self._redis.pipeline() as pipe:
+            pipe.hsetnx(self._jobs_key, job_id, json.dumps(job))
+            pipe.zadd(self._due_key, {job_id: due_at}, nx=True)
+            created, _ = pipe.execute()
+        return bool(created)
+
+    def claim(self, now: float, limit: int, lease_until: float) -> list[dict]:
+        claimed = []
+        for job_id in self._redis.zrangebyscore(self._due_key, "-inf", now, start=0, num=limit):
+            job_id = _as_str(job_id)
+            with self._redis.pipeline() as pipe:
+                try:
+                    pipe.watch(self._due_key)
+                    score = pipe.zscore(self._due_key, job_id)
+                    if score is None or score > now:
+                        pipe.unwatch()
+                        continue
+                    pipe.multi()
+                    pipe.zadd(self._due_key, {job_id: lease_until}, xx=True)
+                    pipe.execute()
+                except WatchError:
+                    # Réclamé entre-temps par un autre dispatcher
+                    continue
+            raw = self._redis.hget(self._jobs_key, job_id)
+            if raw:
+                claimed.append(json.loads(raw))
+            else:
+                self._redis.zrem(self._due_key, job_id)
+        return claimed
+
+    def reschedule(self, job: dict, due_at: float) -> None:
+        with self._redis.pipeline() as pipe:
+            pipe.hset(self._jobs_key, job["job_id"], json.dumps(job))
+            pipe.zadd(self._due_key, {job["job_id"]: due_at})
+            pipe.execute()
+
+    def complete(self, job_id: str) -> None:
+        with self._redis.pipeline() as pipe:
+            pipe.zrem(self._due_key, job_id)
+            pipe.hdel(self._jobs_key, job_id)
+            pipe.execute()
+
+    def dead_letter(self, job: dict) -> None:
+        with self._redis.pipeline() as pipe:
+            pipe.hset(self._dead_key, job["job_id"], json.dumps(job))
+            pipe.zrem(self._due_key, job["job_id"])
+            pipe.hdel(self._jobs_key, job["job_id"])
+            pipe.execute()
+
+    def requeue_dead(self, job_ids: Optional[list[str]], due_at: float) -> int:
+        if job_ids is None:
+            job_ids = [_as_str(job_id) for job_id in self._redis.hkeys(self._dead_key)]
+        requeued = 0
+        for job_id in job_ids:
+            raw = self._redis.hget(self._dead_key, job_id)
+            if not raw:
+                continue
+            with self._redis.pipeline() as pipe:
+                pipe.hset(self._jobs_key, job_id, json.dumps({**json.loads(raw), "attempts": 0}))
+                pipe.zadd(self._due_key, {job_id: due_at})
+                pipe.hdel(self._dead_key, job_id)
+                pipe.execute()
+            requeued += 1
+        return requeued
+
+    def counts(self, now: float) -> dict:
+        with self._redis.pipeline() as pipe:
+            pipe.hlen(self._jobs_key)
+            pipe.zcount(self._due_key, "-inf", now)
+            pipe.hlen(self._dead_key)
+            pending, due, dead = pipe.execute()
+        return {"pending": pending, "due": due, "dead": dead}
+
+
+class _SqliteOutboxStore:
+    backend = "sqlite"
+
+    def __init__(self, path: str | Path) -> None:
+        self._path = str(path)
+        Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._run(lambda conn: (
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox_jobs ("
+                " job_id TEXT PRIMARY KEY, status TEXT NOT NULL, due_at REAL NOT NULL, data TEXT NOT NULL)"
+            ),
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_jobs_due ON outbox_jobs (status, due_at)"),
+        ))
+
+    def _connect(self) -> sqlite3.Connection:
+        # Une connexion par opération: sqlite3 n'aime pas les connexions partagées entre threads
+        conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = fn(conn)
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+                return result
+            finally:
+                conn.close()
+
+    def enqueue(self, job: dict, due_at: float) -> bool:
+        def _op(conn):
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO outbox_jobs (job_id, status, due_at, data) VALUES (?, ?, ?, ?)",
+                (job["job_id"], JOB_PENDING, due_at, json.dumps(job)),
+            )
+            return cur.rowcount == 1
+
+        return self._run(_op)
+
+    def claim(self, now: float, limit: int, lease_until: float) -> list[dict]:
+        def _op(conn):
+            rows = conn.execute(
+                "SELECT job_id, data FROM outbox_jobs WHERE status = ? AND due_at <= ? ORDER BY due_at LIMIT ?",
+                (JOB_PENDING, now, int(limit)),
+            ).fetchall()
+            for job_id, _ in rows:
+                conn.execute("UPDATE outbox_jobs SET due_at = ? WHERE job_id = ?", (lease_until, job_id))
+            return [json.loads(data) for _, data in rows]
+
+        return self._run(_op)
+
+    def reschedule(self, job: dict, due_at: float) -> None:
+        self._run(lambda conn: conn.execute(
+            "UPDATE outbox_jobs SET due_at = ?, data = ? WHERE job_id = ?",
+            (due_at, json.dumps(job), job["job_id"]),
+        ))
+
+    def complete(self, job_id: str) -> None:
+        self._run(lambda conn: conn.execute("DELETE FROM outbox_jobs WHERE job_id = ?", (job_id,)))
+
+    def dead_letter(self, job: dict) -> None:
+        self._run(lambda conn: conn.execute(
+            "UPDATE outbox_jobs SET status = ?, data = ? WHERE job_id = ?",
+            (JOB_DEAD, json.dumps(job), job["job_id"]),
+        ))
+
+    def requeue_dead(self, job_ids: Optional[list[str]], due_at: float) -> int:
+        def _op(conn):
+            rows = conn.execute("SELECT job_id, data FROM outbox_jobs WHERE status = ?", (JOB_DEAD,)).fetchall()
+            requeued = 0
+            for job_id, data in rows:
+                if job_ids is not None and job_id not in job_ids:
+                    continue
+                conn.execute(
+                    "UPDATE outbox_jobs SET status = ?, due_at = ?, data = ? WHERE job_id = ?",
+                    (JOB_PENDING, due_at, json.dumps({**json.loads(data), "attempts": 0}), job_id),
+                )
+                requeued += 1
+            return requeued
+
+        return self._run(_op)
+
+    def counts(self, now: float) -> dict:
+        def _op(conn):
+            pending = conn.execute("SELECT COUNT(*) FROM outbox_jobs WHERE status = ?", (JOB_PENDING,)).fetchone()[0]
+            due = conn.execute(
+                "SELECT COUNT(*) FROM outbox_jobs WHERE status = ? AND due_at <= ?", (JOB_PENDING, now)
+            ).fetchone()[0]
+            dead = conn.execute("SELECT COUNT(*) FROM outbox_jobs WHERE status = ?", (JOB_DEAD,)).fetchone()[0]
+            return {"pending": pending, "due": due, "dead": dead}
+
+        return self._run(_op)
+
+
+class WebhookOutboxService:
+    _instance: Optional[WebhookOutboxService] = None
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        redis_client: Any = None,
+        key_prefix: str = _DEFAULT_KEY_PREFIX,
+        sqlite_path: str | Path | None = None,
+        clock: Callable[[], float] = time.time,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._clock = clock
+        self._logger = logger or logging.getLogger(__name__)
+        self._store: _RedisOutboxStore | _SqliteOutboxStore | None = None
+        self.configure(redis_client=redis_client, key_prefix=key_prefix, sqlite_path=sqlite_path)
+
+    @classmethod
+    def get_instance(cls) -> WebhookOutboxService:
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._lock:
+            cls._instance = None
+
+    def configure(
+        self,
+        *,
+        redis_client: Any = None,
+        key_prefix: str = _DEFAULT_KEY_PREFIX,
+        sqlite_path: str | Path | None = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """Redis si disponible, sinon SQLite; sans l'un ni l'autre l'outbox est inactif."""
+        if logger is not None:
+            self._logger = logger
+        if redis_client is not None:
+            self._store = _RedisOutboxStore(redis_client, key_prefix or _DEFAULT_KEY_PREFIX)
+        elif sqlite_path:
+            self._store = _SqliteOutboxStore(sqlite_path)
+        else:
+            self._store = None
+
+    @property
+    def backend(self) -> Optional[str]:
+        return self._store.backend if self._store is not None else None
+
+    def is_available(self) -> bool:
+        return self._store is not None
+
+    def enqueue(self, job: dict, *, delay_sec: float = 0) -> bool:
+        """Dépose un job, dû dans `delay_sec` secondes (immédiatement par défaut). Retourne False s'il existait déjà."""
+        now = self._clock()
+        job = {"attempts": 0, "created_at": now, **job}
+        created = self._require_store().enqueue(job, now + max(0.0, float(delay_sec)))
+        if not created:
+            self._logger.debug("WEBHOOK_OUTBOX: Job %s already queued for email %s", job["job_id"], job.get("email_id"))
+        return created
+
+    def claim_due(self, *, limit: int, visibility_sec: float) -> list[dict]:
+        """Réclame jusqu'à `limit` jobs échus; ils restent invisibles `visibility_sec` secondes."""
+        now = self._clock()
+        return self._require_store().claim(now, max(1, int(limit)), now + float(visibility_sec))
+
+    def complete(self, job_id: str) -> None:
+        self._require_store().complete(job_id)
+
+    def reschedule(self, job: dict, *, delay_sec: float) -> None:
+        self._require_store().reschedule(job, self._clock() + max(0.0, float(delay_sec)))
+
+    def dead_letter(self, job: dict) -> None:
+        self._require_store().dead_letter(job)
+
+    def requeue_dead(self, job_id: Optional[str] = None) -> int:
+        """Remet en file les jobs abandonnés (tous, ou le seul `job_id`), tentatives remises à zéro.
+
+        Le mail d'un job abandonné est déjà \\Seen: c'est le seul moyen de le relivrer.
+        Retourne le nombre de jobs remis en file.
+        """
+        return self._require_store().requeue_dead(None if job_id is None else [job_id], self._clock())
+
+    def get_stats(self) -> dict:
+        if self._store is None:
+            return {"backend": None}
+        try:
+            return {"backend": self._store.backend, **self._store.counts(self._clock())}
+        except Exception as e:
+            return {"backend": self._store.backend, "error": str(e)}
+
+    def _require_store(self) -> _RedisOutboxStore | _SqliteOutboxStore:
+        if self._store is None:
+            raise RuntimeError("Webhook outbox has no storage backend configured")
+        return self._store
+
+
+def _as_str(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
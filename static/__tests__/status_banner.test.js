@@ -1,5 +1,5 @@
 import { describe, it, expect } from 'vitest';
-import { analyzeLogsForStatus } from '../services/status_banner.js';
+import { analyzeLogsForStatus, summarizeCircuitBreakers } from '../services/status_banner.js';
 
 describe('analyzeLogsForStatus', () => {
     // Given
@@ -96,3 +96,31 @@ describe('analyzeLogsForStatus', () => {
         expect(result.lastExecution).toMatch(/Il y a \d+ min/);
     });
 });
+
+describe('summarizeCircuitBreakers', () => {
+    it('should count open and half-open circuits as a warning', () => {
+        // Given
+        const breakers = [
+            { url: 'https://hook.eu1.make.com/***', state: 'open', retry_at: 1760000000 },
+            { url: 'https://hook.eu2.make.com/***', state: 'half_open', retry_at: null },
+            { url: 'https://webhook.kidpixel.fr/***', state: 'closed', retry_at: null },
+        ];
+
+        // When
+        const result = summarizeCircuitBreakers(breakers);
+
+        // Then
+        expect(result.openCircuits).toBe('2');
+        expect(result.status).toBe('warning');
+        expect(result.details).toContain('hook.eu2.make.com/*** : sonde en cours');
+    });
+
+    it('should report success when every circuit is closed', () => {
+        // When
+        const result = summarizeCircuitBreakers([]);
+
+        // Then
+        expect(result.openCircuits).toBe('0');
+        expect(result.status).toBe('success');
+    });
+});
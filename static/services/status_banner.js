@@ -73,6 +73,27 @@ export function analyzeLogsForStatus(logs) {
     };
 }
 
+/**
+ * Résume l'état des disjoncteurs webhook pour le bandeau
+ * @param {Array} breakers - Disjoncteurs renvoyés par /api/webhooks/circuit_breakers
+ * @returns {object} Nombre de circuits non fermés, détail et statut induit
+ */
+export function summarizeCircuitBreakers(breakers) {
+    const labels = { open: 'ouvert', half_open: 'sonde en cours' };
+    const tripped = (breakers || []).filter(b => b.state === 'open' || b.state === 'half_open');
+    const details = tripped.map(b => {
+        const retry = b.state === 'open' && b.retry_at
+            ? ` (réessai ${new Date(b.retry_at * 1000).toLocaleTimeString('fr-FR')})`
+            : '';
+        return `${b.url} : ${labels[b.state]}${retry}`;
+    });
+    return {
+        openCircuits: tripped.length.toString(),
+        details: details.join('\n'),
+        status: tripped.length > 0 ? 'warning' : 'success'
+    };
+}
+
 /**
  * Met à jour l'affichage du bandeau de statut
  * @param {object} statusData - Données de statut
@@ -141,6 +162,7 @@ export async function updateGlobalStatus() {
         }
 
         const statusData = analyzeLogsForStatus(logs);
+        await applyCircuitBreakerStatus(statusData);
         updateStatusBanner(statusData, config);
 
     } catch (error) {
@@ -154,3 +176,25 @@ export async function updateGlobalStatus() {
         }, {});
     }
 }
+
+/**
+ * Ajoute l'état des disjoncteurs au statut (un circuit ouvert dégrade au moins en warning)
+ * @param {object} statusData - Données de statut, modifiées en place
+ */
+async function applyCircuitBreakerStatus(statusData) {
+    const circuitsEl = DOMHelper.getElement('openCircuits');
+    try {
+        const response = await ApiService.get('/api/webhooks/circuit_breakers');
+        if (!response.success) return;
+        const summary = summarizeCircuitBreakers(response.breakers);
+        if (circuitsEl) {
+            circuitsEl.textContent = summary.openCircuits;
+            circuitsEl.title = summary.details;
+        }
+        if (summary.status === 'warning' && statusData.status === 'success') {
+            statusData.status = 'warning';
+        }
+    } catch (error) {
+        console.warn('Impossible de récupérer l\'état des disjoncteurs:', error);
+    }
+}
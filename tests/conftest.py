@@ -111,6 +111,20 @@ def reset_env_vars():
     os.environ.update(original_env)
 
 
+@pytest.fixture(autouse=True)
+def reset_webhook_delivery_state():
+    """Les échecs simulés d'un test ne doivent pas ouvrir le circuit, vider le budget de retries ni consommer le quota du suivant."""
+    from services.circuit_breaker_service import WebhookCircuitBreakerService
+    from services.rate_limit_service import RateLimitService
+    from services.webhook_latency_service import WebhookLatencyService
+    services = (WebhookCircuitBreakerService, WebhookLatencyService, RateLimitService)
+    for service in services:
+        service.reset_instance()
+    yield
+    for service in services:
+        service.reset_instance()
+
+
 @pytest.fixture
 def flask_app(monkeypatch):
     """Fixture pour créer une instance Flask pour les tests."""
@@ -5,6 +5,7 @@ import re
 import sys
 import types
 
+from email_processing import imap_client
 from email_processing import orchestrator as orch
 
 
@@ -130,6 +131,8 @@ def _install_imap_client_stub(monkeypatch, mail_instance=None):
     module.decode_email_header_value = lambda value: value
     module.extract_sender_email = lambda raw: raw.split('<')[-1].split('>')[0] if '<' in raw else raw
     module.mark_email_as_read_imap = lambda l, _mail, _num: None
+    module.chunk_message_numbers = imap_client.chunk_message_numbers
+    module.fetch_messages = imap_client.fetch_messages
     monkeypatch.setitem(sys.modules, "email_processing.imap_client", module)
     monkeypatch.setattr(orch, "imap_client", module)
 
@@ -174,7 +177,10 @@ def test_orchestrator_routes_to_custom_webhook_when_rule_matches(monkeypatch):
     result = orch.check_new_emails_and_trigger_webhook()
 
     assert result == 2
-    assert sent_calls[0]["webhook_url"] == "https://hook.eu2.make.com/bill"
+    # Rule and default webhooks are sent concurrently (fan-out): call order is not guaranteed
+    assert sorted(c["webhook_url"] for c in sent_calls) == sorted(
+        ["https://hook.eu2.make.com/bill", orch.settings.WEBHOOK_URL]
+    )
 
 
 def test_orchestrator_stop_processing_skips_default(monkeypatch):
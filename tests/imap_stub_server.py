@@ -0,0 +1,417 @@
+"""
+Serveur IMAP4rev1 minimal en mémoire pour les tests (aucun réseau externe).
+
+Couvre le sous-ensemble utilisé par le poller: CAPABILITY, LOGIN, SELECT, NOOP,
+SEARCH, FETCH, STORE, IDLE, CLOSE, LOGOUT et leurs variantes UID. Chaque commande
+reçue est comptée dans `command_counts` pour mesurer les round trips.
+"""
+from __future__ import annotations
+
+import re
+import socket
+import socketserver
+import threading
+import time
+from collections import Counter
+from email import message_from_bytes
+from typing import Optional
+
+_TOKEN_RE = re.compile(rb'"(?:[^"\\]|\\.)*"|\((?:[^()]|\([^()]*\))*\)|\S+')
+_HEADER_FIELDS_RE = re.compile(r"BODY(?:\.PEEK)?\[HEADER\.FIELDS \(([^)]*)\)\]", re.IGNORECASE)
+
+
+def _tokenize(raw: bytes) -> list[str]:
+    tokens = []
+    for tok in _TOKEN_RE.findall(raw):
+        text = tok.decode("utf-8", errors="replace")
+        if text.startswith('"') and text.endswith('"'):
+            text = text[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+        tokens.append(text)
+    return tokens
+
+
+def _parse_sequence_set(spec: str, max_value: int) -> list[int]:
+    values: list[int] = []
+    for chunk in spec.split(","):
+        if ":" in chunk:
+            lo_raw, hi_raw = chunk.split(":", 1)
+            lo = max_value if lo_raw == "*" else int(lo_raw)
+            hi = max_value if hi_raw == "*" else int(hi_raw)
+            if lo > hi:
+                lo, hi = hi, lo
+            values.extend(range(lo, hi + 1))
+        else:
+            values.append(max_value if chunk == "*" else int(chunk))
+    return values
+
+
+def _split_fetch_items(spec: str) -> list[str]:
+    spec = spec.strip()
+    if spec.startswith("(") and spec.endswith(")"):
+        spec = spec[1:-1]
+    items: list[str] = []
+    depth = 0
+    current = ""
+    for ch in spec:
+        if ch in "[(":
+            depth += 1
+        elif ch in "])":
+            depth -= 1
+        if ch == " " and depth == 0:
+            if current:
+                items.append(current)
+            current = ""
+            continue
+        current += ch
+    if current:
+        items.append(current)
+    return items
+
+
+class _StubMessage:
+    def __init__(self, uid: int, raw: bytes, seen: bool) -> None:
+        self.uid = uid
+        self.raw = raw
+        self.flags: set[str] = {"\\Seen"} if seen else set()
+
+    def header_fields(self, names: list[str]) -> bytes:
+        head = self.raw.split(b"\r\n\r\n", 1)[0]
+        wanted = {n.lower() for n in names}
+        out: list[bytes] = []
+        keep = False
+        for line in head.split(b"\r\n"):
+            if line[:1] in (b" ", b"\t"):
+                if keep:
+                    out.append(line)
+                continue
+            name = line.split(b":", 1)[0].decode("ascii", errors="ignore").strip().lower()
+            keep = name in wanted
+            if keep:
+                out.append(line)
+        return b"\r\n".join(out) + b"\r\n\r\n"
+
+    def bodystructure(self) -> str:
+        msg = message_from_bytes(self.raw)
+        maintype = msg.get_content_maintype().upper()
+        subtype = msg.get_content_subtype().upper()
+        if msg.is_multipart():
+            return f'(("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" {len(self.raw)} 1) "{subtype}")'
+        return f'("{maintype}" "{subtype}" ("CHARSET" "utf-8") NIL NIL "7BIT" {len(self.raw)} 1)'
+
+
+class ImapStubServer:
+    """Serveur IMAP de test démarré sur 127.0.0.1 avec un port éphémère."""
+
+    def __init__(
+        self,
+        *,
+        user: str = "poller@example.com",
+        password: str = "secret",
+        capabilities: tuple[str, ...] = ("IMAP4rev1", "IDLE", "UIDPLUS"),
+        uidvalidity: int = 1,
+        latency_sec: float = 0.0,
+    ) -> None:
+        self.user = user
+        self.latency_sec = latency_sec
+        self.password = password
+        self.capabilities = capabilities
+        self.uidvalidity = uidvalidity
+        self.command_counts: Counter = Counter()
+        self.logins = 0
+        self.body_downloads = 0
+        self._messages: list[_StubMessage] = []
+        self._next_uid = 1
+        self._lock = threading.RLock()
+        self._idlers: list["_Handler"] = []
+        self._handlers: list["_Handler"] = []
+        self._server: Optional[socketserver.ThreadingTCPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------ lifecycle
+    def start(self) -> "ImapStubServer":
+        stub = self
+
+        class _BoundHandler(_Handler):
+            server_state = stub
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _BoundHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.drop_connections()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "ImapStubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def host(self) -> str:
+        return "127.0.0.1"
+
+    @property
+    def port(self) -> int:
+        assert self._server is not None
+        return self._server.server_address[1]
+
+    # ------------------------------------------------------------------ mailbox
+    def add_message(self, raw: bytes, *, seen: bool = False) -> int:
+        with self._lock:
+            uid = self._next_uid
+            self._next_uid += 1
+            self._messages.append(_StubMessage(uid, raw, seen))
+            exists = len(self._messages)
+            idlers = list(self._idlers)
+        for handler in idlers:
+            handler.push_untagged(f"* {exists} EXISTS")
+        return uid
+
+    def mark_seen(self, uid: int) -> None:
+        with self._lock:
+            for m in self._messages:
+                if m.uid == uid:
+                    m.flags.add("\\Seen")
+
+    def is_seen(self, uid: int) -> bool:
+        with self._lock:
+            return any(m.uid == uid and "\\Seen" in m.flags for m in self._messages)
+
+    def expunge(self, uid: int) -> None:
+        """Supprime un message: les numéros de séquence suivants sont décalés, pas les UID."""
+        with self._lock:
+            self._messages = [m for m in self._messages if m.uid != uid]
+
+    def reset_uidvalidity(self, value: int) -> None:
+        with self._lock:
+            self.uidvalidity = value
+
+    def drop_connections(self) -> None:
+        with self._lock:
+            handlers = list(self._handlers)
+        for handler in handlers:
+            handler.kill()
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.command_counts.values())
+
+    def _snapshot(self) -> list[_StubMessage]:
+        with self._lock:
+            return list(self._messages)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server_state: ImapStubServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._write_lock = threading.Lock()
+        self._alive = True
+        with self.server_state._lock:
+            self.server_state._handlers.append(self)
+
+    def finish(self) -> None:
+        with self.server_state._lock:
+            if self in self.server_state._handlers:
+                self.server_state._handlers.remove(self)
+            if self in self.server_state._idlers:
+                self.server_state._idlers.remove(self)
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def kill(self) -> None:
+        self._alive = False
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _write(self, data: bytes) -> None:
+        with self._write_lock:
+            try:
+                self.wfile.write(data)
+                self.wfile.flush()
+            except OSError:
+                self._alive = False
+
+    def push_untagged(self, line: str) -> None:
+        self._write(line.encode("utf-8") + b"\r\n")
+
+    def _ok(self, tag: str, text: str) -> None:
+        self._write(f"{tag} OK {text}\r\n".encode("utf-8"))
+
+    def handle(self) -> None:
+        self.push_untagged("* OK IMAP4rev1 stub ready")
+        while self._alive:
+            try:
+                line = self.rfile.readline()
+            except OSError:
+                return
+            if not line:
+                return
+            line = line.rstrip(b"\r\n")
+            parts = line.split(b" ", 2)
+            if len(parts) < 2:
+                continue
+            tag = parts[0].decode()
+            command = parts[1].decode().upper()
+            rest = parts[2] if len(parts) > 2 else b""
+            uid_mode = False
+            if command == "UID":
+                sub = rest.split(b" ", 1)
+                command = sub[0].decode().upper()
+                rest = sub[1] if len(sub) > 1 else b""
+                uid_mode = True
+            self.server_state.command_counts[("UID " if uid_mode else "") + command] += 1
+            if self.server_state.latency_sec:
+                # Simule le RTT réseau d'un vrai serveur IMAP
+                time.sleep(self.server_state.latency_sec)
+            handler = getattr(self, f"_cmd_{command.lower()}", None)
+            if handler is None:
+                self._write(f"{tag} BAD unknown command\r\n".encode())
+                continue
+            handler(tag, rest, uid_mode)
+
+    # ------------------------------------------------------------------ commands
+    def _cmd_capability(self, tag, rest, uid_mode) -> None:
+        self.push_untagged("* CAPABILITY " + " ".join(self.server_state.capabilities))
+        self._ok(tag, "CAPABILITY completed")
+
+    def _cmd_login(self, tag, rest, uid_mode) -> None:
+        args = _tokenize(rest)
+        if len(args) == 2 and args[0] == self.server_state.user and args[1] == self.server_state.password:
+            self.server_state.logins += 1
+            self._ok(tag, "LOGIN completed")
+        else:
+            self._write(f"{tag} NO [AUTHENTICATIONFAILED] invalid credentials\r\n".encode())
+
+    def _cmd_select(self, tag, rest, uid_mode) -> None:
+        state = self.server_state
+        messages = state._snapshot()
+        self.push_untagged(f"* {len(messages)} EXISTS")
+        self.push_untagged("* 0 RECENT")
+        self.push_untagged(f"* OK [UIDVALIDITY {state.uidvalidity}] UIDs valid")
+        self.push_untagged(f"* OK [UIDNEXT {state._next_uid}] Predicted next UID")
+        self._ok(tag, "[READ-WRITE] SELECT completed")
+
+    _cmd_examine = _cmd_select
+
+    def _cmd_noop(self, tag, rest, uid_mode) -> None:
+        self._ok(tag, "NOOP completed")
+
+    def _cmd_close(self, tag, rest, uid_mode) -> None:
+        self._ok(tag, "CLOSE completed")
+
+    def _cmd_logout(self, tag, rest, uid_mode) -> None:
+        self.push_untagged("* BYE logging out")
+        self._ok(tag, "LOGOUT completed")
+        self._alive = False
+
+    def _resolve(self, spec: str, uid_mode: bool) -> list[tuple[int, _StubMessage]]:
+        messages = self.server_state._snapshot()
+        if not messages:
+            return []
+        indexed = list(enumerate(messages, start=1))
+        if uid_mode:
+            wanted = set(_parse_sequence_set(spec, messages[-1].uid))
+            selected = [(n, m) for n, m in indexed if m.uid in wanted]
+            if not selected and spec.endswith(":*"):
+                # RFC 3501: "n:*" always includes the highest UID.
+                selected = [indexed[-1]]
+            return selected
+        wanted = set(_parse_sequence_set(spec, len(messages)))
+        return [(n, m) for n, m in indexed if n in wanted]
+
+    def _cmd_search(self, tag, rest, uid_mode) -> None:
+        args = [a.upper() for a in _tokenize(rest)]
+        if args and args[0] == "CHARSET":
+            args = args[2:]
+        messages = self.server_state._snapshot()
+        indexed = list(enumerate(messages, start=1))
+        if "UNSEEN" in args or "(UNSEEN)" in args:
+            indexed = [(n, m) for n, m in indexed if "\\Seen" not in m.flags]
+        if "UID" in args:
+            spec = args[args.index("UID") + 1]
+            allowed = {m.uid for _, m in self._resolve(spec, True)}
+            indexed = [(n, m) for n, m in indexed if m.uid in allowed]
+        ids = [str(m.uid if uid_mode else n) for n, m in indexed]
+        self.push_untagged("* SEARCH" + ("" if not ids else " " + " ".join(ids)))
+        self._ok(tag, "SEARCH completed")
+
+    def _cmd_fetch(self, tag, rest, uid_mode) -> None:
+        spec, _, items_raw = rest.decode("utf-8").partition(" ")
+        items = _split_fetch_items(items_raw)
+        if uid_mode and not any(i.upper() == "UID" for i in items):
+            items = ["UID"] + items
+        for num, msg in self._resolve(spec, uid_mode):
+            chunks: list[bytes] = []
+            for item in items:
+                upper = item.upper()
+                if upper == "UID":
+                    chunks.append(f"UID {msg.uid}".encode())
+                elif upper == "FLAGS":
+                    chunks.append(f"FLAGS ({' '.join(sorted(msg.flags))})".encode())
+                elif upper == "RFC822.SIZE":
+                    chunks.append(f"RFC822.SIZE {len(msg.raw)}".encode())
+                elif upper == "BODYSTRUCTURE":
+                    chunks.append(f"BODYSTRUCTURE {msg.bodystructure()}".encode())
+                elif upper in ("RFC822", "BODY[]", "BODY.PEEK[]"):
+                    key = "RFC822" if upper == "RFC822" else "BODY[]"
+                    chunks.append(f"{key} {{{len(msg.raw)}}}\r\n".encode() + msg.raw)
+                    self.server_state.body_downloads += 1
+                    if not upper.startswith("BODY.PEEK"):
+                        msg.flags.add("\\Seen")
+                else:
+                    match = _HEADER_FIELDS_RE.match(item)
+                    if match:
+                        names = match.group(1).split()
+                        data = msg.header_fields(names)
+                        key = f"BODY[HEADER.FIELDS ({' '.join(n.upper() for n in names)})]"
+                        chunks.append(f"{key} {{{len(data)}}}\r\n".encode() + data)
+            self._write(f"* {num} FETCH (".encode() + b" ".join(chunks) + b")\r\n")
+        self._ok(tag, "FETCH completed")
+
+    def _cmd_store(self, tag, rest, uid_mode) -> None:
+        args = _tokenize(rest)
+        spec, action = args[0], args[1].upper()
+        flags = args[2].strip("()").split()
+        for num, msg in self._resolve(spec, uid_mode):
+            if action.startswith("+"):
+                msg.flags.update(flags)
+            elif action.startswith("-"):
+                msg.flags.difference_update(flags)
+            else:
+                msg.flags = set(flags)
+            self.push_untagged(f"* {num} FETCH (FLAGS ({' '.join(sorted(msg.flags))}))")
+        self._ok(tag, "STORE completed")
+
+    def _cmd_idle(self, tag, rest, uid_mode) -> None:
+        if "IDLE" not in self.server_state.capabilities:
+            self._write(f"{tag} BAD IDLE not supported\r\n".encode())
+            return
+        with self.server_state._lock:
+            self.server_state._idlers.append(self)
+        self.push_untagged("+ idling")
+        try:
+            line = self.rfile.readline()
+        except OSError:
+            line = b""
+        with self.server_state._lock:
+            if self in self.server_state._idlers:
+                self.server_state._idlers.remove(self)
+        if line.strip().upper() == b"DONE":
+            self._ok(tag, "IDLE terminated")
+        else:
+            self._alive = False
@@ -5,6 +5,7 @@ from typing import Optional, Tuple
 from unittest.mock import MagicMock
 
 import pytest
+from services.http_session_service import HttpSessionService
 from services.rate_limit_service import RateLimitService
 from services.webhook_logger_service import WebhookLoggerService
 
@@ -317,7 +318,7 @@ def test_ingress_gmail_enriches_delivery_links_with_r2_when_enabled(monkeypatch,
         def request_remote_fetch(self, *, source_url, provider, email_id=None, timeout=30):
             return ("https://media.example.com/r2-object", "file.zip")
 
-        def persist_link_pair(self, *, source_url, r2_url, provider, original_filename=None):
+        def persist_link_pair(self, *, source_url, r2_url, provider, original_filename=None, fetch_duration_sec=None):
             return True
 
     monkeypatch.setattr("services.ingress_service.R2TransferService", MagicMock(get_instance=lambda: _FakeR2()))
@@ -478,7 +479,7 @@ def test_gmail_ingress_idempotent_inflight_lock(monkeypatch, flask_client):
             status_code=200, json_data={"success": True}, text="OK"
         )
     )
-    monkeypatch.setattr("requests.post", post_mock)
+    monkeypatch.setattr(HttpSessionService, "post", lambda self, *a, **k: post_mock(*a, **k))
 
     payload = {
         "subject": "Hello",
@@ -556,7 +557,7 @@ def test_gmail_ingress_idempotent_inflight_lock_webhook_failure(monkeypatch, fla
             text="Upstream error",
         )
     )
-    monkeypatch.setattr("requests.post", post_mock)
+    monkeypatch.setattr(HttpSessionService, "post", lambda self, *a, **k: post_mock(*a, **k))
 
     payload = {
         "subject": "Hello",
@@ -0,0 +1,233 @@
+"""
+Tests for the single-flight poll cycle coordinator (background.cycle_coordinator).
+"""
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from background.cycle_coordinator import PollCycleCoordinator
+
+
+class _BlockingCycle:
+    """Cycle factice qui attend un signal, pour simuler un cycle long."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.runs = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.runs += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        self.started.set()
+        self.release.wait(5)
+        with self._lock:
+            self.active -= 1
+        return 0
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert predicate()
+
+
+def _wait_idle(coordinator):
+    _wait_for(lambda: coordinator.status()["running_cycle_id"] is None)
+
+
+@pytest.fixture
+def coordinator():
+    PollCycleCoordinator.reset_instance()
+    yield PollCycleCoordinator.get_instance()
+    PollCycleCoordinator.reset_instance()
+
+
+@pytest.mark.unit
+def test_concurrent_triggers_collapse_into_one_follow_up(coordinator):
+    # Given: a long cycle in flight
+    cycle = _BlockingCycle()
+    first = coordinator.submit(cycle, source="api")
+    assert cycle.started.wait(2)
+
+    # When: five triggers arrive concurrently mid-cycle
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(coordinator.submit(cycle, source="api"))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cycle.release.set()
+    _wait_idle(coordinator)
+
+    # Then: one follow-up cycle shared by every trigger, never two cycles at once
+    assert first["started"] is True
+    assert {r["cycle_id"] for r in results} == {results[0]["cycle_id"]}
+    assert all(r["started"] is False for r in results)
+    assert cycle.runs == 2
+    assert cycle.max_active == 1
+    follow_up = coordinator.get_cycle(results[0]["cycle_id"])
+    assert follow_up["status"] == "succeeded"
+    assert follow_up["triggers"] == 5
+    done = coordinator.get_cycle(first["cycle_id"])
+    assert done["status"] == "succeeded"
+    assert done["duration_ms"] >= 0
+    assert done["started_at"] and done["finished_at"]
+
+
+@pytest.mark.unit
+def test_run_sync_is_coalesced_while_a_cycle_runs(coordinator):
+    cycle = _BlockingCycle()
+    coordinator.submit(cycle, source="api")
+    assert cycle.started.wait(2)
+
+    assert coordinator.run_sync(cycle, source="scheduler") is None
+
+    cycle.release.set()
+    _wait_idle(coordinator)
+    assert cycle.runs == 2
+    result = coordinator.run_sync(lambda: 3, source="scheduler")
+    assert (result["status"], result["result"], result["source"]) == ("succeeded", 3, "scheduler")
+
+
+@pytest.mark.unit
+def test_failed_cycle_is_reported(coordinator):
+    def _boom():
+        raise RuntimeError("IMAP login failed")
+
+    record = coordinator.run_sync(_boom, source="scheduler")
+
+    assert record["status"] == "failed"
+    assert record["error"] == "IMAP login failed"
+    assert coordinator.status()["running_cycle_id"] is None
+
+
+class _FlakyRedis:
+    """Redis dont les commandes échouent tant que `down` est vrai (SET bloquable via `set_gate`)."""
+
+    def __init__(self, inner):
+        self._inner = inner
+        self.down = False
+        self.set_gate = None
+        self.set_blocked = threading.Event()
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return attr
+
+        def _call(*args, **kwargs):
+            if self.down:
+                raise ConnectionError("redis unavailable")
+            if name == "set" and self.set_gate is not None:
+                self.set_blocked.set()
+                self.set_gate.wait(5)
+            return attr(*args, **kwargs)
+
+        return _call
+
+
+@pytest.mark.unit
+def test_lease_backend_error_fails_the_cycle_and_frees_the_slot(mock_redis):
+    # Given: Redis down when the cycle tries to take the cross-process lease
+    redis_client = _FlakyRedis(mock_redis)
+    coordinator = PollCycleCoordinator(redis_client=redis_client)
+    redis_client.down = True
+    runs = []
+
+    # When: running a cycle
+    record = coordinator.run_sync(lambda: runs.append(1), source="scheduler")
+
+    # Then: the cycle is reported failed without running, and the slot is released
+    assert (record["status"], record["error"], runs) == ("failed", "redis unavailable", [])
+    assert coordinator.status()["running_cycle_id"] is None
+    redis_client.down = False
+    assert coordinator.run_sync(lambda: runs.append(1), source="scheduler")["status"] == "succeeded"
+    assert runs == [1]
+
+
+@pytest.mark.unit
+def test_slow_redis_persist_does_not_block_other_callers(mock_redis):
+    # Given: a trigger whose record persistence hangs on Redis
+    redis_client = _FlakyRedis(mock_redis)
+    coordinator = PollCycleCoordinator(redis_client=redis_client)
+    redis_client.set_gate = threading.Event()
+    submitted = threading.Thread(
+        target=coordinator.submit, args=(lambda: None,), kwargs={"source": "api", "spawn": lambda target: None},
+    )
+    submitted.start()
+    assert redis_client.set_blocked.wait(2)
+
+    # Then: the coordinator lock is free while the SET is in flight
+    started = time.monotonic()
+    assert coordinator.status()["running_cycle_id"] is not None
+    assert time.monotonic() - started < 0.5
+    redis_client.set_gate.set()
+    submitted.join(5)
+    cycle_id = coordinator.status()["running_cycle_id"]
+    assert json.loads(mock_redis.get(coordinator._record_key(cycle_id)))["status"] == "queued"
+
+
+@pytest.mark.unit
+def test_cross_process_trigger_is_coalesced_into_remote_cycle(mock_redis):
+    # Given: two processes sharing Redis, process A running a cycle
+    proc_a = PollCycleCoordinator(redis_client=mock_redis)
+    proc_b = PollCycleCoordinator(redis_client=mock_redis)
+    cycle_a, cycle_b = _BlockingCycle(), _BlockingCycle()
+    first = proc_a.submit(cycle_a, source="scheduler")
+    assert cycle_a.started.wait(2)
+
+    # When: process B is triggered meanwhile
+    remote = proc_b.submit(cycle_b, source="api")
+    _wait_idle(proc_b)
+
+    # Then: B does not poll but hands a follow-up over to A
+    assert cycle_b.runs == 0
+    coalesced = proc_b.get_cycle(remote["cycle_id"])
+    assert coalesced["status"] == "coalesced"
+    assert coalesced["coalesced_into"] == first["cycle_id"]
+    # And the status of A's cycle is visible from B through Redis
+    assert proc_b.get_cycle(first["cycle_id"])["status"] == "running"
+
+    cycle_a.release.set()
+    _wait_idle(proc_a)
+    assert cycle_a.runs == 2
+    follow_up = [
+        r for r in (proc_a.get_cycle(cid) for cid in list(proc_a._records)) if r.get("source") == "coalesced"
+    ]
+    assert len(follow_up) == 1
+    assert follow_up[0]["coalesced_from"] == remote["cycle_id"]
+    assert follow_up[0]["status"] == "succeeded"
+
+
+@pytest.mark.integration
+def test_check_emails_route_returns_cycle_id_and_status(authenticated_flask_client, coordinator):
+    cycle = _BlockingCycle()
+    with patch('routes.api_admin._config_service.is_email_config_valid', return_value=True), \
+            patch('routes.api_admin._config_service.has_webhook_url', return_value=True), \
+            patch('routes.api_admin.email_orchestrator.check_new_emails_and_trigger_webhook', side_effect=cycle):
+        first = authenticated_flask_client.post('/api/check_emails_and_download').get_json()
+        assert cycle.started.wait(2)
+        second = authenticated_flask_client.post('/api/check_emails_and_download').get_json()
+
+        running = authenticated_flask_client.get(first["status_url"])
+        cycle.release.set()
+        _wait_idle(coordinator)
+
+    assert first["coalesced"] is False
+    assert second["coalesced"] is True
+    assert second["cycle_id"] != first["cycle_id"]
+    assert running.status_code == 200
+    assert running.get_json()["cycle"]["status"] == "running"
+    done = authenticated_flask_client.get(second["status_url"]).get_json()["cycle"]
+    assert done["status"] == "succeeded"
+    assert authenticated_flask_client.get('/api/poll_cycles/unknown').status_code == 404
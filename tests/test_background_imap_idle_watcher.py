@@ -0,0 +1,98 @@
+"""
+Tests for the IMAP IDLE watcher (background.imap_idle_watcher) against the in-process IMAP stub.
+"""
+import imaplib
+import threading
+import time
+
+import pytest
+
+from background.cycle_coordinator import PollCycleCoordinator
+from background.imap_idle_watcher import ImapIdleWatcher
+from email_processing import imap_client
+from tests.imap_stub_server import ImapStubServer
+
+_RAW = b"Subject: Lot 1\r\nFrom: sender@example.com\r\n\r\nBonjour\r\n"
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert predicate()
+
+
+@pytest.fixture
+def stub():
+    server = ImapStubServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def pool(stub):
+    def _connect():
+        mail = imaplib.IMAP4(stub.host, stub.port, timeout=5)
+        mail.login(stub.user, stub.password)
+        return mail
+
+    pool = imap_client.ImapSessionPool(connection_factory=_connect)
+    yield pool
+    pool.close_all()
+
+
+@pytest.mark.unit
+def test_new_mail_submits_a_cycle_through_the_coordinator(stub, pool):
+    # Given: a watcher idling on INBOX
+    cycles = []
+    watcher = ImapIdleWatcher(
+        pool=pool, run_cycle=lambda: cycles.append("run"), coordinator=PollCycleCoordinator(), timeout_sec=5,
+    )
+    watcher.start()
+    _wait_for(lambda: stub.command_counts["IDLE"] == 1)
+
+    # When: a message arrives
+    stub.add_message(_RAW)
+
+    # Then: a cycle runs right away, and IDLE resumes afterwards
+    _wait_for(lambda: cycles == ["run"])
+    _wait_for(lambda: stub.command_counts["IDLE"] == 2)
+    assert watcher.status()["cycles_submitted"] == 1
+    watcher.stop(timeout=0)
+
+
+@pytest.mark.unit
+def test_new_mail_is_ignored_while_sending_is_disabled():
+    coordinator = PollCycleCoordinator()
+    gate = {"value": (False, "webhook_sending_disabled")}
+    watcher = ImapIdleWatcher(
+        pool=None, run_cycle=lambda: None, coordinator=coordinator, timeout_sec=5, gate=lambda: gate["value"],
+    )
+
+    assert watcher.on_new_mail() is None
+
+    # Outside the time window the scheduler keeps polling slowly: so does IDLE
+    gate["value"] = (False, "outside_time_window")
+    cycle = watcher.on_new_mail()
+    assert cycle["source"] == "idle"
+    _wait_for(lambda: coordinator.status()["running_cycle_id"] is None)
+    assert coordinator.get_cycle(cycle["cycle_id"])["status"] == "succeeded"
+
+
+@pytest.mark.unit
+def test_start_instance_is_a_singleton():
+    ImapIdleWatcher.reset_instance()
+    stop = threading.Event()
+
+    class _Pool:
+        def run_idle_loop(self, on_new_mail, stop_event, **_kwargs):
+            stop.wait(5)
+
+    try:
+        kwargs = dict(pool=_Pool(), run_cycle=lambda: None, coordinator=PollCycleCoordinator(), timeout_sec=5)
+        first = ImapIdleWatcher.start_instance(**kwargs)
+        assert ImapIdleWatcher.start_instance(**kwargs) is first
+        assert first.thread.name == "bg-imap-idle"
+    finally:
+        stop.set()
+        ImapIdleWatcher.reset_instance()
@@ -0,0 +1,333 @@
+"""
+Tests for the background poll scheduler and its Redis lease (background.poll_scheduler).
+"""
+import imaplib
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from background.cycle_coordinator import PollCycleCoordinator
+from background.poll_scheduler import (
+    AdaptiveCadence,
+    FileLease,
+    PollScheduler,
+    RedisLease,
+    last_cycle_new_mail_count,
+)
+from email_processing import orchestrator as orch
+from services.runtime_metrics_service import RuntimeMetricsService
+from tests.imap_stub_server import ImapStubServer
+
+LEASE_KEY = "r:ss:bg_poller_lease:test"
+
+
+def _scheduler(lease, cycles, *, clock=time.time):
+    return PollScheduler(run_cycle=lambda: cycles.append(lease.owner_id), lease=lease, interval_sec=30, clock=clock)
+
+
+@pytest.mark.unit
+def test_only_one_instance_polls_per_tick(mock_redis):
+    # Given: two instances sharing the same Redis
+    cycles = []
+    a = _scheduler(RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-a"), cycles)
+    b = _scheduler(RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-b"), cycles)
+
+    # When: both tick several times
+    for _ in range(3):
+        a.run_once()
+        b.run_once()
+
+    # Then: the first to acquire stays leader and is the only one polling
+    assert cycles == ["node-a"] * 3
+    assert a.status()["leader"] is True
+    assert b.status()["leader"] is False
+
+
+@pytest.mark.unit
+def test_failover_hands_out_a_higher_fencing_token(mock_redis):
+    cycles = []
+    lease_a = RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-a")
+    lease_b = RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-b")
+    a, b = _scheduler(lease_a, cycles), _scheduler(lease_b, cycles)
+    a.run_once()
+    token_a = lease_a.token
+
+    a.stop()
+    assert b.run_once() is True
+
+    assert cycles == ["node-a", "node-b"]
+    assert lease_b.token > token_a
+
+
+@pytest.mark.unit
+def test_stale_leader_is_fenced_out_after_lease_expiry(mock_redis):
+    # Given: node-a's lease expired (e.g. long GC pause) and node-b took over
+    lease_a = RedisLease(mock_redis, LEASE_KEY, ttl_ms=50, owner_id="node-a")
+    assert lease_a.acquire() and lease_a.admit()
+    time.sleep(0.1)
+    lease_b = RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-b")
+    assert lease_b.acquire() and lease_b.admit()
+
+    # Then: node-a can neither renew nor be admitted for another cycle
+    assert lease_a.admit() is False
+    assert lease_a.renew() is False
+    assert lease_a.held is False
+    # And releasing a lost lease never deletes the new holder's key
+    lease_a.release()
+    assert mock_redis.get(LEASE_KEY) == f"node-b:{lease_b.token}"
+
+
+@pytest.mark.unit
+def test_lease_is_renewed_during_cycles_longer_than_ttl(mock_redis):
+    lease_a = RedisLease(mock_redis, LEASE_KEY, ttl_ms=150, owner_id="node-a")
+    a = PollScheduler(run_cycle=lambda: time.sleep(0.45), lease=lease_a, interval_sec=30)
+
+    assert a.run_once() is True
+
+    assert lease_a.held
+    assert RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-b").acquire() is False
+
+
+@pytest.mark.unit
+def test_cycle_updates_runtime_metrics_and_survives_errors(mock_redis):
+    lease = RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-a")
+
+    def _boom():
+        raise RuntimeError("IMAP down")
+
+    scheduler = PollScheduler(run_cycle=_boom, lease=lease, interval_sec=30, clock=lambda: 1_700_000_000)
+
+    assert scheduler.run_once() is True
+    assert RuntimeMetricsService.get_instance().get_last_poll_cycle_ts() == 1_700_000_000
+    assert scheduler.status()["last_error"] == "IMAP down"
+    assert scheduler.status()["cycles_run"] == 1
+
+
+@pytest.mark.unit
+def test_background_thread_runs_cycles_until_stopped(mock_redis):
+    cycles = []
+    lease = RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-a")
+    scheduler = _scheduler(lease, cycles)
+
+    scheduler.start()
+    deadline = time.monotonic() + 2
+    while not cycles and time.monotonic() < deadline:
+        time.sleep(0.01)
+    scheduler.stop()
+
+    assert cycles == ["node-a"]
+    assert scheduler.status()["running"] is False
+    assert mock_redis.get(LEASE_KEY) is None
+
+
+@pytest.mark.unit
+def test_file_lease_is_exclusive_on_one_host(tmp_path):
+    path = str(tmp_path / "poller.lock")
+    first, second = FileLease(path), FileLease(path)
+
+    assert first.acquire() is True
+    assert second.acquire() is False
+    first.release()
+    assert second.acquire() is True
+    second.release()
+
+
+def _cadence():
+    return AdaptiveCadence(base_sec=30, burst_sec=5, max_sec=120, gated_sec=600)
+
+
+@pytest.mark.unit
+def test_cadence_bursts_on_new_mail_and_backs_off_when_idle():
+    cadence = _cadence()
+
+    steps = [cadence.after_cycle(n) for n in (3, 0, 0, 0, 0, 0, 2)]
+
+    assert steps == [
+        (5, "new_mail"),
+        (30, "base"),
+        (60, "idle_backoff"),
+        (120, "idle_max"),
+        (120, "idle_max"),
+        (120, "idle_max"),
+        (5, "new_mail"),
+    ]
+
+
+@pytest.mark.unit
+def test_scheduler_does_not_poll_while_sending_is_disabled(mock_redis):
+    # Given: an absence pause day (webhook sending disabled)
+    cycles = []
+    lease = RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-a")
+    scheduler = PollScheduler(
+        run_cycle=lambda: cycles.append(1), lease=lease, interval_sec=30,
+        cadence=_cadence(), gate=lambda: (False, "webhook_sending_disabled"),
+    )
+
+    # When
+    ran = scheduler.run_once()
+
+    # Then: no IMAP cycle, no lease taken, next check at the gated interval
+    assert ran is False
+    assert cycles == []
+    assert mock_redis.get(LEASE_KEY) is None
+    status = scheduler.status()
+    assert (status["interval_sec"], status["interval_reason"]) == (600, "webhook_sending_disabled")
+
+
+@pytest.mark.unit
+def test_scheduler_slows_down_outside_time_window(mock_redis):
+    lease = RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-a")
+    scheduler = PollScheduler(
+        run_cycle=lambda: 4, lease=lease, interval_sec=30,
+        cadence=_cadence(), gate=lambda: (False, "outside_time_window"),
+    )
+
+    assert scheduler.run_once() is True
+
+    status = scheduler.status()
+    assert (status["interval_sec"], status["interval_reason"]) == (120, "outside_time_window")
+
+
+@pytest.mark.unit
+def test_scheduler_exposes_adaptive_interval(mock_redis):
+    activity = iter([2, 0, 0])
+    lease = RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-a")
+    scheduler = PollScheduler(
+        run_cycle=lambda: next(activity), lease=lease, interval_sec=30,
+        cadence=_cadence(), gate=lambda: (True, "sending_enabled"),
+    )
+
+    reasons = []
+    for _ in range(3):
+        scheduler.run_once()
+        reasons.append((scheduler.status()["interval_sec"], scheduler.status()["interval_reason"]))
+
+    assert reasons == [(5, "new_mail"), (30, "base"), (60, "idle_backoff")]
+    assert scheduler.status()["consecutive_empty_cycles"] == 2
+
+
+class _Dedup:
+    def __init__(self):
+        self.processed = set()
+
+    def is_email_dedup_disabled(self):
+        return False
+
+    def is_email_processed(self, email_id):
+        return email_id in self.processed
+
+    def mark_email_processed(self, email_id):
+        self.processed.add(email_id)
+        return True
+
+    def generate_subject_group_id(self, subject):
+        return subject
+
+    def is_subject_group_processed(self, _group_id):
+        return False
+
+
+def _raw(i: int, sender: str) -> bytes:
+    return (
+        f"Subject: Lot {i}\r\n"
+        f"From: Sender <{sender}>\r\n"
+        f"Message-ID: <cadence-{i}@example.com>\r\n"
+        "Date: Wed, 22 Oct 2025 10:00:00 +0200\r\n"
+        "\r\n"
+        f"https://www.dropbox.com/scl/fo/lot{i}\r\n"
+    ).encode("utf-8")
+
+
+@pytest.mark.unit
+def test_scheduler_backs_off_while_ignored_or_failed_mail_stays_unseen(mock_redis, monkeypatch):
+    # Given: a mail delivered on the first try, one whose receiver keeps failing,
+    # and two that the allowlist skips (the last three stay UNSEEN)
+    dedup = _Dedup()
+    posts = []
+
+    def _post(url, **kwargs):
+        posts.append(url)
+        if len(posts) == 1:
+            return SimpleNamespace(status_code=200, content=b"{}", text="{}", json=lambda: {"success": True})
+        return SimpleNamespace(status_code=500, content=b"", text="boom", json=lambda: {})
+
+    monkeypatch.setattr(orch, "_LAST_CYCLE_CANDIDATES", frozenset())
+    monkeypatch.setattr(orch.settings, "WEBHOOK_URL", "https://hook.eu1.make.com/cadence", raising=False)
+    monkeypatch.setattr(orch.settings, "SENDER_LIST_FOR_POLLING", ["ok@example.com"], raising=False)
+    monkeypatch.setattr(orch.settings, "WEBHOOK_CIRCUIT_BREAKER_ENABLED", False, raising=False)
+    monkeypatch.setattr(orch, "_is_webhook_sending_enabled", lambda: True)
+    monkeypatch.setattr(orch, "_load_webhook_global_time_window", lambda: ("", ""))
+    monkeypatch.setattr(orch, "_load_routing_rules", lambda: ())
+    monkeypatch.setattr(orch.DeduplicationService, "get_instance", classmethod(lambda cls: dedup))
+    monkeypatch.setattr(orch, "_handle_r2_enrichment", lambda *a, **k: None)
+    monkeypatch.setattr(orch.WebhookLoggerService, "append_log", lambda self, *_: None)
+    monkeypatch.setattr(orch.HttpSessionService, "post", lambda self, url, **kwargs: _post(url, **kwargs))
+
+    with ImapStubServer() as stub:
+        stub.add_message(_raw(1, "ok@example.com"))
+        stub.add_message(_raw(2, "ok@example.com"))
+        stub.add_message(_raw(3, "stranger@example.com"))
+        stub.add_message(_raw(4, "stranger@example.com"))
+
+        def _open(_logger):
+            mail = imaplib.IMAP4(stub.host, stub.port, timeout=5)
+            mail.login(stub.user, stub.password)
+            return mail, None
+
+        monkeypatch.setattr(orch, "_open_imap_session", _open)
+        coordinator = PollCycleCoordinator()
+
+        def _run_cycle():
+            coordinator.run_sync(orch.check_new_emails_and_trigger_webhook, source="scheduler")
+            return last_cycle_new_mail_count()
+
+        scheduler = PollScheduler(
+            run_cycle=_run_cycle,
+            lease=RedisLease(mock_redis, LEASE_KEY, ttl_ms=60_000, owner_id="node-a"),
+            interval_sec=30, cadence=_cadence(), gate=lambda: (True, "sending_enabled"),
+        )
+
+        # When: four cycles run, then a new mail arrives
+        reasons = []
+        for _ in range(4):
+            scheduler.run_once()
+            reasons.append((scheduler.status()["interval_sec"], scheduler.status()["interval_reason"]))
+        stub.add_message(_raw(5, "stranger@example.com"))
+        scheduler.run_once()
+        reasons.append((scheduler.status()["interval_sec"], scheduler.status()["interval_reason"]))
+
+        # Then: the failing send is retried every cycle, yet only new mail counts as activity
+        assert len(posts) == 5
+        assert [stub.is_seen(uid) for uid in (1, 2, 3, 4)] == [True, False, False, False]
+        assert reasons == [
+            (5, "new_mail"), (30, "base"), (60, "idle_backoff"), (120, "idle_max"), (5, "new_mail"),
+        ]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "config,within,expected",
+    [
+        ({"webhook_sending_enabled": False}, True, (False, "webhook_sending_disabled")),
+        ({"webhook_time_start": "09h00", "webhook_time_end": "18h00"}, False, (False, "outside_time_window")),
+        ({"webhook_time_start": "09h00", "webhook_time_end": "18h00"}, True, (True, "sending_enabled")),
+    ],
+)
+def test_orchestrator_polling_gate(monkeypatch, config, within, expected):
+    from services import WebhookConfigService
+
+    class _Service:
+        reloads = 0
+
+        def reload(self):
+            _Service.reloads += 1
+
+        def get_all_config(self):
+            return dict(config)
+
+    monkeypatch.setattr(WebhookConfigService, "get_instance", classmethod(lambda cls, *a, **k: _Service()))
+    monkeypatch.setattr(orch, "is_within_time_window_local", lambda *a, **k: within)
+
+    assert orch.get_polling_gate() == expected
+    assert _Service.reloads == 1
@@ -0,0 +1,281 @@
+"""
+Tests for the per-webhook circuit breaker (services.circuit_breaker_service).
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from background.webhook_dispatcher import WebhookDispatcher
+from email_processing import orchestrator as orch
+from services.circuit_breaker_service import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    WebhookCircuitBreakerService,
+)
+from services.webhook_outbox_service import WebhookOutboxService, outbox_job_id
+
+HOOK_URL = "https://hook.eu1.make.com/secret-token"
+
+
+@pytest.fixture
+def clock():
+    now = [1_000.0]
+    return SimpleNamespace(now=now, time=lambda: now[0])
+
+
+def _breaker(clock, redis_client=None, threshold=3):
+    return WebhookCircuitBreakerService(
+        redis_client=redis_client, failure_threshold=threshold, cooldown_sec=60, clock=clock.time,
+    )
+
+
+@pytest.mark.unit
+def test_opens_after_threshold_and_recovers_through_single_probe(clock):
+    breaker = _breaker(clock)
+
+    # Given: consecutive server errors up to the threshold
+    assert breaker.record_failure(HOOK_URL, "upstream_server_error") == STATE_CLOSED
+    assert breaker.record_failure(HOOK_URL, "request_failed") == STATE_CLOSED
+    assert breaker.record_failure(HOOK_URL, "rate_limited") == STATE_OPEN
+
+    # Then: requests fail fast during the cooldown
+    assert breaker.allow_request(HOOK_URL) is False
+    clock.now[0] += 60
+
+    # When: the cooldown elapses, only one caller probes the receiver
+    assert breaker.allow_request(HOOK_URL) is True
+    assert breaker.get_state(HOOK_URL) == STATE_HALF_OPEN
+    assert breaker.allow_request(HOOK_URL) is False
+
+    # Then: a successful probe closes the circuit
+    breaker.record_success(HOOK_URL)
+    assert breaker.get_state(HOOK_URL) == STATE_CLOSED
+    assert breaker.allow_request(HOOK_URL) is True
+    stats = breaker.get_stats()
+    assert (stats["tripped"], stats["recovered"], stats["fast_failed"]) == (1, 1, 2)
+
+
+@pytest.mark.unit
+def test_failed_probe_reopens_for_a_new_cooldown(clock):
+    breaker = _breaker(clock, threshold=1)
+    breaker.record_failure(HOOK_URL, "upstream_server_error")
+    clock.now[0] += 60
+    assert breaker.allow_request(HOOK_URL) is True
+
+    assert breaker.record_failure(HOOK_URL, "request_failed") == STATE_OPEN
+    assert breaker.allow_request(HOOK_URL) is False
+    clock.now[0] += 60
+    assert breaker.allow_request(HOOK_URL) is True
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("reason", ["upstream_client_error", "unsupported_media_type", "remote_application_error"])
+def test_receiver_side_rejections_do_not_trip(clock, reason):
+    # A 4xx / 415 / success=false answer proves the receiver is up
+    breaker = _breaker(clock, threshold=2)
+    breaker.record_failure(HOOK_URL, "upstream_server_error")
+
+    assert breaker.record_failure(HOOK_URL, reason) == STATE_CLOSED
+    assert breaker.record_failure(HOOK_URL, "upstream_server_error") == STATE_CLOSED
+
+
+@pytest.mark.unit
+def test_state_is_shared_between_workers_through_redis(clock, mock_redis):
+    worker_a = _breaker(clock, mock_redis, threshold=2)
+    worker_b = _breaker(clock, mock_redis, threshold=2)
+
+    # Given: failures observed by two different workers
+    worker_a.record_failure(HOOK_URL, "upstream_server_error")
+    worker_b.record_failure(HOOK_URL, "upstream_server_error")
+
+    # Then: both see the circuit open, and only one of them gets the probe
+    assert worker_a.allow_request(HOOK_URL) is False
+    clock.now[0] += 60
+    assert [worker_a.allow_request(HOOK_URL), worker_b.allow_request(HOOK_URL)] == [True, False]
+
+    snapshot = _breaker(clock, mock_redis).get_snapshot()
+    assert snapshot == [{
+        "url": "https://hook.eu1.make.com/***", "state": STATE_HALF_OPEN, "failures": 2,
+        "last_failure_reason": "upstream_server_error", "opened_at": 1000, "retry_at": None,
+    }]
+
+
+@pytest.mark.unit
+def test_concurrent_failures_are_all_counted_and_trip_once(clock, mock_redis):
+    # Given: eight workers recording failures at the same time against one Redis
+    workers = [_breaker(clock, mock_redis, threshold=50) for _ in range(8)]
+    start = threading.Barrier(len(workers))
+
+    def _fail(worker):
+        start.wait()
+        for _ in range(25):
+            worker.record_failure(HOOK_URL, "upstream_server_error")
+
+    threads = [threading.Thread(target=_fail, args=(worker,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Then: no increment is lost and a single worker opened the circuit
+    assert mock_redis.hget(f"r:ss:webhook_circuit:v1:{workers[0]._digest(HOOK_URL)}", "failures") == "200"
+    assert sum(worker.get_stats()["tripped"] for worker in workers) == 1
+    assert workers[0].get_state(HOOK_URL) == STATE_OPEN
+
+
+class _DownReceiver:
+    def __init__(self):
+        self.posts = 0
+
+    def post(self, url, **kwargs):
+        self.posts += 1
+        raise ConnectionError("read timed out")
+
+
+class _UnsupportedMediaReceiver:
+    def __init__(self):
+        self.posts = 0
+
+    def post(self, url, **kwargs):
+        self.posts += 1
+        return SimpleNamespace(status_code=415, content=b"", text="Unsupported Media Type", json=lambda: {})
+
+
+class _TrippingBreaker:
+    """Circuit opened by the first recorded failure (e.g. concurrent failures from other workers)."""
+
+    def allow_request(self, _url):
+        return True
+
+    def record_success(self, _url):
+        return None
+
+    def record_failure(self, _url, _reason):
+        return STATE_OPEN
+
+
+def _send(receiver, breaker, logs, retry_count=2, **kwargs):
+    return orch.send_custom_webhook_flow(
+        email_id="e1", subject="s", payload_for_webhook={"a": 1}, delivery_links=["x"],
+        webhook_url=HOOK_URL, webhook_ssl_verify=True, allow_without_links=True,
+        processing_prefs={"retry_count": retry_count, "retry_delay_sec": 0, "webhook_timeout_sec": 1},
+        rate_limit_allow_send=lambda: True, record_send_event=lambda: None, append_webhook_log=logs.append,
+        mark_email_id_as_processed_redis=lambda eid: True, mark_email_as_read_imap=lambda *a, **k: True,
+        mail=None, email_num=None, urlparse=None, requests=receiver, time=time,
+        logger=orch.logging.getLogger(), circuit_breaker=breaker, **kwargs,
+    )
+
+
+@pytest.mark.unit
+def test_inline_flow_stops_retrying_then_fails_fast(clock):
+    # Given: a receiver that times out, retry_count=5, threshold=3
+    receiver, logs = _DownReceiver(), []
+    breaker = _breaker(clock)
+
+    # When: the first email exhausts attempts until the circuit opens
+    with pytest.raises(ConnectionError):
+        _send(receiver, breaker, logs, retry_count=5)
+    assert receiver.posts == 3
+
+    # Then: the next emails cost no HTTP request at all
+    started = time.monotonic()
+    for _ in range(10):
+        assert _send(receiver, breaker, logs) is True
+    assert time.monotonic() - started < 0.5
+    assert receiver.posts == 3
+    assert {e["failure_reason"] for e in logs} == {"circuit_open"}
+
+
+@pytest.mark.unit
+def test_retries_stop_when_an_error_response_leaves_the_circuit_open():
+    # Given: 415 answers (retried) and a circuit that is open after the first recorded failure
+    receiver, logs = _UnsupportedMediaReceiver(), []
+
+    # When
+    _send(receiver, _TrippingBreaker(), logs, retry_count=5, webhook_fallback_on_415=False)
+
+    # Then: no retry is posted to the open circuit
+    assert receiver.posts == 1
+
+
+@pytest.mark.unit
+def test_circuit_open_send_stays_unseen_without_an_outbox(monkeypatch, tmp_path):
+    # Given: an available outbox store, but neither the outbox nor pacing enabled
+    monkeypatch.setattr(WebhookOutboxService, "_instance", WebhookOutboxService(sqlite_path=tmp_path / "o.sqlite3"))
+    monkeypatch.setattr(orch.settings, "WEBHOOK_CIRCUIT_BREAKER_ENABLED", True, raising=False)
+    monkeypatch.setattr(orch.settings, "WEBHOOK_OUTBOX_ENABLED", False, raising=False)
+    monkeypatch.setattr(orch.settings, "WEBHOOK_RATE_LIMIT_PACING_ENABLED", False, raising=False)
+
+    # Then: no deferral; the fail-fast send is not marked read and the next cycle retries it
+    assert orch._get_circuit_deferral() is None
+    monkeypatch.setattr(orch.settings, "WEBHOOK_OUTBOX_ENABLED", True, raising=False)
+    assert orch._get_circuit_deferral() is not None
+
+
+@pytest.mark.unit
+def test_outbox_job_is_parked_without_consuming_an_attempt(clock, tmp_path):
+    breaker = _breaker(clock, threshold=1)
+    breaker.record_failure(HOOK_URL, "upstream_server_error")
+    outbox = WebhookOutboxService(sqlite_path=tmp_path / "outbox.sqlite3", clock=clock.time)
+    outbox.enqueue({"job_id": outbox_job_id("e1", HOOK_URL), "email_id": "e1", "webhook_url": HOOK_URL,
+                    "serialized_payload": "{}", "delivery_mode": "json"})
+    receiver = _DownReceiver()
+    dispatcher = WebhookDispatcher(
+        outbox=outbox,
+        deliver=lambda job, final: orch.deliver_outbox_job(
+            job, final, requests=receiver, record_send_event=lambda: None, append_webhook_log=lambda *_: None,
+            logger=orch.logging.getLogger(), circuit_breaker=breaker,
+        ),
+        acknowledge=lambda job: None,
+        defer_sec=60,
+    )
+
+    assert dispatcher.run_once() == 1
+
+    assert receiver.posts == 0
+    assert dispatcher.status()["deferred"] == 1
+    assert outbox.claim_due(limit=1, visibility_sec=60) == []
+    clock.now[0] += 60
+    (job,) = outbox.claim_due(limit=1, visibility_sec=60)
+    assert job["attempts"] == 0
+
+
+@pytest.mark.unit
+def test_fail_fast_send_is_queued_until_the_cooldown_ends(clock, tmp_path):
+    # Given: an open circuit (opened at t=1000, cooldown 60s) and an outbox
+    breaker = _breaker(clock, threshold=1)
+    breaker.record_failure(HOOK_URL, "upstream_server_error")
+    clock.now[0] += 15
+    outbox = WebhookOutboxService(sqlite_path=tmp_path / "outbox.sqlite3", clock=clock.time)
+
+    def _defer(job):
+        retry_after = breaker.retry_after(job["webhook_url"])
+        outbox.enqueue(job, delay_sec=retry_after)
+        return retry_after
+
+    receiver, logs = _DownReceiver(), []
+
+    # When: an email is sent while the circuit is open
+    assert orch.send_custom_webhook_flow(
+        email_id="e1", subject="s", payload_for_webhook={"a": 1}, delivery_links=["x"],
+        webhook_url=HOOK_URL, webhook_ssl_verify=True, allow_without_links=True,
+        processing_prefs={"retry_count": 0, "retry_delay_sec": 0, "webhook_timeout_sec": 1},
+        rate_limit_allow_send=lambda: True, record_send_event=lambda: None, append_webhook_log=logs.append,
+        mark_email_id_as_processed_redis=lambda eid: True, mark_email_as_read_imap=lambda *a, **k: True,
+        mail=None, email_num=None, urlparse=None, requests=receiver, time=time,
+        logger=orch.logging.getLogger(), circuit_breaker=breaker, defer_webhook_job=_defer,
+    ) is False
+
+    # Then: nothing is posted; the send waits in the outbox until opened_at + cooldown
+    assert receiver.posts == 0
+    assert [(e["status"], e["failure_reason"], e["retry_after_sec"]) for e in logs] == [
+        ("deferred", "circuit_open", 45.0),
+    ]
+    clock.now[0] += 44
+    assert outbox.claim_due(limit=1, visibility_sec=60) == []
+    clock.now[0] += 1
+    (job,) = outbox.claim_due(limit=1, visibility_sec=60)
+    assert (job["job_id"], job["webhook_url"]) == (outbox_job_id("e1", HOOK_URL), HOOK_URL)
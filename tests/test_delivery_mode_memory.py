@@ -0,0 +1,110 @@
+"""
+Tests for per-webhook delivery-mode learning (services.delivery_mode_service).
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from email_processing import orchestrator as orch
+from services.delivery_mode_service import DeliveryModeMemoryService
+
+HOOK_URL = "https://hook.eu1.make.com/form-only"
+FORM = "application/x-www-form-urlencoded"
+
+
+class _Receiver:
+    """Webhook factice n'acceptant qu'un Content-Type (415 sinon)."""
+
+    def __init__(self, accepts: str):
+        self.accepts = accepts
+        self.content_types = []
+
+    def post(self, url, **kwargs):
+        content_type = kwargs["headers"]["Content-Type"]
+        self.content_types.append(content_type)
+        if content_type != self.accepts:
+            return SimpleNamespace(status_code=415, text="Unsupported Media Type", content=b"")
+        return SimpleNamespace(status_code=200, text="{}", content=b"{}", json=lambda: {"success": True})
+
+
+def _send(receiver, memory, email_id):
+    logs = []
+    orch.send_custom_webhook_flow(
+        email_id=email_id,
+        subject="s",
+        payload_for_webhook={"hello": "world"},
+        delivery_links=["x"],
+        webhook_url=HOOK_URL,
+        webhook_ssl_verify=True,
+        allow_without_links=True,
+        processing_prefs={"retry_count": 0, "retry_delay_sec": 0, "webhook_timeout_sec": 1},
+        rate_limit_allow_send=lambda: True,
+        record_send_event=lambda: None,
+        append_webhook_log=logs.append,
+        mark_email_id_as_processed_redis=lambda eid: True,
+        mark_email_as_read_imap=lambda *a, **k: True,
+        mail=None,
+        email_num=None,
+        urlparse=None,
+        requests=receiver,
+        time=SimpleNamespace(sleep=lambda s: None),
+        logger=SimpleNamespace(info=lambda *a, **k: None, warning=lambda *a, **k: None,
+                               error=lambda *a, **k: None, debug=lambda *a, **k: None),
+        webhook_delivery_mode="json",
+        webhook_fallback_on_415=True,
+        delivery_mode_memory=memory,
+    )
+    return logs[-1]
+
+
+@pytest.mark.unit
+def test_form_only_receiver_costs_one_post_after_learning(mock_redis):
+    # Given: a receiver that answers 415 to JSON
+    receiver = _Receiver(accepts=FORM)
+    memory = DeliveryModeMemoryService(redis_client=mock_redis)
+
+    # When: three emails are delivered
+    entries = [_send(receiver, memory, f"e{i}") for i in range(3)]
+
+    # Then: only the first email pays the 415 double POST
+    assert len(receiver.content_types) == 4
+    assert [e["attempted_delivery_modes"] for e in entries] == [["json", "form"], ["form"], ["form"]]
+    assert all(e["status"] == "success" for e in entries)
+    stats = memory.get_stats()
+    assert (stats["learned"], stats["first_attempts_avoided"]) == (1, 2)
+    # And the learned mode is shared with other workers through Redis
+    assert DeliveryModeMemoryService(redis_client=mock_redis).get_mode(HOOK_URL) == "form"
+
+
+@pytest.mark.unit
+def test_receiver_switching_back_to_json_is_relearned():
+    receiver = _Receiver(accepts=FORM)
+    memory = DeliveryModeMemoryService()
+    _send(receiver, memory, "e1")
+
+    receiver.accepts = "application/json"
+    entry = _send(receiver, memory, "e2")
+
+    assert entry["attempted_delivery_modes"] == ["form", "json"]
+    assert memory.get_mode(HOOK_URL) == "json"
+    assert memory.get_stats()["relearned"] == 1
+
+
+@pytest.mark.unit
+def test_learned_mode_expires_without_redis():
+    now = [1_000.0]
+    memory = DeliveryModeMemoryService(ttl_sec=60, clock=lambda: now[0])
+    memory.remember(HOOK_URL, "form")
+
+    assert memory.get_mode(HOOK_URL) == "form"
+    now[0] += 61
+    assert memory.get_mode(HOOK_URL) is None
+
+
+@pytest.mark.unit
+def test_flow_without_memory_keeps_configured_order():
+    receiver = _Receiver(accepts=FORM)
+
+    entries = [_send(receiver, None, f"e{i}") for i in range(2)]
+
+    assert [e["attempted_delivery_modes"] for e in entries] == [["json", "form"], ["json", "form"]]
@@ -0,0 +1,148 @@
+"""
+Tests for budget-bounded MIME body extraction (orchestrator._extract_email_bodies).
+"""
+import base64
+import os
+import quopri
+import tracemalloc
+from email import message_from_bytes
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import pytest
+
+from email_processing import orchestrator as orch
+
+# Benchmark mémoire sur un message de ~20 MB: hors suite par défaut, RUN_BENCHMARKS=1 pour le lancer
+LARGE_BENCHMARK = pytest.mark.skipif(
+    os.environ.get("RUN_BENCHMARKS") != "1", reason="set RUN_BENCHMARKS=1 to run the 20 MB peak-memory benchmark"
+)
+
+
+class _Logger:
+    def __init__(self):
+        self.warnings = []
+
+    def warning(self, msg, *args, **_kwargs):
+        self.warnings.append(msg % args if args else msg)
+
+    def __getattr__(self, _name):
+        return lambda *a, **k: None
+
+
+def _newsletter(plain_size: int, html_size: int, images: int, image_size: int) -> bytes:
+    root = MIMEMultipart("related")
+    alt = MIMEMultipart("alternative")
+    alt.attach(MIMEText("p" * plain_size, "plain", "utf-8"))
+    alt.attach(MIMEText("<p>" + "h" * html_size + "</p>", "html", "utf-8"))
+    root.attach(alt)
+    for _ in range(images):
+        img = MIMEImage(os.urandom(image_size), "png")
+        img.add_header("Content-Disposition", "inline")
+        root.attach(img)
+    return root.as_bytes()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("cte", ["base64", "quoted-printable", "8bit"])
+def test_extract_matches_full_decode_for_small_parts(cte):
+    # Given: a plain + HTML message in each transfer encoding
+    text = "Lien : https://www.dropbox.com/scl/fo/abc123 — été\n" * 20
+    if cte == "base64":
+        encoded = base64.encodebytes(text.encode("utf-8"))
+    elif cte == "quoted-printable":
+        encoded = quopri.encodestring(text.encode("utf-8"))
+    else:
+        encoded = text.encode("utf-8")
+    raw = b"Content-Type: multipart/alternative; boundary=BND\r\n\r\n"
+    for subtype in ("plain", "html"):
+        raw += (
+            f"--BND\r\nContent-Type: text/{subtype}; charset=utf-8\r\n"
+            f"Content-Transfer-Encoding: {cte}\r\n\r\n"
+        ).encode() + encoded + b"\r\n"
+    raw += b"--BND--\r\n"
+    parsed = orch._parse_message_bytes(raw)
+    expected = [
+        p.get_payload(decode=True).decode("utf-8") for p in parsed.walk() if p.get_content_maintype() == "text"
+    ]
+
+    # When
+    plain, html = orch._extract_email_bodies(parsed, _Logger())
+
+    # Then: identical to a full get_payload(decode=True)
+    assert [plain, html] == expected
+    assert "été" in plain
+
+
+@pytest.mark.unit
+def test_extract_never_decodes_non_text_parts(monkeypatch):
+    msg = orch._parse_message_bytes(_newsletter(100, 100, images=2, image_size=4096))
+    for part in msg.walk():
+        if part.get_content_maintype() == "image":
+            monkeypatch.setattr(part, "get_payload", lambda *a, **k: pytest.fail("image part decoded"))
+
+    plain, html = orch._extract_email_bodies(msg, _Logger())
+
+    assert plain == "p" * 100
+    assert html == "<p>" + "h" * 100 + "</p>"
+
+
+@pytest.mark.unit
+def test_extract_enforces_one_budget_across_plain_and_html(monkeypatch):
+    # Given: a 64 KiB budget and 48 KiB of plain + 48 KiB of HTML
+    monkeypatch.setattr(orch.settings, "EMAIL_BODY_MAX_BYTES", 64 * 1024, raising=False)
+    msg = orch._parse_message_bytes(_newsletter(48 * 1024, 48 * 1024, images=0, image_size=0))
+    logger = _Logger()
+
+    # When
+    plain, html = orch._extract_email_bodies(msg, logger)
+
+    # Then: plain is complete, HTML gets the remainder, one budget warning
+    assert len(plain) == 48 * 1024
+    assert len(plain.encode()) + len(html.encode()) == 64 * 1024
+    assert logger.warnings == [f"Email body truncated (exceeded {64 * 1024} bytes budget)"]
+
+
+@pytest.mark.unit
+def test_extract_keeps_html_cap_warning():
+    msg = orch._parse_message_bytes(_newsletter(10, orch.MAX_HTML_BYTES + 100, images=0, image_size=0))
+    logger = _Logger()
+
+    _, html = orch._extract_email_bodies(msg, logger)
+
+    assert len(html.encode()) == orch.MAX_HTML_BYTES
+    assert logger.warnings == ["HTML content truncated (exceeded 1MB limit)"]
+
+
+@pytest.mark.slow
+@LARGE_BENCHMARK
+def test_extract_peak_memory_is_bounded_for_newsletter_messages():
+    """Benchmark: ~20 MB newsletter (3 MB plain, 3 MB HTML, 4 x 2 MB inline images)."""
+    raw = _newsletter(3 * 1024 * 1024, 3 * 1024 * 1024, images=4, image_size=2 * 1024 * 1024)
+
+    def _legacy(data: bytes):
+        msg = message_from_bytes(data)
+        plain, html = "", ""
+        for part in msg.walk():
+            payload = part.get_payload(decode=True) or b""
+            if part.get_content_type() == "text/plain":
+                plain += payload.decode("utf-8", errors="ignore")
+            elif part.get_content_type() == "text/html":
+                html += payload[: orch.MAX_HTML_BYTES].decode("utf-8", errors="ignore")
+        return plain, html
+
+    def _streaming(data: bytes):
+        return orch._extract_email_bodies(orch._parse_message_bytes(data), _Logger())
+
+    peaks = {}
+    for name, fn in (("legacy", _legacy), ("streaming", _streaming)):
+        tracemalloc.start()
+        plain, html = fn(raw)
+        peaks[name] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if name == "streaming":
+            assert len(plain.encode()) + len(html.encode()) <= orch._get_body_byte_budget()
+
+    assert peaks["streaming"] < peaks["legacy"] / 2
+    assert peaks["streaming"] < 3 * len(raw)
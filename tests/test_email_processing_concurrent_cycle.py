@@ -0,0 +1,144 @@
+"""
+Tests for concurrent per-email processing (orchestrator._process_emails_concurrently
++ imap_client.ImapCommandChannel).
+"""
+import imaplib
+import threading
+import time
+
+import pytest
+
+from email_processing import imap_client
+from email_processing import orchestrator as orch
+from tests.imap_stub_server import ImapStubServer
+
+SLOW_SEND_SEC = 0.4
+
+
+class _Dedup:
+    def is_email_processed(self, _email_id):
+        return False
+
+    def mark_email_processed(self, _email_id):
+        return True
+
+    def generate_subject_group_id(self, subject):
+        return subject
+
+    def is_subject_group_processed(self, _group_id):
+        return False
+
+
+def _raw(i: int) -> bytes:
+    return (
+        f"Subject: Lot {i}\r\n"
+        "From: Sender <ok@example.com>\r\n"
+        f"Message-ID: <concurrent-{i}@example.com>\r\n"
+        "Date: Wed, 22 Oct 2025 10:00:00 +0200\r\n"
+        "\r\n"
+        f"https://www.dropbox.com/scl/fo/lot{i}\r\n"
+    ).encode("utf-8")
+
+
+@pytest.mark.unit
+def test_channel_runs_worker_commands_on_owner_thread():
+    # Given: a channel owned by the test thread
+    calls = []
+
+    class _Mail:
+        def store(self, num, *_):
+            calls.append((num, threading.get_ident()))
+            return "OK", [b""]
+
+    channel = imap_client.ImapCommandChannel(_Mail())
+    results = []
+    worker = threading.Thread(target=lambda: results.append(channel.proxy().store(b"7", "+FLAGS", "\\Seen")))
+
+    # When: a worker issues a STORE and the owner pumps
+    worker.start()
+    while worker.is_alive():
+        channel.pump(timeout=0.05)
+    worker.join()
+
+    # Then: the command ran on the owner thread and its result reached the worker
+    assert calls == [(b"7", threading.get_ident())]
+    assert results == [("OK", [b""])]
+
+
+@pytest.mark.unit
+def test_channel_close_fails_pending_and_new_commands():
+    channel = imap_client.ImapCommandChannel(object())
+    errors = []
+
+    def _worker():
+        try:
+            channel.proxy().noop()
+        except imaplib.IMAP4.abort as e:
+            errors.append(e)
+
+    pending = threading.Thread(target=_worker)
+    pending.start()
+    time.sleep(0.05)
+    channel.close()
+    pending.join(timeout=2)
+    late = threading.Thread(target=_worker)
+    late.start()
+    late.join(timeout=2)
+
+    assert not pending.is_alive() and not late.is_alive()
+    assert len(errors) == 2
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("workers", [1, 4])
+def test_cycle_overlaps_sends_across_workers(monkeypatch, workers):
+    # Given: 4 eligible emails whose webhook takes SLOW_SEND_SEC and marks the email read
+    owner = threading.get_ident()
+    store_threads = []
+    in_flight = {"now": 0, "peak": 0}
+    in_flight_lock = threading.Lock()
+    monkeypatch.setattr(orch.settings, "EMAIL_PROCESSING_WORKERS", workers, raising=False)
+    monkeypatch.setattr(orch.settings, "SENDER_LIST_FOR_POLLING", ["ok@example.com"], raising=False)
+    monkeypatch.setattr(orch, "_is_webhook_sending_enabled", lambda: True)
+    monkeypatch.setattr(orch, "_load_webhook_global_time_window", lambda: ("", ""))
+    monkeypatch.setattr(orch, "_load_routing_rules", lambda: ())
+    monkeypatch.setattr(orch.DeduplicationService, "get_instance", classmethod(lambda cls: _Dedup()))
+    monkeypatch.setattr(orch, "_handle_r2_enrichment", lambda *a, **k: None)
+
+    def _slow_send(email_id, subject, payload, links, url, prefs, mail, num, logger, **_kwargs):
+        assert orch._CYCLE_WEBHOOK_CONFIG.get() is not None  # cycle snapshot visible from workers
+        with in_flight_lock:
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        time.sleep(SLOW_SEND_SEC)
+        with in_flight_lock:
+            in_flight["now"] -= 1
+        imap_client.mark_email_as_read_imap(None, mail, num)
+        return False
+
+    monkeypatch.setattr(orch, "_send_webhook", _slow_send)
+    with ImapStubServer() as stub:
+        for i in range(1, 5):
+            stub.add_message(_raw(i))
+
+        class _TracingIMAP(imaplib.IMAP4):
+            def store(self, *args):
+                store_threads.append(threading.get_ident())
+                return super().store(*args)
+
+        def _open(_logger):
+            mail = _TracingIMAP(stub.host, stub.port, timeout=5)
+            mail.login(stub.user, stub.password)
+            return mail, None
+
+        monkeypatch.setattr(orch, "_open_imap_session", _open)
+
+        # When
+        triggered = orch.check_new_emails_and_trigger_webhook()
+
+        # Then: every email delivered and read, all STOREs issued by the poller thread
+        assert triggered == 4
+        assert all(stub.is_seen(i) for i in range(1, 5))
+        assert store_threads == [owner] * 4
+    # And: one send at a time with 1 worker, all 4 in flight together with 4 workers
+    assert in_flight["peak"] == workers
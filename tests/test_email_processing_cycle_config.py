@@ -0,0 +1,141 @@
+"""
+Tests for the per-cycle configuration snapshot (orchestrator.CycleConfig).
+"""
+import dataclasses
+import imaplib
+
+import pytest
+
+from config import app_config_store
+from email_processing import orchestrator as orch
+from services.runtime_metrics_service import RuntimeMetricsService
+from tests.imap_stub_server import ImapStubServer
+
+
+class _Logger:
+    def __getattr__(self, _name):
+        return lambda *a, **k: None
+
+
+class _StoreBackedService:
+    """Service factice dont chaque reload() coûte une lecture du config store."""
+
+    def __init__(self, key: str, data: dict):
+        self.key = key
+        self.data = data
+        self.reloads = 0
+
+    def reload(self):
+        self.reloads += 1
+        app_config_store.get_config_json(self.key)
+
+    def get_all_config(self):
+        return dict(self.data)
+
+    def get_payload(self):
+        return dict(self.data)
+
+
+class _Dedup:
+    def is_email_processed(self, _email_id):
+        return False
+
+    def mark_email_processed(self, _email_id):
+        return True
+
+    def generate_subject_group_id(self, subject):
+        return subject
+
+    def is_subject_group_processed(self, _group_id):
+        return False
+
+
+def _raw(i: int) -> bytes:
+    return (
+        f"Subject: Lot {i}\r\n"
+        "From: Sender <ok@example.com>\r\n"
+        f"Message-ID: <cycle-{i}@example.com>\r\n"
+        "Date: Wed, 22 Oct 2025 10:00:00 +0200\r\n"
+        "\r\n"
+        "https://www.dropbox.com/scl/fo/abc123\r\n"
+    ).encode("utf-8")
+
+
+@pytest.fixture
+def store_services(monkeypatch):
+    from services import RoutingRulesService, WebhookConfigService
+
+    monkeypatch.setenv("CONFIG_STORE_DISABLE_REDIS", "1")
+    monkeypatch.delenv("EXTERNAL_CONFIG_BASE_URL", raising=False)
+    webhook = _StoreBackedService("webhook_config", {"webhook_sending_enabled": True, "webhook_time_start": ""})
+    routing = _StoreBackedService("routing_rules", {"rules": []})
+    monkeypatch.setattr(WebhookConfigService, "get_instance", classmethod(lambda cls, *a, **k: webhook))
+    monkeypatch.setattr(RoutingRulesService, "get_instance", classmethod(lambda cls, *a, **k: routing))
+    monkeypatch.setattr(orch, "_load_runtime_flags", lambda: {"gmail_ingress_enabled": True})
+    return webhook, routing
+
+
+@pytest.mark.unit
+def test_cycle_config_is_immutable(monkeypatch, store_services):
+    monkeypatch.setattr(orch.settings, "SENDER_LIST_FOR_POLLING", ["OK@Example.com"], raising=False)
+
+    cfg = orch._build_cycle_config(_Logger())
+
+    assert cfg.sender_allowlist == frozenset({"ok@example.com"})
+    assert cfg.webhook_sending_enabled is True
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cfg.time_window = ("09h00", "18h00")
+    with pytest.raises(TypeError):
+        cfg.processing_prefs["max_email_size_mb"] = 1
+    with pytest.raises(TypeError):
+        cfg.runtime_flags["gmail_ingress_enabled"] = False
+
+
+@pytest.mark.unit
+def test_nested_webhook_config_reads_use_cycle_snapshot(store_services):
+    webhook, _ = store_services
+    cfg = orch._build_cycle_config(_Logger())
+    token = orch._CYCLE_WEBHOOK_CONFIG.set(cfg.webhook_config)
+    try:
+        for _ in range(3):
+            orch._resolve_webhook_delivery_settings(webhook_delivery_mode=None, webhook_fallback_on_415=None)
+            orch._load_webhook_global_time_window()
+    finally:
+        orch._CYCLE_WEBHOOK_CONFIG.reset(token)
+
+    assert webhook.reloads == 1
+
+
+@pytest.mark.unit
+def test_cycle_reads_config_once_regardless_of_email_count(monkeypatch, store_services):
+    # Given: 5 eligible emails and store-backed config services
+    webhook, routing = store_services
+    sent = []
+    monkeypatch.setattr(orch.settings, "SENDER_LIST_FOR_POLLING", ["ok@example.com"], raising=False)
+    monkeypatch.setattr(orch.DeduplicationService, "get_instance", classmethod(lambda cls: _Dedup()))
+    monkeypatch.setattr(orch, "_handle_r2_enrichment", lambda *a, **k: None)
+    monkeypatch.setattr(orch, "_send_webhook", lambda *a, **k: sent.append(a[0]) or False)
+    monkeypatch.setattr(orch, "is_within_time_window_local", lambda *a, **k: True)
+    with ImapStubServer() as stub:
+        for i in range(1, 6):
+            stub.add_message(_raw(i))
+
+        def _open(_logger):
+            mail = imaplib.IMAP4(stub.host, stub.port, timeout=5)
+            mail.login(stub.user, stub.password)
+            return mail, None
+
+        monkeypatch.setattr(orch, "_open_imap_session", _open)
+
+        # When
+        triggered = orch.check_new_emails_and_trigger_webhook()
+
+    # Then: one snapshot per cycle, no per-email reloads
+    assert triggered == 5
+    assert len(sent) == 5
+    assert webhook.reloads == 1
+    assert routing.reloads == 1
+    stats = RuntimeMetricsService.get_instance().get_last_poll_cycle_stats()
+    assert stats["config_reads"] == stats["snapshot_config_reads"]
+    # webhook_config + routing_rules + processing_prefs (legacy: 1 + 3 per email = 16)
+    assert stats["config_reads"] == 3
@@ -0,0 +1,172 @@
+"""
+Tests for batched IMAP FETCH (imap_client.fetch_messages + orchestrator._iter_parsed_emails).
+"""
+import imaplib
+import os
+import time
+
+import pytest
+
+from email_processing import imap_client
+from email_processing import orchestrator as orch
+from tests.imap_stub_server import ImapStubServer
+
+# Benchmark chronométré: hors suite par défaut, RUN_BENCHMARKS=1 pour le lancer
+BENCHMARK = pytest.mark.skipif(
+    os.environ.get("RUN_BENCHMARKS") != "1", reason="set RUN_BENCHMARKS=1 to run the wall-clock benchmark"
+)
+
+
+def _raw(i: int) -> bytes:
+    return (
+        f"Subject: Lot {i}\r\n"
+        f"From: Sender <sender{i}@example.com>\r\n"
+        f"Message-ID: <msg-{i}@example.com>\r\n"
+        "Date: Wed, 22 Oct 2025 10:00:00 +0200\r\n"
+        "Content-Type: text/plain; charset=utf-8\r\n"
+        "\r\n"
+        f"Corps du message {i}\r\n"
+    ).encode("utf-8")
+
+
+def _connect(stub: ImapStubServer) -> imaplib.IMAP4:
+    mail = imaplib.IMAP4(stub.host, stub.port, timeout=5)
+    mail.login(stub.user, stub.password)
+    mail.select("INBOX")
+    return mail
+
+
+class _Logger:
+    def __getattr__(self, _name):
+        return lambda *a, **k: None
+
+
+@pytest.mark.unit
+def test_compress_message_set_builds_ranges():
+    assert imap_client.compress_message_set([b"1", b"2", b"3", b"5", b"7", b"8"]) == "1:3,5,7:8"
+    assert imap_client.compress_message_set([]) == ""
+
+
+@pytest.mark.unit
+def test_chunk_message_numbers_preserves_order():
+    assert imap_client.chunk_message_numbers([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4], [5]]
+
+
+@pytest.mark.unit
+def test_parse_fetch_response_demultiplexes_literals_and_atoms():
+    data = [
+        (b"1 (UID 11 RFC822.SIZE 42 BODY[HEADER.FIELDS (FROM SUBJECT)] {12}", b"Subject: A\r\n"),
+        (b" RFC822 {3}", b"abc"),
+        b" FLAGS (\\Seen))",
+        (b"2 (UID 12 RFC822 {3}", b"xyz"),
+        b")",
+        b"3 (UID 13 FLAGS ())",
+    ]
+
+    parsed = imap_client.parse_fetch_response(data)
+
+    assert parsed["1"]["UID"] == 11
+    assert parsed["1"]["RFC822.SIZE"] == 42
+    assert parsed["1"]["BODY[HEADER.FIELDS (FROM SUBJECT)]"] == b"Subject: A\r\n"
+    assert parsed["1"]["RFC822"] == b"abc"
+    assert parsed["1"]["FLAGS"] == "(\\Seen)"
+    assert parsed["2"] == {"UID": 12, "RFC822": b"xyz"}
+    assert parsed["3"]["FLAGS"] == "()"
+
+
+@pytest.mark.unit
+def test_parse_fetch_response_ignores_unstructured_entries():
+    assert imap_client.parse_fetch_response([(b"1", b"raw"), None]) == {}
+
+
+@pytest.mark.unit
+def test_iter_parsed_emails_batches_against_stub(monkeypatch):
+    with ImapStubServer() as stub:
+        for i in range(1, 8):
+            stub.add_message(_raw(i))
+        mail = _connect(stub)
+        monkeypatch.setattr(orch.settings, "IMAP_FETCH_BATCH_SIZE", 3, raising=False)
+        nums = mail.search(None, "UNSEEN")[1][0].split()
+
+        results = list(orch._iter_parsed_emails(mail, nums, _Logger()))
+
+        assert [r[0] for r in results] == nums
+        assert [r[1]["subject"] for r in results] == [f"Lot {i}" for i in range(1, 8)]
+        assert results[0][1]["sender"] == "sender1@example.com"
+        assert stub.command_counts["FETCH"] == 3
+        mail.logout()
+
+
+@pytest.mark.unit
+def test_batched_fetch_leaves_messages_unseen_until_processed(monkeypatch):
+    with ImapStubServer() as stub:
+        for i in range(1, 5):
+            stub.add_message(_raw(i))
+        mail = _connect(stub)
+        monkeypatch.setattr(orch.settings, "IMAP_FETCH_BATCH_SIZE", 4, raising=False)
+        nums = mail.search(None, "UNSEEN")[1][0].split()
+
+        # When: the cycle stops after processing the first message of the batch
+        results = orch._iter_parsed_emails(mail, nums, _Logger())
+        num, parsed = next(results)
+        imap_client.mark_email_as_read_imap(None, mail, num)
+
+        # Then: only that message is \Seen, the rest of the batch stays UNSEEN
+        assert parsed["subject"] == "Lot 1"
+        assert [stub.is_seen(uid) for uid in range(1, 5)] == [True, False, False, False]
+        mail.logout()
+
+
+@pytest.mark.unit
+def test_iter_parsed_emails_falls_back_per_message_when_batch_unparsable(monkeypatch):
+    # Given: a server answering every FETCH with a bare (num, bytes) tuple
+    calls = []
+
+    class _LegacyMail:
+        def fetch(self, num, items):
+            calls.append(num)
+            return "OK", [(b"1", _raw(1))]
+
+    monkeypatch.setattr(orch.settings, "IMAP_FETCH_BATCH_SIZE", 50, raising=False)
+
+    # When
+    results = list(orch._iter_parsed_emails(_LegacyMail(), [b"1"], _Logger()))
+
+    # Then: the batch attempt is followed by the legacy single fetch
+    assert results[0][1]["subject"] == "Lot 1"
+    assert calls == ["1", b"1"]
+
+
+def _fetch_200(batch_size, latency_sec):
+    """Fetch 200 UNSEEN messages; returns (FETCH round trips, elapsed seconds)."""
+    with ImapStubServer(latency_sec=latency_sec) as stub:
+        for i in range(1, 201):
+            stub.add_message(_raw(i))
+        mail = _connect(stub)
+        nums = mail.search(None, "UNSEEN")[1][0].split()
+        fetch_before = stub.command_counts["FETCH"]
+        started = time.perf_counter()
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(orch.settings, "IMAP_FETCH_BATCH_SIZE", batch_size, raising=False)
+            parsed = [e for _, e in orch._iter_parsed_emails(mail, nums, _Logger()) if e]
+        elapsed = time.perf_counter() - started
+        round_trips = stub.command_counts["FETCH"] - fetch_before
+        mail.logout()
+    assert len(parsed) == 200
+    return round_trips, elapsed
+
+
+@pytest.mark.unit
+def test_batched_fetch_round_trips():
+    """200 UNSEEN messages: legacy per-message FETCH vs batches of 50."""
+    assert _fetch_200(1, 0)[0] == 200
+    assert _fetch_200(50, 0)[0] == 4
+
+
+@pytest.mark.slow
+@BENCHMARK
+def test_batched_fetch_benchmark_wall_clock():
+    """Benchmark: with a 2ms RTT, batching must beat per-message FETCH."""
+    _, legacy_elapsed = _fetch_200(1, 0.002)
+    _, batched_elapsed = _fetch_200(50, 0.002)
+    assert batched_elapsed < legacy_elapsed
@@ -0,0 +1,163 @@
+"""
+Tests for the header-first prefilter phase (orchestrator._prefilter_by_headers).
+"""
+import imaplib
+
+import pytest
+
+from email_processing import imap_client
+from email_processing import orchestrator as orch
+from tests.imap_stub_server import ImapStubServer
+
+
+def _raw(subject: str, sender: str, message_id: str) -> bytes:
+    return (
+        f"Subject: {subject}\r\n"
+        f"From: Sender <{sender}>\r\n"
+        f"Message-ID: <{message_id}@example.com>\r\n"
+        "Date: Wed, 22 Oct 2025 10:00:00 +0200\r\n"
+        "Content-Type: text/plain; charset=utf-8\r\n"
+        "\r\n"
+        + ("x" * 4096)
+        + "\r\n"
+    ).encode("utf-8")
+
+
+class _Logger:
+    def __getattr__(self, _name):
+        return lambda *a, **k: None
+
+
+class _Dedup:
+    def __init__(self, processed=()):
+        self.processed = set(processed)
+        self.marked = []
+
+    def is_email_processed(self, email_id):
+        return email_id in self.processed
+
+    def mark_email_processed(self, email_id):
+        self.marked.append(email_id)
+        return True
+
+
+@pytest.fixture
+def dedup(monkeypatch):
+    fake = _Dedup()
+    monkeypatch.setattr(orch.DeduplicationService, "get_instance", classmethod(lambda cls: fake))
+    return fake
+
+
+def _connect(stub: ImapStubServer) -> imaplib.IMAP4:
+    mail = imaplib.IMAP4(stub.host, stub.port, timeout=5)
+    mail.login(stub.user, stub.password)
+    mail.select("INBOX")
+    return mail
+
+
+def _email_id(subject: str, message_id: str) -> str:
+    return imap_client.generate_email_id({
+        "Message-ID": f"<{message_id}@example.com>",
+        "Subject": subject,
+        "Date": "Wed, 22 Oct 2025 10:00:00 +0200",
+    })
+
+
+@pytest.mark.unit
+def test_prefilter_downloads_bodies_only_for_survivors(monkeypatch, dedup):
+    # Given: a mailbox mixing allowlisted, foreign, already-processed and reply messages
+    monkeypatch.setattr(orch.settings, "IMAP_HEADER_PREFETCH_ENABLED", True, raising=False)
+    monkeypatch.setattr(orch.settings, "SENDER_LIST_FOR_POLLING", ["ok@example.com"], raising=False)
+    dedup.processed.add(_email_id("Lot déjà traité", "m3"))
+    with ImapStubServer() as stub:
+        stub.add_message(_raw("Lot 1", "ok@example.com", "m1"))
+        stub.add_message(_raw("Spam", "other@example.com", "m2"))
+        stub.add_message(_raw("Lot déjà traité", "ok@example.com", "m3"))
+        stub.add_message(_raw("RE: Lot 1", "ok@example.com", "m4"))
+        stub.add_message(_raw("Lot 5", "ok@example.com", "m5"))
+        mail = _connect(stub)
+        nums = mail.search(None, "UNSEEN")[1][0].split()
+
+        # When: running the header phase then the body download
+        survivors, approved = orch._prefilter_by_headers(mail, nums, _Logger())
+        parsed = [e for _, e in orch._iter_parsed_emails(mail, survivors, _Logger()) if e]
+
+        # Then: only the two eligible messages were downloaded in full
+        assert survivors == [b"1", b"5"]
+        assert approved == {b"1", b"5"}
+        assert [e["subject"] for e in parsed] == ["Lot 1", "Lot 5"]
+        assert stub.body_downloads == 2
+        # And the reply was marked processed/read without downloading its body
+        assert dedup.marked == [_email_id("RE: Lot 1", "m4")]
+        assert stub.is_seen(4)
+        mail.logout()
+
+
+@pytest.mark.unit
+def test_prefilter_keeps_messages_whose_headers_are_unavailable(monkeypatch, dedup):
+    # Given: a legacy server answering the header FETCH with an unstructured payload
+    monkeypatch.setattr(orch.settings, "IMAP_HEADER_PREFETCH_ENABLED", True, raising=False)
+
+    class _LegacyMail:
+        def fetch(self, num, items):
+            return "OK", [(b"1", b"Subject: x\r\n\r\n")]
+
+    # When
+    survivors, approved = orch._prefilter_by_headers(_LegacyMail(), [b"1", b"2"], _Logger())
+
+    # Then: nothing is filtered and the full-body path keeps applying the filters
+    assert survivors == [b"1", b"2"]
+    assert approved == set()
+
+
+@pytest.mark.unit
+def test_prefilter_disabled_is_passthrough(monkeypatch):
+    monkeypatch.setattr(orch.settings, "IMAP_HEADER_PREFETCH_ENABLED", False, raising=False)
+    monkeypatch.setattr(orch, "_load_processing_prefs", lambda: {"max_email_size_mb": None})
+
+    class _NoFetch:
+        def fetch(self, *_):
+            raise AssertionError("no header FETCH expected")
+
+    assert orch._prefilter_by_headers(_NoFetch(), [b"1"], _Logger()) == ([b"1"], set())
+
+
+class _WebhookLogs:
+    def __init__(self):
+        self.entries = []
+
+    def append_log(self, entry):
+        self.entries.append(entry)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("prefetch_enabled", [True, False])
+def test_prefilter_skips_oversized_messages_without_downloading(monkeypatch, dedup, prefetch_enabled):
+    # Given: max_email_size_mb=1 and a 2 MB message next to a small one
+    logs = _WebhookLogs()
+    monkeypatch.setattr(orch.settings, "IMAP_HEADER_PREFETCH_ENABLED", prefetch_enabled, raising=False)
+    monkeypatch.setattr(orch.settings, "SENDER_LIST_FOR_POLLING", [], raising=False)
+    monkeypatch.setattr(orch, "_load_processing_prefs", lambda: {"max_email_size_mb": 1})
+    monkeypatch.setattr(orch.WebhookLoggerService, "get_instance", classmethod(lambda cls: logs))
+    big = _raw("Gros lot", "ok@example.com", "big").replace(b"x" * 4096, b"x" * (2 * 1024 * 1024))
+    with ImapStubServer() as stub:
+        stub.add_message(big)
+        stub.add_message(_raw("Lot 2", "ok@example.com", "m2"))
+        mail = _connect(stub)
+
+        # When
+        survivors, _ = orch._prefilter_by_headers(mail, [b"1", b"2"], _Logger())
+        list(orch._iter_parsed_emails(mail, survivors, _Logger()))
+
+        # Then: the big message is never downloaded, logged and marked processed/read
+        assert survivors == [b"2"]
+        assert stub.body_downloads == 1
+        assert stub.is_seen(1)
+        assert dedup.marked == [_email_id("Gros lot", "big")]
+        assert len(logs.entries) == 1
+        entry = logs.entries[0]
+        assert entry["status"] == "skipped"
+        assert "status_code" not in entry
+        assert entry["failure_reason"] == "oversized_email"
+        assert entry["subject"] == "Gros lot"
+        mail.logout()
@@ -0,0 +1,258 @@
+"""
+Tests for email_processing.imap_client.ImapSessionPool against the in-process IMAP stub.
+"""
+import imaplib
+import threading
+import time
+
+import pytest
+
+from email_processing import imap_client
+from tests.imap_stub_server import ImapStubServer
+
+
+def _raw(subject: str) -> bytes:
+    return (
+        f"Subject: {subject}\r\n"
+        "From: sender@example.com\r\n"
+        "Content-Type: text/plain; charset=utf-8\r\n"
+        "\r\n"
+        "Bonjour\r\n"
+    ).encode("utf-8")
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def stub():
+    server = ImapStubServer().start()
+    yield server
+    server.stop()
+
+
+def _factory(stub: ImapStubServer):
+    def _connect():
+        mail = imaplib.IMAP4(stub.host, stub.port, timeout=5)
+        mail.login(stub.user, stub.password)
+        return mail
+    return _connect
+
+
+@pytest.mark.unit
+def test_pool_reuses_authenticated_session_across_cycles(stub):
+    # Given: a pool backed by the stub server
+    pool = imap_client.ImapSessionPool(connection_factory=_factory(stub), keepalive_interval_sec=60)
+
+    # When: three consecutive cycles borrow a session
+    for _ in range(3):
+        with pool.session() as mail:
+            assert mail.select("INBOX")[0] == "OK"
+
+    # Then: a single LOGIN was performed
+    assert stub.logins == 1
+    stats = pool.get_stats()
+    assert stats["created"] == 1
+    assert stats["reused"] == 2
+    pool.close_all()
+
+
+@pytest.mark.unit
+def test_pool_sends_noop_keepalive_after_interval(stub):
+    # Given: a session idle for longer than the keepalive interval
+    clock = _Clock()
+    pool = imap_client.ImapSessionPool(
+        connection_factory=_factory(stub), keepalive_interval_sec=30, clock=clock
+    )
+    with pool.session():
+        pass
+    clock.now += 31
+
+    # When: running the keepalive pass
+    kept = pool.keepalive()
+
+    # Then: the session is validated with NOOP and kept without a new LOGIN
+    assert kept == 1
+    assert stub.command_counts["NOOP"] == 1
+    assert stub.logins == 1
+    pool.close_all()
+
+
+@pytest.mark.unit
+def test_pool_reconnects_when_server_dropped_the_session(stub):
+    # Given: a pooled session whose socket was closed by the server
+    pool = imap_client.ImapSessionPool(connection_factory=_factory(stub), keepalive_interval_sec=600)
+    with pool.session():
+        pass
+    stub.drop_connections()
+    time.sleep(0.05)
+
+    # When: the next cycle borrows a session
+    with pool.session() as mail:
+        status, _ = mail.select("INBOX")
+
+    # Then: the dead session is detected and replaced transparently
+    assert status == "OK"
+    assert stub.logins == 2
+    assert pool.get_stats()["reconnects"] == 1
+    pool.close_all()
+
+
+@pytest.mark.unit
+def test_pool_discards_session_broken_during_use(stub):
+    pool = imap_client.ImapSessionPool(connection_factory=_factory(stub))
+
+    with pytest.raises(imaplib.IMAP4.abort):
+        with pool.session():
+            raise imaplib.IMAP4.abort("socket error")
+
+    stats = pool.get_stats()
+    assert stats["discarded"] == 1
+    assert stats["idle_sessions"] == 0
+
+
+@pytest.mark.unit
+def test_wait_for_new_mail_wakes_on_exists(stub):
+    # Given: a pool idling on INBOX
+    pool = imap_client.ImapSessionPool(connection_factory=_factory(stub))
+    threading.Timer(0.2, lambda: stub.add_message(_raw("Lot 1"))).start()
+
+    # When: waiting with a generous timeout
+    started = time.monotonic()
+    woke = pool.wait_for_new_mail(timeout_sec=5)
+
+    # Then: IDLE returns as soon as the server reports the new message
+    assert woke is True
+    assert time.monotonic() - started < 2
+    assert pool.get_stats()["idle_wakeups"] == 1
+    # And the session is reusable after DONE
+    with pool.session() as mail:
+        assert mail.search(None, "UNSEEN")[1] == [b"1"]
+    pool.close_all()
+
+
+@pytest.mark.unit
+def test_wait_for_new_mail_times_out_without_activity(stub):
+    pool = imap_client.ImapSessionPool(connection_factory=_factory(stub))
+
+    assert pool.wait_for_new_mail(timeout_sec=0.2) is False
+    assert stub.command_counts["IDLE"] == 1
+    pool.close_all()
+
+
+@pytest.mark.unit
+def test_wait_for_new_mail_returns_none_without_idle_capability():
+    with ImapStubServer(capabilities=("IMAP4rev1",)) as server:
+        pool = imap_client.ImapSessionPool(connection_factory=_factory(server))
+        assert pool.wait_for_new_mail(timeout_sec=0.2) is None
+        assert server.command_counts["IDLE"] == 0
+        pool.close_all()
+
+
+@pytest.mark.unit
+def test_run_idle_loop_invokes_callback_on_new_mail(stub):
+    pool = imap_client.ImapSessionPool(connection_factory=_factory(stub))
+    stop = threading.Event()
+    calls = []
+
+    def _on_new_mail():
+        calls.append(True)
+        stop.set()
+
+    threading.Timer(0.2, lambda: stub.add_message(_raw("Lot 2"))).start()
+    worker = threading.Thread(target=pool.run_idle_loop, args=(_on_new_mail, stop), kwargs={"timeout_sec": 5})
+    worker.start()
+    worker.join(timeout=5)
+
+    assert calls == [True]
+    pool.close_all()
+
+
+class _RecordingIMAP4(imaplib.IMAP4):
+    """Vraie connexion imaplib qui garde une trace des octets envoyés."""
+
+    def __init__(self, *args, **kwargs):
+        self.sent = []
+        super().__init__(*args, **kwargs)
+
+    def send(self, data):
+        self.sent.append(data)
+        super().send(data)
+
+
+@pytest.mark.unit
+def test_send_raw_command_keeps_imaplib_tag_sequence(stub):
+    # Given: a real imaplib connection, selected on INBOX
+    mail = _RecordingIMAP4(stub.host, stub.port, timeout=5)
+    mail.login(stub.user, stub.password)
+    mail.select("INBOX")
+
+    # When: issuing IDLE through the helper and reading its responses ourselves
+    tag = imap_client._send_raw_command(mail, b"IDLE")
+    assert mail.readline().startswith(b"+")
+    mail.send(b"DONE\r\n")
+    assert mail.readline().startswith(tag + b" OK")
+
+    # Then: the tag comes from imaplib's sequence and is not left pending
+    assert mail.sent[-2] == tag + b" IDLE\r\n"
+    assert tag.startswith(mail.tagpre)
+    assert tag not in mail.tagged_commands
+    # And regular imaplib commands keep working with fresh tags
+    assert mail.noop()[0] == "OK"
+    assert mail.sent[-1].split(b" ", 1)[0] not in (tag, b"")
+    mail.logout()
+
+
+@pytest.mark.unit
+def test_run_idle_loop_sends_keepalive_to_other_sessions(stub):
+    # Given: a pooled session idle for longer than the keepalive interval
+    clock = _Clock()
+    pool = imap_client.ImapSessionPool(
+        connection_factory=_factory(stub), keepalive_interval_sec=30, clock=clock
+    )
+    with pool.session():
+        pass
+    clock.now += 31
+    stop = threading.Event()
+    waits = []
+
+    def _wait(timeout_sec, mailbox="INBOX"):
+        waits.append(timeout_sec)
+        stop.set()
+        return False
+
+    pool.wait_for_new_mail = _wait
+
+    # When: the IDLE loop runs one round with a long IDLE timeout
+    pool.run_idle_loop(lambda: None, stop, timeout_sec=1500)
+
+    # Then: the idle session got its NOOP and IDLE is re-issued within the keepalive interval
+    assert stub.command_counts["NOOP"] == 1
+    assert waits == [30]
+    pool.close_all()
+
+
+@pytest.mark.unit
+def test_orchestrator_keeps_pooled_session_between_cycles(monkeypatch, stub):
+    # Given: the orchestrator configured to use the session pool
+    from email_processing import orchestrator as orch
+
+    pool = imap_client.ImapSessionPool(connection_factory=_factory(stub))
+    monkeypatch.setattr(imap_client.ImapSessionPool, "_instance", pool)
+    monkeypatch.setattr(orch.settings, "IMAP_SESSION_POOL_ENABLED", True, raising=False)
+    monkeypatch.setattr(orch, "_is_webhook_sending_enabled", lambda: True)
+
+    # When: running two empty cycles
+    assert orch.check_new_emails_and_trigger_webhook() == 0
+    assert orch.check_new_emails_and_trigger_webhook() == 0
+
+    # Then: both cycles ran on the same authenticated session
+    assert stub.logins == 1
+    assert stub.command_counts["LOGOUT"] == 0
+    assert stub.command_counts["SELECT"] == 2
+    pool.close_all()
@@ -0,0 +1,197 @@
+"""
+Tests for UID-based incremental sync (email_processing.uid_sync + orchestrator wiring).
+"""
+import imaplib
+import json
+
+import pytest
+
+from email_processing import imap_client
+from email_processing import orchestrator as orch
+from email_processing import uid_sync
+from tests.imap_stub_server import ImapStubServer
+
+ACCOUNT = "poller@example.com"
+
+
+def _raw(i: int) -> bytes:
+    return (
+        f"Subject: Lot {i}\r\n"
+        f"From: Sender <sender{i}@example.com>\r\n"
+        f"Message-ID: <msg-{i}@example.com>\r\n"
+        "Date: Wed, 22 Oct 2025 10:00:00 +0200\r\n"
+        "\r\n"
+        f"Corps {i}\r\n"
+    ).encode("utf-8")
+
+
+class _Logger:
+    def __getattr__(self, _name):
+        return lambda *a, **k: None
+
+
+def _connect(stub: ImapStubServer) -> imaplib.IMAP4:
+    mail = imaplib.IMAP4(stub.host, stub.port, timeout=5)
+    mail.login(stub.user, stub.password)
+    mail.select("INBOX")
+    return mail
+
+
+@pytest.mark.unit
+def test_plan_bootstraps_from_unseen_without_checkpoint():
+    with ImapStubServer() as stub:
+        stub.add_message(_raw(1), seen=True)
+        stub.add_message(_raw(2))
+        stub.add_message(_raw(3))
+        mail = _connect(stub)
+
+        plan = uid_sync.plan_uid_sync(mail, {}, account=ACCOUNT, mailbox="INBOX", logger=_Logger())
+
+        assert plan.bootstrap is True
+        assert plan.uidvalidity == 1
+        assert plan.candidates == [b"2", b"3"]
+        assert plan.high_water == 3
+        mail.logout()
+
+
+@pytest.mark.unit
+def test_plan_only_searches_new_uid_range_regardless_of_seen_flag():
+    # Given: a checkpoint at UID 3 and two new messages, one already read elsewhere
+    with ImapStubServer() as stub:
+        for i in range(1, 4):
+            stub.add_message(_raw(i))
+        stub.add_message(_raw(4), seen=True)
+        stub.add_message(_raw(5))
+        mail = _connect(stub)
+        checkpoint = {"account": ACCOUNT, "uidvalidity": 1, "last_uid": 3, "pending_uids": [2]}
+
+        # When
+        plan = uid_sync.plan_uid_sync(mail, checkpoint, account=ACCOUNT, mailbox="INBOX", logger=_Logger())
+
+        # Then: pending + new range, a single UID SEARCH, no UNSEEN scan
+        assert plan.bootstrap is False
+        assert plan.candidates == [b"2", b"4", b"5"]
+        assert plan.high_water == 5
+        assert stub.command_counts["UID SEARCH"] == 1
+        assert stub.command_counts["SEARCH"] == 0
+        mail.logout()
+
+
+@pytest.mark.unit
+def test_plan_skips_search_when_uidnext_shows_no_new_mail():
+    with ImapStubServer() as stub:
+        stub.add_message(_raw(1))
+        mail = _connect(stub)
+        checkpoint = {"account": ACCOUNT, "uidvalidity": 1, "last_uid": 1, "pending_uids": []}
+
+        plan = uid_sync.plan_uid_sync(mail, checkpoint, account=ACCOUNT, mailbox="INBOX", logger=_Logger())
+
+        assert plan.candidates == []
+        assert stub.command_counts["UID SEARCH"] == 0
+        mail.logout()
+
+
+@pytest.mark.unit
+def test_plan_resyncs_when_uidvalidity_changes():
+    with ImapStubServer(uidvalidity=7) as stub:
+        stub.add_message(_raw(1))
+        mail = _connect(stub)
+        checkpoint = {"account": ACCOUNT, "uidvalidity": 1, "last_uid": 99, "pending_uids": []}
+
+        plan = uid_sync.plan_uid_sync(mail, checkpoint, account=ACCOUNT, mailbox="INBOX", logger=_Logger())
+
+        assert plan.bootstrap is True
+        assert plan.uidvalidity == 7
+        assert plan.candidates == [b"1"]
+        mail.logout()
+
+
+@pytest.mark.unit
+def test_uid_mailbox_fetches_and_stores_by_uid_after_expunge():
+    # Given: sequence numbers shifted by an expunge (UID 3 is now message #2)
+    with ImapStubServer() as stub:
+        for i in range(1, 4):
+            stub.add_message(_raw(i))
+        stub.expunge(1)
+        mail = _connect(stub)
+        mailbox = imap_client.UidMailbox(mail)
+
+        # When
+        fetched = imap_client.fetch_messages(mailbox, [b"3"], "(RFC822)")
+        imap_client.mark_email_as_read_imap(None, mailbox, b"3")
+
+        # Then: results are keyed by UID and STORE targets the right message
+        assert list(fetched) == ["3"]
+        assert b"Subject: Lot 3" in fetched["3"]["RFC822"]
+        assert stub.is_seen(3) and not stub.is_seen(2)
+        mail.logout()
+
+
+@pytest.mark.unit
+def test_finalize_keeps_unread_candidates_pending():
+    with ImapStubServer() as stub:
+        for i in range(1, 4):
+            stub.add_message(_raw(i))
+        stub.mark_seen(2)
+        mail = _connect(stub)
+        plan = uid_sync.UidSyncPlan(mailbox="INBOX", uidvalidity=1, candidates=[b"1", b"2", b"3"], high_water=3)
+
+        entry = uid_sync.finalize_uid_sync(mail, plan, account=ACCOUNT, max_pending=1, logger=_Logger())
+
+        assert entry["last_uid"] == 3
+        assert entry["pending_uids"] == [3]
+        mail.logout()
+
+
+@pytest.mark.unit
+def test_checkpoint_falls_back_to_file_without_redis(tmp_path):
+    path = tmp_path / "imap_uid_checkpoint.json"
+    entry = {"account": ACCOUNT, "uidvalidity": 1, "last_uid": 12, "pending_uids": []}
+
+    assert uid_sync.save_checkpoint(entry, redis_client=None, redis_key="k", file_path=path, mailbox="INBOX")
+
+    assert json.loads(path.read_text())["INBOX"]["last_uid"] == 12
+    assert uid_sync.load_checkpoint(redis_client=None, redis_key="k", file_path=path, mailbox="INBOX") == entry
+
+
+@pytest.mark.unit
+def test_orchestrator_cycles_persist_checkpoint_in_redis(monkeypatch, mock_redis, tmp_path):
+    # Given: UID sync enabled, Redis-backed checkpoint, every sender filtered out
+    with ImapStubServer() as stub:
+        for i in range(1, 4):
+            stub.add_message(_raw(i))
+        pool = imap_client.ImapSessionPool(
+            connection_factory=lambda: _login(stub), keepalive_interval_sec=600
+        )
+        monkeypatch.setattr(imap_client.ImapSessionPool, "_instance", pool)
+        monkeypatch.setattr(orch.settings, "IMAP_SESSION_POOL_ENABLED", True, raising=False)
+        monkeypatch.setattr(orch.settings, "IMAP_UID_SYNC_ENABLED", True, raising=False)
+        monkeypatch.setattr(orch.settings, "IMAP_UID_CHECKPOINT_FILE", tmp_path / "cp.json", raising=False)
+        monkeypatch.setattr(orch.settings, "EMAIL_ADDRESS", ACCOUNT, raising=False)
+        monkeypatch.setattr(orch.settings, "SENDER_LIST_FOR_POLLING", ["boss@example.com"], raising=False)
+        monkeypatch.setattr(orch, "_is_webhook_sending_enabled", lambda: True)
+        monkeypatch.setattr(orch, "_get_redis_client", lambda: mock_redis)
+
+        # When: a first cycle bootstraps, then a new message arrives
+        assert orch.check_new_emails_and_trigger_webhook() == 0
+        stub.add_message(_raw(4))
+        stub.mark_seen(1)
+        searches_before = stub.command_counts["UID SEARCH"]
+        assert orch.check_new_emails_and_trigger_webhook() == 0
+
+        # Then: the checkpoint lives in Redis and only the new range was searched
+        stored = json.loads(mock_redis.get(orch.settings.IMAP_UID_CHECKPOINT_REDIS_KEY))["INBOX"]
+        assert stored["uidvalidity"] == 1
+        assert stored["last_uid"] == 4
+        assert stored["pending_uids"] == [2, 3, 4]
+        # UID SEARCH UID 4:* + UID SEARCH UNSEEN UID <candidats>
+        assert stub.command_counts["UID SEARCH"] - searches_before == 2
+        assert stub.command_counts["SEARCH"] == 0
+        assert not (tmp_path / "cp.json").exists()
+        pool.close_all()
+
+
+def _login(stub: ImapStubServer) -> imaplib.IMAP4:
+    mail = imaplib.IMAP4(stub.host, stub.port, timeout=5)
+    mail.login(stub.user, stub.password)
+    return mail
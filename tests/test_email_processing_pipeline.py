@@ -0,0 +1,122 @@
+"""
+Tests for the cost-ordered per-email pipeline (orchestrator._run_email_pipeline).
+"""
+import imaplib
+
+import pytest
+
+from email_processing import orchestrator as orch
+from services.runtime_metrics_service import RuntimeMetricsService
+from tests.imap_stub_server import ImapStubServer
+
+
+class _Dedup:
+    def __init__(self, processed_groups=()):
+        self.processed_groups = set(processed_groups)
+
+    def is_email_processed(self, _email_id):
+        return False
+
+    def mark_email_processed(self, _email_id):
+        return True
+
+    def generate_subject_group_id(self, subject):
+        return subject
+
+    def is_subject_group_processed(self, group_id):
+        return group_id in self.processed_groups
+
+
+def _raw(i: int) -> bytes:
+    return (
+        f"Subject: Lot {i}\r\n"
+        "From: Sender <ok@example.com>\r\n"
+        f"Message-ID: <pipeline-{i}@example.com>\r\n"
+        "Date: Wed, 22 Oct 2025 10:00:00 +0200\r\n"
+        "\r\n"
+        f"https://www.dropbox.com/scl/fo/lot{i}\r\n"
+    ).encode("utf-8")
+
+
+@pytest.fixture
+def cycle(monkeypatch):
+    """Runs one polling cycle over `count` messages and records R2/webhook calls."""
+    calls = {"r2": [], "sent": []}
+    monkeypatch.setattr(orch.settings, "SENDER_LIST_FOR_POLLING", ["ok@example.com"], raising=False)
+    monkeypatch.setattr(orch.settings, "WEBHOOK_URL", "https://hook.example.com/default", raising=False)
+    monkeypatch.setattr(orch, "_is_webhook_sending_enabled", lambda: True)
+    monkeypatch.setattr(orch, "_load_webhook_global_time_window", lambda: ("09h00", "18h00"))
+    monkeypatch.setattr(orch, "_load_routing_rules", lambda: ())
+    monkeypatch.setattr(orch, "_handle_r2_enrichment", lambda links, email_id, _l: calls["r2"].append(email_id))
+    monkeypatch.setattr(orch, "_send_webhook", lambda *a, **k: calls["sent"].append(a[4]) or False)
+
+    def _run(count: int, *, dedup: _Dedup, within: bool) -> int:
+        monkeypatch.setattr(orch.DeduplicationService, "get_instance", classmethod(lambda cls: dedup))
+        monkeypatch.setattr(orch, "is_within_time_window_local", lambda *a, **k: within)
+        with ImapStubServer() as stub:
+            for i in range(1, count + 1):
+                stub.add_message(_raw(i))
+
+            def _open(_logger):
+                mail = imaplib.IMAP4(stub.host, stub.port, timeout=5)
+                mail.login(stub.user, stub.password)
+                return mail, None
+
+            monkeypatch.setattr(orch, "_open_imap_session", _open)
+            return orch.check_new_emails_and_trigger_webhook()
+
+    return calls, _run
+
+
+@pytest.mark.unit
+def test_group_dedup_short_circuits_before_r2_enrichment(cycle):
+    # Given: three eligible emails, the second belonging to an already processed group
+    calls, run = cycle
+
+    # When
+    triggered = run(3, dedup=_Dedup(processed_groups={"Lot 2"}), within=True)
+
+    # Then: R2 and HTTP work only for the two delivered emails
+    assert triggered == 2
+    assert len(calls["r2"]) == 2
+    assert calls["sent"] == ["https://hook.example.com/default"] * 2
+    stats = RuntimeMetricsService.get_instance().get_last_poll_cycle_stats()["pipeline"]
+    assert stats["stages"]["cheap_filters"] == {"entered": 3, "short_circuited": 1}
+    assert stats["stages"]["enrichment"]["entered"] == 2
+    assert stats["short_circuit_reasons"] == {"group_processed": 1}
+    assert stats["r2_enrichments"] == 2
+    assert stats["r2_enrichments_avoided"] == 1
+    assert stats["deliveries_avoided"] == 1
+
+
+@pytest.mark.unit
+def test_time_window_short_circuits_before_r2_enrichment(cycle):
+    # Given: emails arriving outside the global time window
+    calls, run = cycle
+
+    # When
+    triggered = run(3, dedup=_Dedup(), within=False)
+
+    # Then: no remote R2 fetch and no webhook POST at all
+    assert triggered == 0
+    assert calls["r2"] == []
+    assert calls["sent"] == []
+    stats = RuntimeMetricsService.get_instance().get_last_poll_cycle_stats()["pipeline"]
+    assert stats["stages"]["detectors"] == {"entered": 3, "short_circuited": 3}
+    assert stats["stages"]["enrichment"]["entered"] == 0
+    assert stats["short_circuit_reasons"] == {"outside_time_window": 3}
+    assert stats["r2_enrichments_avoided"] == 3
+
+
+@pytest.mark.unit
+def test_header_prefilter_rejections_are_counted(monkeypatch, cycle):
+    calls, run = cycle
+    monkeypatch.setattr(orch.settings, "IMAP_HEADER_PREFETCH_ENABLED", True, raising=False)
+    monkeypatch.setattr(orch.settings, "SENDER_LIST_FOR_POLLING", ["boss@example.com"], raising=False)
+
+    assert run(2, dedup=_Dedup(), within=True) == 0
+
+    stats = RuntimeMetricsService.get_instance().get_last_poll_cycle_stats()["pipeline"]
+    assert stats["stages"]["headers"] == {"entered": 2, "short_circuited": 2}
+    assert stats["stages"]["parse"]["entered"] == 0
+    assert calls["r2"] == []
@@ -0,0 +1,121 @@
+"""
+Tests for the pooled keep-alive webhook sessions (services.http_session_service).
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from services.http_session_service import HttpSessionService
+
+# Coût simulé d'établissement de connexion (handshake TCP+TLS vers un hôte distant)
+CONNECT_COST_SEC = 0.03
+POSTS = 10
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        time.sleep(CONNECT_COST_SEC)
+        self.server.connections += 1
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = b'{"success": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def webhook_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/hook"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.unit
+def test_sessions_are_shared_per_origin():
+    http = HttpSessionService(pool_maxsize=4)
+
+    a = http.get_session("https://hook.eu1.make.com/abc")
+    b = http.get_session("https://HOOK.eu1.make.com:443/def?x=1")
+    c = http.get_session("https://webhook.kidpixel.fr/index.php")
+
+    assert a is b
+    assert c is not a
+    stats = http.get_stats()
+    assert (stats["hits"], stats["misses"], stats["sessions"]) == (1, 2, 2)
+    http.close_all()
+
+
+@pytest.mark.unit
+def test_idle_sessions_are_evicted():
+    now = [1000.0]
+    http = HttpSessionService(idle_ttl_sec=50, clock=lambda: now[0])
+    first = http.get_session("https://hook.eu1.make.com/abc")
+
+    now[0] += 51
+    second = http.get_session("https://hook.eu1.make.com/abc")
+
+    assert second is not first
+    stats = http.get_stats()
+    assert (stats["evictions"], stats["misses"], stats["sessions"]) == (1, 2, 1)
+    http.close_all()
+
+
+@pytest.mark.unit
+def test_concurrent_lookups_share_one_session():
+    http = HttpSessionService(pool_maxsize=8)
+    sessions = []
+    threads = [
+        threading.Thread(target=lambda: sessions.append(http.get_session("https://hook.eu1.make.com/abc")))
+        for _ in range(16)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(s) for s in sessions}) == 1
+    assert http.get_stats()["misses"] == 1
+    http.close_all()
+
+
+@pytest.mark.unit
+def test_pooled_session_reuses_connections(webhook_stub):
+    # Given: a local webhook stub where opening a connection costs CONNECT_COST_SEC
+    server, url = webhook_stub
+
+    # When: POSTS deliveries without pooling (module-level requests.post) ...
+    for _ in range(POSTS):
+        assert requests.post(url, json={"n": 1}, timeout=5).status_code == 200
+    fresh_connections, server.connections = server.connections, 0
+
+    # ... then through the pooled session registry
+    http = HttpSessionService(pool_maxsize=4)
+    for _ in range(POSTS):
+        assert http.post(url, json={"n": 1}, timeout=5).status_code == 200
+
+    # Then: a single keep-alive connection serves every delivery, so the
+    # connection cost is paid once instead of POSTS times
+    assert fresh_connections == POSTS
+    assert server.connections == 1
+    stats = http.get_stats()
+    assert (stats["connections_opened"], stats["connections_reused"]) == (1, POSTS - 1)
+    http.close_all()
@@ -0,0 +1,129 @@
+"""
+Tests for the lookup-first R2 path: links already offloaded reuse their R2 URL
+instead of a new remote fetch (orchestrator._handle_r2_enrichment, IngressService).
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from email_processing import orchestrator as orch
+from services.ingress_service import IngressService
+from services.r2_transfer_service import R2TransferService
+from services.webhook_logger_service import WebhookLoggerService
+
+FILE_URL = "https://www.dropbox.com/scl/fi/abc123/lot.zip?dl=0"
+FOLDER_URL = "https://www.dropbox.com/scl/fo/abc123/folder?dl=0"
+
+
+@pytest.fixture
+def r2_env(monkeypatch, tmp_path):
+    service = R2TransferService(
+        fetch_endpoint="https://test-worker.example.com/fetch", links_file=tmp_path / "webhook_links.json",
+    )
+    service._enabled = True
+    monkeypatch.setattr(R2TransferService, "_instance", service)
+    fetches, logs = [], []
+
+    def _fetch(*, source_url, provider, email_id=None, timeout=30):
+        fetches.append((source_url, timeout))
+        return "https://media.example.com/r2/lot.zip", "lot.zip"
+
+    monkeypatch.setattr(service, "request_remote_fetch", _fetch)
+    monkeypatch.setattr(WebhookLoggerService.get_instance(), "append_log", logs.append)
+    monkeypatch.setattr(orch.settings, "R2_LINK_REUSE_MAX_AGE_SEC", 3600, raising=False)
+    monkeypatch.setattr(orch.settings, "R2_LINK_REUSE_FOLDER_MAX_AGE_SEC", 0, raising=False)
+    monkeypatch.setattr(orch.settings, "R2_LINK_REUSE_VALIDATE", False, raising=False)
+    return service, fetches, logs
+
+
+def _links(url=FILE_URL):
+    return [{"provider": "dropbox", "raw_url": url}]
+
+
+@pytest.mark.unit
+def test_already_offloaded_link_skips_the_remote_fetch(r2_env, monkeypatch):
+    service, fetches, logs = r2_env
+    # Given: a first email whose Dropbox file fetch took 95 s
+    clock = iter([1000.0, 1095.0])
+    monkeypatch.setattr(orch, "_monotonic", lambda: next(clock))
+    first = _links()
+    orch._handle_r2_enrichment(first, "e1", logging.getLogger())
+
+    # When: a second email carries the same file link
+    second = _links()
+    orch._handle_r2_enrichment(second, "e2", logging.getLogger())
+
+    # Then: the R2 URL is reused without a second fetch and the saving is logged
+    assert len(fetches) == 1
+    assert second[0]["r2_url"] == first[0]["r2_url"] == "https://media.example.com/r2/lot.zip"
+    assert second[0]["original_filename"] == "lot.zip"
+    assert [(e["email_id"], e["status"], e["r2_cache_hits"], e["r2_cache_misses"], e["r2_seconds_saved"])
+            for e in logs] == [("e1", "miss", 0, 1, 0.0), ("e2", "hit", 1, 0, 95.0)]
+
+
+@pytest.mark.unit
+def test_stale_pairs_and_disabled_reuse_fetch_again(r2_env, monkeypatch):
+    service, fetches, logs = r2_env
+    service._links_store.append({
+        "source_url": service.normalize_source_url(FILE_URL, "dropbox"),
+        "r2_url": "https://media.example.com/r2/old.zip",
+        "provider": "dropbox",
+        "created_at": "2020-01-01T00:00:00+00:00",
+    })
+
+    # Given: a pair older than R2_LINK_REUSE_MAX_AGE_SEC
+    links = _links()
+    orch._handle_r2_enrichment(links, "e1", logging.getLogger())
+    assert links[0]["r2_url"] == "https://media.example.com/r2/lot.zip"
+
+    # Given: reuse disabled, even a fresh pair is fetched again and nothing is reported
+    monkeypatch.setattr(orch.settings, "R2_LINK_REUSE_MAX_AGE_SEC", 0, raising=False)
+    orch._handle_r2_enrichment(_links(), "e2", logging.getLogger())
+
+    assert [timeout for _url, timeout in fetches] == [15, 15]
+    assert [e["email_id"] for e in logs] == ["e1"]
+
+
+@pytest.mark.unit
+def test_ingress_reuses_offloaded_links(r2_env):
+    service, fetches, logs = r2_env
+    # Given: the file was offloaded earlier (its fetch took 80 s)
+    service.persist_link_pair(FILE_URL, "https://media.example.com/r2/lot.zip", "dropbox", "lot.zip",
+                              fetch_duration_sec=80)
+
+    # When: a Gmail push carries the same link
+    links = _links()
+    IngressService(logger=logging.getLogger())._maybe_enrich_delivery_links_with_r2(links, "push-1")
+
+    # Then
+    assert fetches == []
+    assert links[0]["r2_url"] == "https://media.example.com/r2/lot.zip"
+    assert [(e["type"], e["status"], e["r2_seconds_saved"]) for e in logs] == [("r2_cache", "hit", 80.0)]
+
+
+@pytest.mark.unit
+def test_shared_folder_links_use_their_own_max_age(r2_env, monkeypatch):
+    service, fetches, logs = r2_env
+    # Given: a shared folder offloaded 10 minutes ago (its content may have changed since)
+    service._links_store.append({
+        "source_url": service.normalize_source_url(FOLDER_URL, "dropbox"),
+        "r2_url": "https://media.example.com/r2/old-folder.zip",
+        "provider": "dropbox",
+        "created_at": (datetime.now(timezone.utc) - timedelta(minutes=10)).isoformat(),
+    })
+    monkeypatch.setattr(service, "persist_link_pair", lambda *a, **k: None)  # only the pair above is known
+
+    # When: folder reuse is off (default), then allowed for 5 minutes, then for 1 hour
+    results = []
+    for folder_max_age in (0, 300, 3600):
+        monkeypatch.setattr(orch.settings, "R2_LINK_REUSE_FOLDER_MAX_AGE_SEC", folder_max_age, raising=False)
+        links = _links(FOLDER_URL)
+        orch._handle_r2_enrichment(links, f"e{folder_max_age}", logging.getLogger())
+        results.append(links[0]["r2_url"])
+
+    # Then: only the pair younger than the folder max age is reused; the first run counts nothing
+    assert results[0] == results[1] == "https://media.example.com/r2/lot.zip"
+    assert results[2] == "https://media.example.com/r2/old-folder.zip"
+    assert [timeout for _url, timeout in fetches] == [120, 120]
+    assert [(e["email_id"], e["status"]) for e in logs] == [("e300", "miss"), ("e3600", "hit")]
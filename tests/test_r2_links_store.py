@@ -0,0 +1,198 @@
+"""
+tests.test_r2_links_store
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Tests unitaires pour R2LinksStore (journal JSONL des paires R2).
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from services import r2_links_store
+from services.r2_links_store import R2LinksStore
+
+# Benchmark à 100k entrées (~25s, plus sous --cov): hors suite par défaut, RUN_BENCHMARKS=1 pour le lancer
+LARGE_BENCHMARK = pytest.mark.skipif(
+    os.environ.get("RUN_BENCHMARKS") != "1", reason="set RUN_BENCHMARKS=1 to run the 100k-entry benchmark"
+)
+
+
+def _pair(i: int, r2: str = "") -> dict:
+    return {
+        "source_url": f"https://www.dropbox.com/s/link{i}/file.zip?dl=1",
+        "r2_url": r2 or f"https://media.example.com/dropbox/link{i}/file.zip",
+        "provider": "dropbox",
+        "created_at": "2026-01-01T00:00:00+00:00",
+    }
+
+
+@pytest.fixture
+def links_file(tmp_path):
+    return tmp_path / "webhook_links.json"
+
+
+@pytest.fixture
+def store(links_file):
+    return R2LinksStore(links_file, max_entries=lambda: 1000)
+
+
+class TestR2LinksStoreAppend:
+    """Tests des ajouts et de la lecture incrémentale."""
+
+    def test_append_writes_one_line_without_rewriting(self, store, links_file):
+        """Chaque paire est ajoutée en fin de fichier, même inode."""
+        store.append(_pair(0))
+        inode = os.stat(links_file).st_ino
+        store.append(_pair(1))
+
+        assert os.stat(links_file).st_ino == inode
+        assert [json.loads(line)["r2_url"] for line in links_file.read_text().splitlines()] == [
+            _pair(0)["r2_url"], _pair(1)["r2_url"],
+        ]
+
+    def test_read_from_returns_only_new_complete_lines(self, store, links_file):
+        """read_from reprend à la position lue; une ligne en cours d'écriture est ignorée."""
+        store.append(_pair(0))
+        entries, position = store.read_all()
+        assert len(entries) == 1
+
+        store.append(_pair(1))
+        with open(links_file, "a", encoding="utf-8") as f:
+            f.write('{"source_url": "partial')
+        entries, new_position = store.read_from(position[1])
+
+        assert entries == [_pair(1)]
+        assert new_position[1] == links_file.stat().st_size - len('{"source_url": "partial')
+        # Une position au milieu d'une ligne signale un fichier remplacé
+        assert store.read_from(position[1] + 3) == ([], None)
+
+    def test_tail_reads_last_pairs_across_blocks(self, store, links_file, monkeypatch):
+        """tail(n) remonte depuis la fin par blocs, sans lire les lignes coupées."""
+        monkeypatch.setattr(r2_links_store, "_TAIL_BLOCK_SIZE", 100)
+        for i in range(20):
+            store.append(_pair(i))
+
+        entries, position = store.tail(3)
+
+        assert [entry["source_url"] for entry in entries] == [_pair(i)["source_url"] for i in (17, 18, 19)]
+        assert position == (os.stat(links_file).st_ino, links_file.stat().st_size)
+        assert len(store.tail(100)[0]) == 20
+
+    def test_concurrent_appends_keep_every_line(self, store, links_file):
+        """Des ajouts concurrents ne perdent ni ne mélangent de lignes."""
+        def _writer(offset):
+            for i in range(50):
+                store.append(_pair(offset + i))
+
+        threads = [threading.Thread(target=_writer, args=(n * 100,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        entries, _position = store.read_all()
+        assert len(entries) == 200
+        assert len({entry["source_url"] for entry in entries}) == 200
+
+
+class TestR2LinksStoreCompaction:
+    """Tests de la compaction (dédoublonnage + rotation)."""
+
+    def test_compact_dedupes_and_trims(self, links_file):
+        """La dernière occurrence d'une paire est gardée, puis les max_entries dernières."""
+        store = R2LinksStore(links_file, max_entries=lambda: 3, compact_every=1000)
+        for pair in (_pair(0), _pair(1), _pair(2), _pair(0), _pair(3), _pair(3, r2="https://media.example.com/v2")):
+            store.append(pair)
+        inode = os.stat(links_file).st_ino
+
+        assert store.compact() == {"before": 6, "after": 3}
+
+        entries, _position = store.read_all()
+        assert [(e["source_url"], e["r2_url"]) for e in entries] == [
+            (_pair(0)["source_url"], _pair(0)["r2_url"]),
+            (_pair(3)["source_url"], _pair(3)["r2_url"]),
+            (_pair(3)["source_url"], "https://media.example.com/v2"),
+        ]
+        # Fichier remplacé atomiquement: les lecteurs voient un nouvel inode
+        assert os.stat(links_file).st_ino != inode
+
+    def test_background_compaction_runs_after_compact_every_appends(self, links_file):
+        """La compaction est planifiée en tâche de fond tous les `compact_every` ajouts."""
+        store = R2LinksStore(links_file, max_entries=lambda: 2, compact_every=4)
+        for i in range(3):
+            store.append(_pair(i))
+        assert store._compaction_thread is None
+
+        store.append(_pair(3))
+        store.join_compaction(timeout=5)
+
+        assert [entry["source_url"] for entry in store.read_all()[0]] == [_pair(2)["source_url"], _pair(3)["source_url"]]
+
+
+class TestR2LinksStoreMigration:
+    """Tests de la migration de l'ancien format (tableau JSON)."""
+
+    def test_legacy_array_is_migrated_in_place(self, store, links_file):
+        """Le tableau JSON existant est converti en JSONL à la première lecture."""
+        links_file.write_text(json.dumps([_pair(0), "invalid", _pair(1)], indent=2), encoding="utf-8")
+
+        entries, _position = store.read_all()
+
+        assert entries == [_pair(0), _pair(1)]
+        assert [json.loads(line) for line in links_file.read_text().splitlines()] == [_pair(0), _pair(1)]
+
+    def test_append_to_legacy_array_migrates_first(self, store, links_file):
+        """Un ajout sur l'ancien format ne corrompt pas le fichier."""
+        links_file.write_text("[]", encoding="utf-8")
+
+        store.append(_pair(0))
+
+        assert store.read_all()[0] == [_pair(0)]
+
+
+def test_append_never_rewrites_existing_entries(links_file):
+    """Un ajout écrit une seule ligne en fin de fichier, sans réécrire les 1000 précédentes."""
+    store = R2LinksStore(links_file, max_entries=lambda: 1000, compact_every=10**9)
+    for i in range(1000):
+        store.append(_pair(i))
+    before = links_file.read_bytes()
+    inode = os.stat(links_file).st_ino
+
+    for i in range(20):
+        store.append(_pair(1000 + i))
+
+    after = links_file.read_bytes()
+    assert os.stat(links_file).st_ino == inode
+    assert after.startswith(before)
+    assert after.count(b"\n") == 1020
+
+
+@pytest.mark.slow
+@LARGE_BENCHMARK
+def test_persist_benchmark(links_file):
+    """Benchmark: ajout JSONL vs réécriture complète du tableau JSON (ancien persist_link_pair)."""
+    count = 100_000
+    legacy_file = links_file.with_name("legacy.json")
+    legacy_file.write_text(json.dumps([_pair(i) for i in range(count)], indent=2), encoding="utf-8")
+    store = R2LinksStore(links_file, max_entries=lambda: count, compact_every=10**9)
+    for i in range(count):
+        store.append(_pair(i))
+
+    started = time.perf_counter()
+    for i in range(20):
+        links = json.loads(legacy_file.read_text(encoding="utf-8"))
+        links.append(_pair(count + i))
+        legacy_file.write_text(json.dumps(links[-count:], indent=2), encoding="utf-8")
+    rewrite = (time.perf_counter() - started) / 20
+
+    started = time.perf_counter()
+    for i in range(20):
+        store.append(_pair(count + i))
+    append = (time.perf_counter() - started) / 20
+
+    assert append * 5 < rewrite
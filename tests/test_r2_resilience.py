@@ -51,9 +51,9 @@ def test_r2_worker_failure_does_not_break_webhook_send_exception(monkeypatch):
         captured["posts"].append({"url": url, "json": json, "kwargs": kwargs})
         return Resp()
 
-    import requests
+    from services.http_session_service import HttpSessionService
 
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(HttpSessionService, "post", lambda self, url, **kw: fake_post(url, **kw))
 
     class FakeMail:
         def select(self, box):
@@ -168,9 +168,9 @@ def test_r2_worker_failure_does_not_break_webhook_send_none(monkeypatch):
         captured["posts"].append({"url": url, "json": json, "kwargs": kwargs})
         return Resp()
 
-    import requests
+    from services.http_session_service import HttpSessionService
 
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(HttpSessionService, "post", lambda self, url, **kw: fake_post(url, **kw))
 
     class FakeMail:
         def select(self, box):
@@ -286,9 +286,9 @@ def test_html_body_over_1mb_is_truncated_and_warning_logged(monkeypatch):
         captured["posts"].append({"url": url, "json": json, "kwargs": kwargs})
         return Resp()
 
-    import requests
+    from services.http_session_service import HttpSessionService
 
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(HttpSessionService, "post", lambda self, url, **kw: fake_post(url, **kw))
 
     class FakeMail:
         def select(self, box):
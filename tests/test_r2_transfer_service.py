@@ -9,6 +9,7 @@ from __future__ import annotations
 import json
 import os
 import tempfile
+import time
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 
@@ -16,6 +17,11 @@ import pytest
 
 from services.r2_transfer_service import R2TransferService
 
+# Benchmark à 100k entrées (~9s, plus sous --cov): hors suite par défaut, RUN_BENCHMARKS=1 pour le lancer
+LARGE_BENCHMARK = pytest.mark.skipif(
+    os.environ.get("RUN_BENCHMARKS") != "1", reason="set RUN_BENCHMARKS=1 to run the 100k-entry benchmark"
+)
+
 
 @pytest.fixture
 def temp_links_file(tmp_path):
@@ -250,9 +256,8 @@ class TestR2TransferServicePersistence:
         
         assert success is True
         
-        # Vérifier le contenu du fichier
-        with open(temp_links_file, 'r', encoding='utf-8') as f:
-            links = json.load(f)
+        # Vérifier le contenu du fichier (une ligne JSON par paire)
+        links = _read_pairs(temp_links_file)
         
         assert len(links) == 1
         assert links[0]['source_url'] == "https://www.dropbox.com/s/abc123/file.zip?dl=1"
@@ -271,8 +276,7 @@ class TestR2TransferServicePersistence:
                 provider="dropbox",
             )
         
-        with open(temp_links_file, 'r', encoding='utf-8') as f:
-            links = json.load(f)
+        links = _read_pairs(temp_links_file)
         
         assert len(links) == 3
     
@@ -287,8 +291,10 @@ class TestR2TransferServicePersistence:
                     provider="dropbox",
                 )
             
-            with open(temp_links_file, 'r', encoding='utf-8') as f:
-                links = json.load(f)
+            # La rotation est faite par la compaction (en tâche de fond après les ajouts)
+            r2_service._links_store.join_compaction()
+            r2_service._links_store.compact()
+            links = _read_pairs(temp_links_file)
             
             # Seulement les 5 derniers doivent être conservés
             assert len(links) == 5
@@ -329,6 +335,172 @@ class TestR2TransferServicePersistence:
         
         assert r2_url == "https://media.example.com/dropbox/abc123/file.zip"
 
+    def test_persist_same_pair_twice_appends_once(self, r2_service, temp_links_file):
+        """Une paire identique à la plus récente de cette URL n'est pas réécrite."""
+        for source_url in ("https://www.dropbox.com/s/abc/file.zip", "https://www.dropbox.com/s/abc/file.zip?dl=0"):
+            assert r2_service.persist_link_pair(source_url, "https://media.example.com/abc", "dropbox") is True
+
+        assert len(_read_pairs(temp_links_file)) == 1
+
+
+def _read_pairs(links_file: Path) -> list:
+    return [json.loads(line) for line in links_file.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def _write_links(links_file: Path, count: int) -> None:
+    links_file.write_text(json.dumps([
+        {
+            "source_url": f"https://www.dropbox.com/s/link{i}/file.zip?dl=1",
+            "r2_url": f"https://media.example.com/dropbox/link{i}/file.zip",
+            "provider": "dropbox",
+            "created_at": "2026-01-01T00:00:00+00:00",
+        }
+        for i in range(count)
+    ]), encoding="utf-8")
+
+
+class TestR2TransferServiceLinkIndex:
+    """Tests de l'index des paires (recherche O(1) par URL source normalisée)."""
+
+    @pytest.fixture(params=["memory", "redis"])
+    def indexed_service(self, request, r2_service):
+        if request.param == "redis":
+            r2_service.configure(request.getfixturevalue("mock_redis"), index_redis_key="r:ss:r2_links:index:test")
+        return r2_service
+
+    def test_lookup_matches_source_variants_and_latest_pair(self, indexed_service):
+        """Les variantes d'une même URL Dropbox retrouvent la paire la plus récente."""
+        indexed_service.persist_link_pair("https://www.dropbox.com/s/abc/file.zip", "https://media.example.com/old", "dropbox")
+        indexed_service.persist_link_pair("https://www.dropbox.com/s/abc/file.zip?dl=0", "https://media.example.com/new", "dropbox")
+        indexed_service.persist_link_pair("https://fromsmash.com/xyz", "https://media.example.com/smash", "fromsmash")
+
+        assert indexed_service.get_r2_url_for_source("https://WWW.dropbox.com//s/abc/file.zip/?amp%3Bdl=0&dl=1") == "https://media.example.com/new"
+        assert indexed_service.get_r2_url_for_source(" https://fromsmash.com/xyz ") == "https://media.example.com/smash"
+        assert indexed_service.get_r2_url_for_source("https://fromsmash.com/other") is None
+
+    def test_appends_are_caught_up_and_compaction_rebuilds(self, indexed_service, temp_links_file):
+        """Les ajouts sont lus depuis la dernière position; compaction et fichier remplacé reconstruisent l'index."""
+        _write_links(temp_links_file, 3)
+        assert indexed_service.get_r2_url_for_source("https://www.dropbox.com/s/link1/file.zip") is not None
+        rebuilds = indexed_service._link_index.rebuilds
+
+        indexed_service.persist_link_pair("https://www.dropbox.com/s/link3/file.zip", "https://media.example.com/3", "dropbox")
+        assert indexed_service.get_r2_url_for_source("https://www.dropbox.com/s/link3/file.zip") == "https://media.example.com/3"
+        assert indexed_service._link_index.rebuilds == rebuilds
+        assert indexed_service._link_index.catch_ups >= 1
+
+        with patch.dict(os.environ, {"R2_LINKS_MAX_ENTRIES": "3"}):
+            indexed_service._links_store.compact()
+            # link0 a été évincé du fichier, donc de l'index
+            assert indexed_service.get_r2_url_for_source("https://www.dropbox.com/s/link0/file.zip") is None
+            assert indexed_service.get_r2_url_for_source("https://www.dropbox.com/s/link3/file.zip") == "https://media.example.com/3"
+        assert indexed_service._link_index.rebuilds == rebuilds + 1
+
+        # Ancien format réécrit en place par un outil externe: migré puis réindexé
+        _write_links(temp_links_file, 1)
+        assert indexed_service.get_r2_url_for_source("https://www.dropbox.com/s/link1/file.zip") is None
+        assert indexed_service.get_r2_url_for_source("https://www.dropbox.com/s/link0/file.zip") is not None
+        assert indexed_service._link_index.rebuilds == rebuilds + 2
+
+    def test_redis_index_is_shared_between_workers(self, r2_service, temp_links_file, mock_redis):
+        """Un second worker profite de l'index Redis construit par le premier, sans relire le fichier."""
+        _write_links(temp_links_file, 50)
+        r2_service.configure(mock_redis)
+        assert r2_service.get_r2_url_for_source("https://www.dropbox.com/s/link7/file.zip") is not None
+
+        other_worker = R2TransferService(links_file=temp_links_file)
+        other_worker.configure(mock_redis)
+        with patch.object(other_worker._links_store, "tail", side_effect=AssertionError("file re-read")):
+            assert other_worker.get_r2_url_for_source("https://www.dropbox.com/s/link42/file.zip") == (
+                "https://media.example.com/dropbox/link42/file.zip"
+            )
+
+            # Une paire ajoutée par le premier worker: seule la nouvelle ligne est lue
+            r2_service.persist_link_pair("https://www.dropbox.com/s/new/file.zip", "https://media.example.com/new", "dropbox")
+            assert other_worker.get_r2_url_for_source("https://www.dropbox.com/s/new/file.zip") == "https://media.example.com/new"
+
+    @pytest.mark.parametrize("backend", ["memory", "redis"])
+    def test_warm_lookups_do_not_reread_the_file(self, r2_service, temp_links_file, mock_redis, backend):
+        """1000 entrées (R2_LINKS_MAX_ENTRIES par défaut): une passe sur le fichier, puis l'index seul."""
+        _write_links(temp_links_file, 1000)
+        service = r2_service
+        if backend == "redis":
+            service.configure(mock_redis)
+
+        assert service.get_r2_url_for_source("https://www.dropbox.com/s/link0/file.zip?dl=0") is not None
+        assert service._link_index.rebuilds == 1
+
+        store = service._links_store
+        with patch.object(store, "tail", side_effect=AssertionError("file re-read")), \
+                patch.object(store, "read_from", side_effect=AssertionError("file re-read")):
+            for i in range(0, 1000, 5):
+                assert service.get_r2_url_for_source(f"https://www.dropbox.com/s/link{i}/file.zip") is not None
+        assert (service._link_index.rebuilds, service._link_index.catch_ups) == (1, 0)
+
+    @pytest.mark.slow
+    @LARGE_BENCHMARK
+    def test_lookup_benchmark(self, r2_service, temp_links_file, mock_redis):
+        """Benchmark: 100k entrées, index froid vs chaud."""
+        count = 100_000
+        _write_links(temp_links_file, count)
+        with patch.dict(os.environ, {"R2_LINKS_MAX_ENTRIES": str(count)}):
+            for backend in ("memory", "redis"):
+                R2TransferService.reset_instance()
+                service = R2TransferService.get_instance(links_file=temp_links_file)
+                if backend == "redis":
+                    service.configure(mock_redis)
+                started = time.perf_counter()
+                # Index froid: une passe sur le fichier, le coût qu'avait chaque recherche avant l'index
+                assert service.get_r2_url_for_source("https://www.dropbox.com/s/link0/file.zip?dl=0") is not None
+                cold = time.perf_counter() - started
+                started = time.perf_counter()
+                for i in range(0, count, count // 200):
+                    assert service.get_r2_url_for_source(f"https://www.dropbox.com/s/link{i}/file.zip") is not None
+                warm = (time.perf_counter() - started) / 200
+                assert warm * 20 < cold
+
+
+class TestR2TransferServiceLinkReuse:
+    """Tests de la réutilisation des liens déjà transférés (lookup-first)."""
+
+    def test_fresh_pair_is_reused_for_the_same_link(self, r2_service):
+        """Une paire récente est réutilisable, avec la durée du fetch évité."""
+        r2_service.persist_link_pair(
+            "https://www.dropbox.com/s/abc/file.zip", "https://media.example.com/abc", "dropbox",
+            "file.zip", fetch_duration_sec=42.5,
+        )
+
+        entry = r2_service.find_reusable_link("https://www.dropbox.com/s/abc/file.zip?dl=0", "dropbox", max_age_sec=3600)
+
+        assert entry["r2_url"] == "https://media.example.com/abc"
+        assert entry["fetch_duration_sec"] == 42.5
+        assert r2_service.find_reusable_link("https://www.dropbox.com/s/other/file.zip", "dropbox", max_age_sec=3600) is None
+
+    def test_stale_pair_or_disabled_reuse_requires_a_fetch(self, r2_service):
+        """Une paire plus vieille que max_age_sec (ou max_age_sec=0) n'est pas réutilisée."""
+        r2_service._links_store.append({
+            "source_url": "https://www.dropbox.com/s/old/file.zip?dl=1",
+            "r2_url": "https://media.example.com/old",
+            "provider": "dropbox",
+            "created_at": "2020-01-01T00:00:00+00:00",
+        })
+        r2_service.persist_link_pair("https://fromsmash.com/xyz", "https://media.example.com/smash", "fromsmash")
+
+        assert r2_service.find_reusable_link("https://www.dropbox.com/s/old/file.zip", "dropbox", max_age_sec=3600) is None
+        assert r2_service.find_reusable_link("https://fromsmash.com/xyz", "fromsmash", max_age_sec=0) is None
+        assert r2_service.find_reusable_link("https://fromsmash.com/xyz", "fromsmash", max_age_sec=60) is not None
+
+    def test_validation_rejects_unreachable_r2_objects(self, r2_service):
+        """Avec validate=True, un objet R2 qui ne répond pas au HEAD n'est pas réutilisé."""
+        r2_service.persist_link_pair("https://fromsmash.com/xyz", "https://media.example.com/smash", "fromsmash")
+
+        with patch("services.r2_transfer_service.requests.head", return_value=Mock(status_code=404)) as head:
+            assert r2_service.find_reusable_link("https://fromsmash.com/xyz", "fromsmash", max_age_sec=60, validate=True) is None
+        head.assert_called_once_with("https://media.example.com/smash", timeout=5, allow_redirects=True)
+
+        with patch("services.r2_transfer_service.requests.head", return_value=Mock(status_code=200)):
+            assert r2_service.find_reusable_link("https://fromsmash.com/xyz", "fromsmash", max_age_sec=60, validate=True) is not None
+
 
 class TestR2TransferServiceDropboxNormalization:
     """Tests ciblés sur la normalisation Dropbox inspirée de debug/csv_service.py."""
@@ -0,0 +1,167 @@
+"""
+Tests for the atomic check-and-reserve rate limiter (services.rate_limit_service).
+"""
+import threading
+
+import pytest
+
+from services.rate_limit_service import (
+    _REDIS_KEY,
+    ALGORITHM_GCRA,
+    ALGORITHMS,
+    ALGORITHM_SLIDING_WINDOW,
+    ALGORITHM_TOKEN_BUCKET,
+    SCOPE_GLOBAL,
+    RateLimitService,
+    routing_rule_scope,
+    webhook_url_scope,
+)
+
+LIMIT = 25
+
+
+def _limiter(algorithm, redis_client=None):
+    rls = RateLimitService.get_instance()
+    rls.configure(redis_client=redis_client, algorithm=algorithm)
+    return rls
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_limit_is_never_exceeded_under_concurrency(algorithm, backend, request):
+    # Given: 16 threads racing for 10 sends each against a limit of 25 per hour
+    redis_client = request.getfixturevalue("mock_redis") if backend == "redis" else None
+    rls = _limiter(algorithm, redis_client)
+    barrier = threading.Barrier(16)
+    granted = []
+
+    def _worker():
+        barrier.wait()
+        for _ in range(10):
+            if rls.allow_send(LIMIT):
+                granted.append(1)
+
+    threads = [threading.Thread(target=_worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Then: exactly the limit went through, reserved once per send
+    assert len(granted) == LIMIT
+    if backend == "redis" and algorithm == ALGORITHM_SLIDING_WINDOW:
+        assert redis_client.zcard(_REDIS_KEY) == LIMIT
+
+
+@pytest.mark.unit
+def test_record_event_does_not_consume_a_second_slot(mock_redis):
+    rls = _limiter(ALGORITHM_SLIDING_WINDOW, mock_redis)
+
+    for _ in range(3):
+        assert rls.allow_send(3) is True
+        rls.record_event()
+
+    assert mock_redis.zcard(_REDIS_KEY) == 3
+    assert rls.allow_send(3) is False
+    assert rls.get_stats()["sent_events"] == 3
+
+
+@pytest.mark.unit
+def test_gcra_keeps_a_single_timestamp_and_paces_after_the_burst(mock_redis):
+    rls = _limiter(ALGORITHM_GCRA, mock_redis)
+    now = [1_000_000.0]
+    rls._clock = lambda: now[0]
+
+    # Burst of `limit` sends, then one slot every hour / limit
+    assert [rls.allow_send(4) for _ in range(5)] == [True] * 4 + [False]
+    allowed, retry_after = rls.acquire([(SCOPE_GLOBAL, 4)])
+    assert (allowed, retry_after) == (False, 900.0)
+    assert mock_redis.keys("*") == [f"{_REDIS_KEY}:{ALGORITHM_GCRA}"]
+    assert mock_redis.type(f"{_REDIS_KEY}:{ALGORITHM_GCRA}") == "string"
+
+    now[0] += 900
+    assert [rls.allow_send(4), rls.allow_send(4)] == [True, False]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("algorithm", [ALGORITHM_SLIDING_WINDOW, ALGORITHM_TOKEN_BUCKET])
+def test_window_and_bucket_refill_over_the_hour(algorithm):
+    rls = _limiter(algorithm)
+    now = [0.0]
+    rls._clock = lambda: now[0]
+
+    assert [rls.allow_send(2) for _ in range(3)] == [True, True, False]
+    now[0] += 1800
+    # The token bucket has regained one token, the sliding window none yet
+    assert rls.allow_send(2) is (algorithm == ALGORITHM_TOKEN_BUCKET)
+    now[0] += 1801
+    assert rls.allow_send(2) is True
+
+
+@pytest.mark.unit
+def test_zero_limit_disables_limiting(mock_redis):
+    rls = _limiter(ALGORITHM_GCRA, mock_redis)
+
+    assert all(rls.allow_send(0) for _ in range(100))
+    assert mock_redis.keys("*") == []
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_scopes_are_reserved_together_or_not_at_all(algorithm, backend, request):
+    # Given: a global limit of 10 and a destination capped at 2 sends per hour
+    redis_client = request.getfixturevalue("mock_redis") if backend == "redis" else None
+    rls = _limiter(algorithm, redis_client)
+    capped = [webhook_url_scope("https://hook.eu1.make.com/capped", 2)]
+
+    # When: the capped destination is hammered, then another one sends
+    capped_results = [rls.allow_send(10, capped) for _ in range(5)]
+    other_results = [rls.allow_send(10) for _ in range(8)]
+
+    # Then: refused sends to the capped URL did not eat into the global quota
+    assert capped_results == [True, True, False, False, False]
+    assert other_results == [True] * 8
+    assert rls.allow_send(10) is False
+
+
+@pytest.mark.unit
+def test_quotas_and_retry_after_per_scope():
+    rls = _limiter(ALGORITHM_SLIDING_WINDOW)
+    now = [0.0]
+    rls._clock = lambda: now[0]
+    url = webhook_url_scope("https://hook.eu1.make.com/secret-token", 2)
+    rule = routing_rule_scope("rule-1", 5, "Factures")
+
+    assert rls.allow_send(100, [url, rule]) is True
+    now[0] = 600
+    assert rls.allow_send(100, [url, rule]) is True
+    now[0] = 1200
+
+    # The URL is full until its oldest send leaves the window
+    assert rls.retry_after([(SCOPE_GLOBAL, 100), url, rule]) == 2400
+    assert [(q["label"], q["remaining"], q["next_slot_in_sec"]) for q in rls.get_quotas()] == [
+        ("global", 98, 0.0),
+        ("Factures", 3, 0.0),
+        ("https://hook.eu1.make.com/***", 0, 2400.0),
+    ]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("algorithm", [ALGORITHM_GCRA, ALGORITHM_TOKEN_BUCKET])
+def test_peek_treats_a_missing_redis_key_as_full_capacity(algorithm, mock_redis):
+    # Given: a local fallback state left exhausted (e.g. by an earlier Redis outage)
+    rls = _limiter(algorithm)
+    now = [0.0]
+    rls._clock = lambda: now[0]
+    while rls.allow_send(3):
+        pass
+    assert rls.retry_after([(SCOPE_GLOBAL, 3)]) > 0
+
+    # When: Redis is back and holds no state for the scope
+    rls.configure(redis_client=mock_redis, algorithm=algorithm)
+
+    # Then: the quota is read from Redis (full), not from the stale local state
+    assert rls.retry_after([(SCOPE_GLOBAL, 3)]) == 0.0
+    assert [(q["remaining"], q["next_slot_in_sec"]) for q in rls.get_quotas()] == [(3, 0.0)]
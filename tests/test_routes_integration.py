@@ -106,6 +106,34 @@ class TestWebhooksConfigEndpoints:
             )
             assert response.status_code == 200
 
+    def test_get_circuit_breakers_masks_urls(self, authenticated_flask_client):
+        """Test GET /api/webhooks/circuit_breakers: état des disjoncteurs, URLs masquées"""
+        from services.circuit_breaker_service import WebhookCircuitBreakerService
+        breaker = WebhookCircuitBreakerService.get_instance()
+        for _ in range(5):
+            breaker.record_failure('https://hook.eu1.make.com/secret', 'upstream_server_error')
+
+        response = authenticated_flask_client.get('/api/webhooks/circuit_breakers')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['success'] is True
+        assert [(b['url'], b['state']) for b in data['breakers']] == [('https://hook.eu1.make.com/***', 'open')]
+
+    def test_get_rate_limits_reports_remaining_quota_per_scope(self, authenticated_flask_client):
+        """Test GET /api/webhooks/rate_limits: quota restant par scope, URLs masquées"""
+        from services.rate_limit_service import RateLimitService, webhook_url_scope
+        rate_limiter = RateLimitService.get_instance()
+        for _ in range(2):
+            rate_limiter.allow_send(10, [webhook_url_scope('https://hook.eu1.make.com/secret', 3)])
+
+        response = authenticated_flask_client.get('/api/webhooks/rate_limits')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['success'] is True
+        assert [(q['label'], q['limit_per_hour'], q['remaining']) for q in data['quotas']] == [
+            ('global', 10, 8), ('https://hook.eu1.make.com/***', 3, 1),
+        ]
+
 @pytest.mark.integration
 class TestProcessingPreferencesEndpoints:
     """Tests pour les endpoints de préférences de traitement"""
@@ -94,3 +94,46 @@ def test_get_rules_reload_reads_from_store(temp_rules_file: Path):
     assert len(rules) == 1
     assert rules[0]["name"] == "Support"
     assert rules[0]["actions"]["priority"] == "high"
+
+
+def test_update_rules_keeps_valid_payload_profile_options(temp_rules_file: Path):
+    store = _DummyStore()
+    service = RoutingRulesService.get_instance(file_path=temp_rules_file, external_store=store)
+    rules = _build_rule()
+    rules[0]["actions"].update({"payload_profile": "Text_Capped", "payload_max_kb": "32", "gzip": True, "batch": 1})
+
+    ok, _msg, _payload = service.update_rules(rules)
+
+    assert ok is True
+    actions = store.saved["rules"][0]["actions"]
+    assert (actions["payload_profile"], actions["payload_max_kb"], actions["gzip"]) == ("text_capped", 32, True)
+    assert actions["batch"] is True
+
+
+@pytest.mark.parametrize("override", [{"payload_profile": "html_only"}, {"payload_max_kb": 0}])
+def test_update_rules_refuses_invalid_payload_profile_options(temp_rules_file: Path, override: dict):
+    service = RoutingRulesService.get_instance(file_path=temp_rules_file, external_store=_DummyStore())
+    rules = _build_rule()
+    rules[0]["actions"].update(override)
+
+    ok, msg, _payload = service.update_rules(rules)
+
+    assert ok is False
+    assert "payload_" in msg
+
+
+@pytest.mark.parametrize("value,expected", [("120", 120), (0, None), (-1, False), ("soon", False)])
+def test_update_rules_validates_rate_limit_per_hour(temp_rules_file: Path, value, expected):
+    store = _DummyStore()
+    service = RoutingRulesService.get_instance(file_path=temp_rules_file, external_store=store)
+    rules = _build_rule()
+    rules[0]["actions"]["rate_limit_per_hour"] = value
+
+    ok, msg, _payload = service.update_rules(rules)
+
+    if expected is False:
+        assert ok is False
+        assert "rate_limit_per_hour" in msg
+    else:
+        assert ok is True
+        assert store.saved["rules"][0]["actions"].get("rate_limit_per_hour") == expected
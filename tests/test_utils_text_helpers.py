@@ -159,3 +159,19 @@ class TestDetectProvider:
         """Test avec URL None"""
         result = text_helpers.detect_provider(None)
         assert result == "unknown"
+
+
+class TestMaskUrl:
+    """Tests pour mask_url()"""
+
+    @pytest.mark.unit
+    def test_mask_url_keeps_scheme_and_host(self):
+        """Test masquage du chemin (jeton) d'une URL de webhook"""
+        result = text_helpers.mask_url("https://hook.eu1.make.com/secret-token")
+        assert result == "https://hook.eu1.make.com/***"
+
+    @pytest.mark.unit
+    def test_mask_url_truncates_non_http_values(self):
+        """Test avec une valeur qui n'est pas une URL http(s)"""
+        assert text_helpers.mask_url("not-an-url") == "not-an-url***"
+        assert text_helpers.mask_url(None) == "***"
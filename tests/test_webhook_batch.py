@@ -0,0 +1,142 @@
+"""
+Tests for batched webhook delivery (email_processing.webhook_batch, orchestrator._deliver_webhook_batch).
+"""
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from email_processing import orchestrator as orch
+from email_processing import webhook_batch
+
+HOOK_URL = "https://hook.eu1.make.com/batch"
+OPTIONS = {"payload_profile": "full", "payload_max_kb": 64, "gzip": False, "batch": True}
+
+
+@pytest.fixture
+def batch_env(monkeypatch):
+    env = SimpleNamespace(posts=[], logs=[], processed=[], reads=[], rate_checks=0, events=0, answer=None)
+
+    def _post(url, **kwargs):
+        items = json.loads(kwargs["data"])
+        env.posts.append(items)
+        status, body = env.answer(items)
+        return SimpleNamespace(status_code=status, content=b"x", text=json.dumps(body), json=lambda: body)
+
+    def _allow(_limit_per_hour, _scopes=()):
+        env.rate_checks += 1
+        return True
+
+    def _record():
+        env.events += 1
+
+    rls = orch.RateLimitService.get_instance()
+    monkeypatch.setattr(rls, "allow_send", _allow)
+    monkeypatch.setattr(rls, "record_event", _record)
+    monkeypatch.setattr(orch.WebhookLoggerService.get_instance(), "append_log", env.logs.append)
+    monkeypatch.setattr(
+        orch.DeduplicationService.get_instance(), "mark_email_processed", lambda eid: env.processed.append(eid) or True,
+    )
+    monkeypatch.setattr(orch.HttpSessionService.get_instance(), "post", _post)
+    monkeypatch.setattr(orch.imap_client, "mark_email_as_read_imap", lambda _logger, _mail, num: env.reads.append(num))
+    monkeypatch.setattr(orch.settings, "ALLOW_CUSTOM_WEBHOOK_WITHOUT_LINKS", True, raising=False)
+    return env
+
+
+def _batcher(max_items=5):
+    def _send(webhook_url, items, options, mail):
+        return orch._deliver_webhook_batch(
+            webhook_url, items, options, mail,
+            processing_prefs={"retry_count": 0, "webhook_timeout_sec": 5}, logger=logging.getLogger(),
+        )
+
+    return webhook_batch.WebhookBatcher(_send, max_items=max_items, max_wait_ms=60_000)
+
+
+def _queue(batcher, count):
+    triggered = 0
+    for i in range(count):
+        triggered += orch._queue_batched_webhook(
+            batcher, f"e{i}", f"Lot {i}", {"subject": f"Lot {i}"}, [], HOOK_URL, object(), str(i).encode(),
+            logging.getLogger(), payload_options=OPTIONS,
+        )
+    return triggered
+
+
+@pytest.mark.unit
+def test_batcher_flushes_on_size_age_and_cycle_end():
+    now, sent = [0.0], []
+    batcher = webhook_batch.WebhookBatcher(
+        lambda url, items, options, mail: sent.append((url, len(items))) or len(items),
+        max_items=3, max_wait_ms=500, clock=lambda: now[0],
+    )
+
+    def _add(url):
+        return batcher.add(url, webhook_batch.BatchItem("e", None, b"1", "{}", 2), options={}, mail=None)
+
+    # Full batch goes at once
+    assert [_add("a") for _ in range(3)] == [0, 0, 3]
+    # An old batch leaves on the next add / flush_due, the young one waits
+    _add("a")
+    now[0] = 0.4
+    _add("b")
+    assert batcher.flush_due(None) == 0
+    now[0] = 0.5
+    assert batcher.flush_due(None) == 1
+    assert (batcher.pending_count(), batcher.flush_all(None), batcher.pending_count()) == (1, 1, 0)
+    assert sent == [("a", 3), ("a", 1), ("b", 1)]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "status,body,expected",
+    [
+        (200, [{"success": True}, {"success": False, "message": "doublon"}], [(True, None), (False, "doublon")]),
+        (200, {"results": [True, False]}, [(True, None), (False, "Unknown error")]),
+        (200, {"success": True}, [(True, None), (True, None)]),
+        (200, [{"success": True}], [(False, "Batch response has 1 result(s) for 2 email(s)")] * 2),
+        (502, {}, [(False, None), (False, None)]),
+    ],
+)
+def test_response_is_mapped_back_to_each_email(status, body, expected):
+    assert webhook_batch.map_batch_response(status, body, 2) == expected
+
+
+@pytest.mark.unit
+def test_burst_becomes_few_posts_with_per_email_outcomes(batch_env):
+    # Given: a receiver answering one result per item, rejecting email e3
+    batch_env.answer = lambda items: (200, [{"success": item["subject"] != "Lot 3"} for item in items])
+    batcher = _batcher(max_items=5)
+
+    # When: a burst of 12 "Lot" emails is queued, then the cycle ends
+    triggered = _queue(batcher, 12) + batcher.flush_all(object())
+
+    # Then: 3 POSTs (5 + 5 + 2) instead of 12, one rate-limit slot each
+    assert [len(items) for items in batch_env.posts] == [5, 5, 2]
+    assert triggered == 12
+    assert (batch_env.rate_checks, batch_env.events) == (3, 3)
+    # Dedup, \Seen and logs follow each email's own result
+    assert "e3" not in batch_env.processed and len(batch_env.processed) == 11
+    assert b"3" not in batch_env.reads and len(batch_env.reads) == 11
+    by_email = {entry["email_id"]: entry for entry in batch_env.logs}
+    assert len(by_email) == 12
+    assert by_email["e3"]["status"] == "error"
+    assert by_email["e0"]["status"] == "success"
+    assert (by_email["e7"]["batch"]["index"], by_email["e7"]["batch"]["size"]) == (2, 5)
+    assert by_email["e0"]["batch"]["batch_id"] != by_email["e7"]["batch"]["batch_id"]
+
+
+@pytest.mark.unit
+def test_failed_batch_leaves_every_email_unmarked(batch_env):
+    batch_env.answer = lambda items: (503, {"error": "maintenance"})
+    batcher = _batcher()
+
+    _queue(batcher, 3)
+    batcher.flush_all(object())
+
+    assert len(batch_env.posts) == 1
+    assert (batch_env.processed, batch_env.reads) == ([], [])
+    assert [(e["status"], e["status_code"], e["failure_reason"]) for e in batch_env.logs] == [
+        ("error", 503, "upstream_server_error")
+    ] * 3
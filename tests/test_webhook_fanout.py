@@ -0,0 +1,124 @@
+"""
+Tests for concurrent delivery to several webhooks (orchestrator._send_webhook_fanout).
+"""
+import json
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from email_processing import orchestrator as orch
+
+SLOW_SEC = 0.4
+RULE_URL = "https://hook.eu2.make.com/rule"
+DEFAULT_URL = "https://webhook.kidpixel.fr/index.php"
+
+
+@pytest.fixture
+def fanout_env(monkeypatch):
+    env = SimpleNamespace(posts=[], logs=[], rate_checks=0, events=0, reads=[], prepares=0, in_flight=0, peak=0)
+    in_flight_lock = threading.Lock()
+    real_prepare = orch._prepare_payload
+
+    def _prepare(**kwargs):
+        env.prepares += 1
+        return real_prepare(**kwargs)
+
+    def _slow_post(url, **kwargs):
+        with in_flight_lock:
+            env.in_flight += 1
+            env.peak = max(env.peak, env.in_flight)
+        time.sleep(SLOW_SEC)
+        with in_flight_lock:
+            env.in_flight -= 1
+        env.posts.append((url, kwargs.get("data") or kwargs.get("json")))
+        return SimpleNamespace(status_code=200, content=b"{}", text="{}", json=lambda: {"success": True})
+
+    def _allow(_limit_per_hour, _scopes=()):
+        env.rate_checks += 1
+        return env.rate_checks <= env.limit
+
+    def _record():
+        env.events += 1
+
+    env.limit = 10
+    rls = orch.RateLimitService.get_instance()
+    monkeypatch.setattr(rls, "allow_send", _allow)
+    monkeypatch.setattr(rls, "record_event", _record)
+    monkeypatch.setattr(orch.WebhookLoggerService.get_instance(), "append_log", env.logs.append)
+    monkeypatch.setattr(orch.DeduplicationService.get_instance(), "mark_email_processed", lambda _id: True)
+    monkeypatch.setattr(orch.HttpSessionService.get_instance(), "post", _slow_post)
+    monkeypatch.setattr(orch, "_prepare_payload", _prepare)
+    monkeypatch.setattr(
+        orch.imap_client, "mark_email_as_read_imap",
+        lambda _logger, _mail, num: env.reads.append((num, threading.get_ident())),
+    )
+    monkeypatch.setattr(orch.settings, "WEBHOOK_OUTBOX_ENABLED", False, raising=False)
+    return env
+
+
+def _fanout(destinations):
+    return orch._send_webhook_fanout(
+        "email-1", "Lot 1", {"subject": "Lot 1"}, [{"raw_url": "https://www.dropbox.com/scl/fo/x"}],
+        destinations, {"retry_count": 0, "webhook_timeout_sec": 5}, object(), b"7", logging.getLogger(),
+    )
+
+
+@pytest.mark.unit
+def test_fanout_sends_concurrently_with_one_serialization(fanout_env):
+    # When: one email goes to the routing-rule webhook and to the default webhook
+    triggered = _fanout([RULE_URL, DEFAULT_URL])
+
+    # Then: both sent in parallel from a single serialized payload
+    assert triggered == 2
+    assert fanout_env.peak == 2
+    assert fanout_env.prepares == 1
+    assert sorted(url for url, _ in fanout_env.posts) == sorted([RULE_URL, DEFAULT_URL])
+    assert len({body for _, body in fanout_env.posts}) == 1
+    # Rate limiter consulted and fed once per destination
+    assert (fanout_env.rate_checks, fanout_env.events) == (2, 2)
+    # IMAP \Seen set once, by the calling thread
+    assert fanout_env.reads == [(b"7", threading.get_ident())]
+    # Outcomes logged per destination, tagged with the fan-out group
+    assert sorted(entry["fanout"]["index"] for entry in fanout_env.logs) == [0, 1]
+    assert {entry["status"] for entry in fanout_env.logs} == {"success"}
+    assert {entry["fanout"]["destinations"] for entry in fanout_env.logs} == {2}
+
+
+@pytest.mark.unit
+def test_fanout_applies_rate_limit_per_destination(fanout_env):
+    # Given: a single send left in the hourly budget
+    fanout_env.limit = 1
+
+    triggered = _fanout([RULE_URL, DEFAULT_URL])
+
+    # Then: the first destination is sent, the second is refused with a 429 entry
+    assert [url for url, _ in fanout_env.posts] == [RULE_URL]
+    assert triggered == 1
+    refused = [e for e in fanout_env.logs if e["status_code"] == 429]
+    assert [e["fanout"]["index"] for e in refused] == [1]
+
+
+@pytest.mark.unit
+def test_fanout_serializes_once_per_payload_profile(fanout_env):
+    # Given: the rule webhook only wants headers, the default one the full payload
+    options = {
+        RULE_URL: {"payload_profile": "headers", "payload_max_kb": 64, "gzip": False},
+        DEFAULT_URL: {"payload_profile": "full", "payload_max_kb": 64, "gzip": False},
+    }
+
+    orch._send_webhook_fanout(
+        "email-1", "Lot 1", {"subject": "Lot 1", "email_content": "x" * 5000},
+        [{"raw_url": "https://www.dropbox.com/scl/fo/x"}], [RULE_URL, DEFAULT_URL],
+        {"retry_count": 0, "webhook_timeout_sec": 5}, object(), b"7", logging.getLogger(),
+        payload_options=options, body_plain="x" * 5000,
+    )
+
+    # Then: one serialization per profile, each destination receiving its own projection
+    assert fanout_env.prepares == 2
+    bodies = {url: json.loads(body) for url, body in fanout_env.posts}
+    assert "email_content" not in bodies[RULE_URL]
+    assert len(bodies[DEFAULT_URL]["email_content"]) == 5000
+    assert {e["payload_profile"] for e in fanout_env.logs} == {"headers", "full"}
@@ -0,0 +1,184 @@
+"""
+Tests for adaptive webhook timeouts and the retry budget (services.webhook_latency_service).
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from background.webhook_dispatcher import OUTCOME_DEFERRED
+from email_processing import orchestrator as orch
+from services.http_session_service import HttpSessionService
+from services.webhook_latency_service import WebhookLatencyService
+
+HOOK_URL = "https://hook.eu1.make.com/latency"
+
+
+class _DelayedHandler(BaseHTTPRequestHandler):
+    """Récepteur dont la latence est réglée par le test (server.delay)."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.server.delay)
+        body = b'{"success": true}'
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass  # client parti après son timeout
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def delayed_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _DelayedHandler)
+    server.daemon_threads = True
+    server.delay = 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/hook"
+    server.shutdown()
+    server.server_close()
+
+
+def _send(url, http, tracker, *, retry_count=0, timeout_sec=5, logs=None):
+    logs = [] if logs is None else logs
+    return orch.send_custom_webhook_flow(
+        email_id="e1", subject="s", payload_for_webhook={"a": 1}, delivery_links=["x"],
+        webhook_url=url, webhook_ssl_verify=True, allow_without_links=True,
+        processing_prefs={"retry_count": retry_count, "retry_delay_sec": 0, "webhook_timeout_sec": timeout_sec},
+        rate_limit_allow_send=lambda: True, record_send_event=lambda: None, append_webhook_log=logs.append,
+        mark_email_id_as_processed_redis=lambda eid: True, mark_email_as_read_imap=lambda *a, **k: True,
+        mail=None, email_num=None, urlparse=None, requests=http, time=time,
+        logger=orch.logging.getLogger(), latency_tracker=tracker,
+    )
+
+
+@pytest.mark.unit
+def test_timeout_follows_p99_and_stays_within_bounds():
+    tracker = WebhookLatencyService(min_samples=10, timeout_factor=3, min_timeout_sec=0.5)
+
+    # Not enough history: the configured timeout applies
+    for _ in range(9):
+        tracker.record_latency(HOOK_URL, 0.4)
+    assert tracker.timeout_for(HOOK_URL, 30) == 30
+
+    # Then: p99 x 3, never above the configured timeout nor below the floor
+    tracker.record_latency(HOOK_URL, 0.4)
+    assert 1.2 <= tracker.timeout_for(HOOK_URL, 30) <= 1.2 * 1.25
+    assert tracker.timeout_for(HOOK_URL, 1) == 1
+    fast = WebhookLatencyService(min_samples=1, min_timeout_sec=0.5)
+    fast.record_latency(HOOK_URL, 0.01)
+    assert fast.timeout_for(HOOK_URL, 30) == 0.5
+
+
+@pytest.mark.unit
+def test_histogram_forgets_samples_outside_its_window():
+    tracker = WebhookLatencyService(window=20, min_samples=1, timeout_factor=1, min_timeout_sec=0.01)
+    for _ in range(20):
+        tracker.record_latency(HOOK_URL, 4.0)
+    for _ in range(20):
+        tracker.record_latency(HOOK_URL, 0.1)
+
+    assert tracker.timeout_for(HOOK_URL, 30) < 0.2
+    assert tracker.get_stats()["destinations"][0]["samples"] == 20
+
+
+@pytest.mark.unit
+def test_stalled_receiver_fails_at_learned_timeout_not_configured_one(delayed_stub):
+    server, url = delayed_stub
+    http = HttpSessionService()
+    tracker = WebhookLatencyService(min_samples=20, timeout_factor=3, min_timeout_sec=0.2)
+
+    # Given: a receiver answering in ~20 ms for 20 emails
+    server.delay = 0.02
+    for _ in range(20):
+        assert _send(url, http, tracker) is False
+    learned = tracker.timeout_for(url, 5)
+    assert 0.2 <= learned < 0.5
+
+    # When: the receiver stalls (2s) while webhook_timeout_sec is 5s
+    server.delay = 2.0
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        _send(url, http, tracker)
+    elapsed = time.monotonic() - started
+
+    # Then: the cycle only waits for the learned timeout
+    assert elapsed < 1.0
+    http.close_all()
+
+
+@pytest.mark.unit
+def test_timeout_grows_back_when_the_receiver_slows_down(delayed_stub):
+    server, url = delayed_stub
+    http = HttpSessionService()
+    tracker = WebhookLatencyService(min_samples=20, timeout_factor=3, min_timeout_sec=0.2)
+    server.delay = 0.02
+    for _ in range(20):
+        _send(url, http, tracker)
+    assert tracker.timeout_for(url, 5) < 0.5
+
+    # When: the receiver durably slows down to 0.5s, above the learned timeout
+    server.delay = 0.5
+    timeouts = 0
+    while True:
+        try:
+            assert _send(url, http, tracker) is False
+            break
+        except requests.exceptions.Timeout:
+            timeouts += 1
+            assert timeouts < 5, "learned timeout never grew back"
+
+    # Then: the timed-out attempts were recorded and raised the timeout past the new latency
+    assert timeouts >= 1
+    assert tracker.timeout_for(url, 5) > 0.5
+    http.close_all()
+
+
+class _DownReceiver:
+    def __init__(self):
+        self.posts = 0
+
+    def post(self, url, **kwargs):
+        self.posts += 1
+        raise requests.exceptions.ConnectionError("connection refused")
+
+
+@pytest.mark.unit
+def test_retry_budget_caps_retries_during_an_outage():
+    # Given: retry_count=3 on 50 emails while the receiver is down
+    receiver = _DownReceiver()
+    tracker = WebhookLatencyService(retry_ratio=0.2, retry_min_per_window=3, retry_window_sec=60)
+
+    for _ in range(50):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            _send(HOOK_URL, receiver, tracker, retry_count=3)
+
+    # Then: 200 requests without budget; at most 50 + 20% + 3 with it
+    assert 50 < receiver.posts <= 50 + 10 + 3
+    assert tracker.get_stats()["retry_budget"]["denied"] > 0
+
+
+@pytest.mark.unit
+def test_outbox_retry_is_parked_when_budget_is_exhausted():
+    receiver = _DownReceiver()
+    tracker = WebhookLatencyService(retry_ratio=0, retry_min_per_window=0)
+    job = {"job_id": "j1", "email_id": "e1", "webhook_url": HOOK_URL, "serialized_payload": "{}", "attempts": 1}
+
+    outcome, error = orch.deliver_outbox_job(
+        job, False, requests=receiver, record_send_event=lambda: None, append_webhook_log=lambda *_: None,
+        logger=orch.logging.getLogger(), latency_tracker=tracker,
+    )
+
+    assert (outcome, error, receiver.posts) == (OUTCOME_DEFERRED, "retry budget exhausted", 0)
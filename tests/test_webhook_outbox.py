@@ -0,0 +1,299 @@
+"""
+Tests for the durable webhook outbox (services.webhook_outbox_service) and its
+dispatcher (background.webhook_dispatcher).
+"""
+import imaplib
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from background.webhook_dispatcher import OUTCOME_DELIVERED, OUTCOME_FAILED, OUTCOME_RETRY, WebhookDispatcher
+from email_processing import orchestrator as orch
+from services.webhook_outbox_service import WebhookOutboxService, outbox_job_id
+from tests.imap_stub_server import ImapStubServer
+
+HOOK_URL = "https://hook.eu1.make.com/outbox"
+
+
+def _job(email_id="e1", url=HOOK_URL):
+    return {"job_id": outbox_job_id(email_id, url), "email_id": email_id, "webhook_url": url}
+
+
+@pytest.fixture(params=["redis", "sqlite"])
+def outbox_factory(request, mock_redis, tmp_path):
+    """Fabrique d'outbox partageant le même stockage (simule plusieurs processus / un redémarrage)."""
+    def _make(clock=time.time):
+        if request.param == "redis":
+            return WebhookOutboxService(redis_client=mock_redis, key_prefix="r:ss:webhook_outbox:test", clock=clock)
+        return WebhookOutboxService(sqlite_path=tmp_path / "outbox.sqlite3", clock=clock)
+
+    return _make
+
+
+@pytest.mark.unit
+def test_enqueue_is_idempotent_per_email_and_url(outbox_factory):
+    outbox = outbox_factory()
+
+    assert outbox.enqueue(_job()) is True
+    assert outbox.enqueue(_job()) is False
+    assert outbox.enqueue(_job(url="https://other.example.org/hook")) is True
+
+    assert outbox.get_stats()["pending"] == 2
+
+
+@pytest.mark.unit
+def test_jobs_survive_restart_and_are_claimed_once(outbox_factory):
+    # Given: a job enqueued by a process that then goes away
+    outbox_factory().enqueue(_job())
+
+    # When: two dispatchers of the restarted deployment claim concurrently
+    first = outbox_factory().claim_due(limit=10, visibility_sec=60)
+    second = outbox_factory().claim_due(limit=10, visibility_sec=60)
+
+    # Then: the job is delivered to exactly one of them
+    assert [j["email_id"] for j in first] == ["e1"]
+    assert second == []
+
+
+@pytest.mark.unit
+def test_unacknowledged_job_is_redelivered_after_visibility_timeout(outbox_factory):
+    now = [1_000.0]
+    outbox = outbox_factory(clock=lambda: now[0])
+    outbox.enqueue(_job())
+    assert len(outbox.claim_due(limit=1, visibility_sec=60)) == 1
+
+    # Dispatcher crashed mid-delivery: nothing is due until the claim expires
+    now[0] += 30
+    assert outbox.claim_due(limit=1, visibility_sec=60) == []
+    now[0] += 31
+    assert len(outbox.claim_due(limit=1, visibility_sec=60)) == 1
+
+
+def _dispatcher(outbox, outcomes, acked, **kwargs):
+    calls = iter(outcomes)
+    return WebhookDispatcher(
+        outbox=outbox,
+        deliver=lambda job, final: next(calls),
+        acknowledge=acked.append,
+        backoff_base_sec=10,
+        backoff_max_sec=60,
+        rng=lambda: 1.0,
+        **kwargs,
+    )
+
+
+@pytest.mark.unit
+def test_dispatcher_retries_with_backoff_until_delivered(outbox_factory):
+    # Given: a receiver failing twice before accepting the delivery
+    now = [1_000.0]
+    outbox = outbox_factory(clock=lambda: now[0])
+    outbox.enqueue(_job())
+    acked = []
+    dispatcher = _dispatcher(
+        outbox, [(OUTCOME_RETRY, "HTTP 503"), (OUTCOME_RETRY, "timeout"), (OUTCOME_DELIVERED, None)], acked
+    )
+
+    # When/Then: each failure pushes the next attempt further (10s, then 20s)
+    for backoff in (10, 20):
+        assert dispatcher.run_once() == 1
+        now[0] += backoff - 1
+        assert dispatcher.run_once() == 0
+        now[0] += 1
+    assert dispatcher.run_once() == 1
+
+    # Then: delivered on the third attempt, acknowledged and removed
+    assert [j["attempts"] for j in acked] == [3]
+    assert outbox.get_stats()["pending"] == 0
+    assert dispatcher.status()["retried"] == 2
+
+
+@pytest.mark.unit
+def test_backoff_is_capped_and_jittered():
+    dispatcher = WebhookDispatcher(
+        outbox=None, deliver=None, acknowledge=None, backoff_base_sec=10, backoff_max_sec=60, rng=lambda: 0.0,
+    )
+
+    assert [dispatcher.backoff_delay(n) for n in (1, 2, 3, 4, 8)] == [5, 10, 20, 30, 30]
+
+
+@pytest.mark.unit
+def test_dispatcher_dead_letters_terminal_and_exhausted_jobs(outbox_factory):
+    outbox = outbox_factory(clock=lambda: 1_000.0)
+    outbox.enqueue(_job("terminal"))
+    outbox.enqueue(_job("exhausted"))
+    outcomes = {"terminal": (OUTCOME_FAILED, "HTTP 404"), "exhausted": (OUTCOME_RETRY, "HTTP 502")}
+    finals = []
+
+    def _deliver(job, final):
+        finals.append((job["email_id"], final))
+        return outcomes[job["email_id"]]
+
+    dispatcher = WebhookDispatcher(outbox=outbox, deliver=_deliver, acknowledge=None, max_attempts=1)
+    dispatcher.run_once()
+
+    assert sorted(finals) == [("exhausted", True), ("terminal", True)]
+    assert outbox.get_stats()["dead"] == 2
+    # A dead-lettered email is not re-enqueued by the next poll cycle
+    assert outbox.enqueue(_job("terminal")) is False
+
+
+@pytest.mark.unit
+def test_dead_lettered_job_can_be_replayed(outbox_factory):
+    # Given: a job dead-lettered after exhausting its attempts (its email is already \\Seen)
+    outbox = outbox_factory(clock=lambda: 1_000.0)
+    outbox.enqueue(_job("e1"))
+    outbox.enqueue(_job("e2"))
+    WebhookDispatcher(
+        outbox=outbox, deliver=lambda job, final: (OUTCOME_RETRY, "HTTP 502"), acknowledge=None, max_attempts=1,
+    ).run_once()
+    assert outbox.get_stats()["dead"] == 2
+
+    # When: one job is replayed
+    assert outbox.requeue_dead(outbox_job_id("e1", HOOK_URL)) == 1
+
+    # Then: it is delivered and acknowledged with a fresh attempt budget
+    acked = []
+    _dispatcher(outbox, [(OUTCOME_DELIVERED, None)], acked).run_once()
+    assert [(j["email_id"], j["attempts"]) for j in acked] == [("e1", 1)]
+    assert outbox.get_stats()["dead"] == 1
+    assert outbox.requeue_dead() == 1
+    assert outbox.get_stats()["pending"] == 1
+
+
+@pytest.mark.integration
+def test_requeue_dead_route(authenticated_flask_client, monkeypatch, tmp_path):
+    outbox = WebhookOutboxService(sqlite_path=tmp_path / "outbox.sqlite3")
+    outbox.enqueue(_job())
+    outbox.dead_letter(_job())
+    monkeypatch.setattr(WebhookOutboxService, "_instance", outbox)
+
+    response = authenticated_flask_client.post("/api/webhook_outbox/requeue_dead", json={})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"success": True, "requeued": 1}
+    assert outbox.get_stats()["pending"] == 1
+    monkeypatch.setattr(WebhookOutboxService, "_instance", WebhookOutboxService())
+    assert authenticated_flask_client.post("/api/webhook_outbox/requeue_dead").status_code == 503
+
+
+class _Dedup:
+    def __init__(self):
+        self.processed = set()
+
+    def is_email_dedup_disabled(self):
+        return False
+
+    def is_email_processed(self, email_id):
+        return email_id in self.processed
+
+    def mark_email_processed(self, email_id):
+        self.processed.add(email_id)
+        return True
+
+    def generate_subject_group_id(self, subject):
+        return subject
+
+    def is_subject_group_processed(self, _group_id):
+        return False
+
+
+def _raw(i: int) -> bytes:
+    return (
+        f"Subject: Lot {i}\r\n"
+        "From: Sender <ok@example.com>\r\n"
+        f"Message-ID: <outbox-{i}@example.com>\r\n"
+        "Date: Wed, 22 Oct 2025 10:00:00 +0200\r\n"
+        "\r\n"
+        f"https://www.dropbox.com/scl/fo/lot{i}\r\n"
+    ).encode("utf-8")
+
+
+@pytest.mark.unit
+def test_poll_cycle_does_not_wait_for_a_slow_receiver(monkeypatch, tmp_path):
+    # Given: the outbox enabled and a receiver that takes 1s per POST
+    import app_render  # noqa: F401  (app créée avant d'activer l'outbox: pas de dispatcher de fond ici)
+
+    dedup = _Dedup()
+    outbox = WebhookOutboxService(sqlite_path=tmp_path / "outbox.sqlite3")
+    posts = []
+
+    def _slow_post(url, **kwargs):
+        time.sleep(1.0)
+        posts.append(url)
+        return SimpleNamespace(status_code=200, content=b"{}", text="{}", json=lambda: {"success": True})
+
+    monkeypatch.setattr(WebhookOutboxService, "_instance", outbox)
+    monkeypatch.setattr(orch.settings, "WEBHOOK_OUTBOX_ENABLED", True, raising=False)
+    monkeypatch.setattr(orch.settings, "WEBHOOK_URL", HOOK_URL, raising=False)
+    monkeypatch.setattr(orch.settings, "SENDER_LIST_FOR_POLLING", ["ok@example.com"], raising=False)
+    monkeypatch.setattr(orch, "_is_webhook_sending_enabled", lambda: True)
+    monkeypatch.setattr(orch, "_load_webhook_global_time_window", lambda: ("", ""))
+    monkeypatch.setattr(orch, "_load_routing_rules", lambda: ())
+    monkeypatch.setattr(orch.DeduplicationService, "get_instance", classmethod(lambda cls: dedup))
+    monkeypatch.setattr(orch, "_handle_r2_enrichment", lambda *a, **k: None)
+    monkeypatch.setattr(orch.WebhookLoggerService.get_instance(), "append_log", lambda *_: None)
+    monkeypatch.setattr(orch.HttpSessionService.get_instance(), "post", _slow_post)
+
+    with ImapStubServer() as stub:
+        for i in (1, 2):
+            stub.add_message(_raw(i))
+
+        def _open(_logger):
+            mail = imaplib.IMAP4(stub.host, stub.port, timeout=5)
+            mail.login(stub.user, stub.password)
+            return mail, None
+
+        monkeypatch.setattr(orch, "_open_imap_session", _open)
+
+        # When: a poll cycle runs
+        started = time.monotonic()
+        assert orch.check_new_emails_and_trigger_webhook() == 2
+        elapsed = time.monotonic() - started
+
+        # Then: it returns without any HTTP call, the emails waiting in the outbox
+        assert elapsed < 0.5
+        assert posts == []
+        assert outbox.get_stats()["pending"] == 2
+        assert dedup.processed == set()
+
+        # When: the dispatcher delivers and acknowledges
+        dispatcher = WebhookDispatcher(
+            outbox=outbox,
+            deliver=lambda job, final: orch.deliver_outbox_job(
+                job, final, requests=orch.HttpSessionService.get_instance(),
+                record_send_event=lambda: None, append_webhook_log=lambda *_: None, logger=orch.logging.getLogger(),
+            ),
+            acknowledge=lambda job: orch.acknowledge_outbox_job(job, logger=orch.logging.getLogger()),
+        )
+        assert dispatcher.run_once() == 2
+
+        # Then: both deliveries are acknowledged (emails processed) and leave the outbox
+        assert stub.is_seen(1) and stub.is_seen(2)
+    assert posts == [HOOK_URL, HOOK_URL]
+    assert len(dedup.processed) == 2
+    assert outbox.get_stats() == {"backend": "sqlite", "pending": 0, "due": 0, "dead": 0}
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "status_code,expected",
+    [(503, OUTCOME_RETRY), (429, OUTCOME_RETRY), (404, OUTCOME_FAILED), (400, OUTCOME_FAILED)],
+)
+def test_deliver_outbox_job_classifies_failures(status_code, expected):
+    logs = []
+    job = {
+        **_job(), "subject": "Lot", "serialized_payload": "{}", "payload_size_bytes": 2,
+        "timeout_sec": 5, "delivery_mode": "json", "fallback_on_415": False,
+    }
+    resp = SimpleNamespace(status_code=status_code, content=b"", text="nope")
+
+    outcome, error = orch.deliver_outbox_job(
+        job, False, requests=SimpleNamespace(post=lambda *a, **k: resp),
+        record_send_event=lambda: None, append_webhook_log=logs.append, logger=orch.logging.getLogger(),
+    )
+
+    assert outcome == expected
+    assert error.startswith(f"HTTP {status_code}")
+    # Transient failures are only logged once retries are exhausted
+    assert len(logs) == (0 if expected == OUTCOME_RETRY else 1)
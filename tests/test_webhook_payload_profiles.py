@@ -0,0 +1,108 @@
+"""
+Tests for webhook payload profiles and gzip bodies (payloads.apply_payload_profile, orchestrator flow).
+"""
+import gzip
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from email_processing import orchestrator as orch
+from email_processing import payloads
+from services.runtime_metrics_service import RuntimeMetricsService
+
+HOOK_URL = "https://hook.eu1.make.com/profiles"
+PLAIN = "Bonjour, voici le lot é" * 4_000  # ~92 KB de texte brut
+HTML = "<div>" + "<p>Lot prêt</p>" * 60_000 + "</div>"
+
+
+def _payload():
+    return {
+        "microsoft_graph_email_id": "e1", "subject": "Lot", "bodyPreview": PLAIN[:200],
+        "email_content": PLAIN + "\n" + HTML, "sender_email": "ok@example.com",
+    }
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "profile,expected_keys,max_bytes",
+    [
+        ("full", {"email_content", "bodyPreview"}, None),
+        ("text", {"email_content", "bodyPreview"}, len(PLAIN.encode("utf-8"))),
+        ("text_capped", {"email_content", "bodyPreview", "email_content_truncated"}, 16 * 1024),
+        ("headers", set(), 0),
+    ],
+)
+def test_profiles_project_email_content(profile, expected_keys, max_bytes):
+    original = _payload()
+
+    projected = payloads.apply_payload_profile(original, profile=profile, body_plain=PLAIN, max_kb=16)
+
+    assert {"email_content", "bodyPreview", "email_content_truncated"} & set(projected) == expected_keys
+    assert projected["subject"] == "Lot"
+    if max_bytes is not None:
+        assert len(projected.get("email_content", "").encode("utf-8")) <= max_bytes
+    # Le payload partagé entre destinations n'est jamais modifié
+    assert original == _payload()
+
+
+@pytest.mark.unit
+def test_text_capped_cuts_on_a_character_boundary():
+    projected = payloads.apply_payload_profile({"email_content": ""}, profile="text_capped", body_plain="é" * 1024, max_kb=1)
+
+    assert projected["email_content"] == "é" * 512
+    assert projected["email_content_truncated"] is True
+
+
+@pytest.mark.unit
+def test_rule_overrides_destination_which_overrides_defaults(monkeypatch):
+    monkeypatch.setattr(orch.settings, "WEBHOOK_PAYLOAD_PROFILE", "text", raising=False)
+    monkeypatch.setattr(orch.settings, "WEBHOOK_GZIP_ENABLED", False, raising=False)
+    monkeypatch.setattr(
+        orch.settings, "WEBHOOK_PAYLOAD_PROFILES_JSON",
+        json.dumps({HOOK_URL: {"payload_profile": "text_capped", "payload_max_kb": 8, "gzip": True}}), raising=False,
+    )
+
+    assert orch._resolve_payload_options("https://other.example.org/hook")["payload_profile"] == "text"
+    assert orch._resolve_payload_options(HOOK_URL) == {
+        "payload_profile": "text_capped", "payload_max_kb": 8, "gzip": True, "batch": False,
+    }
+    assert orch._resolve_payload_options(HOOK_URL, {"payload_profile": "headers"})["payload_profile"] == "headers"
+
+
+@pytest.mark.unit
+def test_gzip_body_is_compressed_once_and_sizes_are_recorded(monkeypatch):
+    # Given: a receiver answering 415 to JSON (form fallback) and gzip enabled
+    metrics = RuntimeMetricsService.get_instance()
+    monkeypatch.setattr(metrics, "_payload_sizes", {})
+    posts, logs = [], []
+
+    def _post(url, **kwargs):
+        posts.append(kwargs)
+        status = 415 if kwargs["headers"]["Content-Type"] == "application/json" else 200
+        return SimpleNamespace(status_code=status, text="", content=b"{}", json=lambda: {"success": True})
+
+    payload = payloads.apply_payload_profile(_payload(), profile="text", body_plain=PLAIN)
+
+    # When
+    orch.send_custom_webhook_flow(
+        email_id="e1", subject="Lot", payload_for_webhook=payload, delivery_links=["x"],
+        webhook_url=HOOK_URL, webhook_ssl_verify=True, allow_without_links=True,
+        processing_prefs={"retry_count": 0, "webhook_timeout_sec": 5},
+        rate_limit_allow_send=lambda: True, record_send_event=lambda: None, append_webhook_log=logs.append,
+        mark_email_id_as_processed_redis=lambda eid: True, mark_email_as_read_imap=lambda *a, **k: True,
+        mail=None, email_num=None, urlparse=None, requests=SimpleNamespace(post=_post), time=time,
+        logger=orch.logging.getLogger(), webhook_delivery_mode="json", webhook_fallback_on_415=True,
+        payload_profile="text", webhook_gzip=True,
+    )
+
+    # Then: both attempts carry the same gzip body, decoding to the serialized payload
+    assert [p["headers"]["Content-Encoding"] for p in posts] == ["gzip", "gzip"]
+    assert posts[0]["data"] is posts[1]["data"]
+    assert json.loads(gzip.decompress(posts[0]["data"]))["email_content"] == PLAIN
+    entry = logs[-1]
+    assert entry["payload_profile"] == "text"
+    assert entry["wire_size_bytes"] < entry["payload_size_bytes"] / 10
+    stats = metrics.get_payload_size_stats()["text"]
+    assert (stats["count"], stats["histogram"][">1024KB"], stats["histogram"]["<=256KB"]) == (1, 0, 1)
@@ -0,0 +1,127 @@
+"""
+Tests for per-destination rate limits with pacing through the webhook outbox
+(orchestrator._get_rate_limit_pacer, deliver_outbox_job, background.webhook_dispatcher).
+"""
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from background.webhook_dispatcher import WebhookDispatcher
+from email_processing import orchestrator as orch
+from services.rate_limit_service import RateLimitService
+from services.webhook_outbox_service import WebhookOutboxService
+
+HOOK_URL = "https://hook.eu1.make.com/paced"
+PREFS = {"retry_count": 0, "webhook_timeout_sec": 5, "rate_limit_per_hour": 5}
+
+
+@pytest.fixture
+def pacing_env(monkeypatch, tmp_path):
+    now = [0.0]
+    env = SimpleNamespace(now=now, posts=[], logs=[], acked=[])
+    outbox = WebhookOutboxService(sqlite_path=tmp_path / "outbox.sqlite3", clock=lambda: now[0])
+    monkeypatch.setattr(WebhookOutboxService, "_instance", outbox)
+    rate_limiter = RateLimitService.get_instance()
+    rate_limiter._clock = lambda: now[0]
+
+    def _post(url, **kwargs):
+        env.posts.append(json.loads(kwargs["data"])["microsoft_graph_email_id"])
+        return SimpleNamespace(status_code=200, content=b"{}", text="", json=lambda: {"success": True})
+
+    monkeypatch.setattr(orch.settings, "WEBHOOK_RATE_LIMIT_PACING_ENABLED", True, raising=False)
+    monkeypatch.setattr(orch.settings, "ALLOW_CUSTOM_WEBHOOK_WITHOUT_LINKS", True, raising=False)
+    monkeypatch.setattr(
+        orch.settings, "WEBHOOK_PAYLOAD_PROFILES_JSON", json.dumps({HOOK_URL: {"rate_limit_per_hour": 2}}),
+        raising=False,
+    )
+    dedup = orch.DeduplicationService.get_instance()
+    monkeypatch.setattr(dedup, "is_email_dedup_disabled", lambda: False)
+    monkeypatch.setattr(dedup, "mark_email_processed", lambda _eid: True)
+    monkeypatch.setattr(orch.WebhookLoggerService.get_instance(), "append_log", env.logs.append)
+    monkeypatch.setattr(orch.HttpSessionService.get_instance(), "post", _post)
+    monkeypatch.setattr(orch.imap_client, "mark_email_as_read_imap", lambda *_a, **_k: True)
+
+    env.dispatcher = WebhookDispatcher(
+        outbox=outbox,
+        deliver=lambda job, final: orch.deliver_outbox_job(
+            job, final, requests=orch.HttpSessionService.get_instance(),
+            record_send_event=rate_limiter.record_event, append_webhook_log=env.logs.append,
+            logger=logging.getLogger(), rate_limiter=rate_limiter,
+        ),
+        acknowledge=lambda job: env.acked.append(job["email_id"]),
+    )
+    return env
+
+
+def _send(email_id):
+    return orch._send_webhook(
+        email_id, "Lot", {"microsoft_graph_email_id": email_id, "subject": "Lot"}, [], HOOK_URL, PREFS,
+        object(), b"1", logging.getLogger(), payload_options=orch._resolve_payload_options(HOOK_URL),
+    )
+
+
+@pytest.mark.unit
+def test_over_limit_sends_are_paced_to_the_next_slot(pacing_env):
+    # Given: a destination capped at 2 sends per hour, used at t=0 and t=600
+    _send("e1")
+    pacing_env.now[0] = 600
+    _send("e2")
+
+    # When: two more emails arrive at t=1200
+    pacing_env.now[0] = 1200
+    _send("e3")
+    _send("e4")
+
+    # Then: they are queued for t=3600 (first slot freed) instead of being skipped
+    assert pacing_env.posts == ["e1", "e2"]
+    paced = [entry for entry in pacing_env.logs if entry["status"] == "paced"]
+    assert [(e["email_id"], e["retry_after_sec"]) for e in paced] == [("e3", 2400.0), ("e4", 2400.0)]
+    assert pacing_env.dispatcher.run_once() == 0
+
+    # At t=3600 one slot is back: e3 goes, e4 is deferred to the next one (t=4200)
+    pacing_env.now[0] = 3600
+    assert pacing_env.dispatcher.run_once() == 2
+    assert (pacing_env.posts[2:], pacing_env.acked) == (["e3"], ["e3"])
+    assert pacing_env.dispatcher.status()["deferred"] == 1
+    pacing_env.now[0] = 4199
+    assert pacing_env.dispatcher.run_once() == 0
+    pacing_env.now[0] = 4200
+    assert pacing_env.dispatcher.run_once() == 1
+    assert pacing_env.posts == ["e1", "e2", "e3", "e4"]
+
+
+@pytest.mark.unit
+def test_without_pacing_over_limit_sends_are_skipped(pacing_env, monkeypatch):
+    monkeypatch.setattr(orch.settings, "WEBHOOK_RATE_LIMIT_PACING_ENABLED", False, raising=False)
+
+    results = [_send(f"e{i}") for i in range(3)]
+
+    assert results == [False, False, True]
+    assert pacing_env.logs[-1]["status_code"] == 429 and pacing_env.logs[-1]["status"] == "error"
+    assert WebhookOutboxService.get_instance().get_stats()["pending"] == 0
+
+
+@pytest.mark.unit
+def test_ingress_sends_share_the_url_limit_and_pacing(pacing_env, monkeypatch):
+    from services.ingress_service import IngressService
+
+    # Given: Gmail push ingress targeting the rate-limited URL (2/h, global 5/h)
+    monkeypatch.setattr(orch, "_get_webhook_config_dict", lambda: {"webhook_url": HOOK_URL})
+    service = IngressService(logger=logging.getLogger())
+    monkeypatch.setattr(service, "_get_processing_prefs", lambda: PREFS)
+
+    # When: three pushes arrive within the hour
+    for i in range(3):
+        result, status = service._send_ingress_webhook(
+            email_id=f"p{i}", subject="Lot", payload_for_webhook={"microsoft_graph_email_id": f"p{i}"},
+            delivery_links=[{"provider": "dropbox", "raw_url": "https://www.dropbox.com/s/a/f.zip"}],
+            dedup_service=orch.DeduplicationService.get_instance(),
+        )
+        assert status == 200
+
+    # Then: the per-URL scope applies, and the third push is paced through the outbox
+    assert pacing_env.posts == ["p0", "p1"]
+    assert [(e["email_id"], e["status"]) for e in pacing_env.logs if e["status"] == "paced"] == [("p2", "paced")]
+    assert WebhookOutboxService.get_instance().get_stats()["pending"] == 1
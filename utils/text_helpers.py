@@ -150,3 +150,17 @@ def mask_sensitive_data(text: str, type: str = "email") -> str:
         return f"Content length: {len(value)} chars"
 
     return "[redacted]"
+
+
+def mask_url(url: str) -> str:
+    """
+    Masque le chemin d'une URL (jetons de webhook) pour les logs et le dashboard.
+
+    Examples:
+        >>> mask_url("https://hook.eu1.make.com/secret-token")
+        "https://hook.eu1.make.com/***"
+    """
+    parts = str(url or "").split("/")
+    if len(parts) > 3 and parts[0].startswith("http"):
+        return f"{parts[0]}//{parts[2]}/***"
+    return str(url or "")[:30] + "***"